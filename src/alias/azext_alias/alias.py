@@ -4,7 +4,6 @@
 # --------------------------------------------------------------------------------------------
 
 import os
-import re
 import json
 import shlex
 import hashlib
@@ -12,7 +11,6 @@ from collections import defaultdict
 
 from knack.log import get_logger
 
-import azext_alias
 from azext_alias import telemetry
 from azext_alias._const import (
     GLOBAL_CONFIG_DIR,
@@ -29,7 +27,8 @@ from azext_alias.util import (
     is_alias_command,
     cache_reserved_commands,
     get_config_parser,
-    build_tab_completion_table
+    build_tab_completion_table,
+    get_reserved_command_levels
 )
 
 
@@ -48,6 +47,7 @@ class AliasManager(object):
         self.collided_alias = defaultdict(list)
         self.alias_config_str = ''
         self.alias_config_hash = ''
+        self.alias_config_changed = False
         self.load_alias_table()
         self.load_alias_hash()
 
@@ -105,6 +105,7 @@ class AliasManager(object):
         if alias_config_sha1 != self.alias_config_hash:
             # Overwrite the old hash with the new one
             self.alias_config_hash = alias_config_sha1
+            self.alias_config_changed = True
             return True
         return False
 
@@ -193,6 +194,7 @@ class AliasManager(object):
     def post_transform(self, args):
         """
         Inject environment variables, and write hash to alias hash file after transforming alias to commands.
+        The hash and collided alias files are only rewritten if the alias configuration has changed.
 
         Args:
             args: A list of args to post-transform.
@@ -208,8 +210,10 @@ class AliasManager(object):
             else:
                 post_transform_commands.append(os.path.expandvars(arg))
 
-        AliasManager.write_alias_config_hash(self.alias_config_hash)
-        AliasManager.write_collided_alias(self.collided_alias)
+        if self.alias_config_changed:
+            AliasManager.write_alias_config_hash(self.alias_config_hash)
+            AliasManager.write_collided_alias(self.collided_alias)
+            self.alias_config_changed = False
 
         return post_transform_commands
 
@@ -246,14 +250,13 @@ class AliasManager(object):
             levels: the amount of levels we tranverse through the command table tree.
         """
         collided_alias = defaultdict(list)
+        command_levels = get_reserved_command_levels()
         for alias in aliases:
             # Only care about the first word in the alias because alias
             # cannot have spaces (unless they have positional arguments)
             word = alias.split()[0]
-            for level in range(1, levels + 1):
-                collision_regex = r'^{}{}($|\s)'.format(r'([a-z\-]*\s)' * (level - 1), word.lower())
-                if list(filter(re.compile(collision_regex).match, azext_alias.cached_reserved_commands)) \
-                        and level not in collided_alias[word]:
+            for level in command_levels.get(word.lower(), []):
+                if level <= levels and level not in collided_alias[word]:
                     collided_alias[word].append(level)
 
         telemetry.set_collided_aliases(list(collided_alias.keys()))
@@ -166,6 +166,25 @@ class TestAlias(unittest.TestCase):
         test_case = azext_alias.alias.AliasManager.build_collision_table(alias_manager.alias_table.sections(), levels=2)
         self.assertDictEqual({'account': [1, 2], 'dns': [2], 'list-locations': [2]}, test_case)
 
+    def test_build_collision_table_with_uppercase_alias(self):
+        test_case = azext_alias.alias.AliasManager.build_collision_table(['Account', 'dns'])
+        self.assertDictEqual({'Account': [1, 2], 'dns': [2]}, test_case)
+
+    def test_post_transform_skips_write_without_config_change(self):
+        alias_manager = self.get_alias_manager()
+        alias_manager.transform(['ac'])
+        azext_alias.alias.AliasManager.write_alias_config_hash.assert_not_called()
+        azext_alias.alias.AliasManager.write_collided_alias.assert_not_called()
+
+    def test_post_transform_writes_on_config_change(self):
+        alias_manager = self.get_alias_manager()
+        alias_manager.alias_config_hash = ''
+        with patch('azext_alias.alias.build_tab_completion_table'):
+            alias_manager.transform(['ac'])
+        azext_alias.alias.AliasManager.write_alias_config_hash.assert_called_once_with(
+            alias_manager.alias_config_hash)
+        azext_alias.alias.AliasManager.write_collided_alias.assert_called_once()
+
     def test_non_parse_error(self):
         alias_manager = self.get_alias_manager()
         self.assertFalse(alias_manager.parse_error())
@@ -0,0 +1,94 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: disable=line-too-long
+
+import unittest
+from unittest.mock import patch
+
+import azext_alias
+from azext_alias.alias import AliasManager
+from azext_alias.util import build_reserved_command_trie
+from azext_alias.tests.test_alias import MockAliasManager
+
+NUM_ALIASES = 500
+NUM_RESERVED_COMMANDS = 5000
+
+
+def _generate_reserved_commands():
+    groups = ['group{}'.format(i) for i in range(50)]
+    return ['{} sub{} command{}'.format(groups[i % 50], i % 20, i) for i in range(NUM_RESERVED_COMMANDS)]
+
+
+def _generate_alias_config():
+    sections = []
+    for i in range(NUM_ALIASES):
+        # Make one alias out of ten collide with a reserved command word
+        alias = 'command{}'.format(i) if i % 10 == 0 else 'alias{}'.format(i)
+        sections.append('[{}]\ncommand = group{} sub{} command{}\n'.format(alias, i % 50, i % 20, i))
+    return '\n'.join(sections)
+
+
+class TestAliasBenchmark(unittest.TestCase):
+    """
+    Check the work done at startup by the alias extension with 500 aliases against a 5k-command table.
+    """
+
+    def setUp(self):
+        self.patchers = [
+            patch('azext_alias.cached_reserved_commands', _generate_reserved_commands()),
+            patch('azext_alias.util._reserved_command_levels_cache', {}),
+            patch('azext_alias.alias.build_tab_completion_table'),
+            patch.object(AliasManager, 'write_alias_config_hash'),
+            patch.object(AliasManager, 'write_collided_alias')
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+        self.alias_config = _generate_alias_config()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+
+    def test_benchmark_build_collision_table(self):
+        aliases = MockAliasManager(mock_alias_str=self.alias_config).alias_table.sections()
+
+        with patch('azext_alias.util.build_reserved_command_trie', wraps=build_reserved_command_trie) as build_trie:
+            for _ in range(10):
+                collided_alias = AliasManager.build_collision_table(aliases)
+
+        # the reserved command trie is only built by the first run
+        build_trie.assert_called_once_with(azext_alias.cached_reserved_commands)
+        self.assertEqual(NUM_ALIASES // 10, len(collided_alias))
+        self.assertEqual([3], collided_alias['command0'])
+
+    def test_benchmark_startup_overhead(self):
+        def _startup(config_changed):
+            alias_manager = MockAliasManager(mock_alias_str=self.alias_config)
+            if config_changed:
+                alias_manager.alias_config_hash = ''
+            alias_manager.transform(['alias1', '-g', 'rg'])
+
+        with patch.object(AliasManager, 'build_collision_table',
+                          wraps=AliasManager.build_collision_table) as build_collision_table:
+            _startup(True)
+            build_collision_table.assert_called_once()
+            AliasManager.write_alias_config_hash.assert_called_once()
+            AliasManager.write_collided_alias.assert_called_once()
+
+            # an unchanged alias configuration neither checks the collisions again nor rewrites the files
+            build_collision_table.reset_mock()
+            AliasManager.write_alias_config_hash.reset_mock()
+            AliasManager.write_collided_alias.reset_mock()
+            for _ in range(5):
+                _startup(False)
+            build_collision_table.assert_not_called()
+            AliasManager.write_alias_config_hash.assert_not_called()
+            AliasManager.write_collided_alias.assert_not_called()
+        self.assertEqual(NUM_RESERVED_COMMANDS, len(azext_alias.cached_reserved_commands))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,7 +11,8 @@ import tempfile
 import unittest
 from unittest import mock
 
-from azext_alias.util import remove_pos_arg_placeholders, build_tab_completion_table, get_config_parser
+from azext_alias.util import (remove_pos_arg_placeholders, build_tab_completion_table, get_config_parser,
+                              build_reserved_command_trie, get_reserved_command_levels)
 from azext_alias._const import ALIAS_TAB_COMP_TABLE_FILE_NAME
 from azext_alias.tests._const import TEST_RESERVED_COMMANDS
 
@@ -23,6 +24,7 @@ class TestUtil(unittest.TestCase):
         self.patchers = []
         self.patchers.append(mock.patch('azext_alias.util.GLOBAL_ALIAS_TAB_COMP_TABLE_PATH', os.path.join(self.mock_config_dir, ALIAS_TAB_COMP_TABLE_FILE_NAME)))
         self.patchers.append(mock.patch('azext_alias.cached_reserved_commands', TEST_RESERVED_COMMANDS))
+        self.patchers.append(mock.patch('azext_alias.util._reserved_command_levels_cache', {}))
         for patcher in self.patchers:
             patcher.start()
 
@@ -61,6 +63,33 @@ class TestUtil(unittest.TestCase):
             'account list-locations': ['']
         }, tab_completion_table)
 
+    def test_build_reserved_command_trie(self):
+        self.assertDictEqual({
+            'account': {'list-locations': {}},
+            'network': {'dns': {}},
+            'storage': {'account': {'create': {}}},
+            'group': {'delete': {}}
+        }, build_reserved_command_trie(TEST_RESERVED_COMMANDS))
+
+    def test_get_reserved_command_levels(self):
+        command_levels = get_reserved_command_levels()
+        self.assertEqual([1, 2], command_levels['account'])
+        self.assertEqual([2], command_levels['dns'])
+        self.assertEqual([3], command_levels['create'])
+
+    def test_get_reserved_command_levels_cached(self):
+        command_levels = get_reserved_command_levels()
+        with mock.patch('azext_alias.util.build_reserved_command_trie') as mock_build:
+            self.assertIs(command_levels, get_reserved_command_levels())
+            mock_build.assert_not_called()
+
+    def test_get_reserved_command_levels_reloaded_commands(self):
+        get_reserved_command_levels()
+        with mock.patch('azext_alias.cached_reserved_commands', TEST_RESERVED_COMMANDS + ['vm create']):
+            command_levels = get_reserved_command_levels()
+        self.assertEqual([1], command_levels['vm'])
+        self.assertEqual([2, 3], command_levels['create'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -17,7 +17,14 @@ from six.moves.urllib.request import urlretrieve
 from knack.util import CLIError
 
 import azext_alias
-from azext_alias._const import COLLISION_CHECK_LEVEL_DEPTH, GLOBAL_ALIAS_TAB_COMP_TABLE_PATH, ALIAS_FILE_URL_ERROR
+from azext_alias._const import (
+    COLLISION_CHECK_LEVEL_DEPTH,
+    GLOBAL_ALIAS_TAB_COMP_TABLE_PATH,
+    ALIAS_FILE_URL_ERROR
+)
+
+# In-memory cache of get_reserved_command_levels(), along with the reserved commands it was derived from
+_reserved_command_levels_cache = {}
 
 
 def get_config_parser():
@@ -79,6 +86,56 @@ def cache_reserved_commands(load_cmd_tbl_func):
         azext_alias.cached_reserved_commands = list(load_cmd_tbl_func([]).keys())
 
 
+def build_reserved_command_trie(reserved_commands):
+    """
+    Build a token trie out of the reserved commands, e.g. ['network dns', 'network vnet'] is turned into
+    {'network': {'dns': {}, 'vnet': {}}}.
+
+    Args:
+        reserved_commands: The list of reserved commands.
+
+    Returns:
+        The token trie as nested dictionaries.
+    """
+    trie = {}
+    for command in reserved_commands:
+        node = trie
+        for token in command.split():
+            node = node.setdefault(token, {})
+    return trie
+
+
+def get_reserved_command_levels():
+    """
+    Get the command levels at which every word of the reserved commands occurs, e.g. {'account': [1, 2]} because
+    of (az account ...) and (az storage account ...).
+
+    The index is derived from the token trie of azext_alias.cached_reserved_commands, and is only rebuilt when
+    the reserved commands are reloaded.
+
+    Returns:
+        A dictionary mapping every word to the sorted list of levels (starting at 1) it occurs at.
+    """
+    reserved_commands = azext_alias.cached_reserved_commands
+    if _reserved_command_levels_cache.get('reserved_commands') is reserved_commands:
+        return _reserved_command_levels_cache['command_levels']
+
+    command_levels = defaultdict(list)
+    level, nodes = 1, [build_reserved_command_trie(reserved_commands)]
+    while nodes:
+        next_nodes = []
+        for node in nodes:
+            for token, child in node.items():
+                if not command_levels[token] or command_levels[token][-1] != level:
+                    command_levels[token].append(level)
+                next_nodes.append(child)
+        level, nodes = level + 1, next_nodes
+
+    _reserved_command_levels_cache['reserved_commands'] = reserved_commands
+    _reserved_command_levels_cache['command_levels'] = dict(command_levels)
+    return _reserved_command_levels_cache['command_levels']
+
+
 def remove_pos_arg_placeholders(alias_command):
     """
     Remove positional argument placeholders from alias_command.
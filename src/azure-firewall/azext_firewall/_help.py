@@ -122,6 +122,35 @@ helps['network firewall threat-intel-allowlist show'] = """
 """
 # endregion
 
+# region AzureFirewall Rules
+helps['network firewall rule'] = """
+    type: group
+    short-summary: Manage Azure Firewall network, NAT and application rules in bulk.
+"""
+
+helps['network firewall rule import'] = """
+    type: command
+    short-summary: Import network, NAT and application rules into an Azure Firewall with a single update.
+    long-summary: |
+        The file is a CSV file with a header row, or a JSON file with a list of rules. Every rule has a rule_type (network, nat or application),
+        a collection_name, a name, and the fields of the matching `az network firewall <rule_type>-rule create` command. priority and action
+        are required to create a collection, and update an existing collection when they differ. List fields are space-separated in CSV files.
+        Outputs the collections and rules which were added, updated or left unchanged.
+    examples:
+        - name: Import rules from a CSV file.
+          text: |
+            az network firewall rule import -g MyResourceGroup -f MyFirewall --source rules.csv
+        - name: Show the changes a JSON file would make, without applying them.
+          text: |
+            az network firewall rule import -g MyResourceGroup -f MyFirewall --source rules.json --dry-run
+        - name: A CSV file with a network rule and an application rule.
+          text: |
+            rule_type,collection_name,priority,action,name,protocols,source_addresses,destination_addresses,destination_ports,target_fqdns
+            network,net-collection,100,Allow,allow-dns,UDP,10.0.0.0/24,168.63.129.16,53,
+            application,app-collection,200,Allow,allow-bing,Http=80 Https=443,10.0.0.0/24,,,www.bing.com
+"""
+# endregion
+
 # region AzureFirewall Network Rules
 helps['network firewall network-rule'] = """
     type: group
@@ -395,6 +424,25 @@ helps['network firewall policy rule-collection-group delete'] = """
     short-summary: Delete an Azure Firewall policy rule collection group.
 """
 
+helps['network firewall policy rule-collection-group import'] = """
+    type: command
+    short-summary: Import rules into an Azure firewall policy rule collection group with a single update.
+    long-summary: |
+        The file is a CSV file with a header row, or a JSON file with a list of rules. Every rule has a rule_type (NetworkRule, ApplicationRule
+        or NatRule), a collection_name, a name, and the fields of the rule, as in `az network firewall policy rule-collection-group collection rule add`.
+        NAT rules go to NAT collections and other rules to filter collections. priority and action are required to create a collection, and update
+        an existing collection when they differ. List fields are space-separated in CSV files.
+        Outputs the collections and rules which were added, updated or left unchanged.
+    examples:
+        - name: Import rules from a JSON file.
+          text: |
+            az network firewall policy rule-collection-group import -g MyResourceGroup --policy-name MyPolicy -n MyRuleCollectionGroup --source rules.json
+        - name: A JSON file with a network rule.
+          text: |
+            [{"ruleType": "NetworkRule", "collectionName": "net-collection", "priority": 100, "action": "Allow", "name": "allow-dns",
+              "ipProtocols": ["UDP"], "sourceAddresses": ["10.0.0.0/24"], "destinationAddresses": ["168.63.129.16"], "destinationPorts": ["53"]}]
+"""
+
 helps['network firewall policy rule-collection-group collection'] = """
     type: group
     short-summary: Manage and configure Azure firewall policy rule collections in the rule collection group.
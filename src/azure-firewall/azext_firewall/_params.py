@@ -140,6 +140,14 @@ def load_arguments(self, _):
     with self.argument_context('network firewall nat-rule', arg_group='Collection') as c:
         c.argument('action', arg_type=get_enum_type(AzureFirewallNatRCActionType), help='The action to apply for the rule collection. Supply only if you want to create the collection.')
 
+    with self.argument_context('network firewall rule import') as c:
+        c.argument('azure_firewall_name', firewall_name_type, id_part=None)
+
+    for scope in ['network firewall rule import', 'network firewall policy rule-collection-group import']:
+        with self.argument_context(scope) as c:
+            c.argument('source', help='Path to a JSON or CSV file with the rules to import. Rules are added, or replace the rules with the same name in the same collection.')
+            c.argument('dry_run', action='store_true', help='Report the changes without applying them.')
+
     with self.argument_context('network firewall ip-config') as c:
         c.argument('item_name', options_list=['--name', '-n'], help='Name of the IP configuration.', id_part='child_name_2')
         c.argument('resource_name', firewall_name_type)
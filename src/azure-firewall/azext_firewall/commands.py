@@ -116,6 +116,9 @@ def load_command_table(self, _):
             g.show_command('show', get_network_resource_property_entry('azure_firewalls', subresource))
             g.command('delete', delete_network_resource_property_entry('azure_firewalls', subresource))
 
+    with self.command_group('network firewall rule', network_firewall_sdk, is_preview=True) as g:
+        g.custom_command('import', 'import_af_rules')
+
     with self.command_group('network firewall', network_firewall_fqdn_tags_sdk) as g:
         g.command('list-fqdn-tags', 'list_all')
     # endregion
@@ -142,6 +145,7 @@ def load_command_table(self, _):
         g.command('delete', 'begin_delete')
         g.show_command('show')
         g.command('list', 'list')
+        g.custom_command('import', 'import_azure_firewall_policy_rule_collection_group_rules', exception_handler=exception_handler)
 
     with self.command_group('network firewall policy rule-collection-group collection', network_firewall_policy_rule_groups, resource_type=CUSTOM_FIREWALL, is_preview=True) as g:
         g.custom_command('add-nat-collection', 'add_azure_firewall_policy_nat_rule_collection', exception_handler=exception_handler)
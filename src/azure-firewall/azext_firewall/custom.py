@@ -4,10 +4,11 @@
 # --------------------------------------------------------------------------------------------
 
 import copy
+import re
 from knack.util import CLIError
 from knack.log import get_logger
 from azure.cli.core.util import sdk_no_wait
-from azure.cli.core.azclierror import UserFault, ServiceError, ValidationError
+from azure.cli.core.azclierror import UserFault, ServiceError, ValidationError, InvalidArgumentValueError
 from azure.cli.core.commands.client_factory import get_subscription_id
 from msrestazure.tools import is_valid_resource_id, resource_id
 from ._client_factory import network_client_factory
@@ -747,7 +748,7 @@ def add_firewall_policy_intrusion_detection_config(cmd,
                                                    bypass_rule_source_ip_groups=None,
                                                    bypass_rule_destination_ip_groups=None):
 
-    from azure.cli.core.azclierror import RequiredArgumentMissingError, InvalidArgumentValueError
+    from azure.cli.core.azclierror import RequiredArgumentMissingError
 
     client = network_client_factory(cmd.cli_ctx).firewall_policies
     firewall_policy = client.get(resource_group_name, firewall_policy_name)
@@ -811,7 +812,7 @@ def remove_firewall_policy_intrusion_detection_config(cmd,
                                                       firewall_policy_name,
                                                       signature_id=None,
                                                       bypass_rule_name=None):
-    from azure.cli.core.azclierror import RequiredArgumentMissingError, InvalidArgumentValueError
+    from azure.cli.core.azclierror import RequiredArgumentMissingError
 
     client = network_client_factory(cmd.cli_ctx).firewall_policies
     firewall_policy = client.get(resource_group_name, firewall_policy_name)
@@ -1146,3 +1147,256 @@ def update_azure_firewall_policy_filter_rule(cmd, instance, rule_collection_name
 
     raise UserFault(f'{rule_name} does not exist!!!')
 # endregion
+
+
+# region Rule Import
+# Import files name the fields like the create commands do, matched ignoring case, dashes and underscores.
+_RULE_IMPORT_COLLECTION_KEYS = ('ruletype', 'collectionname', 'priority', 'action')
+_RULE_IMPORT_ALIASES = {'rulename': 'name', 'enabletlsinspection': 'terminatetls'}
+
+_AF_RULE_IMPORT_TYPES = {
+    'network': ('network_rule_collections', 'AzureFirewallNetworkRuleCollection', 'AzureFirewallNetworkRule',
+                'AzureFirewallRCAction'),
+    'nat': ('nat_rule_collections', 'AzureFirewallNatRuleCollection', 'AzureFirewallNatRule',
+            'AzureFirewallNatRCAction'),
+    'application': ('application_rule_collections', 'AzureFirewallApplicationRuleCollection',
+                    'AzureFirewallApplicationRule', 'AzureFirewallRCAction')
+}
+
+_POLICY_RULE_IMPORT_TYPES = {
+    'network': ('FirewallPolicyFilterRuleCollection', 'NetworkRule', 'FirewallPolicyFilterRuleCollectionAction'),
+    'application': ('FirewallPolicyFilterRuleCollection', 'ApplicationRule',
+                    'FirewallPolicyFilterRuleCollectionAction'),
+    'nat': ('FirewallPolicyNatRuleCollection', 'NatRule', 'FirewallPolicyNatRuleCollectionAction')
+}
+
+
+def _normalize_rule_import_key(key):
+    key = key.replace('-', '').replace('_', '').lower()
+    return _RULE_IMPORT_ALIASES.get(key, key)
+
+
+def _load_rule_records(source):
+    """
+    Read the rules to import from a CSV file with a header row, or from a JSON file holding a list of objects.
+    Every rule names its rule type and collection; empty values are ignored.
+    """
+    import csv
+    import json
+    try:
+        with open(source, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.DictReader(f)) if source.lower().endswith('.csv') else json.load(f)
+    except (OSError, ValueError, csv.Error) as ex:
+        raise InvalidArgumentValueError(f"Unable to read rules from '{source}': {ex}") from ex
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise InvalidArgumentValueError(f"'{source}' must contain a list of rules.")
+    return [{_normalize_rule_import_key(key): value for key, value in row.items()
+             if key is not None and value not in (None, '', [])} for row in rows]
+
+
+def _get_rule_import_type(record, number, rule_types):
+    rule_type = str(record.get('ruletype', '')).replace('-', '').replace('_', '').lower()
+    rule_type = rule_type[:-len('rule')] if rule_type.endswith('rule') else rule_type
+    if rule_type not in rule_types:
+        raise InvalidArgumentValueError(f"Rule #{number}: rule_type must be one of {', '.join(rule_types)}.")
+    return rule_type
+
+
+def _convert_rule_import_value(cmd, value, attr_type):
+    if not attr_type.startswith('['):
+        if attr_type == 'bool' and isinstance(value, str):
+            return value.lower() == 'true'
+        return value
+    if isinstance(value, str):
+        # CSV cells hold the same space-separated lists as the create commands
+        value = [item for item in re.split(r'[\s,;]+', value) if item]
+    if attr_type == '[str]':
+        return [str(item) for item in value]
+    # application rule protocols, in the PROTOCOL=PORT format of --protocols
+    protocol_class = cmd.get_models(attr_type[1:-1])
+    protocols = []
+    for item in value:
+        if isinstance(item, dict):
+            item = {_normalize_rule_import_key(k): v for k, v in item.items()}
+            protocol_type, port = item.get('protocoltype'), item.get('port')
+        else:
+            protocol_type, _, port = str(item).partition('=')
+        if not protocol_type or not port:
+            raise InvalidArgumentValueError('usage error: protocols PROTOCOL=PORT [PROTOCOL=PORT ...]')
+        protocols.append(protocol_class(protocol_type=protocol_type.lower().capitalize(), port=int(port)))
+    return protocols
+
+
+def _build_import_rule(cmd, rule_class, record, number, ip_group_id):
+    attribute_map = rule_class._attribute_map  # pylint: disable=protected-access
+    fields = {attr.replace('_', ''): attr for attr in attribute_map if attr != 'rule_type'}
+    unknown = set(record) - set(fields) - set(_RULE_IMPORT_COLLECTION_KEYS)
+    if unknown:
+        raise InvalidArgumentValueError(f"Rule #{number}: unsupported field(s) {', '.join(sorted(unknown))}.")
+    if not record.get('name') or not record.get('collectionname'):
+        raise InvalidArgumentValueError(f"Rule #{number}: name and collection_name are required.")
+
+    params = {attr: _convert_rule_import_value(cmd, record[key], attribute_map[attr]['type'])
+              for key, attr in fields.items() if key in record}
+    for attr in ['source_ip_groups', 'destination_ip_groups']:
+        if params.get(attr):
+            params[attr] = [ip_group_id(ip_group) for ip_group in params[attr]]
+    return rule_class(**params)
+
+
+def _same_rule(rule, other):
+    def _fields(item):
+        return {k: v for k, v in item.as_dict().items() if v not in (None, '', [])}
+    return _fields(rule) == _fields(other)
+
+
+class _RuleSetIndex:
+    """
+    Looks up rule collections and their rules by name while merging imported rules, so that each rule is merged
+    in constant time instead of scanning the collections like `_upsert` and `_find_item_at_path` do.
+    """
+
+    def __init__(self, collections):
+        self.collections = collections
+        self._collections = {collection.name.lower(): collection for collection in collections}
+        self._rules = {}
+
+    def get_collection(self, name):
+        return self._collections.get(name.lower())
+
+    def add_collection(self, collection):
+        self.collections.append(collection)
+        self._collections[collection.name.lower()] = collection
+
+    def upsert_rule(self, collection, rule):
+        """ Add or replace the rule with the same name, returning 'added', 'updated' or 'unchanged'. """
+        if collection.rules is None:
+            collection.rules = []
+        positions = self._rules.get(collection.name.lower())
+        if positions is None:
+            positions = {(r.name or '').lower(): i for i, r in enumerate(collection.rules)}
+            self._rules[collection.name.lower()] = positions
+
+        position = positions.get(rule.name.lower())
+        if position is None:
+            positions[rule.name.lower()] = len(collection.rules)
+            collection.rules.append(rule)
+            return 'added'
+        if _same_rule(collection.rules[position], rule):
+            return 'unchanged'
+        collection.rules[position] = rule
+        return 'updated'
+
+
+def _merge_import_collection(index, record, number, collection_class, action_class, summary):
+    name = record['collectionname']
+    priority = int(record['priority']) if 'priority' in record else None
+    action = record.get('action')
+    collection = index.get_collection(name)
+    if collection is None:
+        if priority is None or action is None:
+            raise InvalidArgumentValueError(f"Rule #{number}: rule collection '{name}' does not exist, priority "
+                                            "and action are required to create it.")
+        collection = collection_class(name=name, priority=priority, action=action_class(type=action), rules=[])
+        index.add_collection(collection)
+        summary['collectionsAdded'].append(name)
+        return collection
+
+    changed = False
+    if priority is not None and collection.priority != priority:
+        collection.priority = priority
+        changed = True
+    if action is not None and (collection.action is None or str(collection.action.type).lower() != action.lower()):
+        collection.action = action_class(type=action)
+        changed = True
+    if changed and collection.name not in summary['collectionsUpdated'] + summary['collectionsAdded']:
+        summary['collectionsUpdated'].append(collection.name)
+    return collection
+
+
+def _merge_import_rule(index, collection, rule, number, merged, summary):
+    key = (collection.name.lower(), rule.name.lower())
+    if key in merged:
+        raise InvalidArgumentValueError(f"Rule #{number}: rule '{rule.name}' is imported more than once into "
+                                        f"rule collection '{collection.name}'.")
+    merged.add(key)
+    result = index.upsert_rule(collection, rule)
+    summary['rules' + result.capitalize()].append(f'{collection.name}/{rule.name}')
+
+
+def _get_rule_import_ip_group_resolver(cmd, resource_group_name):
+    subscription = get_subscription_id(cmd.cli_ctx)
+
+    def _ip_group_id(ip_group):
+        return ip_group if is_valid_resource_id(ip_group) else resource_id(
+            subscription=subscription, resource_group=resource_group_name, namespace='Microsoft.Network',
+            type='ipGroups', name=ip_group)
+    return _ip_group_id
+
+
+def _new_rule_import_summary():
+    return {'collectionsAdded': [], 'collectionsUpdated': [], 'rulesAdded': [], 'rulesUpdated': [],
+            'rulesUnchanged': []}
+
+
+def _rule_import_has_changes(summary):
+    return any(summary[key] for key in summary if key != 'rulesUnchanged')
+
+
+def import_af_rules(cmd, resource_group_name, azure_firewall_name, source, dry_run=False):
+    records = _load_rule_records(source)
+    ip_group_id = _get_rule_import_ip_group_resolver(cmd, resource_group_name)
+    client = network_client_factory(cmd.cli_ctx).azure_firewalls
+    af = client.get(resource_group_name, azure_firewall_name)
+
+    summary = _new_rule_import_summary()
+    indexes = {}
+    merged = set()
+    for number, record in enumerate(records, 1):
+        rule_type = _get_rule_import_type(record, number, _AF_RULE_IMPORT_TYPES)
+        collection_param_name, collection_model, rule_model, action_model = _AF_RULE_IMPORT_TYPES[rule_type]
+        collection_class, rule_class, action_class = cmd.get_models(collection_model, rule_model, action_model)
+        rule = _build_import_rule(cmd, rule_class, record, number, ip_group_id)
+
+        if collection_param_name not in indexes:
+            if getattr(af, collection_param_name, None) is None:
+                setattr(af, collection_param_name, [])
+            indexes[collection_param_name] = _RuleSetIndex(getattr(af, collection_param_name))
+        index = indexes[collection_param_name]
+        collection = _merge_import_collection(index, record, number, collection_class, action_class, summary)
+        _merge_import_rule(index, collection, rule, number, merged, summary)
+
+    if _rule_import_has_changes(summary) and not dry_run:
+        client.begin_create_or_update(resource_group_name, azure_firewall_name, af).result()
+    return summary
+
+
+def import_azure_firewall_policy_rule_collection_group_rules(cmd, resource_group_name, firewall_policy_name,
+                                                             rule_collection_group_name, source, dry_run=False):
+    records = _load_rule_records(source)
+    ip_group_id = _get_rule_import_ip_group_resolver(cmd, resource_group_name)
+    client = network_client_factory(cmd.cli_ctx).firewall_policy_rule_collection_groups
+    rule_collection_group = client.get(resource_group_name, firewall_policy_name, rule_collection_group_name)
+    if rule_collection_group.rule_collections is None:
+        rule_collection_group.rule_collections = []
+
+    summary = _new_rule_import_summary()
+    index = _RuleSetIndex(rule_collection_group.rule_collections)
+    merged = set()
+    for number, record in enumerate(records, 1):
+        rule_type = _get_rule_import_type(record, number, _POLICY_RULE_IMPORT_TYPES)
+        collection_model, rule_model, action_model = _POLICY_RULE_IMPORT_TYPES[rule_type]
+        collection_class, rule_class, action_class = cmd.get_models(collection_model, rule_model, action_model)
+        rule = _build_import_rule(cmd, rule_class, record, number, ip_group_id)
+
+        collection = _merge_import_collection(index, record, number, collection_class, action_class, summary)
+        if collection.rule_collection_type != collection_model:
+            raise InvalidArgumentValueError(f"Rule #{number}: rule collection '{collection.name}' is a "
+                                            f"{collection.rule_collection_type}, which doesn't support {rule_model}.")
+        _merge_import_rule(index, collection, rule, number, merged, summary)
+
+    if _rule_import_has_changes(summary) and not dry_run:
+        client.begin_create_or_update(resource_group_name, firewall_policy_name, rule_collection_group_name,
+                                      rule_collection_group).result()
+    return summary
+# endregion
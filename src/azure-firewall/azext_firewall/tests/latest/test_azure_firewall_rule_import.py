@@ -0,0 +1,219 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import copy
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from azure.cli.core.azclierror import InvalidArgumentValueError
+
+from azext_firewall.custom import import_af_rules, import_azure_firewall_policy_rule_collection_group_rules
+from azext_firewall.vendored_sdks.v2021_08_01.v2021_08_01 import models
+
+
+class _FakeCmd:
+    cli_ctx = None
+
+    @staticmethod
+    def get_models(*names):
+        classes = tuple(getattr(models, name) for name in names)
+        return classes[0] if len(classes) == 1 else classes
+
+
+class _FakePoller:
+    def __init__(self, result):
+        self._result = result
+
+    def result(self):
+        return self._result
+
+
+class _FakeOperations:
+    """ Stores a single resource, counting the GETs and PUTs like the service would see them. """
+
+    def __init__(self, resource):
+        self.resource = resource
+        self.gets = 0
+        self.puts = 0
+
+    def get(self, *_):
+        self.gets += 1
+        return copy.deepcopy(self.resource)
+
+    def begin_create_or_update(self, *args):
+        self.puts += 1
+        self.resource = copy.deepcopy(args[-1])
+        return _FakePoller(self.resource)
+
+
+def _network_rule(name, port='53'):
+    return models.AzureFirewallNetworkRule(name=name, protocols=['UDP'], source_addresses=['10.0.0.0/24'],
+                                           destination_addresses=['168.63.129.16'], destination_ports=[port])
+
+
+class AzureFirewallRuleImportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        patcher = mock.patch('azext_firewall.custom.get_subscription_id', return_value='sub')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _write(self, name, content):
+        path = os.path.join(self.folder, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content if isinstance(content, str) else json.dumps(content))
+        return path
+
+    def _import_af_rules(self, firewall, source, **kwargs):
+        operations = _FakeOperations(firewall)
+        with mock.patch('azext_firewall.custom.network_client_factory') as factory:
+            factory.return_value.azure_firewalls = operations
+            summary = import_af_rules(_FakeCmd(), 'rg', 'af', source, **kwargs)
+        return operations, summary
+
+    def _import_policy_rules(self, rule_collection_group, source):
+        operations = _FakeOperations(rule_collection_group)
+        with mock.patch('azext_firewall.custom.network_client_factory') as factory:
+            factory.return_value.firewall_policy_rule_collection_groups = operations
+            summary = import_azure_firewall_policy_rule_collection_group_rules(_FakeCmd(), 'rg', 'policy', 'rcg',
+                                                                               source)
+        return operations, summary
+
+    def test_import_af_rules_merge(self):
+        firewall = models.AzureFirewall(network_rule_collections=[models.AzureFirewallNetworkRuleCollection(
+            name='net', priority=100, action=models.AzureFirewallRCAction(type='Allow'),
+            rules=[_network_rule('dns'), _network_rule('ntp', '123'), _network_rule('keep')])])
+        source = self._write('rules.csv', '\n'.join([
+            'rule_type,collection_name,priority,action,name,protocols,source_addresses,destination_addresses,'
+            'destination_ports,target_fqdns,source_ip_groups',
+            'network,net,100,Allow,dns,UDP,10.0.0.0/24,168.63.129.16,53,,',
+            'network,NET,,,ntp,UDP,10.0.0.0/24,168.63.129.16,124,,',
+            'network,net,,,ssh,TCP,10.0.0.0/24 10.0.1.0/24,10.1.0.4,22,,ipg1',
+            'application-rule,app,200,Deny,bing,Http=80 https=443,10.0.0.0/24,,,www.bing.com,'
+        ]))
+
+        operations, summary = self._import_af_rules(firewall, source)
+
+        self.assertEqual((1, 1), (operations.gets, operations.puts))
+        self.assertEqual({'collectionsAdded': ['app'], 'collectionsUpdated': [], 'rulesAdded': ['net/ssh', 'app/bing'],
+                          'rulesUpdated': ['net/ntp'], 'rulesUnchanged': ['net/dns']}, summary)
+        net = operations.resource.network_rule_collections[0]
+        self.assertEqual(['dns', 'ntp', 'keep', 'ssh'], [rule.name for rule in net.rules])
+        self.assertEqual(['124'], net.rules[1].destination_ports)
+        self.assertEqual(['10.0.0.0/24', '10.0.1.0/24'], net.rules[3].source_addresses)
+        self.assertEqual(['/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Network/ipGroups/ipg1'],
+                         net.rules[3].source_ip_groups)
+        app = operations.resource.application_rule_collections[0]
+        self.assertEqual((200, 'Deny'), (app.priority, app.action.type))
+        self.assertEqual([('Http', 80), ('Https', 443)],
+                         [(p.protocol_type, p.port) for p in app.rules[0].protocols])
+
+        # importing the same file again changes nothing, so the firewall isn't updated
+        operations, summary = self._import_af_rules(operations.resource, source)
+        self.assertEqual((1, 0), (operations.gets, operations.puts))
+        self.assertEqual(4, len(summary['rulesUnchanged']))
+
+    def test_import_af_rules_collection_update_and_dry_run(self):
+        firewall = models.AzureFirewall(nat_rule_collections=[models.AzureFirewallNatRuleCollection(
+            name='nat', priority=100, action=models.AzureFirewallNatRCAction(type='Dnat'), rules=[])])
+        source = self._write('rules.json', [{
+            'ruleType': 'nat', 'collectionName': 'nat', 'priority': 300, 'name': 'web', 'protocols': ['TCP'],
+            'sourceAddresses': ['*'], 'destinationAddresses': ['1.2.3.4'], 'destinationPorts': ['80'],
+            'translatedAddress': '10.0.0.4', 'translatedPort': '8080'}])
+
+        operations, summary = self._import_af_rules(firewall, source, dry_run=True)
+        self.assertEqual((['nat'], ['nat/web']), (summary['collectionsUpdated'], summary['rulesAdded']))
+        self.assertEqual(0, operations.puts)
+
+        operations, _ = self._import_af_rules(firewall, source)
+        collection = operations.resource.nat_rule_collections[0]
+        self.assertEqual((300, 'Dnat', '8080'), (collection.priority, collection.action.type,
+                                                 collection.rules[0].translated_port))
+
+    def test_import_af_rules_errors(self):
+        firewall = models.AzureFirewall()
+        invalid_rules = [
+            [{'ruleType': 'network', 'collectionName': 'new', 'name': 'r1'}],
+            [{'ruleType': 'unknown', 'collectionName': 'c', 'priority': 100, 'action': 'Allow', 'name': 'r1'}],
+            [{'ruleType': 'network', 'collectionName': 'c', 'priority': 100, 'action': 'Allow', 'name': 'r1',
+              'targetFqdns': ['x']}],
+            [{'ruleType': 'network', 'collectionName': 'c', 'priority': 100, 'action': 'Allow', 'name': 'r1'},
+             {'ruleType': 'network', 'collectionName': 'C', 'name': 'R1'}],
+            {'rules': []},
+        ]
+        for rules in invalid_rules:
+            source = self._write('rules.json', rules)
+            with self.assertRaises(InvalidArgumentValueError, msg=rules):
+                self._import_af_rules(firewall, source)
+        with self.assertRaises(InvalidArgumentValueError):
+            self._import_af_rules(firewall, self._write('rules.json', '[{'))
+
+    def test_import_policy_rules(self):
+        rule_collection_group = models.FirewallPolicyRuleCollectionGroup(priority=100, rule_collections=[
+            models.FirewallPolicyFilterRuleCollection(
+                name='filter', priority=100, action=models.FirewallPolicyFilterRuleCollectionAction(type='Allow'),
+                rules=[models.NetworkRule(name='dns', ip_protocols=['UDP'], destination_ports=['53'])])])
+        source = self._write('rules.json', [
+            {'rule_type': 'NetworkRule', 'collection_name': 'filter', 'name': 'dns', 'ip_protocols': ['UDP'],
+             'destination_ports': ['5353']},
+            {'rule_type': 'ApplicationRule', 'collection_name': 'filter', 'name': 'bing', 'protocols': ['Https=443'],
+             'target_fqdns': ['www.bing.com'], 'enable_tls_inspection': True},
+            {'rule_type': 'NatRule', 'collection_name': 'nat', 'priority': 200, 'action': 'DNAT', 'name': 'web',
+             'ip_protocols': ['TCP'], 'destination_addresses': ['1.2.3.4'], 'destination_ports': ['80'],
+             'translated_address': '10.0.0.4', 'translated_port': '8080'}])
+
+        operations, summary = self._import_policy_rules(rule_collection_group, source)
+
+        self.assertEqual((1, 1), (operations.gets, operations.puts))
+        self.assertEqual({'collectionsAdded': ['nat'], 'collectionsUpdated': [],
+                          'rulesAdded': ['filter/bing', 'nat/web'], 'rulesUpdated': ['filter/dns'],
+                          'rulesUnchanged': []}, summary)
+        collections = operations.resource.rule_collections
+        self.assertEqual(['5353'], collections[0].rules[0].destination_ports)
+        self.assertTrue(collections[0].rules[1].terminate_tls)
+        nat = collections[1]
+        self.assertEqual(('FirewallPolicyNatRuleCollection', 'DNAT', 'NatRule'),
+                         (nat.rule_collection_type, nat.action.type, nat.rules[0].rule_type))
+
+        source = self._write('rules.json', [{'rule_type': 'NatRule', 'collection_name': 'filter', 'name': 'web'}])
+        with self.assertRaises(InvalidArgumentValueError):
+            self._import_policy_rules(rule_collection_group, source)
+
+    def test_import_af_rules_performance(self):
+        count = 2000
+        firewall = models.AzureFirewall(network_rule_collections=[models.AzureFirewallNetworkRuleCollection(
+            name='net-0', priority=100, action=models.AzureFirewallRCAction(type='Allow'),
+            rules=[_network_rule(f'rule-{i}') for i in range(0, count, 2)])])
+        rules = []
+        for i in range(count):
+            rule_type = 'network' if i % 2 else 'application'
+            rule = {'rule_type': rule_type, 'collection_name': f'{rule_type}-{i % 10}', 'priority': 100 + i % 10,
+                    'action': 'Allow', 'name': f'rule-{i}', 'source_addresses': '10.0.0.0/24'}
+            if rule_type == 'network':
+                rule.update({'protocols': 'UDP', 'destination_addresses': '168.63.129.16', 'destination_ports': '53'})
+            else:
+                rule.update({'protocols': 'Https=443', 'target_fqdns': f'host-{i}.contoso.com'})
+            rules.append(rule)
+        source = self._write('rules.json', rules)
+
+        start = time.perf_counter()
+        operations, summary = self._import_af_rules(firewall, source)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual((1, 1), (operations.gets, operations.puts))
+        self.assertEqual(count, len(summary['rulesAdded']))
+        self.assertEqual(count, sum(len(c.rules) for c in operations.resource.network_rule_collections))
+        self.assertLess(elapsed, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
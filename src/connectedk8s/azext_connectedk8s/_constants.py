@@ -177,6 +177,12 @@ K8s_Cluster_Info = "k8s_cluster_info.txt"
 Outbound_Network_Connectivity_Check = "outbound_network_connectivity_check.txt"
 Events_of_Incomplete_Diagnoser_Job = "diagnoser_failure_events.txt"
 
+# Number of container logs fetched, and of diagnostic checks run, at a time
+Arc_Agents_Logs_Max_Workers = 8
+Diagnostic_Checks_Max_Workers = 6
+# Size of the chunks in which the container logs are streamed to their files
+Arc_Agents_Logs_Chunk_Size = 64 * 1024
+
 # Diagnostic Results Name
 Outbound_Connectivity_Check_Result_String = "Outbound Network Connectivity Result:"
 DNS_Check_Result_String = "DNS Result:"
@@ -11,6 +11,8 @@ import os
 import yaml
 import json
 import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from subprocess import Popen, PIPE, run, STDOUT, call, DEVNULL
 import shutil
 from knack.log import get_logger
@@ -19,7 +21,51 @@ import azext_connectedk8s._constants as consts
 logger = get_logger(__name__)
 # pylint: disable=unused-argument, too-many-locals, too-many-branches, too-many-statements, line-too-long
 
-diagnoser_output = []
+
+class DiagnoserOutput(list):
+    '''
+    The output of the diagnoser written to the diagnoser results. The output of the checks run by run_diagnostic_checks
+    is kept apart while they run, and added in the order of the checks.
+    '''
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+
+    def append(self, output):
+        check_output = getattr(self._local, 'check_output', None)
+        if check_output is not None:
+            check_output.append(output)
+        else:
+            super().append(output)
+
+    def run_check(self, check, args):
+        self._local.check_output = []
+        try:
+            return check(*args), self._local.check_output
+        finally:
+            self._local.check_output = None
+
+
+diagnoser_output = DiagnoserOutput()
+
+
+def run_diagnostic_checks(checks, max_workers=consts.Diagnostic_Checks_Max_Workers):
+
+    # Runs the independent checks, given as (check, args) tuples, at once and returns their results in the same order
+    with ThreadPoolExecutor(max_workers=max(min(max_workers, len(checks)), 1)) as executor:
+        futures = [executor.submit(diagnoser_output.run_check, check, args) for check, args in checks]
+        results = []
+        for future in futures:
+            result, check_output = future.result()
+            diagnoser_output.extend(check_output)
+            results.append(result)
+    return results
+
+
+def is_storage_unavailable(e, filepath_with_timestamp):
+
+    # No space is left on the device, or the diagnostic folder was removed by a check running at once that ran out of space
+    return "[Errno 28]" in str(e) or (isinstance(e, FileNotFoundError) and not os.path.isdir(filepath_with_timestamp))
 
 
 def create_folder_diagnosticlogs(time_stamp):
@@ -48,7 +94,7 @@ def create_folder_diagnosticlogs(time_stamp):
     # For handling storage or OS exception that may occur during the execution
     except OSError as e:
         if "[Errno 28]" in str(e):
-            shutil.rmtree(filepath_with_timestamp, ignore_errors=False, onerror=None)
+            shutil.rmtree(filepath_with_timestamp, ignore_errors=True)
             telemetry.set_exception(exception=e, fault_type=consts.No_Storage_Space_Available_Fault_Type, summary="No space left on device")
             return "", False
         else:
@@ -78,8 +124,8 @@ def fetch_kubectl_cluster_info(filepath_with_timestamp, storage_space_available,
             output_cluster_info, error_cluster_info = response_cluster_info.communicate()
             if response_cluster_info.returncode != 0:
                 telemetry.set_exception(exception=error_cluster_info.decode("ascii"), fault_type=consts.Kubectl_Cluster_Info_Failed_Fault_Type, summary="Error while doing kubectl cluster-info")
-                logger.warning("Error while doing 'kubectl cluster-info'. We were not able to capture cluster-info logs in arc_diganostic_logs folder. Exception: ", error_cluster_info.decode("ascii"))
-                diagnoser_output.append("Error while doing 'kubectl cluster-info'. We were not able to capture cluster-info logs in arc_diganostic_logs folder. Exception: ", error_cluster_info.decode("ascii"))
+                logger.warning("Error while doing 'kubectl cluster-info'. We were not able to capture cluster-info logs in arc_diganostic_logs folder. Exception: %s", error_cluster_info.decode("ascii"))
+                diagnoser_output.append("Error while doing 'kubectl cluster-info'. We were not able to capture cluster-info logs in arc_diganostic_logs folder. Exception: " + error_cluster_info.decode("ascii"))
                 return consts.Diagnostic_Check_Failed, storage_space_available
             output_cluster_info_decoded = output_cluster_info.decode()
             # Converting the output to list and remove the extra message(To further debug and diagnose cluster problems, use 'kubectl cluster-info dump'.) that gets printed
@@ -98,10 +144,10 @@ def fetch_kubectl_cluster_info(filepath_with_timestamp, storage_space_available,
 
     # For handling storage or OS exception that may occur during the execution
     except OSError as e:
-        if "[Errno 28]" in str(e):
+        if is_storage_unavailable(e, filepath_with_timestamp):
             storage_space_available = False
             telemetry.set_exception(exception=e, fault_type=consts.No_Storage_Space_Available_Fault_Type, summary="No space left on device")
-            shutil.rmtree(filepath_with_timestamp, ignore_errors=False, onerror=None)
+            shutil.rmtree(filepath_with_timestamp, ignore_errors=True)
         else:
             logger.warning("An exception has occured while trying to store the cluster info in the arc_diagnostic_logs folder. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Fetch_Kubectl_Cluster_Info_Fault_Type, summary="Error occured while fetching cluster-info")
@@ -135,10 +181,10 @@ def fetch_connected_cluster_resource(filepath_with_timestamp, connected_cluster,
 
     # For handling storage or OS exception that may occur during the execution
     except OSError as e:
-        if "[Errno 28]" in str(e):
+        if is_storage_unavailable(e, filepath_with_timestamp):
             storage_space_available = False
             telemetry.set_exception(exception=e, fault_type=consts.No_Storage_Space_Available_Fault_Type, summary="No space left on device")
-            shutil.rmtree(filepath_with_timestamp, ignore_errors=False, onerror=None)
+            shutil.rmtree(filepath_with_timestamp, ignore_errors=True)
         else:
             logger.warning("An exception has occured while trying to store the get output of connected cluster resource in diagnostic logs folder. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Connected_Cluster_Resource_Fetch_Fault_Type, summary="Error occured while fetching the Get output of connected cluster")
@@ -160,15 +206,16 @@ def retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, stora
         if storage_space_available:
             # To retrieve all of the arc agents pods that are present in the Cluster
             arc_agents_pod_list = corev1_api_instance.list_namespaced_pod(namespace="azure-arc")
+            arc_agent_logs_path = os.path.join(filepath_with_timestamp, consts.Arc_Agents_Logs)
+            try:
+                os.mkdir(arc_agent_logs_path)
+            except FileExistsError:
+                pass
+            container_logs = []
             # Traversing through all agents
             for each_agent_pod in arc_agents_pod_list.items:
                 # Fetching the current Pod name and creating a folder with that name inside the timestamp folder
                 agent_name = each_agent_pod.metadata.name
-                arc_agent_logs_path = os.path.join(filepath_with_timestamp, consts.Arc_Agents_Logs)
-                try:
-                    os.mkdir(arc_agent_logs_path)
-                except FileExistsError:
-                    pass
                 agent_name_logs_path = os.path.join(arc_agent_logs_path, agent_name)
                 try:
                     os.mkdir(agent_name_logs_path)
@@ -177,25 +224,31 @@ def retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, stora
                 # If the agent is not in Running state we wont be able to get logs of the containers
                 if(each_agent_pod.status.phase != "Running"):
                     continue
-                # Traversing through all of the containers present inside each pods
+                # Path to add the logs of each of the containers present inside the pod
                 for each_container in each_agent_pod.spec.containers:
-                    # Fetching the Container name
-                    container_name = each_container.name
-                    # Creating a text file with the name of the container and adding that containers logs in it
-                    container_log = corev1_api_instance.read_namespaced_pod_log(name=agent_name, container=container_name, namespace="azure-arc")
-                    # Path to add the arc agents container logs.
-                    arc_agent_container_logs_path = os.path.join(agent_name_logs_path, container_name + ".txt")
-                    with open(arc_agent_container_logs_path, 'w+') as container_file:
-                        container_file.write(str(container_log))
+                    container_logs.append((agent_name, each_container.name, os.path.join(agent_name_logs_path, each_container.name + ".txt")))
+
+            # Fetching the logs of the containers at once, each streamed to its text file
+            with ThreadPoolExecutor(max_workers=consts.Arc_Agents_Logs_Max_Workers) as executor:
+                futures = [executor.submit(write_container_log, corev1_api_instance, agent_name, container_name, arc_agent_container_logs_path)
+                           for agent_name, container_name, arc_agent_container_logs_path in container_logs]
+                try:
+                    for future in futures:
+                        future.result()
+                except BaseException:
+                    # Not fetching the remaining logs once one of them failed
+                    for future in futures:
+                        future.cancel()
+                    raise
 
         return consts.Diagnostic_Check_Passed, storage_space_available
 
     # For handling storage or OS exception that may occur during the execution
     except OSError as e:
-        if "[Errno 28]" in str(e):
+        if is_storage_unavailable(e, filepath_with_timestamp):
             storage_space_available = False
             telemetry.set_exception(exception=e, fault_type=consts.No_Storage_Space_Available_Fault_Type, summary="No space left on device")
-            shutil.rmtree(filepath_with_timestamp, ignore_errors=False, onerror=None)
+            shutil.rmtree(filepath_with_timestamp, ignore_errors=True)
         else:
             logger.warning("An exception has occured while trying to fetch the azure arc agents logs from the cluster. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Fetch_Arc_Agent_Logs_Failed_Fault_Type, summary="Error occured in arc agents logger")
@@ -210,6 +263,18 @@ def retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, stora
     return consts.Diagnostic_Check_Failed, storage_space_available
 
 
+def write_container_log(corev1_api_instance, agent_name, container_name, arc_agent_container_logs_path):
+
+    # Streaming the logs of the container to its file rather than reading them in memory
+    container_log = corev1_api_instance.read_namespaced_pod_log(name=agent_name, container=container_name, namespace="azure-arc", _preload_content=False)
+    try:
+        with open(arc_agent_container_logs_path, 'wb') as container_file:
+            for chunk in container_log.stream(consts.Arc_Agents_Logs_Chunk_Size):
+                container_file.write(chunk)
+    finally:
+        container_log.release_conn()
+
+
 def retrieve_arc_agents_event_logs(filepath_with_timestamp, storage_space_available, kubectl_client_location):
 
     global diagnoser_output
@@ -223,8 +288,8 @@ def retrieve_arc_agents_event_logs(filepath_with_timestamp, storage_space_availa
             output_kubectl_get_events, error_kubectl_get_events = response_kubectl_get_events.communicate()
             if response_kubectl_get_events.returncode != 0:
                 telemetry.set_exception(exception=error_kubectl_get_events.decode("ascii"), fault_type=consts.Kubectl_Get_Events_Failed_Fault_Type, summary='Error while doing kubectl get events')
-                logger.warning("Error while doing kubectl get events. We were not able to capture events log in arc_diganostic_logs folder. Exception: ", error_kubectl_get_events.decode("ascii"))
-                diagnoser_output.append("Error while doing kubectl get events. We were not able to capture events log in arc_diganostic_logs folder. Exception: ", error_kubectl_get_events.decode("ascii"))
+                logger.warning("Error while doing kubectl get events. We were not able to capture events log in arc_diganostic_logs folder. Exception: %s", error_kubectl_get_events.decode("ascii"))
+                diagnoser_output.append("Error while doing kubectl get events. We were not able to capture events log in arc_diganostic_logs folder. Exception: " + error_kubectl_get_events.decode("ascii"))
                 return consts.Diagnostic_Check_Failed, storage_space_available
 
             # Converting output obtained in json format and fetching the azure-arc events
@@ -242,10 +307,10 @@ def retrieve_arc_agents_event_logs(filepath_with_timestamp, storage_space_availa
 
     # For handling storage or OS exception that may occur during the execution
     except OSError as e:
-        if "[Errno 28]" in str(e):
+        if is_storage_unavailable(e, filepath_with_timestamp):
             storage_space_available = False
             telemetry.set_exception(exception=e, fault_type=consts.No_Storage_Space_Available_Fault_Type, summary="No space left on device")
-            shutil.rmtree(filepath_with_timestamp, ignore_errors=False, onerror=None)
+            shutil.rmtree(filepath_with_timestamp, ignore_errors=True)
         else:
             logger.warning("An exception has occured while trying to fetch the events occured in azure-arc namespace from the cluster. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Fetch_Arc_Agents_Events_Logs_Failed_Fault_Type, summary="Error occured in arc agents events logger")
@@ -286,10 +351,10 @@ def retrieve_deployments_logs(appv1_api_instance, filepath_with_timestamp, stora
 
     # For handling storage or OS exception that may occur during the execution
     except OSError as e:
-        if "[Errno 28]" in str(e):
+        if is_storage_unavailable(e, filepath_with_timestamp):
             storage_space_available = False
             telemetry.set_exception(exception=e, fault_type=consts.No_Storage_Space_Available_Fault_Type, summary="No space left on device")
-            shutil.rmtree(filepath_with_timestamp, ignore_errors=False, onerror=None)
+            shutil.rmtree(filepath_with_timestamp, ignore_errors=True)
         else:
             logger.warning("An exception has occured while trying to fetch the azure arc deployment logs from the cluster. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Fetch_Arc_Deployment_Logs_Failed_Fault_Type, summary="Error occured in deployments logger")
@@ -407,10 +472,10 @@ def check_agent_state(corev1_api_instance, filepath_with_timestamp, storage_spac
 
     # For handling storage or OS exception that may occur during the execution
     except OSError as e:
-        if "[Errno 28]" in str(e):
+        if is_storage_unavailable(e, filepath_with_timestamp):
             storage_space_available = False
             telemetry.set_exception(exception=e, fault_type=consts.No_Storage_Space_Available_Fault_Type, summary="No space left on device")
-            shutil.rmtree(filepath_with_timestamp, ignore_errors=False, onerror=None)
+            shutil.rmtree(filepath_with_timestamp, ignore_errors=True)
         else:
             logger.warning("An exception has occured while trying to check the azure arc agents state in the cluster. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Agent_State_Check_Fault_Type, summary="Error ocuured while performing the agent state check")
@@ -681,8 +746,8 @@ def executing_diagnoser_job(corev1_api_instance, batchv1_api_instance, filepath_
                         output_kubectl_get_events, error_kubectl_get_events = response_kubectl_get_events.communicate()
                         if response_kubectl_get_events.returncode != 0:
                             telemetry.set_exception(exception=error_kubectl_get_events.decode("ascii"), fault_type=consts.Kubectl_Get_Events_Failed_Fault_Type, summary='Error while doing kubectl get events')
-                            logger.warning("Error while doing kubectl get events. We were not able to capture events log in arc_diganostic_logs folder. Exception: ", error_kubectl_get_events.decode("ascii"))
-                            diagnoser_output.append("Error while doing kubectl get events. We were not able to capture events log in arc_diganostic_logs folder. Exception: ", error_kubectl_get_events.decode("ascii"))
+                            logger.warning("Error while doing kubectl get events. We were not able to capture events log in arc_diganostic_logs folder. Exception: %s", error_kubectl_get_events.decode("ascii"))
+                            diagnoser_output.append("Error while doing kubectl get events. We were not able to capture events log in arc_diganostic_logs folder. Exception: " + error_kubectl_get_events.decode("ascii"))
                             return consts.Diagnostic_Check_Failed, storage_space_available
                         # Converting output obtained in json format and fetching the clusterconnect-agent feature
                         events_json = json.loads(output_kubectl_get_events)
@@ -742,10 +807,10 @@ def check_cluster_DNS(dns_check_log, filepath_with_timestamp, storage_space_avai
 
     # For handling storage or OS exception that may occur during the execution
     except OSError as e:
-        if "[Errno 28]" in str(e):
+        if is_storage_unavailable(e, filepath_with_timestamp):
             storage_space_available = False
             telemetry.set_exception(exception=e, fault_type=consts.No_Storage_Space_Available_Fault_Type, summary="No space left on device")
-            shutil.rmtree(filepath_with_timestamp, ignore_errors=False, onerror=None)
+            shutil.rmtree(filepath_with_timestamp, ignore_errors=True)
         else:
             logger.warning("An exception has occured while performing the DNS check on the cluster. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Cluster_DNS_Check_Fault_Type, summary="Error occured while performing cluster DNS check")
@@ -786,10 +851,10 @@ def check_cluster_outbound_connectivity(outbound_connectivity_check_log, filepat
 
     # For handling storage or OS exception that may occur during the execution
     except OSError as e:
-        if "[Errno 28]" in str(e):
+        if is_storage_unavailable(e, filepath_with_timestamp):
             storage_space_available = False
             telemetry.set_exception(exception=e, fault_type=consts.No_Storage_Space_Available_Fault_Type, summary="No space left on device")
-            shutil.rmtree(filepath_with_timestamp, ignore_errors=False, onerror=None)
+            shutil.rmtree(filepath_with_timestamp, ignore_errors=True)
         else:
             logger.warning("An exception has occured while performing the outbound connectivity check on the cluster. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Outbound_Connectivity_Check_Fault_Type, summary="Error occured while performing outbound connectivity check in the cluster")
@@ -957,10 +1022,10 @@ def describe_non_ready_agent_log(filepath_with_timestamp, corev1_api_instance, a
 
     # For handling storage or OS exception that may occur during the execution
     except OSError as e:
-        if "[Errno 28]" in str(e):
+        if is_storage_unavailable(e, filepath_with_timestamp):
             storage_space_available = False
             telemetry.set_exception(exception=e, fault_type=consts.No_Storage_Space_Available_Fault_Type, summary="No space left on device")
-            shutil.rmtree(filepath_with_timestamp, ignore_errors=False, onerror=None)
+            shutil.rmtree(filepath_with_timestamp, ignore_errors=True)
         else:
             logger.warning("An exception has occured while storing stuck agent logs in the user local machine. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Describe_Stuck_Agents_Fault_Type, summary="Error occured while storing the stuck agents description")
@@ -1006,10 +1071,10 @@ def fetching_cli_output_logs(filepath_with_timestamp, storage_space_available, f
 
     # For handling storage or OS exception that may occur during the execution
     except OSError as e:
-        if "[Errno 28]" in str(e):
+        if is_storage_unavailable(e, filepath_with_timestamp):
             storage_space_available = False
             telemetry.set_exception(exception=e, fault_type=consts.No_Storage_Space_Available_Fault_Type, summary="No space left on device")
-            shutil.rmtree(filepath_with_timestamp, ignore_errors=False, onerror=None)
+            shutil.rmtree(filepath_with_timestamp, ignore_errors=True)
 
     # To handle any exception that may occur during the execution
     except Exception as e:
@@ -2261,31 +2261,37 @@ def troubleshoot(cmd, client, resource_group_name, cluster_name, kube_config=Non
         if(diagnostic_folder_status is not True):
             storage_space_available = False
 
-        # To store the cluster-info of the cluster in current-context
-        diagnostic_checks[consts.Fetch_Kubectl_Cluster_Info], storage_space_available = troubleshootutils.fetch_kubectl_cluster_info(filepath_with_timestamp, storage_space_available, kubectl_client_location)
-
-        # To store the connected cluster resource logs in the diagnostic folder
-        diagnostic_checks[consts.Fetch_Connected_Cluster_Resource], storage_space_available = troubleshootutils.fetch_connected_cluster_resource(filepath_with_timestamp, connected_cluster, storage_space_available)
         corev1_api_instance = kube_client.CoreV1Api(kube_client.ApiClient(configuration))
 
         # Check if agents have been added to the cluster
         arc_agents_pod_list = corev1_api_instance.list_namespaced_pod(namespace="azure-arc")
 
-        # To verify if arc agents have been added to the cluster
+        # To store the cluster-info of the cluster in current-context and the connected cluster resource logs in the diagnostic folder
+        independent_checks = [(troubleshootutils.fetch_kubectl_cluster_info, (filepath_with_timestamp, storage_space_available, kubectl_client_location)),
+                              (troubleshootutils.fetch_connected_cluster_resource, (filepath_with_timestamp, connected_cluster, storage_space_available))]
         if arc_agents_pod_list.items:
+            # For storing all the agent logs using the CoreV1Api, all arc agents events logs, all the deployments logs using the AppsV1Api, and checking the azure arc agent states
+            appv1_api_instance = kube_client.AppsV1Api(kube_client.ApiClient(configuration))
+            independent_checks += [(troubleshootutils.retrieve_arc_agents_logs, (corev1_api_instance, filepath_with_timestamp, storage_space_available)),
+                                   (troubleshootutils.retrieve_arc_agents_event_logs, (filepath_with_timestamp, storage_space_available, kubectl_client_location)),
+                                   (troubleshootutils.retrieve_deployments_logs, (appv1_api_instance, filepath_with_timestamp, storage_space_available)),
+                                   (troubleshootutils.check_agent_state, (corev1_api_instance, filepath_with_timestamp, storage_space_available))]
 
-            # For storing all the agent logs using the CoreV1Api
-            diagnostic_checks[consts.Retrieve_Arc_Agents_Logs], storage_space_available = troubleshootutils.retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, storage_space_available)
-
-            # For storing all arc agents events logs
-            diagnostic_checks[consts.Retrieve_Arc_Agents_Event_Logs], storage_space_available = troubleshootutils.retrieve_arc_agents_event_logs(filepath_with_timestamp, storage_space_available, kubectl_client_location)
+        # These checks don't depend on each other so they are run at once, their output is reported in this order
+        independent_checks_results = troubleshootutils.run_diagnostic_checks(independent_checks)
+        storage_space_available = all(result[1] for result in independent_checks_results)
+        diagnostic_checks[consts.Fetch_Kubectl_Cluster_Info] = independent_checks_results[0][0]
+        diagnostic_checks[consts.Fetch_Connected_Cluster_Resource] = independent_checks_results[1][0]
 
-            # For storing all the deployments logs using the AppsV1Api
-            appv1_api_instance = kube_client.AppsV1Api(kube_client.ApiClient(configuration))
-            diagnostic_checks[consts.Retrieve_Deployments_Logs], storage_space_available = troubleshootutils.retrieve_deployments_logs(appv1_api_instance, filepath_with_timestamp, storage_space_available)
+        # To verify if arc agents have been added to the cluster
+        if arc_agents_pod_list.items:
 
-            # Check for the azure arc agent states
-            diagnostic_checks[consts.Arc_Agent_State_Check], storage_space_available, all_agents_stuck, probable_sufficient_resource_for_agents = troubleshootutils.check_agent_state(corev1_api_instance, filepath_with_timestamp, storage_space_available)
+            diagnostic_checks[consts.Retrieve_Arc_Agents_Logs] = independent_checks_results[2][0]
+            diagnostic_checks[consts.Retrieve_Arc_Agents_Event_Logs] = independent_checks_results[3][0]
+            diagnostic_checks[consts.Retrieve_Deployments_Logs] = independent_checks_results[4][0]
+            diagnostic_checks[consts.Arc_Agent_State_Check] = independent_checks_results[5][0]
+            all_agents_stuck = independent_checks_results[5][2]
+            probable_sufficient_resource_for_agents = independent_checks_results[5][3]
 
             # Check for msi certificate
             if all_agents_stuck is False:
@@ -0,0 +1,192 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import azext_connectedk8s._constants as consts
+import azext_connectedk8s._troubleshootutils as troubleshootutils
+
+
+def agent_pod(name, containers, phase="Running"):
+    containers = [SimpleNamespace(name=container) for container in containers]
+    return SimpleNamespace(metadata=SimpleNamespace(name=name), status=SimpleNamespace(phase=phase),
+                           spec=SimpleNamespace(containers=containers))
+
+
+def container_log(pod_name, container_name, lines):
+    return "".join("{} {} line {}\n".format(pod_name, container_name, i) for i in range(lines)).encode("utf-8")
+
+
+class _FakeLogResponse():
+    """Stands in for the urllib3 response of a log read without preloading its content."""
+
+    def __init__(self, api, content):
+        self.api = api
+        self.content = content
+        self.released = False
+
+    def stream(self, amt):
+        for start in range(0, len(self.content), amt):
+            threading.Event().wait(self.api.latency)
+            yield self.content[start:start + amt]
+
+    def release_conn(self):
+        self.released = True
+        with self.api.lock:
+            self.api.running -= 1
+
+
+class FakeCoreV1Api():
+    """
+    Stands in for the CoreV1Api of the cluster, with the azure-arc pods given. Reading a container log takes latency
+    seconds before each chunk of it, reading the logs of the containers in fail raises an error.
+    """
+
+    def __init__(self, pods, lines=100, latency=0, fail=()):
+        self.pods = pods
+        self.logs = {(pod.metadata.name, container.name): container_log(pod.metadata.name, container.name, lines)
+                     for pod in pods for container in pod.spec.containers}
+        self.latency = latency
+        self.fail = set(fail)
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.responses = []
+
+    def list_namespaced_pod(self, namespace):
+        assert namespace == "azure-arc"
+        return SimpleNamespace(items=self.pods)
+
+    def read_namespaced_pod_log(self, name, container, namespace, _preload_content=True):
+        assert namespace == "azure-arc" and not _preload_content
+        if container in self.fail:
+            raise ValueError("Unable to read the logs of {}".format(container))
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        response = _FakeLogResponse(self, self.logs[(name, container)])
+        self.responses.append(response)
+        return response
+
+
+class Connectedk8sTroubleshootTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, True)
+        troubleshootutils.diagnoser_output.clear()
+        self.addCleanup(troubleshootutils.diagnoser_output.clear)
+
+    def _read_logs(self):
+        logs = {}
+        logs_path = os.path.join(self.folder, consts.Arc_Agents_Logs)
+        for pod_name in os.listdir(logs_path):
+            for file_name in os.listdir(os.path.join(logs_path, pod_name)):
+                with open(os.path.join(logs_path, pod_name, file_name), "rb") as f:
+                    logs[(pod_name, file_name[:-len(".txt")])] = f.read()
+        return logs
+
+    def test_retrieve_arc_agents_logs(self):
+        pods = [agent_pod("pod{}".format(i), ["agent", "fluent-bit", "proxy"]) for i in range(10)]
+        pods.append(agent_pod("pending-pod", ["agent"], phase="Pending"))
+        api = FakeCoreV1Api(pods, lines=10000, latency=0.001)
+
+        with mock.patch.object(consts, "Arc_Agents_Logs_Chunk_Size", 4096):
+            result = troubleshootutils.retrieve_arc_agents_logs(api, self.folder, True)
+
+        self.assertEqual((consts.Diagnostic_Check_Passed, True), result)
+        # the pods which aren't running get a folder without logs
+        self.assertEqual({key: log for key, log in api.logs.items() if key[0] != "pending-pod"}, self._read_logs())
+        self.assertEqual([], os.listdir(os.path.join(self.folder, consts.Arc_Agents_Logs, "pending-pod")))
+        self.assertEqual(consts.Arc_Agents_Logs_Max_Workers, api.max_running)
+        self.assertTrue(all(response.released for response in api.responses))
+
+    def test_retrieve_arc_agents_logs_failure(self):
+        pods = [agent_pod("pod{}".format(i), ["agent", "proxy"]) for i in range(3)]
+        api = FakeCoreV1Api(pods, fail=["proxy"])
+
+        with mock.patch.object(troubleshootutils.telemetry, "set_exception") as set_exception:
+            result = troubleshootutils.retrieve_arc_agents_logs(api, self.folder, True)
+
+        self.assertEqual((consts.Diagnostic_Check_Failed, True), result)
+        self.assertEqual(["An exception has occured while trying to fetch the azure arc agents logs from the cluster. "
+                          "Exception: Unable to read the logs of proxy\n"], troubleshootutils.diagnoser_output)
+        self.assertEqual(consts.Fetch_Arc_Agent_Logs_Failed_Fault_Type, set_exception.call_args[1]["fault_type"])
+
+    def test_retrieve_arc_agents_logs_folder_removed(self):
+        api = FakeCoreV1Api([agent_pod("pod", ["agent"])])
+        read_namespaced_pod_log = api.read_namespaced_pod_log
+
+        # a check running at once ran out of space and removed the diagnostic folder
+        def remove_folder(**kwargs):
+            shutil.rmtree(self.folder)
+            return read_namespaced_pod_log(**kwargs)
+        api.read_namespaced_pod_log = remove_folder
+
+        with mock.patch.object(troubleshootutils.telemetry, "set_exception") as set_exception:
+            result = troubleshootutils.retrieve_arc_agents_logs(api, self.folder, True)
+
+        self.assertEqual((consts.Diagnostic_Check_Failed, False), result)
+        self.assertEqual(consts.No_Storage_Space_Available_Fault_Type, set_exception.call_args[1]["fault_type"])
+        self.assertEqual([], troubleshootutils.diagnoser_output)
+
+    def test_retrieve_arc_agents_logs_no_storage(self):
+        api = FakeCoreV1Api([agent_pod("pod", ["agent"])])
+
+        self.assertEqual((consts.Diagnostic_Check_Passed, False),
+                         troubleshootutils.retrieve_arc_agents_logs(api, self.folder, False))
+        self.assertEqual([], api.responses)
+
+    def test_fetch_kubectl_cluster_info_failure(self):
+        process = mock.Mock(returncode=1)
+        process.communicate.return_value = (b"", b"connection refused")
+
+        with mock.patch.object(troubleshootutils, "Popen", return_value=process), \
+                mock.patch.object(troubleshootutils.telemetry, "set_exception"):
+            result = troubleshootutils.fetch_kubectl_cluster_info(self.folder, True, "kubectl")
+
+        self.assertEqual((consts.Diagnostic_Check_Failed, True), result)
+        self.assertEqual(["Error while doing 'kubectl cluster-info'. We were not able to capture cluster-info logs in "
+                          "arc_diganostic_logs folder. Exception: connection refused"],
+                         troubleshootutils.diagnoser_output)
+
+    def test_run_diagnostic_checks(self):
+        started = []
+
+        def check(name, duration, output):
+            started.append(name)
+            time.sleep(duration)
+            for line in output:
+                troubleshootutils.diagnoser_output.append(line)
+            return consts.Diagnostic_Check_Failed if output else consts.Diagnostic_Check_Passed, name != "full"
+
+        troubleshootutils.diagnoser_output.append("before")
+        start = time.perf_counter()
+        results = troubleshootutils.run_diagnostic_checks([
+            (check, ("slow", 0.2, ["slow 1", "slow 2"])),
+            (check, ("passed", 0, [])),
+            (check, ("full", 0.1, ["full 1"])),
+            (check, ("fast", 0, ["fast 1"]))])
+        elapsed = time.perf_counter() - start
+
+        # the checks run at once, their results and output are in the order of the checks whichever ends first
+        self.assertLess(elapsed, 0.3)
+        self.assertEqual(4, len(started))
+        self.assertEqual([(consts.Diagnostic_Check_Failed, True), (consts.Diagnostic_Check_Passed, True),
+                          (consts.Diagnostic_Check_Failed, False), (consts.Diagnostic_Check_Failed, True)], results)
+        self.assertEqual(["before", "slow 1", "slow 2", "full 1", "fast 1"], troubleshootutils.diagnoser_output)
+        troubleshootutils.diagnoser_output.append("after")
+        self.assertEqual("after", troubleshootutils.diagnoser_output[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
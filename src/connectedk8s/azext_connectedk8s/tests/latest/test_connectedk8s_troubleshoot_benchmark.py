@@ -0,0 +1,61 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import unittest
+
+import azext_connectedk8s._constants as consts
+import azext_connectedk8s._troubleshootutils as troubleshootutils
+from azext_connectedk8s.tests.latest.test_connectedk8s_troubleshoot import FakeCoreV1Api, agent_pod
+
+
+def legacy_retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp):
+    """ retrieve_arc_agents_logs as it was before, reading the log of each container in memory one after another """
+    arc_agent_logs_path = os.path.join(filepath_with_timestamp, consts.Arc_Agents_Logs)
+    os.makedirs(arc_agent_logs_path, exist_ok=True)
+    for each_agent_pod in corev1_api_instance.list_namespaced_pod(namespace="azure-arc").items:
+        agent_name_logs_path = os.path.join(arc_agent_logs_path, each_agent_pod.metadata.name)
+        os.makedirs(agent_name_logs_path, exist_ok=True)
+        for each_container in each_agent_pod.spec.containers:
+            response = corev1_api_instance.read_namespaced_pod_log(name=each_agent_pod.metadata.name,
+                                                                   container=each_container.name,
+                                                                   namespace="azure-arc", _preload_content=False)
+            # the log was preloaded in memory, then decoded
+            container_log = b"".join(response.stream(consts.Arc_Agents_Logs_Chunk_Size)).decode("utf-8")
+            response.release_conn()
+            with open(os.path.join(agent_name_logs_path, each_container.name + ".txt"), 'w+') as container_file:
+                container_file.write(str(container_log))
+
+
+class Connectedk8sTroubleshootBenchmark(unittest.TestCase):
+    """ collects the logs of 40 agents of 3 containers, 1.5MB each, each chunk of 64KB taking 1ms to read """
+
+    def test_benchmark_retrieve_arc_agents_logs(self):
+        pods = [agent_pod("pod{}".format(i), ["agent", "fluent-bit", "proxy"]) for i in range(40)]
+        api = FakeCoreV1Api(pods, lines=64 * 1024, latency=0.001)
+        timings, peaks = [], []
+        for retrieve in [legacy_retrieve_arc_agents_logs,
+                         lambda api, folder: troubleshootutils.retrieve_arc_agents_logs(api, folder, True)]:
+            folder = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, folder)
+            tracemalloc.start()
+            start = time.perf_counter()
+            retrieve(api, folder)
+            timings.append(time.perf_counter() - start)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        message = "collect {} container logs: {:.2f}s, {:.1f}MB peak before, {:.2f}s, {:.1f}MB peak after".format(
+            len(api.logs), timings[0], peaks[0] / 2 ** 20, timings[1], peaks[1] / 2 ** 20)
+        self.assertLess(timings[1] * 3, timings[0], message)
+        self.assertLess(peaks[1] * 3, peaks[0], message)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -16,6 +16,9 @@ class RequiredExtensionMissing(AzCLIError):
 
 logger = get_logger(__name__)
 
+# the containerapp extension can create Container Apps concurrently from this version on
+CONCURRENT_CREATE_MIN_VERSION = "0.3.11"
+
 
 def log_containerapp_extension_required():
     message = "Please install the containerapp extension before proceeding with "
@@ -111,6 +114,18 @@ def build_containerapp_from_compose_service(cmd,
     return app.image, app.registry_server, app.registry_user, app.registry_pass
 
 
+def supports_concurrent_create():
+    # earlier versions fill in module-level models, so concurrent apps could be sent with each other's settings
+    from azure.cli.core.extension import get_extension, ExtensionNotInstalledException
+    from packaging import version
+    try:
+        containerapp_version = get_extension("containerapp").version
+    except ExtensionNotInstalledException:
+        return False
+    return containerapp_version is not None and \
+        version.parse(containerapp_version) >= version.parse(CONCURRENT_CREATE_MIN_VERSION)
+
+
 def create_containerapp_from_service(*args, **kwargs):
     return custom.create_containerapp(*args, **kwargs)
 
@@ -23,3 +23,4 @@ def load_arguments(self, _):
         c.argument('registry_pass', options_list=['--registry-password'], help="Supplied container registry's password")
         c.argument('logs_workspace_name', options_list=['--logs-workspace', '-w'], help=SUPPRESS)
         c.argument('transport_mapping', options_list=['--transport-mapping', c.deprecate(target='--transport', redirect='--transport-mapping')], action='append', nargs='+', help="Transport options per Container App instance (servicename=transportsetting).")
+        c.argument('parallelism', type=int, help="Maximum number of Container Apps created at once, for the services which don't depend on each other. Use 1 to create them one by one.")
@@ -4,6 +4,10 @@
 # --------------------------------------------------------------------------------------------
 
 import os
+import re
+from collections import OrderedDict
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 from azure.cli.core.azclierror import InvalidArgumentValueError
 from knack.log import get_logger
@@ -13,6 +17,9 @@ from pycomposefile import ComposeFile
 
 logger = get_logger(__name__)
 
+# number of Container Apps created at once, when they don't depend on each other
+DEFAULT_PARALLELISM = 4
+
 
 def resolve_configuration_element_list(compose_service, unsupported_configuration, area=None):
     if area is not None:
@@ -105,6 +112,74 @@ def check_supported_platform(platform):
     return True
 
 
+def resolve_services_settings(parsed_compose_file,  # pylint: disable=R0914
+                              managed_env_id,
+                              registry_server,
+                              registry_user,
+                              registry_pass,
+                              transport_mapping):
+    """
+    Return the build context and Dockerfile (None if the image isn't built) and the Container App settings of each
+    service, by service name in the order of the compose file.
+    """
+    services_settings = OrderedDict()
+    # Using the key to iterate to get the service name
+    # pylint: disable=C0201,C0206
+    for service_name in parsed_compose_file.ordered_services.keys():
+        service = parsed_compose_file.services[service_name]
+        if not check_supported_platform(service.platform):
+            message = "Unsupported platform found. "
+            message += "Azure Container Apps only supports linux/amd64 container images."
+            raise InvalidArgumentValueError(message)
+        image = service.image
+        warn_about_unsupported_elements(service)
+        ingress_type, target_port = resolve_ingress_and_target_port(service)
+        registry, registry_username, registry_password = resolve_registry_from_cli_args(registry_server, registry_user, registry_pass)  # pylint: disable=C0301
+        transport_setting = resolve_transport_from_cli_args(service_name, transport_mapping)
+        startup_command, startup_args = resolve_service_startup_command(service)
+        cpu, memory = validate_memory_and_cpu_setting(
+            resolve_cpu_configuration_from_service(service),
+            resolve_memory_configuration_from_service(service)
+        )
+        replicas = resolve_replicas_from_service(service)
+        environment = resolve_environment_from_service(service)
+        secret_vars, secret_env_ref = resolve_secret_from_service(service, parsed_compose_file.secrets)
+        if environment is not None and secret_env_ref is not None:
+            environment.extend(secret_env_ref)
+        elif secret_env_ref is not None:
+            environment = secret_env_ref
+
+        build = None
+        if service.build is not None:
+            logger.warning("Build configuration defined for this service.")
+            logger.warning("The build will be performed by Azure Container Registry.")
+            dockerfile = "Dockerfile"
+            if service.build.dockerfile is not None:
+                dockerfile = service.build.dockerfile
+            build = (service.build.context, dockerfile)
+
+        services_settings[service_name] = (build, {
+            "image": image,
+            "container_name": service.container_name,
+            "managed_env": managed_env_id,
+            "ingress": ingress_type,
+            "target_port": target_port,
+            "registry_server": registry,
+            "registry_user": registry_username,
+            "registry_pass": registry_password,
+            "transport": transport_setting,
+            "startup_command": startup_command,
+            "args": startup_args,
+            "cpu": cpu,
+            "memory": memory,
+            "env_vars": environment,
+            "secrets": secret_vars,
+            "min_replicas": replicas,
+            "max_replicas": replicas,
+        })
+    return services_settings
+
+
 def create_containerapps_from_compose(cmd,  # pylint: disable=R0914
                                       resource_group_name,
                                       managed_env,
@@ -115,13 +190,23 @@ def create_containerapps_from_compose(cmd,  # pylint: disable=R0914
                                       transport_mapping=None,
                                       logs_workspace_name=None,
                                       location=None,
-                                      tags=None):
+                                      tags=None,
+                                      parallelism=DEFAULT_PARALLELISM):
     from ._monkey_patch import (
         create_containerapp_from_service,
         create_containerapps_compose_environment,
         build_containerapp_from_compose_service,
         load_yaml_file,
-        show_managed_environment)
+        show_managed_environment,
+        supports_concurrent_create,
+        CONCURRENT_CREATE_MIN_VERSION)
+
+    if parallelism < 1:
+        raise InvalidArgumentValueError("--parallelism must be at least 1.")
+    if parallelism > 1 and not supports_concurrent_create():
+        logger.warning("The containerapp extension must be updated to %s or later to create Container Apps in "
+                       "parallel. Creating them one at a time.", CONCURRENT_CREATE_MIN_VERSION)
+        parallelism = 1
 
     logger.info(   # pylint: disable=W1203
         f"Creating the Container Apps managed environment {managed_env} under {resource_group_name} in {location}.")
@@ -143,82 +228,146 @@ def create_containerapps_from_compose(cmd,  # pylint: disable=R0914
 
     compose_yaml = load_yaml_file(compose_file_path)
     parsed_compose_file = ComposeFile(compose_yaml)
-
-    containerapps_from_compose = []
-    # Using the key to iterate to get the service name
-    # pylint: disable=C0201,C0206
-    for service_name in parsed_compose_file.ordered_services.keys():
-        service = parsed_compose_file.services[service_name]
-        if not check_supported_platform(service.platform):
-            message = "Unsupported platform found. "
-            message += "Azure Container Apps only supports linux/amd64 container images."
-            raise InvalidArgumentValueError(message)
-        image = service.image
-        warn_about_unsupported_elements(service)
+    dependencies = resolve_service_dependencies(parsed_compose_file)
+
+    # Resolve the settings of every service first, as it may prompt for some of them
+    services_settings = resolve_services_settings(parsed_compose_file, managed_environment["id"], registry_server,
+                                                  registry_user, registry_pass, transport_mapping)
+
+    # the builds may create the same registry, so they run one at a time
+    build_lock = threading.Lock()
+
+    def create_service_containerapp(service_name):
+        build, containerapp_settings = services_settings[service_name]
+        if build is not None:
+            with build_lock:
+                (containerapp_settings["image"], containerapp_settings["registry_server"],
+                 containerapp_settings["registry_user"],
+                 containerapp_settings["registry_pass"]) = build_containerapp_from_compose_service(
+                    cmd,
+                    service_name,
+                    build[0],
+                    build[1],
+                    resource_group_name,
+                    managed_env,
+                    location,
+                    containerapp_settings["image"],
+                    containerapp_settings["target_port"],
+                    containerapp_settings["ingress"],
+                    containerapp_settings["registry_server"],
+                    containerapp_settings["registry_user"],
+                    containerapp_settings["registry_pass"],
+                    containerapp_settings["env_vars"])
         logger.info(  # pylint: disable=W1203
             f"Creating the Container Apps instance for {service_name} under {resource_group_name} in {location}.")
-        ingress_type, target_port = resolve_ingress_and_target_port(service)
-        registry, registry_username, registry_password = resolve_registry_from_cli_args(registry_server, registry_user, registry_pass)  # pylint: disable=C0301
-        transport_setting = resolve_transport_from_cli_args(service_name, transport_mapping)
-        startup_command, startup_args = resolve_service_startup_command(service)
-        cpu, memory = validate_memory_and_cpu_setting(
-            resolve_cpu_configuration_from_service(service),
-            resolve_memory_configuration_from_service(service)
-        )
-        replicas = resolve_replicas_from_service(service)
-        environment = resolve_environment_from_service(service)
-        secret_vars, secret_env_ref = resolve_secret_from_service(service, parsed_compose_file.secrets)
-        if environment is not None and secret_env_ref is not None:
-            environment.extend(secret_env_ref)
-        elif secret_env_ref is not None:
-            environment = secret_env_ref
+        return create_containerapp_from_service(cmd,
+                                                service_name,
+                                                resource_group_name,
+                                                **containerapp_settings)
 
-        if service.build is not None:
-            logger.warning("Build configuration defined for this service.")
-            logger.warning("The build will be performed by Azure Container Registry.")
-            context = service.build.context
-            dockerfile = "Dockerfile"
-            if service.build.dockerfile is not None:
-                dockerfile = service.build.dockerfile
-            image, registry, registry_username, registry_password = build_containerapp_from_compose_service(
-                cmd,
-                service_name,
-                context,
-                dockerfile,
-                resource_group_name,
-                managed_env,
-                location,
-                image,
-                target_port,
-                ingress_type,
-                registry,
-                registry_username,
-                registry_password,
-                environment)
-
-        containerapps_from_compose.append(
-            create_containerapp_from_service(cmd,
-                                             service_name,
-                                             resource_group_name,
-                                             image=image,
-                                             container_name=service.container_name,
-                                             managed_env=managed_environment["id"],
-                                             ingress=ingress_type,
-                                             target_port=target_port,
-                                             registry_server=registry,
-                                             registry_user=registry_username,
-                                             registry_pass=registry_password,
-                                             transport=transport_setting,
-                                             startup_command=startup_command,
-                                             args=startup_args,
-                                             cpu=cpu,
-                                             memory=memory,
-                                             env_vars=environment,
-                                             secrets=secret_vars,
-                                             min_replicas=replicas,
-                                             max_replicas=replicas,)
-        )
-    return containerapps_from_compose
+    containerapps, failures = deploy_services(list(services_settings.keys()), dependencies, create_service_containerapp,
+                                              parallelism)
+    if failures:
+        raise next(failures[service_name] for service_name in services_settings.keys() if service_name in failures)
+    return [containerapps[service_name] for service_name in services_settings.keys()]
+
+
+def resolve_service_references(service, service_names):
+    # services referenced by the host of a url or address in the environment, eg, http://api:8080 or db:5432
+    referenced = set()
+    env_vars = service.resolve_environment_hierarchy()
+    if env_vars is None:
+        return referenced
+    for value in env_vars.values():
+        if value is None:
+            continue
+        for host in re.findall(r"(?:^|//|@|[\s,;=])([A-Za-z0-9_.-]+)(?=[:/\s,;]|$)", str(value)):
+            if host in service_names:
+                referenced.add(host)
+    return referenced
+
+
+def resolve_service_dependencies(parsed_compose_file):
+    """
+    Return the names of the services each service depends on, from its depends_on and links, and the services its
+    environment references (eg, the url of an ingress) unless they depend on it in turn.
+    """
+    service_names = set(parsed_compose_file.services.keys())
+    dependencies = OrderedDict()
+    for service_name, service in parsed_compose_file.services.items():
+        required = [str(dependency) for dependency in service.depends_on or []]
+        required += [str(link).split(":", maxsplit=1)[0] for link in service.links or []]
+        for dependency in required:
+            if dependency not in service_names:
+                raise InvalidArgumentValueError(
+                    f"Service {service_name} depends on the service {dependency} which isn't defined.")
+        dependencies[service_name] = set(required) - {service_name}
+
+    def depends_on(source, target):
+        visited = set()
+        to_visit = [source]
+        while to_visit:
+            current = to_visit.pop()
+            if current == target:
+                return True
+            if current not in visited:
+                visited.add(current)
+                to_visit.extend(dependencies[current])
+        return False
+
+    for service_name in dependencies:
+        if any(depends_on(dependency, service_name) for dependency in dependencies[service_name]):
+            raise InvalidArgumentValueError(f"Service {service_name} depends on itself through depends_on or links.")
+
+    # a reference is only an ordering hint, services may reference each other
+    for service_name, service in parsed_compose_file.services.items():
+        for referenced in sorted(resolve_service_references(service, service_names) - {service_name}):
+            if not depends_on(referenced, service_name):
+                dependencies[service_name].add(referenced)
+    return dependencies
+
+
+def deploy_services(service_names, dependencies, deploy, parallelism=DEFAULT_PARALLELISM):
+    """
+    Call deploy for each service once the services it depends on are deployed, for up to parallelism services at
+    once. Return the results and the exceptions of the services which failed, by service name. The services depending
+    on a failed service aren't deployed, and are in neither.
+    """
+    results = {}
+    failures = {}
+    skipped = set()
+    pending = list(service_names)
+    running = {}
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        while pending or running:
+            # skip the services depending on a failed service, and those depending on them in turn
+            skipping = True
+            while skipping:
+                skipping = [service_name for service_name in pending if any(
+                    dependency in failures or dependency in skipped for dependency in dependencies[service_name])]
+                for service_name in skipping:
+                    logger.error("Skipping the service %s as a service it depends on failed", service_name)
+                    skipped.add(service_name)
+                    pending.remove(service_name)
+
+            for service_name in [service_name for service_name in pending
+                                 if all(dependency in results for dependency in dependencies[service_name])]:
+                if len(running) >= parallelism:
+                    break
+                running[executor.submit(deploy, service_name)] = service_name
+                pending.remove(service_name)
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                service_name = running.pop(future)
+                try:
+                    results[service_name] = future.result()
+                except Exception as ex:  # pylint: disable=broad-except
+                    logger.error("Failed to create the Container App for the service %s: %s", service_name, ex)
+                    failures[service_name] = ex
+    return results, failures
 
 
 def service_deploy_exists(service):
@@ -0,0 +1,244 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import sys
+import threading
+import time
+import types
+import unittest
+from collections import OrderedDict
+from unittest import mock
+
+import yaml
+from azure.cli.core.azclierror import InvalidArgumentValueError
+from pycomposefile import ComposeFile
+
+from azext_containerapp_compose.custom import (create_containerapps_from_compose, deploy_services,
+                                               resolve_service_dependencies)
+
+
+def parse_compose_file(compose_text):
+    return ComposeFile(yaml.safe_load(compose_text))
+
+
+class FakeContainerAppClient():
+    """
+    Stands in for the containerapp extension used by compose create, each Container App taking latency seconds to
+    create. Creating the apps in fail raises an error.
+    """
+
+    def __init__(self, test, compose_text, latency=0.05, fail=(), concurrent_create=True):
+        self.compose_text = compose_text
+        self.latency = latency
+        self.fail = set(fail)
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.started = {}
+        self.finished = {}
+        self.builds = []
+        module = types.ModuleType("azext_containerapp_compose._monkey_patch")
+        module.create_containerapp_from_service = self.create_containerapp
+        module.create_containerapps_compose_environment = mock.Mock()
+        module.build_containerapp_from_compose_service = self.build
+        module.load_yaml_file = lambda _: yaml.safe_load(self.compose_text)
+        module.show_managed_environment = lambda **_: {
+            "id": "env-id", "properties": {"defaultDomain": "domain", "staticIp": "ip"}}
+        module.supports_concurrent_create = lambda: concurrent_create
+        module.CONCURRENT_CREATE_MIN_VERSION = "0.3.11"
+        patcher = mock.patch.dict(sys.modules, {"azext_containerapp_compose._monkey_patch": module})
+        patcher.start()
+        test.addCleanup(patcher.stop)
+
+    def create_containerapp(self, cmd, name, resource_group_name, **kwargs):
+        with self.lock:
+            self.started[name] = time.perf_counter()
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.latency)
+        with self.lock:
+            self.running -= 1
+            self.finished[name] = time.perf_counter()
+        if name in self.fail:
+            raise ValueError("creating {} failed".format(name))
+        return {"name": name, "image": kwargs["image"], "env": kwargs["env_vars"]}
+
+    def build(self, cmd, name, *args):
+        with self.lock:
+            self.builds.append((name, "start"))
+        time.sleep(self.latency)
+        with self.lock:
+            self.builds.append((name, "end"))
+        return "registry.azurecr.io/{}:latest".format(name), "registry.azurecr.io", "user", "pass"
+
+    def run(self, **kwargs):
+        return create_containerapps_from_compose(mock.Mock(), "rg", "env", **kwargs)
+
+
+_LAYERED_COMPOSE = """
+services:
+  web:
+    image: web
+    depends_on: [api, auth]
+    environment:
+      API_URL: http://api:8080
+  api:
+    image: api
+    depends_on:
+      db:
+        condition: service_started
+    links: ["cache:redis"]
+  auth:
+    image: auth
+    environment:
+      DATABASE: postgres://user@db:5432/auth
+  db:
+    image: db
+  cache:
+    image: cache
+  worker:
+    image: worker
+    environment:
+      QUEUE: cache
+"""
+
+
+class ContainerappComposeDeployTest(unittest.TestCase):
+
+    def setUp(self):
+        # the services ordered by ComposeFile are shared by all its instances
+        patcher = mock.patch.object(ComposeFile, "ordered_services", OrderedDict())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_resolve_service_dependencies(self):
+        dependencies = resolve_service_dependencies(parse_compose_file(_LAYERED_COMPOSE))
+
+        self.assertEqual({"web": {"api", "auth"}, "api": {"db", "cache"}, "auth": {"db"}, "db": set(),
+                          "cache": set(), "worker": {"cache"}}, dependencies)
+
+    def test_resolve_service_dependencies_cycles(self):
+        # services referencing each other in their environment are created in any order
+        dependencies = resolve_service_dependencies(parse_compose_file("""
+services:
+  frontend:
+    image: frontend
+    environment:
+      BACKEND: http://backend
+  backend:
+    image: backend
+    depends_on: [frontend]
+    environment:
+      CORS_ORIGIN: https://frontend:443/
+"""))
+        self.assertEqual({"frontend": set(), "backend": {"frontend"}}, dependencies)
+
+        with self.assertRaisesRegex(InvalidArgumentValueError, "depends on itself"):
+            resolve_service_dependencies(parse_compose_file("""
+services:
+  a:
+    image: a
+    links: [b]
+  b:
+    image: b
+    links: [a]
+"""))
+        with self.assertRaisesRegex(InvalidArgumentValueError, "missing which isn't defined"):
+            resolve_service_dependencies(parse_compose_file("""
+services:
+  a:
+    image: a
+    links: ["missing:alias"]
+"""))
+
+    def test_create_in_dependency_order(self):
+        client = FakeContainerAppClient(self, _LAYERED_COMPOSE)
+
+        result = client.run()
+
+        # the results are in the order of the compose file, with the services in depends_on first
+        self.assertEqual(["db", "api", "auth", "web", "cache", "worker"], [app["name"] for app in result])
+        dependencies = resolve_service_dependencies(parse_compose_file(_LAYERED_COMPOSE))
+        for service_name, required in dependencies.items():
+            for dependency in required:
+                self.assertLessEqual(client.finished[dependency], client.started[service_name])
+        # db, cache then api, auth and worker are created at once
+        self.assertEqual(3, client.max_running)
+        self.assertEqual(["http://api:8080"], [env.split("=", 1)[1] for env in result[3]["env"]])
+
+    def test_create_parallelism(self):
+        compose_text = "services:\n" + "".join("  app{0}:\n    image: app{0}\n".format(i) for i in range(10))
+        client = FakeContainerAppClient(self, compose_text)
+
+        client.run(parallelism=3)
+        self.assertEqual(3, client.max_running)
+
+        client.max_running = 0
+        client.run(parallelism=1)
+        self.assertEqual(1, client.max_running)
+
+        with self.assertRaisesRegex(InvalidArgumentValueError, "at least 1"):
+            client.run(parallelism=0)
+
+    def test_create_outdated_containerapp_extension(self):
+        compose_text = "services:\n" + "".join("  app{0}:\n    image: app{0}\n".format(i) for i in range(4))
+        client = FakeContainerAppClient(self, compose_text, concurrent_create=False)
+
+        with self.assertLogs("cli.azext_containerapp_compose.custom", "WARNING") as logs:
+            result = client.run(parallelism=4)
+        # the apps are created one at a time, as the extension can't create them concurrently
+        self.assertEqual(["app0", "app1", "app2", "app3"], [app["name"] for app in result])
+        self.assertEqual(1, client.max_running)
+        self.assertIn("0.3.11 or later", logs.output[0])
+
+    def test_create_failures(self):
+        client = FakeContainerAppClient(self, _LAYERED_COMPOSE, fail=["api", "worker"])
+
+        with self.assertLogs("cli.azext_containerapp_compose.custom", "ERROR") as logs:
+            with self.assertRaisesRegex(ValueError, "creating api failed"):
+                client.run()
+
+        # the services depending on a failed service aren't created, the others are
+        self.assertEqual({"db", "cache", "api", "auth", "worker"}, set(client.started))
+        self.assertEqual(3, len(logs.output))
+        self.assertEqual(["api: creating api failed", "worker: creating worker failed"],
+                         sorted(log.split("service ")[1] for log in logs.output[:2]))
+        self.assertIn("Skipping the service web", logs.output[2])
+
+    def test_create_builds_one_at_a_time(self):
+        client = FakeContainerAppClient(self, """
+services:
+  a:
+    build: ./a
+  b:
+    build:
+      context: ./b
+      dockerfile: Dockerfile.b
+""")
+
+        result = client.run()
+
+        self.assertEqual(["registry.azurecr.io/a:latest", "registry.azurecr.io/b:latest"],
+                         [app["image"] for app in result])
+        self.assertEqual(["start", "end", "start", "end"], [event for _, event in client.builds])
+
+    def test_deploy_services(self):
+        deployed = []
+        results, failures = deploy_services(["a", "b", "c"], {"a": set(), "b": {"a"}, "c": {"b"}},
+                                            lambda name: deployed.append(name) or name.upper())
+
+        self.assertEqual(({"a": "A", "b": "B", "c": "C"}, {}), (results, failures))
+        self.assertEqual(["a", "b", "c"], deployed)
+
+        # the services depending on a failed service are skipped, whatever their order
+        results, failures = deploy_services(["c", "b", "a", "d"], {"a": set(), "b": {"a"}, "c": {"b"}, "d": set()},
+                                            lambda name: 1 / (name != "a"))
+        self.assertEqual({"d": 1}, results)
+        self.assertEqual(["a"], list(failures))
+        self.assertIsInstance(failures["a"], ZeroDivisionError)
+
+
+if __name__ == "__main__":
+    unittest.main()
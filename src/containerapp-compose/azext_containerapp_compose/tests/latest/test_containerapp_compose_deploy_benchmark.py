@@ -0,0 +1,52 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import time
+import unittest
+from collections import OrderedDict
+from unittest import mock
+
+from pycomposefile import ComposeFile
+
+from azext_containerapp_compose.tests.latest.test_containerapp_compose_deploy import FakeContainerAppClient
+
+
+def synthetic_compose_file(layers, services_per_layer):
+    """ services in layers, each service depending on all the services of the layer before """
+    compose_text = "services:\n"
+    for layer in range(layers):
+        for i in range(services_per_layer):
+            compose_text += "  service{}-{}:\n    image: service{}-{}\n".format(layer, i, layer, i)
+            if layer:
+                compose_text += "    depends_on: [{}]\n".format(", ".join(
+                    "service{}-{}".format(layer - 1, j) for j in range(services_per_layer)))
+    return compose_text
+
+
+class ContainerappComposeDeployBenchmark(unittest.TestCase):
+    """ creates 12 Container Apps in 3 layers, each taking 100ms to create """
+
+    def setUp(self):
+        patcher = mock.patch.object(ComposeFile, "ordered_services", OrderedDict())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_benchmark_create(self):
+        client = FakeContainerAppClient(self, synthetic_compose_file(3, 4), latency=0.1)
+
+        timings = []
+        # one at a time, as the services were created before
+        for parallelism in [1, 4]:
+            start = time.perf_counter()
+            self.assertEqual(12, len(client.run(parallelism=parallelism)))
+            timings.append(time.perf_counter() - start)
+
+        message = "create 12 services in 3 layers: {:.2f}s one by one, {:.2f}s in parallel".format(*timings)
+        self.assertGreater(timings[0], 1.2, message)
+        self.assertLess(timings[1], 0.6, message)
+
+
+if __name__ == "__main__":
+    unittest.main()
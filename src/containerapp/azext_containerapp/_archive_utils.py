@@ -4,21 +4,27 @@
 # --------------------------------------------------------------------------------------------
 # pylint: disable=consider-using-f-string, consider-using-with, no-member
 
+import gzip
 import tarfile
 import os
+import posixpath
 import re
 import codecs
 from io import open
 import requests
 from knack.log import get_logger
 from msrestazure.azure_exceptions import CloudError
-from azure.cli.core.azclierror import (CLIInternalError)
+from azure.cli.core.azclierror import (CLIInternalError, InvalidArgumentValueError)
 from azure.cli.core.profiles import ResourceType, get_sdk
 from azure.cli.command_modules.acr._azure_utils import get_blob_info
 from azure.cli.command_modules.acr._constants import TASK_VALID_VSTS_URLS
 
 logger = get_logger(__name__)
 
+DEFAULT_COMPRESSION_LEVEL = 6  # gzip compression level of the source archive, from 1 (fastest) to 9 (smallest)
+COMMON_VCS_IGNORE_LIST = {'.git', '.gitignore', '.bzr', 'bzrignore', '.hg', '.hgignore', '.svn'}
+_REGEX_SPECIAL_CHARS = set("[]()|\\^$+{}")
+
 
 def upload_source_code(cmd, client,
                        registry_name,
@@ -27,10 +33,15 @@ def upload_source_code(cmd, client,
                        tar_file_path,
                        docker_file_path,
                        docker_file_in_tar):
+    compression_level = cmd.cli_ctx.config.getint("containerapp", "source_compression_level",
+                                                  fallback=DEFAULT_COMPRESSION_LEVEL)
+    if not 0 <= compression_level <= 9:
+        raise InvalidArgumentValueError("The containerapp.source_compression_level config must be between 0 and 9.")
     _pack_source_code(source_location,
                       tar_file_path,
                       docker_file_path,
-                      docker_file_in_tar)
+                      docker_file_in_tar,
+                      compression_level)
 
     size = os.path.getsize(tar_file_path)
     unit = 'GiB'
@@ -69,47 +80,20 @@ def upload_source_code(cmd, client,
     return relative_path
 
 
-def _pack_source_code(source_location, tar_file_path, docker_file_path, docker_file_in_tar):
+def _pack_source_code(source_location, tar_file_path, docker_file_path, docker_file_in_tar,
+                      compression_level=DEFAULT_COMPRESSION_LEVEL):
     logger.info("Packing source code into tar to upload...")
 
     original_docker_file_name = os.path.basename(docker_file_path.replace("\\", os.sep))
-    ignore_list, ignore_list_size = _load_dockerignore_file(source_location, original_docker_file_name)
-    common_vcs_ignore_list = {'.git', '.gitignore', '.bzr', 'bzrignore', '.hg', '.hgignore', '.svn'}
-
-    def _ignore_check(tarinfo, parent_ignored, parent_matching_rule_index):
-        # ignore common vcs dir or file
-        if tarinfo.name in common_vcs_ignore_list:
-            logger.info("Excluding '%s' based on default ignore rules", tarinfo.name)
-            return True, parent_matching_rule_index
-
-        if ignore_list is None:
-            # if .dockerignore doesn't exists, inherit from parent
-            # eg, it will ignore the files under .git folder.
-            return parent_ignored, parent_matching_rule_index
+    ignore_list, _ = _load_dockerignore_file(source_location, original_docker_file_name)
+    matcher = DockerIgnoreMatcher(ignore_list)
 
-        for index, item in enumerate(ignore_list):
-            # stop checking the remaining rules whose priorities are lower than the parent matching rule
-            # at this point, current item should just inherit from parent
-            if index >= parent_matching_rule_index:
-                break
-            if re.match(item.pattern, tarinfo.name):
-                logger.debug(".dockerignore: rule '%s' matches '%s'.",
-                             item.rule, tarinfo.name)
-                return item.ignore, index
-
-        logger.debug(".dockerignore: no rule for '%s'. parent ignore '%s'",
-                     tarinfo.name, parent_ignored)
-        # inherit from parent
-        return parent_ignored, parent_matching_rule_index
-
-    with tarfile.open(tar_file_path, "w:gz") as tar:
+    # the tar is streamed through gzip, without seeking back in the archive
+    with open(tar_file_path, "wb") as f, \
+            gzip.GzipFile(fileobj=f, mode="wb", compresslevel=compression_level) as gz, \
+            tarfile.open(fileobj=gz, mode="w|") as tar:
         # need to set arcname to empty string as the archive root path
-        _archive_file_recursively(tar,
-                                  source_location,
-                                  arcname="",
-                                  parent_ignored=False,
-                                  parent_matching_rule_index=ignore_list_size,
-                                  ignore_check=_ignore_check)
+        _archive_source(tar, source_location, matcher)
 
         # Add the Dockerfile if it's specified.
         # In the case of run, there will be no Dockerfile.
@@ -135,21 +119,90 @@ class IgnoreRule:  # pylint: disable=too-few-public-methods
                 rule = rule[1:]  # remove beginning '/'
 
         self.pattern = "^"
+        # the pattern of each path segment, None for **, to tell whether the rule can match under a directory
+        self.segment_patterns = []
         tokens = rule.split('/')
         token_length = len(tokens)
         for index, token in enumerate(tokens, 1):
             # ** matches any number of directories
             if token == "**":
                 self.pattern += ".*"  # treat **/ as **
+                self.segment_patterns.append(None)
             else:
                 # * matches any sequence of non-seperator characters
                 # ? matches any single non-seperator character
                 # . matches dot character
-                self.pattern += token.replace(
+                segment_pattern = token.replace(
                     "*", "[^/]*").replace("?", "[^/]").replace(".", "\\.")
+                self.pattern += segment_pattern
+                self.segment_patterns.append(segment_pattern)
                 if index < token_length:
                     self.pattern += "/"  # add back / if it's not the last
         self.pattern += "$"
+        # other regular expression syntax may match across path segments
+        if any(c in rule for c in _REGEX_SPECIAL_CHARS):
+            self.segment_patterns = None
+
+    def can_match_under(self, directory_segments):
+        """Whether the rule can match a path under the directory of the given path segments."""
+        if self.segment_patterns is None:
+            return True
+        for index, segment in enumerate(directory_segments):
+            if index >= len(self.segment_patterns):
+                return False
+            segment_pattern = self.segment_patterns[index]
+            if segment_pattern is None:
+                return True
+            if not re.fullmatch(segment_pattern, segment):
+                return False
+        return len(self.segment_patterns) > len(directory_segments)
+
+
+class DockerIgnoreMatcher:
+    """
+    The rules of a .dockerignore file compiled into a single regular expression. A path matches the rule of the
+    highest priority matching it, as if the rules were tried one by one in their priority order.
+    """
+
+    def __init__(self, ignore_list):
+        self.ignore_list = ignore_list or []
+        self._regex = None
+        if self.ignore_list:
+            self._regex = re.compile("|".join("(?P<rule{}>{})".format(index, item.pattern)
+                                              for index, item in enumerate(self.ignore_list)))
+        self._no_dockerignore = ignore_list is None
+
+    def check(self, name, parent_ignored, parent_matching_rule_index):
+        """Return whether the path is ignored, and the index of the rule deciding it."""
+        # ignore common vcs dir or file
+        if name in COMMON_VCS_IGNORE_LIST:
+            logger.info("Excluding '%s' based on default ignore rules", name)
+            return True, parent_matching_rule_index
+
+        if self._no_dockerignore:
+            # if .dockerignore doesn't exists, inherit from parent
+            # eg, it will ignore the files under .git folder.
+            return parent_ignored, parent_matching_rule_index
+
+        match = self._regex.match(name) if self._regex else None
+        # only the rules whose priorities are higher than the parent matching rule apply,
+        # the first rule matching has the highest priority
+        if match:
+            index = int(match.lastgroup[len("rule"):])
+            if index < parent_matching_rule_index:
+                item = self.ignore_list[index]
+                logger.debug(".dockerignore: rule '%s' matches '%s'.", item.rule, name)
+                return item.ignore, index
+
+        logger.debug(".dockerignore: no rule for '%s'. parent ignore '%s'", name, parent_ignored)
+        # inherit from parent
+        return parent_ignored, parent_matching_rule_index
+
+    def can_include_under(self, name, matching_rule_index):
+        """Whether a path under the ignored directory can be included again by a ! rule of a higher priority."""
+        segments = name.split("/") if name else []
+        return any(not item.ignore and item.can_match_under(segments)
+                   for item in self.ignore_list[:matching_rule_index])
 
 
 def _load_dockerignore_file(source_location, original_docker_file_name):
@@ -188,31 +241,42 @@ def _load_dockerignore_file(source_location, original_docker_file_name):
     return ignore_list, len(ignore_list)
 
 
-def _archive_file_recursively(tar, name, arcname, parent_ignored, parent_matching_rule_index, ignore_check):
-    # create a TarInfo object from the file
-    tarinfo = tar.gettarinfo(name, arcname)
+def _archive_source(tar, source_location, matcher):
+    # walk depth first in the order of the directory listings, as (path, arcname, is_dir, parent ignored,
+    # parent matching rule index)
+    stack = [(source_location, "", os.path.isdir(source_location), False, len(matcher.ignore_list))]
+    while stack:
+        name, arcname, is_dir, parent_ignored, parent_matching_rule_index = stack.pop()
 
-    if tarinfo is None:
-        raise CLIInternalError("tarfile: unsupported type {}".format(name))
+        # check if the file/dir is ignored
+        ignored, matching_rule_index = matcher.check(arcname, parent_ignored, parent_matching_rule_index)
 
-    # check if the file/dir is ignored
-    ignored, matching_rule_index = ignore_check(
-        tarinfo, parent_ignored, parent_matching_rule_index)
+        if not ignored:
+            # create a TarInfo object from the file
+            tarinfo = tar.gettarinfo(name, arcname)
 
-    if not ignored:
-        # append the tar header and data to the archive
-        if tarinfo.isreg():
-            with open(name, "rb") as f:
-                tar.addfile(tarinfo, f)
-        else:
-            tar.addfile(tarinfo)
+            if tarinfo is None:
+                raise CLIInternalError("tarfile: unsupported type {}".format(name))
 
-    # even the dir is ignored, its child items can still be included, so continue to scan
-    if tarinfo.isdir():
-        for f in os.listdir(name):
-            _archive_file_recursively(tar, os.path.join(name, f), os.path.join(arcname, f),
-                                      parent_ignored=ignored, parent_matching_rule_index=matching_rule_index,
-                                      ignore_check=ignore_check)
+            # append the tar header and data to the archive
+            if tarinfo.isreg():
+                with open(name, "rb") as f:
+                    tar.addfile(tarinfo, f)
+            else:
+                tar.addfile(tarinfo)
+
+        if not is_dir:
+            continue
+        # even the dir is ignored, its child items can still be included, so continue to scan,
+        # unless no rule can include them again
+        if ignored and not matcher.can_include_under(arcname, matching_rule_index):
+            logger.debug("Excluding '%s' and all of its content", arcname)
+            continue
+        with os.scandir(name) as entries:
+            # the rules match the names in the archive, which are separated by / on every platform
+            children = [(entry.path, posixpath.join(arcname, entry.name), entry.is_dir(follow_symlinks=False),
+                         ignored, matching_rule_index) for entry in entries]
+        stack.extend(reversed(children))
 
 
 def check_remote_source_code(source_location):
@@ -2,11 +2,14 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
-# pylint: disable=line-too-long, super-with-arguments, too-many-instance-attributes, consider-using-f-string, no-else-return, no-self-use
+# pylint: disable=line-too-long, super-with-arguments, too-many-instance-attributes, too-few-public-methods, consider-using-f-string, no-else-return, no-self-use
 
+import heapq
 import json
+import random
 import time
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 from azure.cli.core.util import send_raw_request
 from azure.cli.core.commands.client_factory import get_subscription_id
@@ -16,7 +19,12 @@ logger = get_logger(__name__)
 
 STABLE_API_VERSION = "2022-03-01"
 POLLING_TIMEOUT = 600  # how many seconds before exiting
-POLLING_SECONDS = 2  # how many seconds between requests
+POLLING_SECONDS = 2  # how many seconds between requests, unless polling adaptively
+POLLING_MIN_SECONDS = 1  # how many seconds before the second request when polling adaptively
+POLLING_MAX_SECONDS = 30  # how many seconds at most between requests when polling adaptively
+POLLING_BACKOFF = 1.5  # how much longer each wait is than the previous one when polling adaptively
+POLLING_JITTER = 0.2  # how much a wait is randomly stretched or shortened when polling adaptively
+POLLING_DELETE_STATUSES = ["scheduledfordelete", "cancelled"]
 
 
 class PollingAnimation():
@@ -37,35 +45,136 @@ class PollingAnimation():
         sys.stdout.write("\033[K")
 
 
-def poll(cmd, request_url, poll_if_status):  # pylint: disable=inconsistent-return-statements
-    try:
-        start = time.time()
-        end = time.time() + POLLING_TIMEOUT
-        animation = PollingAnimation()
-
-        animation.tick()
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-
-        while r.status_code in [200, 201] and start < end:
-            time.sleep(POLLING_SECONDS)
-            animation.tick()
+def poll(cmd, request_url, poll_if_status):
+    poller = ResourcePoller(cmd)
+    poller.add(request_url, poll_if_status)
+    return poller.wait()[0]
 
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            r2 = r.json()
 
-            if "properties" not in r2 or "provisioningState" not in r2["properties"] or not r2["properties"]["provisioningState"].lower() == poll_if_status:
-                break
-            start = time.time()
+def _is_adaptive_polling(cmd):
+    # "az config set containerapp.adaptive_polling=false" falls back to a request every POLLING_SECONDS
+    return cmd.cli_ctx.config.getboolean("containerapp", "adaptive_polling", fallback=True)
 
-        animation.flush()
-        return r.json()
-    except Exception as e:  # pylint: disable=broad-except
-        animation.flush()
 
-        delete_statuses = ["scheduledfordelete", "cancelled"]
-
-        if poll_if_status not in delete_statuses:  # Catch "not found" errors if polling for delete
-            raise e
+def _get_retry_after(response):
+    # the server delay is capped so that a long Retry-After cannot overrun POLLING_TIMEOUT
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if not retry_after:
+        return None
+    try:
+        return min(max(0, int(retry_after)), POLLING_MAX_SECONDS)
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        return min(max(0, parsedate_to_datetime(retry_after).timestamp() - time.time()), POLLING_MAX_SECONDS)
+    except (TypeError, ValueError):
+        return None
+
+
+class _PolledResource():
+    def __init__(self, request_url, poll_if_status):
+        self.request_url = request_url
+        self.poll_if_status = poll_if_status
+        self.interval = POLLING_MIN_SECONDS
+        self.response = None
+        self.result = None
+        self.error = None
+
+
+class ResourcePoller():
+    """
+    Polls resources from one loop until none of them is in the provisioning state polled for, or POLLING_TIMEOUT is
+    reached. The wait before polling a resource again honours the Retry-After header of its last response, or else
+    grows exponentially with some jitter from POLLING_MIN_SECONDS up to POLLING_MAX_SECONDS.
+    """
+
+    def __init__(self, cmd, timeout=POLLING_TIMEOUT):
+        self.cmd = cmd
+        self.timeout = timeout
+        self.adaptive = _is_adaptive_polling(cmd)
+        self._resources = []
+
+    def add(self, request_url, poll_if_status):
+        self._resources.append(_PolledResource(request_url, poll_if_status))
+
+    def wait(self):
+        """Return the last response of each resource, in the order they were added, and raise the first error once
+        all the resources are polled. Resources polled for deletion return None once not found."""
+        end = time.time() + self.timeout
+        animation = PollingAnimation()
+        queue = [(0, index, resource) for index, resource in enumerate(self._resources)]
+        try:
+            while queue:
+                poll_at, index, resource = heapq.heappop(queue)
+                delay = poll_at - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                animation.tick()
+                if self._poll(resource) and time.time() < end:
+                    heapq.heappush(queue, (time.time() + self._get_interval(resource), index, resource))
+        finally:
+            animation.flush()
+
+        for resource in self._resources:
+            if resource.error is not None:
+                raise resource.error
+        return [resource.result for resource in self._resources]
+
+    def _poll(self, resource):
+        # return whether the resource is still in the state polled for
+        try:
+            r = send_raw_request(self.cmd.cli_ctx, "GET", resource.request_url)
+            resource.response = r
+            resource.result = r.json()
+        except Exception as e:  # pylint: disable=broad-except
+            resource.result = None
+            if resource.poll_if_status not in POLLING_DELETE_STATUSES:  # Catch "not found" errors if polling for delete
+                resource.error = e
+            return False
+
+        r2 = resource.result
+        if r.status_code not in [200, 201] or not isinstance(r2, dict):
+            return False
+        provisioning_state = (r2.get("properties") or {}).get("provisioningState")
+        return provisioning_state is not None and provisioning_state.lower() == resource.poll_if_status
+
+    def _get_interval(self, resource):
+        if not self.adaptive:
+            return POLLING_SECONDS
+        retry_after = _get_retry_after(resource.response)
+        if retry_after is not None:
+            return retry_after
+        interval = resource.interval
+        resource.interval = min(resource.interval * POLLING_BACKOFF, POLLING_MAX_SECONDS)
+        return interval * random.uniform(1 - POLLING_JITTER, 1 + POLLING_JITTER)
+
+
+def _get_page(cmd, request_url):
+    r = send_raw_request(cmd.cli_ctx, "GET", request_url)
+    return r.json()
+
+
+def _iter_pages(cmd, request_url):
+    """Yield the pages of a listing, requesting each next page while the previous one is processed."""
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        j = _get_page(cmd, request_url)
+        while True:
+            next_page = None
+            if j.get("nextLink") is not None:
+                next_page = executor.submit(_get_page, cmd, j["nextLink"])
+            yield j
+            if next_page is None:
+                return
+            j = next_page.result()
+
+
+def _list_pages(cmd, request_url, formatter=lambda x: x):
+    items = []
+    for j in _iter_pages(cmd, request_url):
+        for item in j["value"]:
+            items.append(formatter(item))
+    return items
 
 
 class ContainerAppClient():
@@ -181,8 +290,6 @@ class ContainerAppClient():
 
     @classmethod
     def list_by_subscription(cls, cmd, formatter=lambda x: x):
-        app_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         api_version = STABLE_API_VERSION
         sub_id = get_subscription_id(cmd.cli_ctx)
@@ -191,26 +298,10 @@ class ContainerAppClient():
             sub_id,
             api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            app_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                app_list.append(formatted)
-
-        return app_list
+        return _list_pages(cmd, request_url, formatter)
 
     @classmethod
     def list_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x):
-        app_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         api_version = STABLE_API_VERSION
         sub_id = get_subscription_id(cmd.cli_ctx)
@@ -221,21 +312,7 @@ class ContainerAppClient():
             resource_group_name,
             api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            app_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                app_list.append(formatted)
-
-        return app_list
+        return _list_pages(cmd, request_url, formatter)
 
     @classmethod
     def list_secrets(cls, cmd, resource_group_name, name):
@@ -257,8 +334,6 @@ class ContainerAppClient():
     @classmethod
     def list_revisions(cls, cmd, resource_group_name, name, formatter=lambda x: x):
 
-        revisions_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         api_version = STABLE_API_VERSION
         sub_id = get_subscription_id(cmd.cli_ctx)
@@ -270,21 +345,7 @@ class ContainerAppClient():
             name,
             api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            revisions_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                revisions_list.append(formatted)
-
-        return revisions_list
+        return _list_pages(cmd, request_url, formatter)
 
     @classmethod
     def show_revision(cls, cmd, resource_group_name, container_app_name, name):
@@ -356,8 +417,6 @@ class ContainerAppClient():
 
     @classmethod
     def list_replicas(cls, cmd, resource_group_name, container_app_name, revision_name):
-        replica_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         sub_id = get_subscription_id(cmd.cli_ctx)
         url_fmt = "{}/subscriptions/{}/resourceGroups/{}/providers/Microsoft.App/containerApps/{}/revisions/{}/replicas?api-version={}"
@@ -369,19 +428,7 @@ class ContainerAppClient():
             revision_name,
             STABLE_API_VERSION)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for replica in j["value"]:
-            replica_list.append(replica)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for replica in j["value"]:
-                replica_list.append(replica)
-
-        return replica_list
+        return _list_pages(cmd, request_url)
 
     @classmethod
     def get_replica(cls, cmd, resource_group_name, container_app_name, revision_name, replica_name):
@@ -544,8 +591,6 @@ class ManagedEnvironmentClient():
 
     @classmethod
     def list_by_subscription(cls, cmd, formatter=lambda x: x):
-        env_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         api_version = STABLE_API_VERSION
         sub_id = get_subscription_id(cmd.cli_ctx)
@@ -554,26 +599,10 @@ class ManagedEnvironmentClient():
             sub_id,
             api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for env in j["value"]:
-            formatted = formatter(env)
-            env_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for env in j["value"]:
-                formatted = formatter(env)
-                env_list.append(formatted)
-
-        return env_list
+        return _list_pages(cmd, request_url, formatter)
 
     @classmethod
     def list_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x):
-        env_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         api_version = STABLE_API_VERSION
         sub_id = get_subscription_id(cmd.cli_ctx)
@@ -584,21 +613,7 @@ class ManagedEnvironmentClient():
             resource_group_name,
             api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for env in j["value"]:
-            formatted = formatter(env)
-            env_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for env in j["value"]:
-                formatted = formatter(env)
-                env_list.append(formatted)
-
-        return env_list
+        return _list_pages(cmd, request_url, formatter)
 
     @classmethod
     def show_certificate(cls, cmd, resource_group_name, name, certificate_name):
@@ -619,8 +634,6 @@ class ManagedEnvironmentClient():
 
     @classmethod
     def list_certificates(cls, cmd, resource_group_name, name, formatter=lambda x: x):
-        certs_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         api_version = STABLE_API_VERSION
         sub_id = get_subscription_id(cmd.cli_ctx)
@@ -632,12 +645,7 @@ class ManagedEnvironmentClient():
             name,
             api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url, body=None)
-        j = r.json()
-        for cert in j["value"]:
-            formatted = formatter(cert)
-            certs_list.append(formatted)
-        return certs_list
+        return _list_pages(cmd, request_url, formatter)
 
     @classmethod
     def create_or_update_certificate(cls, cmd, resource_group_name, name, certificate_name, certificate):
@@ -860,8 +868,6 @@ class DaprComponentClient():
 
     @classmethod
     def list(cls, cmd, resource_group_name, environment_name, formatter=lambda x: x):
-        app_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         api_version = STABLE_API_VERSION
         sub_id = get_subscription_id(cmd.cli_ctx)
@@ -872,21 +878,7 @@ class DaprComponentClient():
             environment_name,
             api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            app_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                app_list.append(formatted)
-
-        return app_list
+        return _list_pages(cmd, request_url, formatter)
 
 
 class StorageClient():
@@ -976,8 +968,6 @@ class StorageClient():
 
     @classmethod
     def list(cls, cmd, resource_group_name, env_name, formatter=lambda x: x):
-        env_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         api_version = STABLE_API_VERSION
         sub_id = get_subscription_id(cmd.cli_ctx)
@@ -989,21 +979,7 @@ class StorageClient():
             env_name,
             api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for env in j["value"]:
-            formatted = formatter(env)
-            env_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for env in j["value"]:
-                formatted = formatter(env)
-                env_list.append(formatted)
-
-        return env_list
+        return _list_pages(cmd, request_url, formatter)
 
 
 class AuthClient():
@@ -135,7 +135,7 @@ helps['containerapp logs'] = """
 
 helps['containerapp logs show'] = """
     type: command
-    short-summary: Show past logs and/or print logs in real time (with the --follow parameter). Note that the logs are only taken from one revision, replica, and container.
+    short-summary: Show past logs and/or print logs in real time (with the --follow parameter). Note that the logs are only taken from one revision, and from one replica and container unless --all-replicas or --all-containers is used.
     examples:
     - name: Fetch the past 20 lines of logs from an app and return
       text: |
@@ -146,6 +146,9 @@ helps['containerapp logs show'] = """
     - name: Fetch logs for a particular revision, replica, and container
       text: |
           az containerapp logs show -n MyContainerapp -g MyResourceGroup --replica MyReplica --revision MyRevision --container MyContainer
+    - name: Print the logs of all the replicas and containers of an app's latest revision as they come in
+      text: |
+          az containerapp logs show -n MyContainerapp -g MyResourceGroup --follow --all-replicas --all-containers
 """
 
 # Replica Commands
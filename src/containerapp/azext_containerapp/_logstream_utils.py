@@ -0,0 +1,124 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import re
+import sys
+import threading
+import time
+from collections import namedtuple
+from itertools import count
+from queue import Queue, Empty
+
+import requests
+
+from knack.log import get_logger
+from azure.cli.core.azclierror import ValidationError
+
+logger = get_logger(__name__)
+
+# Lines received within this window are sorted by timestamp before being written out together
+LOGSTREAM_MERGE_WINDOW_SECONDS = 0.5
+
+# The logstream API returns some special characters escaped, they are needed to display color/quotations properly
+_ESCAPED_CHARS_RE = re.compile(r"\\u(0022|001B|002B|0027)")
+_TIMESTAMP_RE = re.compile(r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.(\d+))?")
+_TIMESTAMP_SEARCH_LENGTH = 64
+
+_STREAM_END = object()
+
+# label is the prefix printed in front of the lines of this source, None for no prefix
+LogStreamSource = namedtuple("LogStreamSource", ["label", "url"])
+
+
+def format_log_line(line):
+    return _ESCAPED_CHARS_RE.sub(lambda m: chr(int(m.group(1), 16)), line)
+
+
+def get_log_line_timestamp(line):
+    """Return a sortable timestamp of the log line (fractional seconds padded to nanoseconds), or None."""
+    match = _TIMESTAMP_RE.search(line, 0, _TIMESTAMP_SEARCH_LENGTH)
+    if not match:
+        return None
+    return "{}.{}".format(match.group(1), (match.group(2) or "").ljust(9, "0"))
+
+
+def label_log_line(line, label, output_format=None):
+    if not label:
+        return line
+    if output_format == "json" and line.startswith("{") and not line[1:].lstrip().startswith("}"):
+        return '{"Source":' + json.dumps(label) + "," + line[1:]
+    return "[{}] {}".format(label, line)
+
+
+def _read_log_stream(source, params, headers, lines):
+    try:
+        logger.info("connecting to : %s", source.url)
+        resp = requests.get(source.url, timeout=None, stream=True, params=params, headers=headers)
+        if not resp.ok:
+            raise ValidationError(f"Got bad status from the logstream API: {resp.status_code}")
+        for line in resp.iter_lines():
+            if line:
+                lines.put((source, line))
+    except Exception as ex:  # pylint: disable=broad-except
+        lines.put((source, ex))
+    finally:
+        lines.put((source, _STREAM_END))
+
+
+def stream_logs(sources, params=None, headers=None, output_format=None, output=None,
+                merge_window=LOGSTREAM_MERGE_WINDOW_SECONDS):
+    """
+    Stream the logs of every source concurrently and write them to output (stdout by default).
+    Lines received within merge_window are ordered by their timestamp and written in a single batch.
+    """
+    output = output or sys.stdout
+    lines = Queue()
+    for source in sources:
+        threading.Thread(target=_read_log_stream, args=(source, params, headers, lines), daemon=True).start()
+
+    sequence = count()
+    last_timestamps = {}
+    errors = []
+    buffer = []
+    pending = len(sources)
+    deadline = time.monotonic() + merge_window
+    while pending:
+        try:
+            source, line = lines.get(timeout=max(0, deadline - time.monotonic()))
+        except Empty:
+            source, line = None, None
+
+        if line is _STREAM_END:
+            pending -= 1
+        elif isinstance(line, Exception):
+            if len(sources) > 1:
+                logger.warning("Failed to stream the logs of %s: %s", source.label, line)
+            errors.append(line)
+        elif line is not None:
+            logger.info("received raw log line: %s", line)
+            text = format_log_line(line.decode("utf-8"))
+            timestamp = ""
+            if len(sources) > 1:
+                # lines without a timestamp stay after the previous line of the same source
+                timestamp = get_log_line_timestamp(text) or last_timestamps.get(source, "")
+                last_timestamps[source] = timestamp
+            buffer.append((timestamp, next(sequence), label_log_line(text, source.label, output_format)))
+
+        if not pending or time.monotonic() >= deadline:
+            _flush_log_lines(buffer, output)
+            deadline = time.monotonic() + merge_window
+
+    if errors and len(errors) == len(sources):
+        raise errors[0] if isinstance(errors[0], ValidationError) else ValidationError(str(errors[0]))
+
+
+def _flush_log_lines(buffer, output):
+    if not buffer:
+        return
+    buffer.sort()
+    output.write("".join(line + "\n" for _, _, line in buffer))
+    output.flush()
+    buffer.clear()
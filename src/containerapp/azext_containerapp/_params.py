@@ -46,6 +46,8 @@ def load_arguments(self, _):
         c.argument('output_format', options_list=["--format"], help="Log output format", arg_type=get_enum_type(["json", "text"]), default="json")
         c.argument('replica', help="The name of the replica. List replicas with 'az containerapp replica list'. A replica may not exist if there is not traffic to your app.")
         c.argument('revision', help="The name of the container app revision. Defaults to the latest revision.")
+        c.argument('all_replicas', options_list=['--all-replicas'], arg_type=get_three_state_flag(), help="Stream the logs of all the replicas of the revision at once. Lines are prefixed with their replica name.")
+        c.argument('all_containers', options_list=['--all-containers'], arg_type=get_three_state_flag(), help="Stream the logs of all the containers of the replica at once. Lines are prefixed with their container name.")
         c.argument('name', name_type, id_part=None, help="The name of the Containerapp.")
         c.argument('resource_group_name', arg_type=resource_group_name_type, id_part=None)
 
@@ -5,6 +5,7 @@
 # pylint: disable=logging-fstring-interpolation
 
 import os
+import queue
 import sys
 import time
 import threading
@@ -47,6 +48,17 @@ SSH_DEFAULT_ENCODING = "utf-8"
 SSH_BACKUP_ENCODING = "latin_1"
 
 SSH_CTRL_C_MSG = b"\x00\x00\x03"
+SSH_EOF_MSG = b"\x00\x00\x04"
+
+# keystrokes read within this many seconds of the first one are sent in a single frame, up to a budget of bytes
+SSH_INPUT_BATCH_SECONDS = 0.01
+SSH_INPUT_BATCH_BYTES = 4096
+# ctrl + c, ctrl + d, ctrl + z and ctrl + \ are sent right away, along with the keystrokes before them
+SSH_INPUT_FLUSH_KEYS = {b"\x03", b"\x04", b"\x1a", b"\x1c"}
+# seconds between two checks of the terminal size while no key is pressed
+SSH_RESIZE_POLL_SECONDS = 0.5
+# size of the frames piped stdin is streamed in
+SSH_PIPED_INPUT_BYTES = 32 * 1024
 
 
 class WebSocketConnection:
@@ -129,21 +141,64 @@ def read_ssh(connection: WebSocketConnection, response_encodings):
                     raise CLIInternalError("Unexpected message received")
 
 
-def _send_stdin(connection: WebSocketConnection, getch_fn):
+def _read_keys(connection: WebSocketConnection, getch_fn, keys: queue.Queue):
     while connection.is_connected:
-        _resize_terminal(connection)
         ch = getch_fn()
-        _resize_terminal(connection)
+        if not ch:  # end of stdin
+            break
+        keys.put(ch)
+
+
+def _send_stdin(connection: WebSocketConnection, getch_fn):
+    # keystrokes are read on their own thread, so that those read in a burst (eg, pasted text) share a frame
+    keys = queue.Queue()
+    reader = threading.Thread(target=_read_keys, args=(connection, getch_fn, keys))
+    reader.daemon = True
+    reader.start()
+
+    terminal_size = None
+    while connection.is_connected:
+        terminal_size = _resize_terminal(connection, terminal_size)
+        try:
+            batch = [keys.get(timeout=SSH_RESIZE_POLL_SECONDS)]
+        except queue.Empty:
+            continue
+        batch_size = len(batch[0])
+        deadline = time.monotonic() + SSH_INPUT_BATCH_SECONDS
+        while batch[-1] not in SSH_INPUT_FLUSH_KEYS and batch_size < SSH_INPUT_BATCH_BYTES:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(keys.get(timeout=timeout))
+            except queue.Empty:
+                break
+            batch_size += len(batch[-1])
+        terminal_size = _resize_terminal(connection, terminal_size)
         if connection.is_connected:
-            connection.send(b"".join([SSH_INPUT_PREFIX, ch]))
+            connection.send(b"".join([SSH_INPUT_PREFIX] + batch))
+
+
+def _send_piped_stdin(connection: WebSocketConnection, stdin):
+    # stdin isn't a terminal (eg, a script piped to the command), so it's streamed in large frames
+    while connection.is_connected:
+        data = stdin.read1(SSH_PIPED_INPUT_BYTES)
+        if not connection.is_connected:
+            break
+        if not data:
+            connection.send(SSH_EOF_MSG)
+            break
+        connection.send(b"".join([SSH_INPUT_PREFIX, data]))
 
 
-def _resize_terminal(connection: WebSocketConnection):
+def _resize_terminal(connection: WebSocketConnection, last_size=None):
     size = os.get_terminal_size()
-    if connection.is_connected:
+    # only send the size when it changed from the last size sent
+    if connection.is_connected and size != last_size:
         connection.send(b"".join([SSH_TERM_RESIZE_PREFIX,
                                   f'{{"Width": {size.columns}, '
                                   f'"Height": {size.lines}}}'.encode(SSH_DEFAULT_ENCODING)]))
+    return size
 
 
 def _getch_unix():
@@ -170,7 +225,9 @@ def ping_container_app(app):
 
 
 def get_stdin_writer(connection: WebSocketConnection):
-    if not is_platform_windows():
+    if not sys.stdin.isatty():
+        writer = threading.Thread(target=_send_piped_stdin, args=(connection, sys.stdin.buffer))
+    elif not is_platform_windows():
         import tty
         tty.setcbreak(sys.stdin.fileno())  # needed to prevent printing arrow key characters
         writer = threading.Thread(target=_send_stdin, args=(connection, _getch_unix))
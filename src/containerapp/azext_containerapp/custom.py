@@ -7,8 +7,8 @@
 import threading
 import sys
 import time
+from copy import deepcopy
 from urllib.parse import urlparse
-import requests
 
 from azure.cli.core.azclierror import (
     RequiredArgumentMissingError,
@@ -67,6 +67,7 @@ from ._utils import (_validate_subscription_registered, _get_location_from_resou
                      create_acrpull_role_assignment, is_registry_msi_system, clean_null_values, _populate_secret_values,
                      validate_environment_location)
 from ._validators import validate_create
+from ._logstream_utils import LogStreamSource, stream_logs
 from ._ssh_utils import (SSH_DEFAULT_ENCODING, WebSocketConnection, read_ssh, get_stdin_writer, SSH_CTRL_C_MSG,
                          SSH_BACKUP_ENCODING)
 from ._constants import (MAXIMUM_SECRET_LENGTH, MICROSOFT_SECRET_SETTING_NAME, FACEBOOK_SECRET_SETTING_NAME, GITHUB_SECRET_SETTING_NAME,
@@ -378,7 +379,7 @@ def create_containerapp(cmd,
 
     ingress_def = None
     if target_port is not None and ingress is not None:
-        ingress_def = IngressModel
+        ingress_def = deepcopy(IngressModel)
         ingress_def["external"] = external_ingress
         ingress_def["targetPort"] = target_port
         ingress_def["transport"] = transport
@@ -389,7 +390,7 @@ def create_containerapp(cmd,
 
     registries_def = None
     if registry_server is not None and not is_registry_msi_system(registry_identity):
-        registries_def = RegistryCredentialsModel
+        registries_def = deepcopy(RegistryCredentialsModel)
         registries_def["server"] = registry_server
 
         # Infer credentials if not supplied and its azurecr
@@ -407,13 +408,13 @@ def create_containerapp(cmd,
 
     dapr_def = None
     if dapr_enabled:
-        dapr_def = DaprModel
+        dapr_def = deepcopy(DaprModel)
         dapr_def["enabled"] = True
         dapr_def["appId"] = dapr_app_id
         dapr_def["appPort"] = dapr_app_port
         dapr_def["appProtocol"] = dapr_app_protocol
 
-    config_def = ConfigurationModel
+    config_def = deepcopy(ConfigurationModel)
     config_def["secrets"] = secrets_def
     config_def["activeRevisionsMode"] = revisions_mode
     config_def["ingress"] = ingress_def
@@ -421,7 +422,7 @@ def create_containerapp(cmd,
     config_def["dapr"] = dapr_def
 
     # Identity actions
-    identity_def = ManagedServiceIdentityModel
+    identity_def = deepcopy(ManagedServiceIdentityModel)
     identity_def["type"] = "None"
 
     assign_system_identity = system_assigned
@@ -447,17 +448,17 @@ def create_containerapp(cmd,
 
     scale_def = None
     if min_replicas is not None or max_replicas is not None:
-        scale_def = ScaleModel
+        scale_def = deepcopy(ScaleModel)
         scale_def["minReplicas"] = min_replicas
         scale_def["maxReplicas"] = max_replicas
 
     resources_def = None
     if cpu is not None or memory is not None:
-        resources_def = ContainerResourcesModel
+        resources_def = deepcopy(ContainerResourcesModel)
         resources_def["cpu"] = cpu
         resources_def["memory"] = memory
 
-    container_def = ContainerModel
+    container_def = deepcopy(ContainerModel)
     container_def["name"] = container_name if container_name else name
     container_def["image"] = image if not is_registry_msi_system(registry_identity) else HELLO_WORLD_IMAGE
     if env_vars is not None:
@@ -469,14 +470,14 @@ def create_containerapp(cmd,
     if resources_def is not None:
         container_def["resources"] = resources_def
 
-    template_def = TemplateModel
+    template_def = deepcopy(TemplateModel)
     template_def["containers"] = [container_def]
     template_def["scale"] = scale_def
 
     if revision_suffix is not None:
         template_def["revisionSuffix"] = revision_suffix
 
-    containerapp_def = ContainerAppModel
+    containerapp_def = deepcopy(ContainerAppModel)
     containerapp_def["location"] = location
     containerapp_def["identity"] = identity_def
     containerapp_def["properties"]["managedEnvironmentId"] = managed_env
@@ -503,7 +504,7 @@ def create_containerapp(cmd,
             create_acrpull_role_assignment(cmd, registry_server, registry_identity=None, service_principal=system_sp)
             container_def["image"] = image
 
-            registries_def = RegistryCredentialsModel
+            registries_def = deepcopy(RegistryCredentialsModel)
             registries_def["server"] = registry_server
             registries_def["identity"] = registry_identity
             config_def["registries"] = [registries_def]
@@ -2262,7 +2263,7 @@ def containerapp_ssh(cmd, resource_group_name, name, container=None, revision=No
 
 
 def stream_containerapp_logs(cmd, resource_group_name, name, container=None, revision=None, replica=None, follow=False,
-                             tail=None, output_format=None):
+                             tail=None, output_format=None, all_replicas=False, all_containers=False):
     if tail:
         if tail < 0 or tail > 300:
             raise ValidationError("--tail must be between 0 and 300.")
@@ -2272,24 +2273,32 @@ def stream_containerapp_logs(cmd, resource_group_name, name, container=None, rev
     token = token_response["properties"]["token"]
     logstream_endpoint = token_response["properties"]["logStreamEndpoint"]
     base_url = logstream_endpoint[:logstream_endpoint.index("/subscriptions/")]
+    url_fmt = (f"{base_url}/subscriptions/{sub}/resourceGroups/{resource_group_name}/containerApps/{name}"
+               f"/revisions/{revision}/replicas/{{}}/containers/{{}}/logstream")
 
-    url = (f"{base_url}/subscriptions/{sub}/resourceGroups/{resource_group_name}/containerApps/{name}"
-           f"/revisions/{revision}/replicas/{replica}/containers/{container}/logstream")
+    if all_replicas or all_containers:
+        if all_replicas:
+            replicas = ContainerAppClient.list_replicas(cmd=cmd, resource_group_name=resource_group_name,
+                                                        container_app_name=name, revision_name=revision)
+        else:
+            replicas = [ContainerAppClient.get_replica(cmd=cmd, resource_group_name=resource_group_name,
+                                                       container_app_name=name, revision_name=revision,
+                                                       replica_name=replica)]
+        sources = []
+        for r in replicas:
+            containers = [c["name"] for c in safe_get(r, "properties", "containers", default=[])] \
+                if all_containers else [container]
+            for c in containers:
+                label = "/".join(([r["name"]] if all_replicas else []) + ([c] if all_containers else []))
+                sources.append(LogStreamSource(label, url_fmt.format(r["name"], c)))
+        if not sources:
+            raise ResourceNotFoundError("Could not find a replica or container to stream the logs from")
+    else:
+        sources = [LogStreamSource(None, url_fmt.format(replica, container))]
 
-    logger.info("connecting to : %s", url)
     request_params = {"follow": str(follow).lower(), "output": output_format, "tailLines": tail}
     headers = {"Authorization": f"Bearer {token}"}
-    resp = requests.get(url, timeout=None, stream=True, params=request_params, headers=headers)
-
-    if not resp.ok:
-        ValidationError(f"Got bad status from the logstream API: {resp.status_code}")
-
-    for line in resp.iter_lines():
-        if line:
-            logger.info("received raw log line: %s", line)
-            # these .replaces are needed to display color/quotations properly
-            # for some reason the API returns garbled unicode special characters (may need to add more in the future)
-            print(line.decode("utf-8").replace("\\u0022", "\u0022").replace("\\u001B", "\u001B").replace("\\u002B", "\u002B").replace("\\u0027", "\u0027"))
+    stream_logs(sources, params=request_params, headers=headers, output_format=output_format)
 
 
 def open_containerapp_in_browser(cmd, name, resource_group_name):
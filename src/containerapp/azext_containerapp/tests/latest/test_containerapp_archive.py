@@ -0,0 +1,223 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import codecs
+import gzip
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import unittest
+from unittest import mock
+
+from azure.cli.core.azclierror import InvalidArgumentValueError
+
+from azext_containerapp._archive_utils import (_load_dockerignore_file, _pack_source_code, upload_source_code,
+                                               DockerIgnoreMatcher, IgnoreRule)
+
+
+def legacy_pack_source_code(source_location, tar_file_path, docker_file_path, docker_file_in_tar):
+    """ _pack_source_code as it was before the rules were compiled, trying every rule on every file of the tree """
+    original_docker_file_name = os.path.basename(docker_file_path.replace("\\", os.sep))
+    ignore_list, ignore_list_size = _load_dockerignore_file(source_location, original_docker_file_name)
+    common_vcs_ignore_list = {'.git', '.gitignore', '.bzr', 'bzrignore', '.hg', '.hgignore', '.svn'}
+
+    def _ignore_check(tarinfo, parent_ignored, parent_matching_rule_index):
+        if tarinfo.name in common_vcs_ignore_list:
+            return True, parent_matching_rule_index
+        if ignore_list is None:
+            return parent_ignored, parent_matching_rule_index
+        for index, item in enumerate(ignore_list):
+            if index >= parent_matching_rule_index:
+                break
+            if re.match(item.pattern, tarinfo.name):
+                return item.ignore, index
+        return parent_ignored, parent_matching_rule_index
+
+    def _archive_file_recursively(tar, name, arcname, parent_ignored, parent_matching_rule_index):
+        tarinfo = tar.gettarinfo(name, arcname)
+        ignored, matching_rule_index = _ignore_check(tarinfo, parent_ignored, parent_matching_rule_index)
+        if not ignored:
+            if tarinfo.isreg():
+                with open(name, "rb") as f:
+                    tar.addfile(tarinfo, f)
+            else:
+                tar.addfile(tarinfo)
+        if tarinfo.isdir():
+            for f in os.listdir(name):
+                _archive_file_recursively(tar, os.path.join(name, f), os.path.join(arcname, f),
+                                          ignored, matching_rule_index)
+
+    with tarfile.open(tar_file_path, "w:gz") as tar:
+        _archive_file_recursively(tar, source_location, "", False, ignore_list_size)
+        if docker_file_path:
+            docker_file_tarinfo = tar.gettarinfo(docker_file_path, docker_file_in_tar)
+            with open(docker_file_path, "rb") as f:
+                tar.addfile(docker_file_tarinfo, f)
+
+
+def write_tree(root, paths):
+    for path in paths:
+        full_path = os.path.join(root, *path.split("/"))
+        if path.endswith("/"):
+            os.makedirs(full_path, exist_ok=True)
+            continue
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as f:
+            f.write(path)
+
+
+def archive_members(tar_file_path):
+    with tarfile.open(tar_file_path, "r:gz") as tar:
+        return [(member.name, member.type, tar.extractfile(member).read() if member.isreg() else None)
+                for member in tar.getmembers()]
+
+
+_TREE = ["Dockerfile", "Dockerfile.prod", "app.py", "debug.log", "important.log", "a1c", "abc/file",
+         ".git/HEAD", ".git/objects/ab/cdef", ".gitignore", "sub/.git/HEAD", ".hg/store",
+         "node_modules/lodash/index.js", "node_modules/lodash/package.json", "node_modules/keep/index.js",
+         "src/main.py", "src/keep.log", "src/__pycache__/main.pyc", "src/deep/er/x.tmp", "src/deep/er/y.py",
+         "docs/index.md", "docs/keep/guide.md", "docs/keep/more/notes.md", "build/out.bin", "abs/file",
+         "empty/", "c++/file", "weird[1]/file"]
+
+_RULE_SETS = [
+    None,
+    [],
+    ["# only comments", ""],
+    ["node_modules"],
+    ["node_modules", "!node_modules/keep"],
+    ["node_modules/**", "!node_modules/keep/**"],
+    ["*.log", "!important.log", "**/*.log", "!src/keep.log"],
+    ["**/__pycache__", "**/*.tmp", "src/deep"],
+    ["docs", "!docs/keep", "docs/keep/more"],
+    ["docs/**", "!docs/keep/**"],
+    ["*", "!src", "!Dockerfile"],
+    ["*", "!src/**"],
+    ["**", "!**/*.py"],
+    ["/abs", "build/", "!/abs/file"],
+    ["a?c", "abc"],
+    ["*/", "!docs"],
+    [".git", "!.git/HEAD"],
+    ["!.git/objects"],
+    ["weird[1]", "c++"],
+    ["src/deep/er", "!src/*/er/y.py"],
+    ["src/deep/er", "!src/**/y.py"],
+    ["node_modules", "!node_modules/*/index.js"],
+    ["node_modules", "!node_modules/k?ep"],
+    ["src", "docs", "!*/keep*", "!**/notes.md"],
+    ["**/__pycache__", "node_modules", "!node_modules/keep/index.js", "**/*.js"],
+]
+
+
+class ContainerAppArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.source = os.path.join(self.folder, "source")
+        write_tree(self.source, _TREE)
+
+    def _pack(self, pack, name, docker_file="Dockerfile"):
+        tar_file_path = os.path.join(self.folder, name + ".tar.gz")
+        pack(self.source, tar_file_path, os.path.join(self.source, docker_file), "uuid_" + docker_file)
+        return archive_members(tar_file_path)
+
+    def _write_dockerignore(self, rules, name=".dockerignore"):
+        path = os.path.join(self.source, name)
+        if rules is None:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        with open(path, "w") as f:
+            f.write("\n".join(rules) + "\n")
+
+    def test_parity(self):
+        for rules in _RULE_SETS:
+            with self.subTest(rules=rules):
+                self._write_dockerignore(rules)
+                expected = self._pack(legacy_pack_source_code, "legacy")
+                self.assertEqual(expected, self._pack(_pack_source_code, "compiled"))
+
+    def test_parity_dockerfile_override(self):
+        self._write_dockerignore(["*.log"])
+        self._write_dockerignore(["node_modules", "!node_modules/keep", "**/*.py"], "Dockerfile.prod.dockerignore")
+        expected = self._pack(legacy_pack_source_code, "legacy", "Dockerfile.prod")
+        self.assertEqual(expected, self._pack(_pack_source_code, "compiled", "Dockerfile.prod"))
+        names = [name for name, _, _ in expected]
+        self.assertIn("debug.log", names)
+        self.assertNotIn("node_modules/lodash/index.js", names)
+
+        # a BOM at the start of the file is skipped
+        with open(os.path.join(self.source, ".dockerignore"), "wb") as f:
+            f.write(codecs.BOM_UTF8 + b"debug.log\n")
+        expected = self._pack(legacy_pack_source_code, "legacy")
+        self.assertEqual(expected, self._pack(_pack_source_code, "compiled"))
+        self.assertNotIn("debug.log", [name for name, _, _ in expected])
+
+    def test_matcher_priority(self):
+        rules = [IgnoreRule(rule) for rule in ["!src/keep.log", "**/*.log", "src"]]
+        matcher = DockerIgnoreMatcher(rules)
+
+        self.assertEqual((False, 0), matcher.check("src/keep.log", True, 2))
+        self.assertEqual((True, 1), matcher.check("src/other.log", True, 2))
+        # the rules of a lower priority than the one deciding the parent don't apply
+        self.assertEqual((True, 1), matcher.check("src/other.log", True, 1))
+        self.assertEqual((True, 0), matcher.check("src/other.log", True, 0))
+        self.assertEqual((True, 2), matcher.check(".git", False, 2))
+
+    def test_matcher_windows_separator(self):
+        # the names in the archive are separated by / whatever the separator of the platform
+        rules = [IgnoreRule(rule) for rule in ["!src/lib/keep", "src/lib", "**/node_modules"]]
+        matcher = DockerIgnoreMatcher(rules)
+
+        with mock.patch("azext_containerapp._archive_utils.os.sep", "\\"):
+            self.assertEqual((True, 1), matcher.check("src/lib", False, 3))
+            self.assertTrue(matcher.can_include_under("src/lib", 1))
+            self.assertEqual((True, 2), matcher.check("src/app/node_modules", False, 3))
+            self.assertFalse(matcher.can_include_under("src/app/node_modules", 2))
+            self._write_dockerignore(["src/deep/er", "!src/*/er/y.py"])
+            self.assertEqual(self._pack(legacy_pack_source_code, "legacy"), self._pack(_pack_source_code, "compiled"))
+
+    def test_prune_ignored_directories(self):
+        self._write_dockerignore(["node_modules", "!node_modules/keep", "docs", "**/__pycache__"])
+        listed = []
+        scandir = os.scandir
+
+        def record_scandir(path):
+            listed.append(os.path.relpath(path, self.source).replace(os.sep, "/"))
+            return scandir(path)
+
+        with mock.patch("azext_containerapp._archive_utils.os.scandir", side_effect=record_scandir):
+            _pack_source_code(self.source, os.path.join(self.folder, "archive.tar.gz"),
+                              os.path.join(self.source, "Dockerfile"), "uuid_Dockerfile")
+
+        # the ignored directories no rule can include again aren't walked
+        self.assertIn("node_modules", listed)
+        self.assertIn("node_modules/keep", listed)
+        for pruned in ["node_modules/lodash", "docs", "docs/keep", ".git", "src/__pycache__"]:
+            self.assertNotIn(pruned, listed)
+
+    def test_compression_level(self):
+        write_tree(self.source, ["large/file{}".format(i) for i in range(200)])
+        sizes = []
+        for level in [1, 9]:
+            tar_file_path = os.path.join(self.folder, "level{}.tar.gz".format(level))
+            _pack_source_code(self.source, tar_file_path, os.path.join(self.source, "Dockerfile"), "uuid_Dockerfile",
+                              compression_level=level)
+            with gzip.open(tar_file_path) as f:
+                self.assertEqual(0, len(f.read()) % tarfile.RECORDSIZE)
+            sizes.append(os.path.getsize(tar_file_path))
+        self.assertLess(sizes[1], sizes[0])
+
+        cmd = mock.Mock()
+        cmd.cli_ctx.config.getint.return_value = 10
+        with self.assertRaisesRegex(InvalidArgumentValueError, "between 0 and 9"):
+            upload_source_code(cmd, None, "registry", "rg", self.source, os.path.join(self.folder, "a.tar.gz"),
+                               os.path.join(self.source, "Dockerfile"), "uuid_Dockerfile")
+
+
+if __name__ == "__main__":
+    unittest.main()
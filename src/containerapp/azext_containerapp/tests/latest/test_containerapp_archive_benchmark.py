@@ -0,0 +1,65 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from azext_containerapp._archive_utils import _pack_source_code
+from azext_containerapp.tests.latest.test_containerapp_archive import archive_members, legacy_pack_source_code
+
+_DOCKERIGNORE = ["node_modules", "**/*.log", "**/__pycache__", "dist/**", "!dist/index.html", "*.tmp", ".venv",
+                 "coverage", "**/*.pyc", "build", "!build/keep"] + ["generated/rule{}".format(i) for i in range(40)]
+
+
+def write_synthetic_tree(root):
+    """ a 100k files source tree, most of them in node_modules as for a typical node app """
+    files = 0
+    for package in range(950):
+        package_dir = os.path.join(root, "node_modules", "package{}".format(package), "lib")
+        os.makedirs(package_dir)
+        for i in range(100):
+            open(os.path.join(package_dir, "module{}.js".format(i)), "w").close()
+            files += 1
+    for module in range(500):
+        module_dir = os.path.join(root, "src", "module{}".format(module))
+        os.makedirs(os.path.join(module_dir, "__pycache__"))
+        for i in range(4):
+            with open(os.path.join(module_dir, "file{}.py".format(i)), "w") as f:
+                f.write("print({})\n".format(i))
+            open(os.path.join(module_dir, "__pycache__", "file{}.pyc".format(i)), "w").close()
+            files += 2
+    with open(os.path.join(root, "Dockerfile"), "w") as f:
+        f.write("FROM python\n")
+    with open(os.path.join(root, ".dockerignore"), "w") as f:
+        f.write("\n".join(_DOCKERIGNORE) + "\n")
+    return files + 2
+
+
+class ContainerAppArchiveBenchmark(unittest.TestCase):
+    """ packs a synthetic 100k files tree with the rules tried one by one on every file, and compiled """
+
+    def test_benchmark_pack_source_code(self):
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        source = os.path.join(folder, "source")
+        files = write_synthetic_tree(source)
+
+        timings = []
+        for name, pack in [("legacy", legacy_pack_source_code), ("compiled", _pack_source_code)]:
+            start = time.perf_counter()
+            pack(source, os.path.join(folder, name + ".tar.gz"), os.path.join(source, "Dockerfile"), "uuid_Dockerfile")
+            timings.append(time.perf_counter() - start)
+
+        self.assertEqual(archive_members(os.path.join(folder, "legacy.tar.gz")),
+                         archive_members(os.path.join(folder, "compiled.tar.gz")))
+        self.assertLess(timings[1] * 5, timings[0],
+                        "pack {} files: {:.2f}s before, {:.2f}s after".format(files, *timings))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import copy
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from azext_containerapp import _models
+from azext_containerapp.custom import create_containerapp
+
+_ENV_ID = "/subscriptions/sub/resourceGroups/rg/providers/Microsoft.App/managedEnvironments/env"
+
+
+class _FakeContainerAppClient():
+    """
+    Stands in for ContainerAppClient, keeping a copy of each envelope created. The creations wait for each other,
+    so that the apps are all being created at once, eg, by containerapp compose.
+    """
+
+    def __init__(self, test, parties):
+        self.barrier = threading.Barrier(parties, timeout=10)
+        self.lock = threading.Lock()
+        self.created = {}
+        for target, fake in [("ContainerAppClient.create_or_update", self.create_or_update),
+                             ("ManagedEnvironmentClient.show", lambda **_: {"location": "eastus"}),
+                             ("register_provider_if_needed", mock.Mock()),
+                             ("_ensure_location_allowed", mock.Mock())]:
+            patcher = mock.patch("azext_containerapp.custom." + target, fake)
+            patcher.start()
+            test.addCleanup(patcher.stop)
+
+    def create_or_update(self, cmd, resource_group_name, name, container_app_envelope, no_wait=False):
+        self.barrier.wait()
+        with self.lock:
+            self.created[name] = copy.deepcopy(container_app_envelope)
+        return {"name": name, "properties": {"provisioningState": "Succeeded", "configuration": {}}}
+
+
+class ContainerAppCreateTest(unittest.TestCase):
+
+    def test_create_concurrently(self):
+        models = copy.deepcopy([_models.ContainerApp, _models.Configuration, _models.Container, _models.Ingress])
+        names = ["app{}".format(i) for i in range(4)]
+        client = _FakeContainerAppClient(self, len(names))
+
+        def create(index):
+            return create_containerapp(mock.Mock(), names[index], "rg", image="image{}".format(index),
+                                       managed_env=_ENV_ID, target_port=8000 + index, ingress="external",
+                                       env_vars=["INDEX={}".format(index)], disable_warnings=True)
+
+        with ThreadPoolExecutor(max_workers=len(names)) as executor:
+            results = list(executor.map(create, range(len(names))))
+
+        self.assertEqual(names, [r["name"] for r in results])
+        for index, name in enumerate(names):
+            # each app is created with its own settings, not the ones of the app created last
+            properties = client.created[name]["properties"]
+            container = properties["template"]["containers"][0]
+            self.assertEqual((name, "image{}".format(index)), (container["name"], container["image"]))
+            self.assertEqual([{"name": "INDEX", "value": str(index)}], container["env"])
+            self.assertEqual(8000 + index, properties["configuration"]["ingress"]["targetPort"])
+        # the models stay untouched
+        self.assertEqual(models, [_models.ContainerApp, _models.Configuration, _models.Container, _models.Ingress])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+from azure.cli.core.azclierror import HTTPError
+
+from azext_containerapp._clients import ContainerAppClient, ManagedEnvironmentClient
+
+_ARM = "https://management.azure.com/subscriptions/sub"
+_API = "?api-version=2022-03-01"
+_RESOURCE_GROUPS_URL = _ARM + "/resourcegroups?api-version=2021-04-01"
+
+
+class _FakeResponse():
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class _PagedArm():
+    """
+    Stands in for send_raw_request, serving the items of each listing url by pages of page_size items linked by
+    nextLink (the resource groups in one page), each page taking latency seconds. Urls in errors fail with the given
+    status code.
+    """
+
+    def __init__(self, test, listings, page_size=2, latency=0.02):
+        self.listings = listings
+        self.page_size = page_size
+        self.latency = latency
+        self.errors = {}
+        self.events = []
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.cmd = mock.Mock()
+        self.cmd.cli_ctx.cloud.endpoints.resource_manager = "https://management.azure.com/"
+        for target, fake in [("send_raw_request", self.send_raw_request), ("get_subscription_id", lambda _: "sub")]:
+            patcher = mock.patch("azext_containerapp._clients." + target, fake)
+            patcher.start()
+            test.addCleanup(patcher.stop)
+
+    def send_raw_request(self, cli_ctx, method, url, body=None):
+        listing_url, _, page = url.partition("&page=")
+        page = int(page or 0)
+        with self.lock:
+            self.events.append(("request", listing_url, page))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.latency)
+            if listing_url in self.errors:
+                status_code = self.errors[listing_url]
+                raise HTTPError("({}) request failed".format(status_code), _FakeResponse(status_code))
+            items = self.listings[listing_url]
+            page_size = 1000 if listing_url == _RESOURCE_GROUPS_URL else self.page_size
+            j = {"value": items[page * page_size:(page + 1) * page_size]}
+            if (page + 1) * page_size < len(items):
+                j["nextLink"] = "{}&page={}".format(listing_url, page + 1)
+            return _FakeResponse(200, j)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+    def requests(self, listing_url=None):
+        return [(url, page) for event, url, page in self.events if event == "request" and
+                (listing_url is None or url == listing_url)]
+
+
+def _apps(resource_group, count):
+    return [{"name": "{}-app{}".format(resource_group, i), "resourceGroup": resource_group} for i in range(count)]
+
+
+class ContainerAppListPagingTest(unittest.TestCase):
+
+    def test_list_pages_prefetch(self):
+        url = _ARM + "/resourceGroups/rg/providers/Microsoft.App/containerApps/app/revisions" + _API
+        arm = _PagedArm(self, {url: [{"name": "revision{}".format(i)} for i in range(10)]})
+
+        def formatter(revision):
+            with arm.lock:
+                arm.events.append(("format", revision["name"], None))
+            time.sleep(0.01)
+            return revision["name"]
+
+        start = time.perf_counter()
+        result = ContainerAppClient.list_revisions(arm.cmd, "rg", "app", formatter)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(["revision{}".format(i) for i in range(10)], result)
+        self.assertEqual([(url, i) for i in range(5)], arm.requests())
+        # each next page is requested before the previous page is formatted
+        for page in range(1, 5):
+            request = arm.events.index(("request", url, page))
+            self.assertLess(request, arm.events.index(("format", "revision{}".format(2 * page - 1), None)))
+        # 5 pages of 20ms and 10 items of 10ms take about 120ms rather than 200ms
+        self.assertLess(elapsed, 0.18)
+
+    def test_list_pages_error(self):
+        url = _ARM + "/resourceGroups/rg/providers/Microsoft.App/managedEnvironments/env/certificates" + _API
+        arm = _PagedArm(self, {url: [{"name": "cert{}".format(i)} for i in range(5)]})
+
+        self.assertEqual(5, len(ManagedEnvironmentClient.list_certificates(arm.cmd, "rg", "env")))
+
+        arm.errors[url] = 500
+        with self.assertRaisesRegex(HTTPError, "500"):
+            ManagedEnvironmentClient.list_certificates(arm.cmd, "rg", "env")
+
+    def test_list_by_subscription_single_page(self):
+        url = _ARM + "/providers/Microsoft.App/managedEnvironments" + _API
+        arm = _PagedArm(self, {url: _apps("rg", 2)})
+
+        self.assertEqual(["rg-app0", "rg-app1"], ManagedEnvironmentClient.list_by_subscription(
+            arm.cmd, formatter=lambda env: env["name"]))
+        self.assertEqual([(url, 0)], arm.requests())
+
+    def test_list_by_subscription_many_empty_resource_groups(self):
+        # 40 apps in 10 of 500 resource groups, the others are empty
+        resource_groups = ["rg{}".format(i) for i in range(500)]
+        apps = [app for rg in resource_groups[:10] for app in _apps(rg, 4)]
+        url = _ARM + "/providers/Microsoft.App/containerApps" + _API
+        listings = {url: apps, _RESOURCE_GROUPS_URL: [{"name": rg} for rg in resource_groups]}
+        listings.update({_ARM + "/resourceGroups/{}/providers/Microsoft.App/containerApps{}".format(rg, _API):
+                         [app for app in apps if app["resourceGroup"] == rg] for rg in resource_groups})
+        arm = _PagedArm(self, listings, page_size=10, latency=0.02)
+
+        def formatter(app):
+            time.sleep(0.002)
+            return app["name"]
+
+        start = time.perf_counter()
+        result = ContainerAppClient.list_by_subscription(arm.cmd, formatter=formatter)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual([app["name"] for app in apps], result)
+        # the subscription is listed page by page, whatever its number of resource groups
+        self.assertEqual([(url, i) for i in range(4)], arm.requests())
+        print("list {} apps in {} resource groups: {} requests, {:.2f}s".format(
+            len(apps), len(resource_groups), len(arm.requests()), elapsed))
+        # 4 pages of 20ms and 40 apps of 2ms take about 100ms rather than 160ms, as the pages are prefetched
+        self.assertLess(elapsed, 0.14)
+
+        arm.errors[url] = 500
+        with self.assertRaisesRegex(HTTPError, "500"):
+            ContainerAppClient.list_by_subscription(arm.cmd)
+
+
+if __name__ == "__main__":
+    unittest.main()
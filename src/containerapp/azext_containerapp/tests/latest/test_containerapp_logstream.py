@@ -0,0 +1,105 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from azure.cli.core.azclierror import ValidationError
+
+from azext_containerapp._logstream_utils import (LogStreamSource, stream_logs, format_log_line,
+                                                 get_log_line_timestamp, label_log_line)
+
+
+class _SyntheticLogHandler(BaseHTTPRequestHandler):
+    """Emits `lines` synthetic log lines for /<replica>/<container>, a line every `interval` seconds."""
+    lines = 5
+    interval = 0.01
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        path = self.path.split("?")[0].strip("/")
+        if path == "missing":
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.end_headers()
+        replica, container = path.split("/")
+        offset = int(replica[-1])
+        for i in range(self.lines):
+            line = {"TimeStamp": "2022-06-01T10:00:{:02d}.{}".format(2 * i + offset, offset),
+                    "Log": "{} {} line {} \\u0022quoted\\u0022".format(replica, container, i)}
+            self.wfile.write((json.dumps(line) + "\n").encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.interval)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class ContainerappLogStreamTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _SyntheticLogHandler)
+        cls.url = "http://127.0.0.1:{}".format(cls.server.server_address[1])
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def _source(self, replica, container, label=None):
+        return LogStreamSource(label, "{}/{}/{}".format(self.url, replica, container))
+
+    def test_stream_single_source(self):
+        output = io.StringIO()
+        stream_logs([self._source("replica1", "app")], output=output, merge_window=0.05)
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(5, len(lines))
+        self.assertEqual("replica1 app line 0 \"quoted\"", json.loads(lines[0])["Log"])
+
+    def test_stream_all_replicas_and_containers(self):
+        sources = [self._source(r, c, "{}/{}".format(r, c))
+                   for r in ["replica1", "replica2"] for c in ["app", "sidecar"]]
+        output = io.StringIO()
+        stream_logs(sources, output_format="json", output=output, merge_window=1)
+
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(20, len(records))
+        self.assertEqual({s.label for s in sources}, {r["Source"] for r in records})
+        # all the lines arrive within the merge window so they are ordered by timestamp
+        timestamps = [r["TimeStamp"] for r in records]
+        self.assertEqual(sorted(timestamps), timestamps)
+        for label in ["replica2/app", "replica1/sidecar"]:
+            logs = [r["Log"] for r in records if r["Source"] == label]
+            self.assertEqual(["{} line {} \"quoted\"".format(label.replace("/", " "), i) for i in range(5)], logs)
+
+    def test_stream_failed_source(self):
+        output = io.StringIO()
+        stream_logs([self._source("replica1", "app", "app"), LogStreamSource("missing", self.url + "/missing")],
+                    output=output, merge_window=0.05)
+        self.assertEqual(5, len(output.getvalue().splitlines()))
+
+        with self.assertRaises(ValidationError):
+            stream_logs([LogStreamSource(None, self.url + "/missing")], output=output)
+
+    def test_format_log_line(self):
+        self.assertEqual('"a" \u001B[0m \'b\' +', format_log_line('\\u0022a\\u0022 \\u001B[0m \\u0027b\\u0027 \\u002B'))
+        self.assertEqual("2022-06-01T10:00:01.120000000", get_log_line_timestamp("2022-06-01T10:00:01.12  Started"))
+        self.assertIsNone(get_log_line_timestamp("no timestamp"))
+        self.assertEqual("[replica1] text", label_log_line("text", "replica1", "text"))
+        self.assertEqual('{"Source":"replica1","Log":"a"}', label_log_line('{"Log":"a"}', "replica1", "json"))
+        self.assertEqual("text", label_log_line("text", None))
+
+
+if __name__ == '__main__':
+    unittest.main()
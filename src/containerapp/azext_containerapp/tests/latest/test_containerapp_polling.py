@@ -0,0 +1,189 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+from unittest import mock
+
+from azure.cli.core.azclierror import ResourceNotFoundError
+
+from azext_containerapp import _clients
+from azext_containerapp._clients import ContainerAppClient, ResourcePoller, poll
+
+_RG_URL = "https://management.azure.com/subscriptions/sub/resourceGroups/rg/providers/Microsoft.App/"
+_APP_URL = _RG_URL + "containerApps/app"
+_ENV_URL = _RG_URL + "managedEnvironments/env"
+_JOB_URL = _RG_URL + "jobs/job"
+
+
+class _FakeResponse():
+    def __init__(self, status_code, body, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class _FakeArm():
+    """
+    Stands in for send_raw_request, with a fake clock advanced by time.sleep. Each GET of a url returns the next of
+    its scripted states, provisioning states or exceptions, and the last one once they are exhausted.
+    """
+
+    def __init__(self, test, states, adaptive=True):
+        self.states = states
+        self.now = 1000.0
+        self.requests = []
+        self.cmd = mock.Mock()
+        self.cmd.cli_ctx.config.getboolean.return_value = adaptive
+        self.cmd.cli_ctx.cloud.endpoints.resource_manager = "https://management.azure.com/"
+        for target, fake in [("send_raw_request", self.send_raw_request), ("time.time", lambda: self.now),
+                             ("time.sleep", self.sleep), ("random.uniform", lambda a, b: (a + b) / 2),
+                             ("get_subscription_id", lambda cli_ctx: "sub")]:
+            patcher = mock.patch("azext_containerapp._clients." + target, fake)
+            patcher.start()
+            test.addCleanup(patcher.stop)
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def send_raw_request(self, cli_ctx, method, url, body=None):
+        self.requests.append((self.now, method, url))
+        if method == "PUT":
+            return _FakeResponse(201, {"properties": {"provisioningState": "InProgress"}})
+        states = self.states[url]
+        state = states.pop(0) if len(states) > 1 else states[0]
+        if isinstance(state, Exception):
+            raise state
+        if isinstance(state, _FakeResponse):
+            return state
+        return _FakeResponse(200, {"name": url.split("/")[-1], "properties": {"provisioningState": state}})
+
+    def wait(self, request_urls, poll_if_status):
+        poller = ResourcePoller(self.cmd)
+        for request_url in request_urls:
+            poller.add(request_url, poll_if_status)
+        return poller.wait()
+
+    def poll_times(self, url):
+        return [now - 1000 for now, method, request_url in self.requests if request_url == url and method == "GET"]
+
+
+class ContainerAppPollingTest(unittest.TestCase):
+
+    def test_poll_backoff(self):
+        arm = _FakeArm(self, {_APP_URL: ["InProgress"] * 14 + ["Succeeded"]})
+
+        result = poll(arm.cmd, _APP_URL, "inprogress")
+
+        self.assertEqual({"name": "app", "properties": {"provisioningState": "Succeeded"}}, result)
+        waits = [b - a for a, b in zip(arm.poll_times(_APP_URL), arm.poll_times(_APP_URL)[1:])]
+        # the waits grow from POLLING_MIN_SECONDS by POLLING_BACKOFF up to POLLING_MAX_SECONDS
+        self.assertEqual([1, 1.5, 2.25, 3.375, 5.0625], waits[:5])
+        self.assertEqual([30, 30, 30], waits[-3:])
+        self.assertEqual(15, len(waits) + 1)
+
+    def test_poll_jitter(self):
+        arm = _FakeArm(self, {_APP_URL: ["InProgress"] * 3 + ["Succeeded"]})
+        waits = []
+        with mock.patch("azext_containerapp._clients.random.uniform",
+                        side_effect=lambda a, b: waits.append((a, b)) or a):
+            poll(arm.cmd, _APP_URL, "inprogress")
+        self.assertEqual([(0.8, 1.2)] * 3, waits)
+        self.assertEqual([0, 0.8, 0.8 + 1.2, 0.8 + 1.2 + 1.8], [round(t, 6) for t in arm.poll_times(_APP_URL)])
+
+    def test_poll_retry_after(self):
+        arm = _FakeArm(self, {_ENV_URL: [
+            _FakeResponse(200, {"properties": {"provisioningState": "Waiting"}}, {"Retry-After": "7"}),
+            _FakeResponse(200, {"properties": {"provisioningState": "Waiting"}},
+                          {"Retry-After": "Thu, 01 Jan 1970 00:17:00 GMT"}),
+            "Waiting",
+            "Succeeded"]})
+
+        poll(arm.cmd, _ENV_URL, "waiting")
+
+        # the Retry-After header is honoured as seconds or as a date, the backoff applies without it
+        self.assertEqual([0, 7, 1020 - 1000, 21], arm.poll_times(_ENV_URL))
+
+    def test_poll_retry_after_capped(self):
+        arm = _FakeArm(self, {_ENV_URL: [
+            _FakeResponse(200, {"properties": {"provisioningState": "Waiting"}}, {"Retry-After": "3600"}),
+            _FakeResponse(200, {"properties": {"provisioningState": "Waiting"}},
+                          {"Retry-After": "Fri, 02 Jan 1970 00:00:00 GMT"}),
+            "Succeeded"]})
+
+        poll(arm.cmd, _ENV_URL, "waiting")
+
+        # a Retry-After longer than POLLING_MAX_SECONDS waits POLLING_MAX_SECONDS
+        self.assertEqual([0, 30, 60], arm.poll_times(_ENV_URL))
+
+    def test_poll_fallback(self):
+        arm = _FakeArm(self, {_APP_URL: ["InProgress"] * 4 + ["Succeeded"]}, adaptive=False)
+
+        poll(arm.cmd, _APP_URL, "inprogress")
+
+        self.assertEqual([0, 2, 4, 6, 8], arm.poll_times(_APP_URL))
+        arm.cmd.cli_ctx.config.getboolean.assert_called_with("containerapp", "adaptive_polling", fallback=True)
+
+    def test_poll_timeout(self):
+        arm = _FakeArm(self, {_APP_URL: ["InProgress"]})
+
+        result = poll(arm.cmd, _APP_URL, "inprogress")
+
+        self.assertEqual("InProgress", result["properties"]["provisioningState"])
+        self.assertGreaterEqual(arm.now - 1000, _clients.POLLING_TIMEOUT)
+        self.assertLess(arm.now - 1000, _clients.POLLING_TIMEOUT + _clients.POLLING_MAX_SECONDS)
+
+    def test_poller_resources(self):
+        arm = _FakeArm(self, {
+            _APP_URL: ["InProgress"] * 3 + ["Succeeded"],
+            _ENV_URL: ["Waiting"] * 8 + ["Succeeded"],
+            _JOB_URL: ["InProgress", "Failed"]})
+
+        results = arm.wait([_APP_URL, _ENV_URL, _JOB_URL], "inprogress")
+
+        # an environment is waited for while in the state "waiting", not "inprogress"
+        self.assertEqual(["Succeeded", "Waiting", "Failed"], [r["properties"]["provisioningState"] for r in results])
+
+        poller = ResourcePoller(arm.cmd)
+        poller.add(_APP_URL, "inprogress")
+        poller.add(_ENV_URL, "waiting")
+        poller.add(_JOB_URL, "inprogress")
+        arm.states[_APP_URL] = ["InProgress"] * 6 + ["Succeeded"]
+        arm.states[_JOB_URL] = ["InProgress", "Succeeded"]
+        arm.requests, arm.now = [], 1000.0
+
+        self.assertEqual(["app", "env", "job"], [r["name"] for r in poller.wait()])
+        # each resource is polled on its own schedule, so the wait is the one of the slowest
+        self.assertEqual(7, len(arm.poll_times(_APP_URL)))
+        self.assertEqual(8, len(arm.poll_times(_ENV_URL)))
+        self.assertEqual([0, 1], arm.poll_times(_JOB_URL))
+        self.assertEqual(max(arm.poll_times(_ENV_URL)), arm.now - 1000)
+
+    def test_poll_errors(self):
+        not_found = ResourceNotFoundError("not found")
+        arm = _FakeArm(self, {_APP_URL: ["Cancelled", not_found], _ENV_URL: ["InProgress", "Succeeded"]})
+
+        # the resource is not found once deleted
+        self.assertIsNone(poll(arm.cmd, _APP_URL, "cancelled"))
+
+        arm.states[_APP_URL] = [not_found]
+        with self.assertRaises(ResourceNotFoundError):
+            arm.wait([_APP_URL, _ENV_URL], "inprogress")
+        # the error is raised once the other resources are polled
+        self.assertEqual(2, len(arm.poll_times(_ENV_URL)))
+
+    def test_create_or_update(self):
+        arm = _FakeArm(self, {_APP_URL + "?api-version=2022-03-01": ["InProgress", "InProgress", "Succeeded"]})
+
+        result = ContainerAppClient.create_or_update(arm.cmd, "rg", "app", {})
+
+        self.assertEqual("Succeeded", result["properties"]["provisioningState"])
+        self.assertEqual(["PUT", "GET", "GET", "GET"], [method for _, method, _ in arm.requests])
+
+
+if __name__ == "__main__":
+    unittest.main()
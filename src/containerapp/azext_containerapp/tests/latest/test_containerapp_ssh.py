@@ -0,0 +1,149 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+from azext_containerapp import _ssh_utils
+from azext_containerapp._ssh_utils import (SSH_EOF_MSG, SSH_INPUT_PREFIX, SSH_TERM_RESIZE_PREFIX, WebSocketConnection,
+                                           _send_piped_stdin, _send_stdin)
+
+_SCRIPT = "".join("echo line {} of the pasted script\n".format(i) for i in range(200))
+
+
+class _FakeWebSocket():
+    """Stands in for websocket.WebSocket, recording the frames sent."""
+
+    def __init__(self, enable_multithread=False):
+        self.frames = []
+        self.lock = threading.Lock()
+
+    def connect(self, url, header=None):
+        self.url = url
+
+    def send(self, data):
+        with self.lock:
+            self.frames.append(data)
+
+    def close(self):
+        pass
+
+    def input(self):
+        with self.lock:
+            return b"".join(f[len(SSH_INPUT_PREFIX):] for f in self.frames if f.startswith(SSH_INPUT_PREFIX))
+
+    def count(self, prefix):
+        with self.lock:
+            return len([f for f in self.frames if f.startswith(prefix)])
+
+
+class _Keyboard():
+    """A getch function returning the keys typed, each burst of keys after the given pause, then blocking."""
+
+    def __init__(self, bursts):
+        self.keys = [(pause if i == 0 else 0, key) for pause, burst in bursts for i, key in enumerate(burst)]
+
+    def __call__(self):
+        if not self.keys:
+            threading.Event().wait()
+        pause, key = self.keys.pop(0)
+        if pause:
+            time.sleep(pause)
+        return key.encode("utf-8")
+
+
+def _legacy_frame_count(keys):
+    # a frame for each keystroke, with a terminal resize frame before and after it
+    return 3 * len(keys)
+
+
+class ContainerAppSshTest(unittest.TestCase):
+
+    def setUp(self):
+        self.terminal_size = os.terminal_size((80, 24))
+        for target, fake in [("websocket.WebSocket", _FakeWebSocket),
+                             ("ContainerAppClient.get_auth_token", lambda *_: {"properties": {
+                                 "token": "token", "logStreamEndpoint": "https://proxy/subscriptions/sub/logstream"}}),
+                             ("get_subscription_id", lambda _: "sub"),
+                             ("os.get_terminal_size", lambda: self.terminal_size)]:
+            patcher = mock.patch("azext_containerapp._ssh_utils." + target, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.conn = WebSocketConnection(mock.Mock(), "rg", "app", "revision", "replica", "container", "sh")
+        self.socket = self.conn._socket  # pylint: disable=protected-access
+
+    def _run(self, target, args, expected_input):
+        writer = threading.Thread(target=target, args=(self.conn,) + args, daemon=True)
+        writer.start()
+        deadline = time.monotonic() + 10
+        while self.socket.input() != expected_input and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.conn.is_connected = False
+        writer.join(1)
+        self.assertEqual(expected_input, self.socket.input())
+
+    def test_send_pasted_input(self):
+        start = time.perf_counter()
+        self._run(_send_stdin, (_Keyboard([(0, _SCRIPT)]),), _SCRIPT.encode("utf-8"))
+        elapsed = time.perf_counter() - start
+
+        frames = len(self.socket.frames)
+        print("paste {} keys: {} frames before, {} after, {:.2f}s".format(
+            len(_SCRIPT), _legacy_frame_count(_SCRIPT), frames, elapsed))
+        # the terminal size is sent once, the keys by frames of up to SSH_INPUT_BATCH_BYTES
+        self.assertEqual(1, self.socket.count(SSH_TERM_RESIZE_PREFIX))
+        self.assertLessEqual(self.socket.count(SSH_INPUT_PREFIX), 10)
+        self.assertTrue(all(len(f) <= _ssh_utils.SSH_INPUT_BATCH_BYTES + len(SSH_INPUT_PREFIX)
+                            for f in self.socket.frames))
+
+    def test_send_typed_input(self):
+        # keys typed apart are sent on their own, without waiting for more
+        keyboard = _Keyboard([(0.05, "l"), (0.05, "s"), (0.05, "\n"), (0.05, "\x1b[A")])
+        self._run(_send_stdin, (keyboard,), b"ls\n\x1b[A")
+
+        self.assertEqual([b"l", b"s", b"\n", b"\x1b[A"],
+                         [f[len(SSH_INPUT_PREFIX):] for f in self.socket.frames if f.startswith(SSH_INPUT_PREFIX)])
+
+    def test_send_control_keys(self):
+        # a control key is sent right away along with the keys before it, the keys after it are batched apart
+        with mock.patch("azext_containerapp._ssh_utils.SSH_INPUT_BATCH_SECONDS", 5):
+            self._run(_send_stdin, (_Keyboard([(0, "sleep 100\x03exit\x04")]),), b"sleep 100\x03exit\x04")
+
+        self.assertEqual([b"sleep 100\x03", b"exit\x04"],
+                         [f[len(SSH_INPUT_PREFIX):] for f in self.socket.frames if f.startswith(SSH_INPUT_PREFIX)])
+
+    def test_send_terminal_resize(self):
+        keyboard = _Keyboard([(0, "a"), (0.2, "b")])
+
+        def resize():
+            time.sleep(0.1)
+            self.terminal_size = os.terminal_size((120, 40))
+
+        threading.Thread(target=resize, daemon=True).start()
+        self._run(_send_stdin, (keyboard,), b"ab")
+
+        resizes = [f for f in self.socket.frames if f.startswith(SSH_TERM_RESIZE_PREFIX)]
+        self.assertEqual([b'{"Width": 80, "Height": 24}', b'{"Width": 120, "Height": 40}'],
+                         [f[len(SSH_TERM_RESIZE_PREFIX):] for f in resizes])
+
+    def test_send_piped_stdin(self):
+        script = (_SCRIPT * 20).encode("utf-8")
+        writer = threading.Thread(target=_send_piped_stdin, args=(self.conn, io.BufferedReader(io.BytesIO(script))))
+        writer.start()
+        writer.join(10)
+
+        self.assertEqual(script, self.socket.input()[:-1])
+        # streamed in frames of SSH_PIPED_INPUT_BYTES, then ctrl + d at the end of the input
+        self.assertEqual(-(-len(script) // _ssh_utils.SSH_PIPED_INPUT_BYTES) + 1, len(self.socket.frames))
+        self.assertEqual(SSH_EOF_MSG, self.socket.frames[-1])
+        self.assertEqual(0, self.socket.count(SSH_TERM_RESIZE_PREFIX))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,202 +1,233 @@
-# --------------------------------------------------------------------------------------------
-# Copyright (c) Microsoft Corporation. All rights reserved.
-# Licensed under the MIT License. See License.txt in the project root for license information.
-# --------------------------------------------------------------------------------------------
-
-import datetime
-import time
-
-from knack.util import CLIError
-from knack.log import get_logger
-
-from azext_imagecopy.cli_utils import run_cli_command, prepare_cli_command, get_storage_account_id_from_blob_path
-
-logger = get_logger(__name__)
-
-STORAGE_ACCOUNT_NAME_LENGTH = 24
-
-
-# pylint: disable=too-many-statements
-# pylint: disable=too-many-locals
-def create_target_image(cmd, location, transient_resource_group_name, source_type, source_object_name,
-                        source_os_disk_snapshot_name, source_os_disk_snapshot_url, source_os_type,
-                        target_resource_group_name, azure_pool_frequency, tags, target_name, target_subscription,
-                        export_as_snapshot, timeout, hyper_v_generation='V1'):
-
-    random_string = get_random_string(
-        STORAGE_ACCOUNT_NAME_LENGTH - len(location))
-
-    # create the target storage account. storage account name must be lowercase.
-    logger.warning(
-        "%s - Creating target storage account (can be slow sometimes)", location)
-    target_storage_account_name = location.lower() + random_string
-    cli_cmd = prepare_cli_command(['storage', 'account', 'create',
-                                   '--name', target_storage_account_name,
-                                   '--resource-group', transient_resource_group_name,
-                                   '--location', location,
-                                   '--sku', 'Standard_LRS'],
-                                  subscription=target_subscription)
-
-    json_output = run_cli_command(cli_cmd, return_as_json=True)
-    target_blob_endpoint = json_output['primaryEndpoints']['blob']
-
-    # Setup the target storage account
-    cli_cmd = prepare_cli_command(['storage', 'account', 'keys', 'list',
-                                   '--account-name', target_storage_account_name,
-                                   '--resource-group', transient_resource_group_name],
-                                  subscription=target_subscription)
-
-    json_output = run_cli_command(cli_cmd, return_as_json=True)
-
-    target_storage_account_key = json_output[0]['value']
-    logger.debug("storage account key: %s", target_storage_account_key)
-
-    expiry_format = "%Y-%m-%dT%H:%MZ"
-    expiry = datetime.datetime.utcnow() + datetime.timedelta(seconds=timeout)
-    logger.debug(
-        "create target storage sas using timeout seconds: %d", timeout)
-
-    cli_cmd = prepare_cli_command(['storage', 'account', 'generate-sas',
-                                   '--account-name', target_storage_account_name,
-                                   '--account-key', target_storage_account_key,
-                                   '--expiry', expiry.strftime(expiry_format),
-                                   '--permissions', 'aclrpuw', '--resource-types',
-                                   'sco', '--services', 'b', '--https-only'],
-                                  output_as_json=False,
-                                  subscription=target_subscription)
-
-    sas_token = run_cli_command(cli_cmd)
-    sas_token = sas_token.rstrip("\n\r")  # STRANGE
-    logger.debug("sas token: %s", sas_token)
-
-    # create a container in the target blob storage account
-    logger.warning(
-        "%s - Creating container in the target storage account", location)
-    target_container_name = 'snapshots'
-    cli_cmd = prepare_cli_command(['storage', 'container', 'create',
-                                   '--name', target_container_name,
-                                   '--account-name', target_storage_account_name],
-                                  subscription=target_subscription)
-
-    run_cli_command(cli_cmd)
-
-    # Copy the snapshot to the target region using the SAS URL
-    blob_name = source_os_disk_snapshot_name + '.vhd'
-    logger.warning(
-        "%s - Copying blob to target storage account", location)
-    cli_cmd = prepare_cli_command(['storage', 'blob', 'copy', 'start',
-                                   '--source-uri', source_os_disk_snapshot_url,
-                                   '--destination-blob', blob_name,
-                                   '--destination-container', target_container_name,
-                                   '--account-name', target_storage_account_name,
-                                   '--sas-token', sas_token],
-                                  subscription=target_subscription)
-
-    run_cli_command(cli_cmd)
-
-    # Wait for the copy to complete
-    start_datetime = datetime.datetime.now()
-    wait_for_blob_copy_operation(blob_name, target_container_name, target_storage_account_name,
-                                 azure_pool_frequency, location, target_subscription)
-    msg = "{0} - Copy time: {1}".format(
-        location, datetime.datetime.now() - start_datetime)
-    logger.warning(msg)
-
-    # Create the snapshot in the target region from the copied blob
-    logger.warning(
-        "%s - Creating snapshot in target region from the copied blob", location)
-    target_blob_path = target_blob_endpoint + \
-        target_container_name + '/' + blob_name
-    target_snapshot_name = source_os_disk_snapshot_name + '-' + location
-    if export_as_snapshot:
-        snapshot_resource_group_name = target_resource_group_name
-    else:
-        snapshot_resource_group_name = transient_resource_group_name
-
-    source_storage_account_id = get_storage_account_id_from_blob_path(cmd,
-                                                                      target_blob_path,
-                                                                      transient_resource_group_name,
-                                                                      target_subscription)
-
-    cli_cmd = prepare_cli_command(['snapshot', 'create',
-                                   '--resource-group', snapshot_resource_group_name,
-                                   '--name', target_snapshot_name,
-                                   '--location', location,
-                                   '--source', target_blob_path,
-                                   '--source-storage-account-id', source_storage_account_id,
-                                   '--hyper-v-generation', hyper_v_generation],
-                                  subscription=target_subscription)
-
-    json_output = run_cli_command(cli_cmd, return_as_json=True)
-    target_snapshot_id = json_output['id']
-
-    # Optionally create the final image
-    if export_as_snapshot:
-        logger.warning("%s - Skipping image creation", location)
-    else:
-        logger.warning("%s - Creating final image", location)
-        if target_name is None:
-            target_image_name = source_object_name
-            if source_type != 'image':
-                target_image_name += '-image'
-            target_image_name += '-' + location
-        else:
-            target_image_name = target_name
-
-        cli_cmd = prepare_cli_command(['image', 'create',
-                                       '--resource-group', target_resource_group_name,
-                                       '--name', target_image_name,
-                                       '--location', location,
-                                       '--os-type', source_os_type,
-                                       '--source', target_snapshot_id,
-                                       '--hyper-v-generation', hyper_v_generation],
-                                      tags=tags,
-                                      subscription=target_subscription)
-
-        run_cli_command(cli_cmd)
-
-
-def wait_for_blob_copy_operation(blob_name, target_container_name, target_storage_account_name,
-                                 azure_pool_frequency, location, subscription):
-    copy_status = "pending"
-    prev_progress = -1
-    while copy_status == "pending":
-        cli_cmd = prepare_cli_command(['storage', 'blob', 'show',
-                                       '--name', blob_name,
-                                       '--container-name', target_container_name,
-                                       '--account-name', target_storage_account_name],
-                                      subscription=subscription)
-
-        json_output = run_cli_command(cli_cmd, return_as_json=True)
-        copy_status = json_output["properties"]["copy"]["status"]
-        copy_progress_1, copy_progress_2 = json_output["properties"]["copy"]["progress"].split(
-            "/")
-        current_progress = int(
-            int(copy_progress_1) / int(copy_progress_2) * 100)
-
-        if current_progress != prev_progress:
-            msg = "{0} - Copy progress: {1}%"\
-                .format(location, str(current_progress))
-            logger.warning(msg)
-
-        prev_progress = current_progress
-
-        try:
-            time.sleep(azure_pool_frequency)
-        except KeyboardInterrupt:
-            return
-
-    if copy_status != 'success':
-        logger.error(
-            "The copy operation didn't succeed. Last status: %s", copy_status)
-        logger.error("Command run: %s", cli_cmd)
-        logger.error("Command output: %s", json_output)
-
-        raise CLIError('Blob copy failed')
-
-
-def get_random_string(length):
-    import string
-    import random
-    chars = string.ascii_lowercase + string.digits
-    return ''.join(random.choice(chars) for _ in range(length))
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import datetime
+import threading
+import time
+from concurrent.futures import Future
+
+from knack.util import CLIError
+from knack.log import get_logger
+
+from azext_imagecopy._client_factory import cf_blob_service, cf_compute, cf_storage
+from azext_imagecopy.cli_utils import get_resource_tags
+
+logger = get_logger(__name__)
+
+STORAGE_ACCOUNT_NAME_LENGTH = 24
+TARGET_CONTAINER_NAME = 'snapshots'
+
+# Seconds between two polls of the status of the blob copies
+COPY_POLL_INTERVAL = 5
+
+
+# pylint: disable=too-many-locals
+def create_target_image(cmd, location, transient_resource_group_name, source_type, source_object_name,
+                        source_os_disk_snapshot_name, source_os_disk_snapshot_url, source_os_type,
+                        target_resource_group_name, poller, tags, target_name, target_subscription,
+                        export_as_snapshot, hyper_v_generation='V1'):
+    compute_client = cf_compute(cmd.cli_ctx, target_subscription)
+
+    storage_account = create_target_storage_account(cmd, location, transient_resource_group_name,
+                                                    target_subscription)
+
+    # Copy the snapshot to the target region using the SAS URL
+    blob_name = source_os_disk_snapshot_name + '.vhd'
+    blob_client = start_blob_copy(cmd, location, storage_account, transient_resource_group_name,
+                                  source_os_disk_snapshot_url, blob_name, target_subscription)
+
+    # Wait for the copy to complete
+    start_datetime = datetime.datetime.now()
+    poller.wait(location, blob_client)
+    msg = "{0} - Copy time: {1}".format(
+        location, datetime.datetime.now() - start_datetime)
+    logger.warning(msg)
+
+    # Create the snapshot in the target region from the copied blob
+    logger.warning(
+        "%s - Creating snapshot in target region from the copied blob", location)
+    target_snapshot_name = source_os_disk_snapshot_name + '-' + location
+    if export_as_snapshot:
+        snapshot_resource_group_name = target_resource_group_name
+    else:
+        snapshot_resource_group_name = transient_resource_group_name
+
+    target_snapshot = compute_client.snapshots.begin_create_or_update(
+        snapshot_resource_group_name, target_snapshot_name, {
+            'location': location,
+            'tags': get_resource_tags(),
+            'hyper_v_generation': hyper_v_generation,
+            'creation_data': {
+                'create_option': 'Import',
+                'source_uri': blob_client.url,
+                'storage_account_id': storage_account.id
+            }
+        }).result()
+
+    # Optionally create the final image
+    if export_as_snapshot:
+        logger.warning("%s - Skipping image creation", location)
+        return target_snapshot
+
+    logger.warning("%s - Creating final image", location)
+    if target_name is None:
+        target_image_name = source_object_name
+        if source_type != 'image':
+            target_image_name += '-image'
+        target_image_name += '-' + location
+    else:
+        target_image_name = target_name
+
+    return compute_client.images.begin_create_or_update(
+        target_resource_group_name, target_image_name, {
+            'location': location,
+            'tags': get_resource_tags(tags),
+            'hyper_v_generation': hyper_v_generation,
+            'storage_profile': {
+                'os_disk': {
+                    'os_type': source_os_type,
+                    'os_state': 'Generalized',
+                    'snapshot': {'id': target_snapshot.id}
+                }
+            }
+        }).result()
+
+
+def create_target_storage_account(cmd, location, resource_group_name, subscription):
+    storage_client = cf_storage(cmd.cli_ctx, subscription)
+
+    random_string = get_random_string(
+        STORAGE_ACCOUNT_NAME_LENGTH - len(location))
+
+    # create the target storage account. storage account name must be lowercase.
+    logger.warning(
+        "%s - Creating target storage account (can be slow sometimes)", location)
+    target_storage_account_name = location.lower() + random_string
+    return storage_client.storage_accounts.begin_create(
+        resource_group_name, target_storage_account_name, {
+            'location': location,
+            'tags': get_resource_tags(),
+            'sku': {'name': 'Standard_LRS'},
+            'kind': 'StorageV2',
+            'enable_https_traffic_only': True
+        }).result()
+
+
+def start_blob_copy(cmd, location, storage_account, resource_group_name, source_url, blob_name, subscription):
+    storage_client = cf_storage(cmd.cli_ctx, subscription)
+
+    # Setup the target storage account
+    keys = storage_client.storage_accounts.list_keys(resource_group_name, storage_account.name).keys
+    blob_service_client = cf_blob_service(cmd.cli_ctx, storage_account.primary_endpoints.blob, keys[0].value)
+
+    # create a container in the target blob storage account
+    logger.warning(
+        "%s - Creating container in the target storage account", location)
+    container_client = blob_service_client.get_container_client(TARGET_CONTAINER_NAME)
+    container_client.create_container()
+
+    logger.warning(
+        "%s - Copying blob to target storage account", location)
+    blob_client = container_client.get_blob_client(blob_name)
+    blob_client.start_copy_from_url(source_url)
+    return blob_client
+
+
+class BlobCopyPoller:
+    """
+    Polls the status of the blob copies of all the target locations from a single thread, every COPY_POLL_INTERVAL
+    seconds.
+    """
+
+    def __init__(self):
+        self._copies = {}
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = None
+
+    def wait(self, location, blob_client):
+        """ Block until the copy to the blob completes, raise CLIError if it didn't succeed. """
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise CLIError('The copy to {} was cancelled'.format(location))
+            self._copies[future] = [location, blob_client, -1]
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='image-copy-poller', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return future.result()
+
+    def close(self):
+        """ Stop polling, failing the copies still waited for. """
+        with self._condition:
+            self._closed = True
+            copies = list(self._copies.items())
+            self._copies.clear()
+            self._condition.notify()
+        for future, (location, _, _) in copies:
+            future.set_exception(CLIError('The copy to {} was cancelled'.format(location)))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._copies and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                copies = list(self._copies.items())
+
+            for future, copy in copies:
+                self._poll(future, copy)
+
+            with self._condition:
+                deadline = time.monotonic() + COPY_POLL_INTERVAL
+                while not self._closed and time.monotonic() < deadline:
+                    self._condition.wait(deadline - time.monotonic())
+
+    def _poll(self, future, copy):
+        location, blob_client, prev_progress = copy
+        try:
+            copy_properties = blob_client.get_blob_properties().copy
+        except Exception as ex:  # pylint: disable=broad-except
+            self._finish(future, ex)
+            return
+
+        copy_status = copy_properties.status
+        if copy_properties.progress:
+            copy_progress_1, copy_progress_2 = copy_properties.progress.split("/")
+            current_progress = int(
+                int(copy_progress_1) / int(copy_progress_2) * 100)
+            if current_progress != prev_progress:
+                msg = "{0} - Copy progress: {1}%"\
+                    .format(location, str(current_progress))
+                logger.warning(msg)
+            copy[2] = current_progress
+
+        if copy_status == 'pending':
+            return
+        if copy_status != 'success':
+            logger.error(
+                "%s - The copy operation didn't succeed. Last status: %s", location, copy_status)
+            logger.error("Copy status description: %s", copy_properties.status_description)
+            self._finish(future, CLIError('Blob copy failed'))
+            return
+        self._finish(future)
+
+    def _finish(self, future, exception=None):
+        with self._condition:
+            if self._copies.pop(future, None) is None:
+                return
+        if exception is None:
+            future.set_result(None)
+        else:
+            future.set_exception(exception)
+
+
+def get_random_string(length):
+    import string
+    import random
+    chars = string.ascii_lowercase + string.digits
+    return ''.join(random.choice(chars) for _ in range(length))
@@ -0,0 +1,52 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import subprocess
+import sys
+import time
+import unittest
+from unittest import mock
+
+from azext_imagecopy.tests.latest.test_image_copy_pipeline import _FakeAzure, copy_image
+
+LOCATIONS = ['eastus', 'eastus2', 'westus', 'westeurope', 'northeurope', 'southeastasia']
+
+
+def _legacy_spawn_count(locations, polls):
+    """ The az processes spawned by the copy before it called the SDKs in-process, for a copy without --cleanup """
+    # image show, snapshot create, snapshot grant-access, group exists and group create of the two groups
+    count = 3 + 2 * 2
+    # storage account create, keys list, generate-sas, container create, blob copy start, snapshot create, image create
+    count += 7 * locations
+    # a storage blob show for each poll of a copy
+    return count + polls
+
+
+class ImageCopyBenchmark(unittest.TestCase):
+    """ counts the processes spawned by a copy to 6 locations, with in-memory clients taking 10ms a request """
+
+    def test_benchmark_subprocess_spawns(self):
+        azure = _FakeAzure(copies={location: [('pending', '{}/10'.format(i)) for i in range(5)] + [('success', '10/10')]
+                                   for location in LOCATIONS}, latency=0.01)
+        azure.patch(self)
+
+        with mock.patch('subprocess.Popen', wraps=subprocess.Popen) as popen:
+            start = time.perf_counter()
+            copy_image(LOCATIONS)
+            elapsed = time.perf_counter() - start
+
+        before = _legacy_spawn_count(len(LOCATIONS), sum(azure.polls.values()))
+        start = time.perf_counter()
+        subprocess.check_call([sys.executable, '-c', 'import azure.cli.core'])
+        startup = time.perf_counter() - start
+        message = ('subprocess spawns: {} before, {} after; in-process copy {:.2f}s, '
+                   'at least {:.1f}s of interpreter startup before'.format(before, popen.call_count, elapsed,
+                                                                           before * startup))
+        self.assertEqual(0, popen.call_count, message)
+        self.assertLess(elapsed, 2, message)
+
+
+if __name__ == '__main__':
+    unittest.main()
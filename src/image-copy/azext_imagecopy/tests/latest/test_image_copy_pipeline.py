@@ -0,0 +1,302 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from knack.util import CLIError
+
+from azext_imagecopy.create_target import BlobCopyPoller
+from azext_imagecopy.custom import imagecopy
+
+_SUBSCRIPTION = '00000000-0000-0000-0000-000000000000'
+
+
+class _Poller:
+    def __init__(self, result=None):
+        self._result = result
+
+    def result(self):
+        return self._result
+
+
+class _FakeAzure:
+    """
+    Stands in for the compute, storage, resource and blob clients of the copy, recording the calls made to them. The
+    copy to a location goes through the given (status, progress) states, one per poll, and stays in the last one.
+    """
+
+    def __init__(self, copies=None, existing_groups=None, source=None, latency=0):
+        self.copies = copies or {}
+        self.groups = set(existing_groups or [])
+        self.source = source or _image_source(managed_disk=SimpleNamespace(id='/disks/os'))
+        self.latency = latency
+        self.calls = []
+        self.resources = {}
+        self.polls = {}
+        self.account_locations = {}
+        self.poll_threads = set()
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def _call(self, name, *args, result=None):
+        with self.lock:
+            self.calls.append((name,) + args)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.latency)
+            return result
+        finally:
+            with self.lock:
+                self.running -= 1
+
+    def _create(self, kind, resource_group, name, body):
+        resource = SimpleNamespace(id='/{}/{}/{}'.format(resource_group, kind, name), name=name, body=body)
+        with self.lock:
+            self.resources[(kind, resource_group, name)] = resource
+        return _Poller(self._call(kind + '.create', resource_group, name, result=resource))
+
+    def compute(self, cli_ctx, subscription_id=None):
+        return SimpleNamespace(
+            images=SimpleNamespace(
+                get=lambda rg, name: self._call('images.get', rg, name, result=self.source),
+                begin_create_or_update=lambda rg, name, body: self._create('images', rg, name, body)),
+            virtual_machines=SimpleNamespace(
+                get=lambda rg, name: self._call('virtual_machines.get', rg, name, result=self.source)),
+            snapshots=SimpleNamespace(
+                begin_create_or_update=lambda rg, name, body: self._create('snapshots', rg, name, body),
+                begin_grant_access=lambda rg, name, body: _Poller(self._call(
+                    'snapshots.grant_access', rg, name, result=SimpleNamespace(access_sas='https://source/sas'))),
+                begin_revoke_access=lambda rg, name: _Poller(self._call('snapshots.revoke_access', rg, name)),
+                begin_delete=lambda rg, name: _Poller(self._call('snapshots.delete', rg, name))))
+
+    def storage(self, cli_ctx, subscription_id=None):
+        def begin_create(rg, name, body):
+            poller = self._create('storage_accounts', rg, name, body)
+            account = poller.result()
+            account.primary_endpoints = SimpleNamespace(blob='https://{}.blob.core.windows.net/'.format(name))
+            self.account_locations[name] = body['location']
+            return poller
+
+        return SimpleNamespace(storage_accounts=SimpleNamespace(
+            begin_create=begin_create,
+            list_keys=lambda rg, name: self._call('storage_accounts.list_keys', rg, name,
+                                                  result=SimpleNamespace(keys=[SimpleNamespace(value='key')]))))
+
+    def resource_groups(self, cli_ctx, subscription_id=None):
+        def create_or_update(name, body):
+            self.groups.add(name)
+            return self._call('groups.create', name, body)
+
+        return SimpleNamespace(
+            check_existence=lambda name: self._call('groups.exists', name, result=name in self.groups),
+            create_or_update=create_or_update,
+            begin_delete=lambda name: _Poller(self._call('groups.delete', name)))
+
+    def blob_service(self, cli_ctx, account_url, account_key):
+        return _FakeBlobService(self, account_url)
+
+    def poll(self, location):
+        with self.lock:
+            self.poll_threads.add(threading.current_thread().name)
+            polls = self.polls[location] = self.polls.get(location, 0) + 1
+        states = self.copies.get(location, [('pending', '0/10'), ('success', '10/10')])
+        status, progress = states[min(polls, len(states) - 1)]
+        return SimpleNamespace(copy=SimpleNamespace(status=status, progress=progress,
+                                                    status_description='copy {}'.format(status)))
+
+    def patch(self, test):
+        for target, fake in [('custom.cf_compute', self.compute), ('custom.cf_resource_groups', self.resource_groups),
+                             ('create_target.cf_compute', self.compute), ('create_target.cf_storage', self.storage),
+                             ('create_target.cf_blob_service', self.blob_service),
+                             ('create_target.COPY_POLL_INTERVAL', 0.01),
+                             ('cli_utils.get_subscription_id', lambda cmd, subscription=None: _SUBSCRIPTION)]:
+            patcher = mock.patch('azext_imagecopy.' + target, fake)
+            patcher.start()
+            test.addCleanup(patcher.stop)
+
+
+class _FakeBlobService:
+    def __init__(self, azure, account_url):
+        self._azure = azure
+        self.url = account_url
+        self.location = azure.account_locations[account_url.split('//')[1].split('.')[0]]
+
+    def get_container_client(self, container):
+        return SimpleNamespace(create_container=lambda: self._azure._call('container.create', self.url, container),
+                               get_blob_client=lambda blob: _FakeBlobClient(self, container, blob))
+
+
+class _FakeBlobClient:
+    def __init__(self, service, container, blob):
+        self._service = service
+        self.url = '{}{}/{}'.format(service.url, container, blob)
+
+    def start_copy_from_url(self, source_url):
+        return self._service._azure._call('blob.copy', self.url, source_url)
+
+    def get_blob_properties(self):
+        return self._service._azure.poll(self._service.location)
+
+
+def _image_source(managed_disk=None, blob_uri=None, snapshot=None):
+    return SimpleNamespace(location='westus', hyper_v_generation='V2', storage_profile=SimpleNamespace(
+        data_disks=[], os_disk=SimpleNamespace(os_type='Linux', managed_disk=managed_disk, blob_uri=blob_uri,
+                                               snapshot=snapshot)))
+
+
+def copy_image(locations, **kwargs):
+    kwargs.setdefault('target_resource_group_name', 'target-rg')
+    return imagecopy(mock.Mock(), 'source-rg', 'image', locations, **kwargs)
+
+
+class ImageCopyPipelineTests(unittest.TestCase):
+
+    def test_copy_to_locations(self):
+        azure = _FakeAzure(copies={
+            'eastus': [('pending', '0/10')] * 3 + [('pending', '5/10')] * 3 + [('success', '10/10')],
+            'westeurope': [('success', '10/10')]})
+        azure.patch(self)
+
+        with mock.patch('subprocess.Popen', side_effect=AssertionError('no process should be spawned')):
+            copy_image(['eastus', ' westeurope', 'centralus'], tags={'owner': 'me'})
+
+        source_snapshot = azure.resources[('snapshots', 'source-rg', 'image_os_disk_snapshot')].body
+        self.assertEqual({'create_option': 'Copy', 'source_resource_id': '/disks/os'}, source_snapshot['creation_data'])
+        self.assertEqual('V2', source_snapshot['hyper_v_generation'])
+        self.assertEqual({'image-copy-rg', 'target-rg'}, azure.groups)
+
+        for location in ['eastus', 'westeurope', 'centralus']:
+            copy = next(c for c in azure.calls if c[0] == 'blob.copy' and '//' + location in c[1])
+            self.assertEqual('https://source/sas', copy[2])
+            self.assertTrue(copy[1].endswith('/snapshots/image_os_disk_snapshot.vhd'))
+
+            snapshot = azure.resources[('snapshots', 'image-copy-rg', 'image_os_disk_snapshot-' + location)]
+            self.assertEqual(copy[1], snapshot.body['creation_data']['source_uri'])
+            image = azure.resources[('images', 'target-rg', 'image-' + location)].body
+            self.assertEqual(location, image['location'])
+            self.assertEqual({'created_by': 'image-copy-extension', 'owner': 'me'}, image['tags'])
+            self.assertEqual({'os_type': 'Linux', 'os_state': 'Generalized', 'snapshot': {'id': snapshot.id}},
+                             image['storage_profile']['os_disk'])
+
+        # the copies of all the locations are polled by one thread, until they end
+        self.assertEqual({'eastus': 6, 'westeurope': 1, 'centralus': 1}, azure.polls)
+        self.assertEqual({'image-copy-poller'}, azure.poll_threads)
+        self.assertNotIn('groups.delete', [c[0] for c in azure.calls])
+
+    def test_copy_concurrency(self):
+        azure = _FakeAzure(latency=0.02)
+        azure.patch(self)
+
+        copy_image(['location{}'.format(i) for i in range(6)], parallel_degree=3)
+        self.assertEqual(3, azure.max_running)
+        self.assertEqual(6, len([c for c in azure.calls if c[0] == 'images.create']))
+
+        azure = _FakeAzure(latency=0.02)
+        azure.patch(self)
+        copy_image(['location{}'.format(i) for i in range(6)], parallel_degree=1)
+        self.assertEqual(1, azure.max_running)
+
+    def test_copy_failure(self):
+        azure = _FakeAzure(copies={'eastus': [('pending', '0/10'), ('failed', '2/10')]})
+        azure.patch(self)
+
+        with self.assertLogs('cli.azext_imagecopy', 'ERROR') as logs, \
+                self.assertRaisesRegex(CLIError, 'Failed to copy the image to: eastus'):
+            copy_image(['eastus', 'westeurope'], cleanup=True)
+
+        self.assertIn("eastus - The copy operation didn't succeed. Last status: failed", logs.output[0])
+        self.assertEqual([('images', 'target-rg', 'image-westeurope')],
+                         [key for key in azure.resources if key[0] == 'images'])
+        # the temporary resources are deleted anyway
+        self.assertEqual([('groups.delete', 'image-copy-rg'),
+                          ('snapshots.revoke_access', 'source-rg', 'image_os_disk_snapshot'),
+                          ('snapshots.delete', 'source-rg', 'image_os_disk_snapshot')], azure.calls[-3:])
+
+    def test_copy_cancelled(self):
+        azure = _FakeAzure()
+        azure.patch(self)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        create = azure._create
+
+        # the command is cancelled while the storage account of eastus is being created
+        def create_or_cancel(kind, resource_group, name, body):
+            if kind == 'storage_accounts' and body['location'] == 'westeurope':
+                raise KeyboardInterrupt()
+            if kind == 'storage_accounts':
+                release.wait(10)
+            return create(kind, resource_group, name, body)
+        azure._create = create_or_cancel
+
+        with self.assertLogs('cli.azext_imagecopy', 'WARNING') as logs:
+            self.assertIsNone(copy_image(['westeurope', 'eastus']))
+
+        self.assertTrue(any('User cancelled the operation' in output for output in logs.output))
+        # the copy in progress runs on a daemon thread, which doesn't keep the command from exiting
+        self.assertEqual([True], [t.daemon for t in threading.enumerate() if t.name == 'image-copy-eastus'])
+
+    def test_copy_blob_source_as_snapshot(self):
+        azure = _FakeAzure(source=_image_source(blob_uri='https://account.blob.core.windows.net/vhds/os.vhd'))
+        azure.patch(self)
+
+        copy_image(['eastus'], export_as_snapshot=True)
+
+        source_snapshot = azure.resources[('snapshots', 'source-rg', 'image_os_disk_snapshot')].body
+        self.assertEqual({'create_option': 'Import', 'source_uri': 'https://account.blob.core.windows.net/vhds/os.vhd',
+                          'storage_account_id': '/subscriptions/{}/resourceGroups/source-rg/providers/'
+                                                'Microsoft.Storage/storageAccounts/account'.format(_SUBSCRIPTION)},
+                         source_snapshot['creation_data'])
+        self.assertIn(('snapshots', 'target-rg', 'image_os_disk_snapshot-eastus'), azure.resources)
+        self.assertEqual([], [key for key in azure.resources if key[0] == 'images'])
+
+    def test_invalid_source(self):
+        azure = _FakeAzure(existing_groups=['image-copy-rg'])
+        azure.patch(self)
+
+        with self.assertRaisesRegex(CLIError, 'existing resource group'):
+            copy_image(['eastus'], cleanup=True)
+        with self.assertRaisesRegex(CLIError, 'Invalid Timeout'):
+            copy_image(['eastus'], timeout=60)
+
+        azure.source = _image_source()
+        with self.assertRaisesRegex(CLIError, 'Invalid OS Disk Source Type'):
+            copy_image(['eastus'])
+        self.assertEqual([], [c for c in azure.calls if c[0].endswith('.create')])
+
+    def test_poller_close(self):
+        azure = _FakeAzure(copies={'eastus': [('pending', '0/10')]})
+        azure.patch(self)
+        azure.account_locations['account'] = 'eastus'
+        poller = BlobCopyPoller()
+        blob_client = _FakeBlobService(azure, 'https://account.blob.core.windows.net/').get_container_client(
+            'snapshots').get_blob_client('blob')
+        errors = []
+
+        def wait():
+            try:
+                poller.wait('eastus', blob_client)
+            except CLIError as ex:
+                errors.append(str(ex))
+
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        time.sleep(0.1)
+        poller.close()
+        waiter.join(1)
+
+        self.assertEqual(['The copy to eastus was cancelled'], errors)
+        self.assertGreater(azure.polls['eastus'], 1)
+        with self.assertRaisesRegex(CLIError, 'cancelled'):
+            poller.wait('eastus', blob_client)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -271,9 +271,8 @@ class AzCompleter(Completer):
                 if self.validate_param_completion(param, self.leftover_args):
                     yield self.yield_param_completion(param, self.unfinished_word)
         elif not self.leftover_args:
-            for child_command in self.subtree.children:
-                if self.validate_completion(child_command):
-                    yield Completion(child_command, -len(self.unfinished_word))
+            for child_command in self.subtree.get_children_with_prefix(self.unfinished_word):
+                yield Completion(child_command, -len(self.unfinished_word))
 
     def gen_global_params_and_arg_completions(self):
         # global parameters
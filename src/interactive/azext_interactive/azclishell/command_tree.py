@@ -3,6 +3,8 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+from bisect import bisect_left
+
 
 class CommandTree(object):
     """ a command tree """
@@ -12,6 +14,8 @@ class CommandTree(object):
             self.children = {}
         else:
             self.children = children
+        # sorted (lower case name, name) pairs of the children, built on the first prefix query
+        self._prefix_index = None
 
     def get_child(self, child_name):  # pylint: disable=no-self-use
         """ returns the object with the name supplied """
@@ -24,6 +28,19 @@ class CommandTree(object):
         """ adds a child to this branch """
         # TODO allow adding child_name
         self.children[child.data] = child
+        self._prefix_index = None
+
+    def get_children_with_prefix(self, prefix):
+        """ returns the names of the children starting with the prefix, case insensitive """
+        if self._prefix_index is None:
+            self._prefix_index = sorted((name.lower(), name) for name in self.children)
+        prefix = prefix.lower()
+        index = bisect_left(self._prefix_index, (prefix,))
+        matches = []
+        while index < len(self._prefix_index) and self._prefix_index[index][0].startswith(prefix):
+            matches.append(self._prefix_index[index][1])
+            index += 1
+        return matches
 
     def has_child(self, name):
         """ whether this has a child """
@@ -6,6 +6,8 @@
 import math
 import os
 import json
+from collections.abc import MutableMapping
+
 from knack.log import get_logger
 
 from .command_tree import CommandBranch, CommandHead
@@ -26,6 +28,10 @@ OUTPUT_CHOICES = ['json', 'tsv', 'table', 'jsonc']
 OUTPUT_OPTIONS = ['--output', '-o']
 GLOBAL_PARAM = list(GLOBAL_PARAM_DESCRIPTIONS.keys())
 
+# the completion index is serialized beside the help cache, with this suffix
+INDEX_FILE_SUFFIX = '.index'
+INDEX_VERSION = 1
+
 
 def _get_window_columns():
     _, col = get_window_dim()
@@ -68,21 +74,82 @@ def add_new_lines(long_phrase, line_min=None, tolerance=TOLERANCE):
     return long_phrase + "\n"
 
 
+class LazyFormattedDict(MutableMapping):
+    """ a dictionary whose values are formatted the first time they are read """
+    def __init__(self, formatter, raw=None):
+        self._formatter = formatter
+        self._raw = raw or {}
+        self._formatted = {}
+
+    @property
+    def raw(self):
+        """ the values as they were before being formatted """
+        return self._raw
+
+    def set_raw(self, key, value):
+        """ sets a value which is formatted when read """
+        self._raw[key] = value
+        self._formatted.pop(key, None)
+
+    def __getitem__(self, key):
+        try:
+            return self._formatted[key]
+        except KeyError:
+            value = self._formatted[key] = self._formatter(self._raw[key])
+            return value
+
+    def __setitem__(self, key, value):
+        self._raw[key] = value
+        self._formatted[key] = value
+
+    def __delitem__(self, key):
+        del self._raw[key]
+        self._formatted.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self._raw
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __len__(self):
+        return len(self._raw)
+
+
+def _tree_to_dict(tree):
+    return {name: _tree_to_dict(child) for name, child in tree.children.items()}
+
+
+def _dict_to_tree(branch, children):
+    for name, grand_children in children.items():
+        child = CommandBranch(name)
+        _dict_to_tree(child, grand_children)
+        branch.add_child(child)
+
+
 # pylint: disable=too-many-instance-attributes
 class GatherCommands(object):
     """ grabs all the cached commands from files """
     def __init__(self, config):
+        line_min = int(_get_window_columns()) - 2 * TOLERANCE
+
+        def _format_description(description):
+            return add_new_lines(description, line_min=line_min)
+
+        def _format_examples(examples):
+            return [[_format_description(example[0]), _format_description(example[1])] for example in examples]
+
         # everything that is completable
         self.completable = []
         # a completable to the description of what is does
-        self.descrip = {}
+        self.descrip = LazyFormattedDict(_format_description)
         # from a command to a list of parameters
         self.command_param = {}
 
         self.completable_param = []
-        self.command_example = {}
+        self.command_example = LazyFormattedDict(_format_examples)
         self.command_tree = CommandHead()
-        self.param_descript = {}
+        self.param_descript = LazyFormattedDict(_format_description)
         self.completer = None
         self.command_param_info = {}
 
@@ -114,32 +181,39 @@ class GatherCommands(object):
         """ gathers from the files in a way that is convienent to use """
         command_file = config.get_help_files()
         cache_path = os.path.join(config.get_config_dir(), 'cache')
-        cols = _get_window_columns()
+        help_file_path = os.path.join(cache_path, command_file)
+        index_file_path = help_file_path + INDEX_FILE_SUFFIX
+
+        help_file_stat = os.stat(help_file_path)
+        source = [help_file_stat.st_mtime, help_file_stat.st_size]
 
-        with open(os.path.join(cache_path, command_file), 'r') as help_file:
-            data = json.load(help_file)
         self.add_exit()
-        commands = data.keys()
+        if self._load_index(index_file_path, source):
+            return
 
-        for command in commands:
+        with open(help_file_path, 'r') as help_file:
+            data = json.load(help_file)
+        self._build_index(data)
+        self._write_index(index_file_path, source)
+
+    def _build_index(self, data):
+        """ builds the completion index from the help cache data """
+        # dictionaries keep the insertion order and make the membership checks constant time
+        completable = dict.fromkeys(self.completable)
+        completable_param = dict.fromkeys(self.completable_param)
+
+        for command in data:
             branch = self.command_tree
             for word in command.split():
-                if word not in self.completable:
-                    self.completable.append(word)
+                completable[word] = None
                 if not branch.has_child(word):
                     branch.add_child(CommandBranch(word))
                 branch = branch.get_child(word)
 
-            description = data[command]['help']
-            self.descrip[command] = add_new_lines(description, line_min=int(cols) - 2 * TOLERANCE)
+            self.descrip.set_raw(command, data[command]['help'])
 
             if 'examples' in data[command]:
-                examples = []
-                for example in data[command]['examples']:
-                    examples.append([
-                        add_new_lines(example[0], line_min=int(cols) - 2 * TOLERANCE),
-                        add_new_lines(example[1], line_min=int(cols) - 2 * TOLERANCE)])
-                self.command_example[command] = examples
+                self.command_example.set_raw(command, data[command]['examples'])
 
             command_params = data[command].get('parameters', {})
             for param in command_params:
@@ -149,25 +223,70 @@ class GatherCommands(object):
                     for par in command_params[param]['name']:
                         param_aliases.add(par)
 
-                        self.param_descript[command + " " + par] = \
-                            add_new_lines(
-                                command_params[param]['required'] +
-                                " " + command_params[param]['help'],
-                                line_min=int(cols) - 2 * TOLERANCE)
-                        if par not in self.completable_param:
-                            self.completable_param.append(par)
+                        self.param_descript.set_raw(
+                            command + " " + par,
+                            command_params[param]['required'] + " " + command_params[param]['help'])
+                        completable_param[par] = None
 
                     param_doubles = self.command_param_info.get(command, {})
                     for alias in param_aliases:
                         param_doubles[alias] = param_aliases
                     self.command_param_info[command] = param_doubles
 
+        self.completable = list(completable)
+        self.completable_param = list(completable_param)
+
+    def _load_index(self, index_file_path, source):
+        """ loads the completion index serialized by a previous run, if it is up to date with the help cache """
+        try:
+            with open(index_file_path, 'r') as index_file:
+                index = json.load(index_file)
+            if index.get('version') != INDEX_VERSION or index.get('source') != source:
+                return False
+        except (IOError, OSError, ValueError):
+            return False
+
+        _dict_to_tree(self.command_tree, index['tree'])
+        self.completable = index['completable']
+        self.completable_param = index['completable_param']
+        self.descrip.raw.update(index['descrip'])
+        self.command_example.raw.update(index['command_example'])
+        self.param_descript.raw.update(index['param_descript'])
+        for command, param_doubles in index['command_param_info'].items():
+            self.command_param_info[command] = {alias: set(aliases) for alias, aliases in param_doubles.items()}
+        return True
+
+    def _write_index(self, index_file_path, source):
+        """ serializes the completion index beside the help cache """
+        index = {
+            'version': INDEX_VERSION,
+            'source': source,
+            'tree': _tree_to_dict(self.command_tree),
+            'completable': self.completable,
+            'completable_param': self.completable_param,
+            'descrip': self.descrip.raw,
+            'command_example': self.command_example.raw,
+            'param_descript': self.param_descript.raw,
+            'command_param_info': {
+                command: {alias: sorted(aliases) for alias, aliases in param_doubles.items()}
+                for command, param_doubles in self.command_param_info.items()
+            }
+        }
+        try:
+            temp_file_path = index_file_path + '.tmp'
+            with open(temp_file_path, 'w') as index_file:
+                json.dump(index, index_file)
+            os.replace(temp_file_path, index_file_path)
+        except (IOError, OSError):
+            logger.debug('Unable to write the completion index to %s', index_file_path)
+
     def get_all_subcommands(self):
         """ returns all the subcommands """
-        subcommands = []
+        subcommands = {}
+        kids = self.command_tree.children
         for command in self.descrip:
             for word in command.split():
-                for kid in self.command_tree.children:
-                    if word != kid and word not in subcommands:
-                        subcommands.append(word)
-        return subcommands
+                # a word is a subcommand if it differs from any of the top level commands
+                if word not in subcommands and (len(kids) > 1 or (kids and word not in kids)):
+                    subcommands[word] = None
+        return list(subcommands)
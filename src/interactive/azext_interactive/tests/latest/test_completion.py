@@ -10,6 +10,7 @@ from unittest import mock
 from azure.cli.core.mock import DummyCli
 from azext_interactive.azclishell.configuration import Configuration
 from azext_interactive.azclishell.app import AzInteractiveShell
+from azext_interactive.azclishell.gather_commands import GatherCommands
 
 from prompt_toolkit.document import Document
 
@@ -21,7 +22,8 @@ class CompletionTest(unittest.TestCase):
     def __init__(self, methodName):
         super(CompletionTest, self).__init__(methodName)
         with mock.patch.object(Configuration, 'get_help_files', lambda _: 'help_dump_test.json'):
-            with mock.patch.object(Configuration, 'get_config_dir', lambda _: TEST_DIR):
+            with mock.patch.object(Configuration, 'get_config_dir', lambda _: TEST_DIR), \
+                    mock.patch.object(GatherCommands, '_write_index'):
                 shell_ctx = AzInteractiveShell(DummyCli(), None)
                 self.completer = shell_ctx.completer
                 self.shell_ctx = shell_ctx
@@ -0,0 +1,95 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import timeit
+import unittest
+from unittest import mock
+
+from azext_interactive.azclishell.az_completer import AzCompleter
+from azext_interactive.azclishell.gather_commands import GatherCommands
+
+from prompt_toolkit.document import Document
+
+NUM_GROUPS = 200
+NUM_SUBGROUPS = 10
+NUM_COMMANDS = 5
+
+
+def _generate_help_dump():
+    """ generates a help dump about the size of the full command table (10k commands) """
+    data = {}
+    for group in range(NUM_GROUPS):
+        for subgroup in range(NUM_SUBGROUPS):
+            for command in range(NUM_COMMANDS):
+                name = 'group{} sub{} command{}'.format(group, subgroup, command)
+                data[name] = {
+                    'help': 'Description of {}. '.format(name) * 5,
+                    'examples': [['Example of {}'.format(name), 'az {} --name MyName'.format(name)]],
+                    'parameters': {
+                        '--name': {'name': ['--name', '-n'], 'required': '[REQUIRED]', 'help': 'The name.'},
+                        '--resource-group': {'name': ['--resource-group', '-g'], 'required': '[REQUIRED]',
+                                             'help': 'Name of resource group.'},
+                        '--param{}'.format(command): {'name': ['--param{}'.format(command)], 'required': '',
+                                                      'help': 'A parameter.'}
+                    }
+                }
+    return data
+
+
+class MockConfiguration(object):
+    def __init__(self, config_dir):
+        self.config_dir = config_dir
+
+    def get_help_files(self):
+        return 'help_dump.json'
+
+    def get_config_dir(self):
+        return self.config_dir
+
+
+class CompletionBenchmark(unittest.TestCase):
+    """ measures the keystroke completion latency over a full size command table """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.config_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.config_dir, 'cache'))
+        with open(os.path.join(cls.config_dir, 'cache', 'help_dump.json'), 'w') as help_file:
+            json.dump(_generate_help_dump(), help_file)
+        cls.config = MockConfiguration(cls.config_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.config_dir)
+
+    def test_benchmark_gather_commands(self):
+        cold = timeit.timeit(lambda: GatherCommands(self.config), number=1)
+        warm = timeit.timeit(lambda: GatherCommands(self.config), number=3) / 3
+        self.assertLess(warm, 5, 'gather commands: {:.1f}ms (building index), {:.1f}ms (serialized index)'.format(
+            cold * 1000, warm * 1000))
+
+    def test_benchmark_keystroke_completion(self):
+        commands = GatherCommands(self.config)
+        shell_ctx = mock.Mock(default_command='')
+        completer = AzCompleter(shell_ctx, commands)
+
+        keystrokes = ['g', 'group1', 'group150 ', 'group150 sub', 'group150 sub3 c',
+                      'group150 sub3 command2 ', 'group150 sub3 command2 --p']
+        for text in keystrokes:
+            self.assertTrue(list(completer.get_completions(Document(text), None)))
+
+        number = 100
+        for text in keystrokes:
+            elapsed = timeit.timeit(lambda t=text: list(completer.get_completions(Document(t), None)),
+                                    number=number) / number
+            self.assertLess(elapsed, 0.05, 'completion of {!r}: {:.3f}ms'.format(text, elapsed * 1000))
+
+
+if __name__ == '__main__':
+    unittest.main()
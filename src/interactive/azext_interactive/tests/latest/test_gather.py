@@ -3,8 +3,27 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import os
+import shutil
+import tempfile
 import unittest
-from azext_interactive.azclishell.gather_commands import add_new_lines as nl
+from unittest import mock
+
+from azext_interactive.azclishell.gather_commands import add_new_lines as nl, GatherCommands, LazyFormattedDict
+
+
+TEST_DIR = os.path.abspath(os.path.join(os.path.abspath(__file__), '..'))
+
+
+class MockConfiguration(object):
+    def __init__(self, config_dir):
+        self.config_dir = config_dir
+
+    def get_help_files(self):
+        return 'help_dump_test.json'
+
+    def get_config_dir(self):
+        return self.config_dir
 
 
 class GatherTest(unittest.TestCase):
@@ -56,5 +75,72 @@ class GatherTest(unittest.TestCase):
         )
 
 
+
+class GatherCommandsTest(unittest.TestCase):
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        shutil.copytree(os.path.join(TEST_DIR, 'cache'), os.path.join(self.config_dir, 'cache'))
+        self.config = MockConfiguration(self.config_dir)
+        self.index_path = os.path.join(self.config_dir, 'cache', 'help_dump_test.json.index')
+
+    def tearDown(self):
+        shutil.rmtree(self.config_dir)
+
+    def test_gather_commands(self):
+        commands = GatherCommands(self.config)
+
+        self.assertEqual(len(commands.completable), len(set(commands.completable)))
+        self.assertEqual(len(commands.completable_param), len(set(commands.completable_param)))
+        self.assertIn('storage', commands.completable)
+        self.assertIn('--resource-group', commands.completable_param)
+        self.assertIn('storage account create', commands.descrip)
+        self.assertTrue(commands.descrip['storage account create'].endswith('\n'))
+        self.assertEqual({'--resource-group', '-g'}, commands.command_param_info['vmss create']['-g'])
+        self.assertIn('[REQUIRED]', commands.param_descript['vmss create --name'])
+
+    def test_completion_index_is_serialized(self):
+        commands = GatherCommands(self.config)
+        self.assertTrue(os.path.exists(self.index_path))
+
+        with mock.patch.object(GatherCommands, '_build_index') as build_index:
+            indexed_commands = GatherCommands(self.config)
+            build_index.assert_not_called()
+
+        self.assertEqual(commands.completable, indexed_commands.completable)
+        self.assertEqual(commands.completable_param, indexed_commands.completable_param)
+        self.assertEqual(dict(commands.descrip), dict(indexed_commands.descrip))
+        self.assertEqual(dict(commands.param_descript), dict(indexed_commands.param_descript))
+        self.assertEqual(dict(commands.command_example), dict(indexed_commands.command_example))
+        self.assertEqual(commands.command_param_info, indexed_commands.command_param_info)
+        self.assertEqual(commands.get_all_subcommands(), indexed_commands.get_all_subcommands())
+        self.assertTrue(indexed_commands.command_tree.in_tree(['storage', 'account', 'create']))
+
+    def test_stale_completion_index_is_rebuilt(self):
+        GatherCommands(self.config)
+        help_file_path = os.path.join(self.config_dir, 'cache', 'help_dump_test.json')
+        stat = os.stat(help_file_path)
+        os.utime(help_file_path, (stat.st_atime, stat.st_mtime + 10))
+
+        with mock.patch.object(GatherCommands, '_build_index') as build_index:
+            GatherCommands(self.config)
+            build_index.assert_called_once()
+
+    def test_lazy_formatted_dict(self):
+        formatter = mock.Mock(side_effect=lambda value: value.upper())
+        lazy_dict = LazyFormattedDict(formatter)
+        lazy_dict.set_raw('a', 'first')
+        lazy_dict['b'] = 'second'
+
+        self.assertIn('a', lazy_dict)
+        self.assertEqual(['a', 'b'], list(lazy_dict))
+        formatter.assert_not_called()
+
+        self.assertEqual('FIRST', lazy_dict['a'])
+        self.assertEqual('FIRST', lazy_dict.get('a'))
+        self.assertEqual('second', lazy_dict['b'])
+        self.assertEqual('', lazy_dict.get('c', ''))
+        formatter.assert_called_once_with('first')
+
+
 if __name__ == '__main__':
     unittest.main()
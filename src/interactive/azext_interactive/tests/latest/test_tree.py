@@ -11,6 +11,8 @@ from unittest import mock
 from azure.cli.core.mock import DummyCli
 from azext_interactive.azclishell.configuration import Configuration
 from azext_interactive.azclishell.app import AzInteractiveShell
+from azext_interactive.azclishell.command_tree import CommandBranch
+from azext_interactive.azclishell.gather_commands import GatherCommands
 
 
 TEST_DIR = os.path.abspath(os.path.join(os.path.abspath(__file__), '..'))
@@ -21,7 +23,8 @@ class CommandTreeTest(unittest.TestCase):
 
     def init_tree(self):
         with mock.patch.object(Configuration, 'get_help_files', lambda _: 'help_dump_test.json'):
-            with mock.patch.object(Configuration, 'get_config_dir', lambda _: TEST_DIR):
+            with mock.patch.object(Configuration, 'get_config_dir', lambda _: TEST_DIR), \
+                    mock.patch.object(GatherCommands, '_write_index'):
                 shell_ctx = AzInteractiveShell(DummyCli(), None)
                 self.command_tree = shell_ctx.completer.command_tree
 
@@ -71,6 +74,20 @@ class CommandTreeTest(unittest.TestCase):
         self.assertEqual(current_command, 'storage account create')
         self.assertEqual(leftover_args, ['--name', 'MyStorageAccount'])
 
+    def test_children_with_prefix(self):
+        self.init_tree()
+
+        self.assertEqual(['vm', 'vmss'], self.command_tree.get_children_with_prefix('v'))
+        self.assertEqual(['vm', 'vmss'], self.command_tree.get_children_with_prefix('VM'))
+        self.assertEqual(['vmss'], self.command_tree.get_children_with_prefix('vms'))
+        self.assertEqual([], self.command_tree.get_children_with_prefix('vmsss'))
+        self.assertEqual(sorted(self.command_tree.children), self.command_tree.get_children_with_prefix(''))
+
+        tree, _, _ = self.command_tree.get_sub_tree(['storage', 'account'])
+        self.assertEqual(['check-name', 'create'], tree.get_children_with_prefix('c'))
+        tree.add_child(CommandBranch('cors'))
+        self.assertEqual(['check-name', 'cors', 'create'], tree.get_children_with_prefix('c'))
+
 
 if __name__ == '__main__':
     unittest.main()
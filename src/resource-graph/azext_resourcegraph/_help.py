@@ -41,6 +41,12 @@ helps['graph query'] = """
         - name: --allow-partial-scopes -a
           type: bool
           short-summary: Indicates if query should succeed when only partial number of subscription underneath can be processed by server.
+        - name: --all
+          type: bool
+          short-summary: Return the complete result instead of a single page.
+          long-summary: >
+            The subscriptions (or management groups) are split into batches within the service limits which are queried in parallel,
+            and every page of each batch is fetched. Duplicated rows are removed. The ordering of the query is only kept within a batch.
     examples:
         - name: Query resources requesting a subset of resource fields.
           text: >
@@ -57,6 +63,9 @@ helps['graph query'] = """
         - name: Choose management groups to query.
           text: >
             az graph query -q "where type =~ "Microsoft.Compute" | project name, tags" --management-groups aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb --allow-partial-scopes
+        - name: Query all virtual machines of every accessible subscription, fetching all the pages.
+          text: >
+            az graph query -q "where type =~ "Microsoft.Compute/virtualMachines" | project id, name" --all
         - name: Query with the skip token.
           text: >
             az graph query -q "where type =~ "Microsoft.Compute" | project name, tags" --skip-token skip_token_value_from_previous_query_response
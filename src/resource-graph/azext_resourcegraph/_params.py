@@ -42,6 +42,8 @@ def load_arguments(self, _):
         c.argument('allow_partial_scopes', options_list=['--allow-partial-scopes', '-a'],
                    arg_type=get_three_state_flag(), required=False, default=False,
                    help='Indicates if query should succeed when only partial number of subscription underneath can be processed by server.')
+        c.argument('all_results', options_list=['--all'], arg_type=get_three_state_flag(), required=False, default=False,
+                   help='Return the complete result: query every subscription or management group in parallel batches and follow the skip token of every page. --first sets the page size.')
 
     with self.argument_context('graph shared-query') as c:
         c.argument('graph_query', options_list=['--graph-query', '--q', '-q'],
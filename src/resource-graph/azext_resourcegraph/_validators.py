@@ -23,6 +23,14 @@ def validate_query_args(namespace):
         recommendation = 'Try to pass --subscriptions param only or --management-groups param only.'
         raise InvalidArgumentValueError(error_msg, recommendation)
 
+    if getattr(namespace, 'all_results', False):
+        if namespace.skip or namespace.skip_token is not None:
+            error_msg = '--skip and --skip-token cannot be used together with --all.'
+            recommendation = '--all already follows the skip token of every page to return the complete result.'
+            raise InvalidArgumentValueError(error_msg, recommendation)
+        if namespace.first is None:
+            namespace.first = __ROWS_PER_PAGE
+
     if namespace.first is not None:
         namespace.first = min(namespace.first, __ROWS_PER_PAGE)
     elif namespace.skip_token is None:
@@ -27,11 +27,16 @@ from .vendored_sdks.resourcegraph.models import \
 
 __SUBSCRIPTION_LIMIT = 1000
 __MANAGEMENT_GROUP_LIMIT = 10
+__MAX_CONCURRENT_SHARDS = 4
 __logger = get_logger(__name__)
 
 
-def execute_query(client, graph_query, first, skip, subscriptions, management_groups, allow_partial_scopes, skip_token):
-    # type: (ResourceGraphClient, str, int, int, list[str], list[str], bool, str) -> object
+def execute_query(client, graph_query, first, skip, subscriptions, management_groups, allow_partial_scopes, skip_token,
+                  all_results=False):
+    # type: (ResourceGraphClient, str, int, int, list[str], list[str], bool, str, bool) -> object
+    if all_results:
+        return _execute_query_all(client, graph_query, first, subscriptions, management_groups, allow_partial_scopes)
+
     mgs_list = management_groups
     if mgs_list is not None and len(mgs_list) > __MANAGEMENT_GROUP_LIMIT:
         mgs_list = mgs_list[:__MANAGEMENT_GROUP_LIMIT]
@@ -82,10 +87,7 @@ def execute_query(client, graph_query, first, skip, subscriptions, management_gr
                              "see the docs for an example: https://aka.ms/arg-results-truncated")
 
     except HttpResponseError as ex:
-        if ex.model.error.code == 'BadRequest':
-            raise BadRequestError(json.dumps(_to_dict(ex.model.error), indent=4)) from ex
-
-        raise AzureInternalError(json.dumps(_to_dict(ex.model.error), indent=4)) from ex
+        _raise_query_error(ex)
 
     result_dict = dict()
     result_dict['data'] = response.data
@@ -96,6 +98,102 @@ def execute_query(client, graph_query, first, skip, subscriptions, management_gr
     return result_dict
 
 
+def _execute_query_all(client, graph_query, page_size, subscriptions, management_groups, allow_partial_scopes):
+    # type: (ResourceGraphClient, str, int, list[str], list[str], bool) -> object
+    """
+    Run the query against every given scope and return the complete result.
+
+    The scopes are split into shards within the service limits. The shards are queried concurrently and each one
+    follows the skip token to exhaustion. A resource returned by several shards is only reported by the first one.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if management_groups is not None:
+        scopes, shard_size, scope_arg = management_groups, __MANAGEMENT_GROUP_LIMIT, 'management_groups'
+    else:
+        scopes = subscriptions or _get_cached_subscriptions()
+        shard_size, scope_arg = __SUBSCRIPTION_LIMIT, 'subscriptions'
+
+    shards = [scopes[i:i + shard_size] for i in range(0, len(scopes), shard_size)] or [None]
+
+    def _query_shard(shard):
+        return list(_iter_query_pages(client, graph_query, page_size, allow_partial_scopes, **{scope_arg: shard}))
+
+    try:
+        if len(shards) == 1:
+            shard_pages = [_query_shard(shards[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(shards), __MAX_CONCURRENT_SHARDS)) as executor:
+                shard_pages = list(executor.map(_query_shard, shards))
+    except HttpResponseError as ex:
+        _raise_query_error(ex)
+
+    data = []
+    seen_ids = set()
+    for pages in shard_pages:
+        # A resource may legitimately produce several rows (e.g. mv-expand), so rows are only compared across shards
+        shard_ids = set()
+        for page in pages:
+            for row in page:
+                row_id = _get_row_id(row)
+                if row_id is not None:
+                    if row_id in seen_ids:
+                        continue
+                    shard_ids.add(row_id)
+                data.append(row)
+        seen_ids.update(shard_ids)
+
+    result_dict = dict()
+    result_dict['data'] = data
+    result_dict['count'] = len(data)
+    result_dict['total_records'] = len(data)
+    result_dict['skip_token'] = None
+
+    return result_dict
+
+
+def _iter_query_pages(client, graph_query, page_size, allow_partial_scopes, subscriptions=None,
+                      management_groups=None):
+    # type: (ResourceGraphClient, str, int, bool, list[str], list[str]) -> object
+    skip_token = None
+    while True:
+        request_options = QueryRequestOptions(
+            top=page_size,
+            skip_token=skip_token,
+            result_format=ResultFormat.object_array,
+            allow_partial_scopes=allow_partial_scopes
+        )
+        request = QueryRequest(
+            query=graph_query,
+            subscriptions=subscriptions,
+            management_groups=management_groups,
+            options=request_options)
+        response = client.resources(request)  # type: QueryResponse
+        yield response.data
+
+        skip_token = response.skip_token
+        if not skip_token:
+            if response.result_truncated == ResultTruncated.true:
+                __logger.warning("Unable to paginate the results of the query. "
+                                 "Some resources may be missing from the results. "
+                                 "To rewrite the query and enable paging, "
+                                 "see the docs for an example: https://aka.ms/arg-results-truncated")
+            return
+
+
+def _get_row_id(row):
+    # Resource IDs are case insensitive, rows without one are never considered duplicates
+    row_id = row.get('id') if isinstance(row, dict) else None
+    return row_id.lower() if isinstance(row_id, str) else None
+
+
+def _raise_query_error(ex):
+    if ex.model.error.code == 'BadRequest':
+        raise BadRequestError(json.dumps(_to_dict(ex.model.error), indent=4)) from ex
+
+    raise AzureInternalError(json.dumps(_to_dict(ex.model.error), indent=4)) from ex
+
+
 def create_shared_query(client, resource_group_name,
                         resource_name, description,
                         graph_query, location='global', tags=None):
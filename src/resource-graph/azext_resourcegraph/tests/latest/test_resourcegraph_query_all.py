@@ -0,0 +1,108 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import unittest
+from unittest import mock
+
+from azext_resourcegraph.custom import execute_query
+from azext_resourcegraph.vendored_sdks.resourcegraph.models import ResultTruncated
+
+
+class _FakeResponse(object):
+    def __init__(self, data, skip_token=None):
+        self.data = data
+        self.count = len(data)
+        self.total_records = len(data)
+        self.skip_token = skip_token
+        self.result_truncated = ResultTruncated.false
+
+
+class _FakeQueryClient(object):
+    """
+    Serves every subscription's resources, then the shared rows, in pages of `page_size`, keyed by the skip token.
+    """
+
+    def __init__(self, resources_per_subscription=3, page_size=2, shared_rows=()):
+        self.resources_per_subscription = resources_per_subscription
+        self.page_size = page_size
+        self.shared_rows = list(shared_rows)
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def resources(self, request):
+        with self._lock:
+            self.requests.append(request)
+        rows = []
+        for sub in request.subscriptions:
+            rows.extend({'id': '/subscriptions/{}/vm{}'.format(sub, i)}
+                        for i in range(self.resources_per_subscription))
+        rows.extend(self.shared_rows)
+
+        start = int(request.options.skip_token or 0)
+        end = start + self.page_size
+        return _FakeResponse(rows[start:end], str(end) if end < len(rows) else None)
+
+
+class ResourceGraphQueryAllTests(unittest.TestCase):
+
+    def test_query_all_shards_subscriptions(self):
+        subscriptions = ['sub{}'.format(i) for i in range(2500)]
+        client = _FakeQueryClient(resources_per_subscription=1, page_size=1000)
+
+        result = execute_query(client, 'project id', 1000, None, subscriptions, None, False, None, all_results=True)
+
+        self.assertEqual(2500, result['count'])
+        self.assertEqual(2500, len(result['data']))
+        self.assertIsNone(result['skip_token'])
+        self.assertTrue(all(len(r.subscriptions) <= 1000 for r in client.requests))
+        self.assertEqual(subscriptions, [r['id'].split('/')[2] for r in result['data']])
+
+    def test_query_all_follows_skip_token(self):
+        client = _FakeQueryClient(resources_per_subscription=5, page_size=2)
+
+        result = execute_query(client, 'project id', 2, None, ['sub1'], None, False, None, all_results=True)
+
+        self.assertEqual(5, result['count'])
+        self.assertEqual([None, '2', '4'], [r.options.skip_token for r in client.requests])
+
+    def test_query_all_removes_duplicated_rows(self):
+        subscriptions = ['sub{}'.format(i) for i in range(1500)]
+        shared = {'id': '/providers/Microsoft.Management/managementGroups/root'}
+        upper = {'id': shared['id'].upper()}
+        client = _FakeQueryClient(resources_per_subscription=1, page_size=300, shared_rows=[shared, upper])
+
+        result = execute_query(client, 'project id', 300, None, subscriptions, None, False, None, all_results=True)
+
+        # the resource is reported by the first shard, both of its rows
+        self.assertEqual(1502, result['count'])
+        self.assertEqual([shared, upper], result['data'][1000:1002])
+        self.assertEqual(1, result['data'].count(shared))
+
+    def test_query_all_keeps_identical_rows(self):
+        subscriptions = ['sub{}'.format(i) for i in range(1500)]
+        expanded = {'id': '/subscriptions/sub0/vm0', 'ip': '10.0.0.1'}
+        client = _FakeQueryClient(resources_per_subscription=0, page_size=300,
+                                  shared_rows=[{'type': 'vm'}, {'type': 'vm'}, expanded, expanded])
+
+        result = execute_query(client, 'project type', 300, None, subscriptions, None, False, None,
+                               all_results=True)
+
+        # rows without an id are all kept, as are the rows of a resource within one shard
+        self.assertEqual(4, result['data'].count({'type': 'vm'}))
+        self.assertEqual(2, result['data'].count(expanded))
+        self.assertEqual(6, result['count'])
+
+    def test_query_all_uses_cached_subscriptions(self):
+        client = _FakeQueryClient(resources_per_subscription=1)
+
+        with mock.patch('azext_resourcegraph.custom._get_cached_subscriptions', return_value=['sub1', 'sub2']):
+            result = execute_query(client, 'project id', 1000, None, None, None, False, None, all_results=True)
+
+        self.assertEqual(2, result['count'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,12 +11,7 @@ from azure.cli.core.azclierror import InvalidArgumentValueError
 class ScheduleQueryConditionAction(argparse._AppendAction):
 
     def __call__(self, parser, namespace, values, option_string=None):
-        # antlr4 is not available everywhere, restrict the import scope so that commands
-        # that do not need it don't fail when it is absent
-        import antlr4
-
-        from azext_scheduled_query.grammar.scheduled_query import (
-            ScheduleQueryConditionLexer, ScheduleQueryConditionParser, ScheduleQueryConditionValidator)
+        from azext_scheduled_query._condition_parser import parse_condition
 
         usage = 'usage error: --condition {avg,min,max,total,count} ["METRIC COLUMN" from]\n' \
                 '                         "QUERY_PLACEHOLDER" {=,!=,>,>=,<,<=} THRESHOLD\n' \
@@ -26,21 +21,13 @@ class ScheduleQueryConditionAction(argparse._AppendAction):
                 '                         [at least MinTimeToFail violations out of EvaluationPeriod aggregated points]'
         string_val = ' '.join(values)
 
-        lexer = ScheduleQueryConditionLexer(antlr4.InputStream(string_val))
-        stream = antlr4.CommonTokenStream(lexer)
-        parser = ScheduleQueryConditionParser(stream)
-        tree = parser.expression()
-
         try:
-            validator = ScheduleQueryConditionValidator()
-            walker = antlr4.ParseTreeWalker()
-            walker.walk(validator, tree)
-            scheduled_query_condition = validator.result()
-            for item in ['time_aggregation', 'threshold', 'operator']:
-                if not getattr(scheduled_query_condition, item, None):
-                    raise InvalidArgumentValueError(usage)
-        except (AttributeError, TypeError, KeyError) as e:
+            scheduled_query_condition = parse_condition(string_val)
+        except ValueError as e:
             raise InvalidArgumentValueError(usage) from e
+        for item in ['time_aggregation', 'threshold', 'operator']:
+            if not getattr(scheduled_query_condition, item, None):
+                raise InvalidArgumentValueError(usage)
         super().__call__(parser, namespace, scheduled_query_condition, option_string)
 
 
@@ -0,0 +1,286 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Hand-written parser of the `--condition` expressions, equivalent to grammar/scheduled_query/ScheduleQueryCondition.g4.
+
+It accepts the same expressions as the ANTLR grammar and produces the same Condition objects as
+ScheduleQueryConditionValidator, without loading the ANTLR runtime. Unlike ANTLR, it doesn't try to recover from
+syntax errors: any expression that the grammar reports an error for raises a ValueError.
+Any change to the grammar must be reflected here, test_scheduled_query_condition.py compares both parsers.
+"""
+
+import re
+
+op_conversion = {
+    '=': 'Equals',
+    '!=': 'NotEquals',
+    '>': 'GreaterThan',
+    '>=': 'GreaterThanOrEqual',
+    '<': 'LessThan',
+    '<=': 'LessThanOrEqual'
+}
+
+agg_conversion = {
+    'avg': 'Average',
+    'min': 'Minimum',
+    'max': 'Maximum',
+    'total': 'Total',
+    'count': 'Count'
+}
+
+dim_op_conversion = {
+    'includes': 'Include',
+    'excludes': 'Exclude'
+}
+
+# Token types, the literal tokens of the grammar use their own text as type
+WORD = 'WORD'
+NUMBER = 'NUMBER'
+QUOTE = 'QUOTE'
+OPERATOR = 'OPERATOR'
+WHITESPACE = 'WHITESPACE'
+NEWLINE = 'NEWLINE'
+
+KEYWORDS = {k: k.upper() for k in ['where', 'resource', 'at', 'least', 'out', 'of', 'violations', 'aggregated',
+                                   'points', 'and', 'includes', 'excludes', 'or']}
+KEYWORDS.update({'from': 'COMESFROM', 'id': 'COLUMN'})
+
+# NUMBER is defined before WORD, it wins when it is at least as long as the WORD starting at the same position
+_TOKEN_RE = re.compile(r"""
+    (?P<WHITESPACE>[\ \t]+)
+  | (?P<NEWLINE>[\r\n]+)
+  | (?P<NUMBER>[0-9]+[.,][0-9]+|[0-9]+(?![A-Za-z0-9_]))
+  | (?P<WORD>[A-Za-z0-9_]+)
+  | (?P<LITERAL>==|\\["']|[<>!]=|[<=>"'/.\\:%\-,|&()*~])
+""", re.VERBOSE)
+_LITERAL_TYPES = {'<': OPERATOR, '=': OPERATOR, '>': OPERATOR, '<=': OPERATOR, '>=': OPERATOR, '!=': OPERATOR,
+                  '"': QUOTE, "'": QUOTE}
+
+# Tokens allowed in the repeated parser rules
+_METRIC_TOKENS = frozenset([WORD, WHITESPACE, '.', '/', '_', '\\', ':', '%', '-', ',', '|'])
+_QUERY_TOKENS = frozenset([WORD, WHITESPACE, NUMBER, OPERATOR, 'AND', 'OR', '&', '.', '/', '(', ')', '_', '\\', ':',
+                           '%', '-', ',', '|', '==', '\\"', "\\'"])
+_RESOURCE_ID_TOKENS = _METRIC_TOKENS
+_DIM_VALUE_TOKENS = frozenset([NUMBER, WORD, '-', '.', '*', WHITESPACE, ':', '~', ',', '|', '%', '_'])
+
+
+def tokenize(text):
+    """ Split the text in (type, text) tokens, picking the longest match like the ANTLR lexer. """
+    tokens = []
+    pos = 0
+    for match in _TOKEN_RE.finditer(text):
+        if match.start() != pos:
+            break
+        token_type = match.lastgroup
+        token = match.group()
+        if token_type == WORD:
+            # the '_' literal is defined before WORD
+            token_type = '_' if token == '_' else KEYWORDS.get(token.lower(), WORD)
+        elif token_type == 'LITERAL':
+            token_type = _LITERAL_TYPES.get(token, token)
+        tokens.append((token_type, token))
+        pos = match.end()
+    if pos != len(text):
+        raise ValueError("token recognition error at: '{}'".format(text[pos]))
+    return tokens
+
+
+class ConditionParser:  # pylint: disable=too-few-public-methods
+    """
+    Recursive descent parser of the tokens of a condition.
+
+    The optional and repeated rules return all the positions they can end at, the longest first, so that the parser
+    backtracks like the adaptive prediction of ANTLR would. Results are memoized by position to keep it linear on
+    valid expressions and polynomial on invalid ones.
+    """
+
+    def __init__(self, tokens):
+        self.types = [t for t, _ in tokens] + [None]
+        self.texts = [t for _, t in tokens] + ['']
+        self.end = len(tokens)
+        self._memo = {}
+
+    def _text(self, start, end):
+        return ''.join(self.texts[start:end])
+
+    def _expect(self, pos, *token_types):
+        for token_type in token_types:
+            if self.types[pos] != token_type:
+                raise ValueError("mismatched input '{}' expecting {}".format(self.texts[pos] or '<EOF>', token_type))
+            pos += 1
+        return pos
+
+    def _run(self, pos, allowed):
+        while self.types[pos] in allowed:
+            pos += 1
+        return pos
+
+    def _memoized(self, rule, pos):
+        key = (rule.__name__, pos)
+        if key not in self._memo:
+            results = {}
+            for end, value in rule(pos):
+                results.setdefault(end, value)
+            self._memo[key] = list(results.items())
+        return self._memo[key]
+
+    def parse(self):
+        parameters = {}
+        pos = self._expect(0, WORD)
+        parameters['time_aggregation'] = self.texts[0]
+        pos = self._expect(pos, WHITESPACE)
+
+        metric = self._metric_with_quote(pos)
+        if metric:
+            pos, parameters['metric_measure_column'] = metric
+        pos, parameters['query'] = self._query_with_quote(pos)
+
+        pos = self._expect(pos, WHITESPACE, OPERATOR)
+        parameters['operator'] = self.texts[pos - 1]
+        pos = self._expect(pos, WHITESPACE, NUMBER)
+        parameters['threshold'] = self.texts[pos - 1]
+
+        for pos, tail in self._tail(pos):
+            pos = self._run(pos, (NEWLINE,))
+            if pos == self.end:
+                parameters.update(tail)
+                return parameters
+        raise ValueError("extraneous input '{}'".format(self._text(pos, self.end)))
+
+    def _metric_with_quote(self, pos):
+        """ (QUOTE metric QUOTE | metric) WHITESPACE COMESFROM WHITESPACE, or None when there is no metric. """
+        try:
+            if self.types[pos] == QUOTE:
+                metric_end = self._run(pos + 1, _METRIC_TOKENS)
+                metric = self._text(pos + 1, metric_end)
+                end = self._expect(metric_end, QUOTE, WHITESPACE, 'COMESFROM', WHITESPACE)
+            else:
+                # the metric can contain whitespaces, the last one is the separator before 'from'
+                metric_end = max(pos, self._run(pos, _METRIC_TOKENS) - 1)
+                metric = self._text(pos, metric_end)
+                end = self._expect(metric_end, WHITESPACE, 'COMESFROM', WHITESPACE)
+        except ValueError:
+            return None
+        if not metric:
+            return None
+        return end, metric.strip()
+
+    def _query_with_quote(self, pos):
+        pos = self._expect(pos, QUOTE)
+        start = pos
+        while True:
+            if self.types[pos] in _QUERY_TOKENS:
+                pos += 1
+            elif self.types[pos] == 'WHERE':
+                pos = self._expect(pos + 1, WHITESPACE)
+            else:
+                break
+        if pos == start:
+            raise ValueError("empty query")
+        query = self._text(start, pos).strip().replace("\\\"", "\"").replace("\\\'", "\'")
+        return self._expect(pos, QUOTE), query
+
+    def _tail(self, pos):
+        """ (WHITESPACE resource_column)? (WHITESPACE dimensions)* (WHITESPACE falling_period)? """
+        resource_ids = [(pos, None)]
+        if self.types[pos] == WHITESPACE and self.types[pos + 1] == 'RESOURCE':
+            resource_ids = self._memoized(self._resource_column, pos + 1) + resource_ids
+
+        for resource_end, resource_id in resource_ids:
+            for dimensions_end, dimensions in self._memoized(self._dimensions_list, resource_end):
+                tail = {}
+                if resource_id is not None:
+                    tail['resource_id_column'] = resource_id
+                tail['dimensions'] = dimensions
+                falling_period = self._falling_period(dimensions_end)
+                if falling_period:
+                    yield falling_period[0], dict(tail, failing_periods=falling_period[1])
+                yield dimensions_end, tail
+
+    def _resource_column(self, pos):
+        start = self._expect(pos, 'RESOURCE', WHITESPACE, 'COLUMN', WHITESPACE)
+        run_end = self._run(start, _RESOURCE_ID_TOKENS)
+        # the resource id can only be followed by the whitespace before the next clause
+        for end in range(run_end, start, -1):
+            if end == run_end or self.types[end] == WHITESPACE:
+                yield end, self._text(start, end).strip()
+
+    def _dimensions_list(self, pos):
+        """ (WHITESPACE dimensions)* """
+        # The validator fails on the dimensions of a second 'where' clause, so only one is accepted
+        if self.types[pos] == WHITESPACE and self.types[pos + 1] == 'WHERE':
+            yield from self._memoized(self._dimensions, pos + 1)
+        yield pos, []
+
+    def _dimensions(self, pos):
+        """ WHERE WHITESPACE dimension (dim_separator dimension)* """
+        return self._dimension_sequence(self._expect(pos, 'WHERE', WHITESPACE))
+
+    def _dimension_sequence(self, pos):
+        for end, dimension in self._memoized(self._dimension, pos):
+            if self.types[end] in ('AND', ',') and self.types[end + 1] == WHITESPACE:
+                for sequence_end, dimensions in self._memoized(self._dimension_sequence, end + 2):
+                    yield sequence_end, [dimension] + dimensions
+            yield end, [dimension]
+
+    def _dimension(self, pos):
+        """ dim_name dim_operator dim_values """
+        try:
+            start = self._expect(pos, WORD, WHITESPACE)
+            if self.types[start] not in ('INCLUDES', 'EXCLUDES'):
+                return
+            start = self._expect(start + 1, WHITESPACE)
+        except ValueError:
+            return
+        name = self.texts[pos]
+        operator = dim_op_conversion[self.texts[pos + 2].lower()]
+        for end, _ in self._memoized(self._dim_values, start):
+            values = [x for x in self._text(start, end).strip().split(' ') if x not in ['', 'or']]
+            yield end, {'name': name, 'operator': operator, 'values': values}
+
+    def _dim_values(self, pos):
+        """ dim_value (dim_val_separator dim_value)* """
+        run_end = self._run(pos, _DIM_VALUE_TOKENS)
+        # a value can be followed by a separator, or by the whitespace before the next clause
+        for end in range(run_end, pos, -1):
+            if end != run_end and self.types[end] not in (WHITESPACE, ','):
+                continue
+            if self.types[end] in ('OR', ',') and self.types[end + 1] == WHITESPACE:
+                for values_end, _ in self._memoized(self._dim_values, end + 2):
+                    yield values_end, None
+            yield end, None
+
+    def _falling_period(self, pos):
+        """ WHITESPACE at least min_times violations out of evaluation_period aggregated points """
+        if self.types[pos] != WHITESPACE or self.types[pos + 1] != 'AT':
+            return None
+        pos = self._expect(pos + 1, 'AT', WHITESPACE, 'LEAST', WHITESPACE, NUMBER)
+        min_times = self.texts[pos - 1]
+        pos = self._expect(pos, WHITESPACE, 'VIOLATIONS', WHITESPACE, 'OUT', WHITESPACE, 'OF', WHITESPACE, NUMBER)
+        evaluation_period = self.texts[pos - 1]
+        pos = self._expect(pos, WHITESPACE, 'AGGREGATED', WHITESPACE, 'POINTS')
+        return pos, (int(float(min_times)), int(float(evaluation_period)))
+
+
+def parse_condition(text):
+    """
+    Parse a `--condition` expression into a Condition. Raise ValueError if the expression is invalid.
+    """
+    from azext_scheduled_query.vendored_sdks.azure_mgmt_scheduled_query.models import (
+        Condition, ConditionFailingPeriods, Dimension)
+
+    parameters = ConditionParser(tokenize(text)).parse()
+    try:
+        parameters['time_aggregation'] = agg_conversion[parameters['time_aggregation']]
+    except KeyError as e:
+        raise ValueError("unknown aggregation '{}'".format(parameters['time_aggregation'])) from e
+    parameters['operator'] = op_conversion[parameters['operator']]
+    parameters['dimensions'] = [Dimension(**dim) for dim in parameters['dimensions']]
+    if 'failing_periods' in parameters:
+        min_times, evaluation_period = parameters['failing_periods']
+        parameters['failing_periods'] = ConditionFailingPeriods(min_failing_periods_to_alert=min_times,
+                                                                number_of_evaluation_periods=evaluation_period)
+    return Condition(**parameters)
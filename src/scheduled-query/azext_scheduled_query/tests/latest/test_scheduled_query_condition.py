@@ -0,0 +1,215 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import random
+import unittest
+
+from azext_scheduled_query._condition_parser import parse_condition, tokenize
+
+CORPUS = [
+    'avg "Perf" > 90',
+    'count \'placeholder_1\' > 360',
+    'count \'union Event, Syslog | where TimeGenerated > ago(1h)\' > 360 resource id _ResourceId',
+    'count \'placeholder_1\' < 260 resource id _ResourceId at least 2 violations out of 3 aggregated points',
+    'avg "% Processor Time" from "Perf | where ObjectName == \\"Processor\\"" > 70 resource id resourceId',
+    'avg "% Processor Time" from "Perf | where ObjectName == \\"Processor\\" and C>=D && E<<F" > 70 resource id '
+    'resourceId where ApiName includes GetBlob or PutBlob and DpiName excludes CCC at least 1.1 violations out of '
+    '10.1 aggregated points',
+    'max CounterValue from \'Perf\' >= 1.5',
+    'min a b from "Perf" != 0',
+    'total "x" <= 10,5 where A includes x, y or z and B excludes y',
+    'avg "Perf" > 90 where A includes x, B includes y',
+    'avg "Perf" > 90 where A includes * or 50% or a-b.c:d~e|f',
+    'avg "Perf" > 90 where A includes x OR y',
+    'avg "Perf" > 90 resource id x junk',
+    'avg "Perf" > 90 resource id x\n',
+    'avg \'Perf" > 90',
+    'avg  "Perf"\t> 90\r\n',
+    'avg "Perf | where x == \\\'y\\\'" = 1',
+    'AVG "Perf" > 90 RESOURCE ID x WHERE A INCLUDES b AT LEAST 1 VIOLATIONS OUT OF 2 AGGREGATED POINTS',
+    # invalid expressions
+    '',
+    'avg',
+    'sum "Perf" > 90',
+    'avg Perf > 90',
+    'avg "Perf" >90',
+    'avg "Perf" > 90 ',
+    'avg "Perf" > 90 junk',
+    'avg "Perf" > x',
+    'avg "Per+f" > 90',
+    'avg "Perf | project id" > 90',
+    'avg "Perf where" > 90',
+    'avg "" > 90',
+    'avg "5" from "Perf" > 90',
+    'avg "Perf" > 90 where A includes x where B includes y',
+    'avg "Perf" > 90 where A include x',
+    'avg "Perf" > 90 where A includes x or',
+    'avg "Perf" > 1,5 at least 1,5 violations out of 2 aggregated points',
+    'avg "Perf" > 90 at least 1 violations out of aggregated points',
+    'avg "Perf" > 90 resource id x where A includes b at least 1',
+]
+
+
+def _generate_corpus(count, seed=0):
+    """ Generate expressions from the pieces of the grammar, one piece out of twenty being invalid in its position. """
+    rng = random.Random(seed)
+
+    def pick(valid, invalid):
+        return rng.choice(invalid if rng.random() < 0.05 else valid)
+
+    def join(valid, invalid, count):
+        return ''.join(pick(valid, invalid) for _ in range(rng.randint(1, count)))
+
+    query_pieces = ['Perf', ' ', ' | ', 'where ', 'TimeGenerated > ago(1h)', 'ObjectName == \\"Processor\\"', '&&',
+                    'count()', 'and', 'or', 'bin(TimeGenerated, 5m)', '%', '-', ':', '/', '.', ',', '_', '\\', '1.5']
+    metric_pieces = ['% Processor Time', 'CounterValue', 'a.b', 'c/d', 'x_y', 'e:f', 'g-h', 'i,j', 'k|l', ' ']
+    value_pieces = ['GetBlob', '*', '1.5', 'a-b', 'x:y', '~z', 'a,b', 'p|q', '50%', '_', 'or', 'OR', ' ', ', ']
+    expressions = []
+    for _ in range(count):
+        parts = [pick(['avg', 'min', 'max', 'total', 'count'], ['sum', 'Avg', '']), ' ']
+        if rng.random() < 0.4:
+            quote = pick(['"', "'", ''], ['"5'])
+            parts += [quote, join(metric_pieces, ['5', 'id', '('], 3), quote, ' ', pick(['from', 'FROM'], ['of']), ' ']
+        parts += ['"', join(query_pieces, ['project id', '+', '"', 'where'], 6), pick(['"', "'"], ['', '`'])]
+        parts += [' ', pick(['>', '>=', '<', '<=', '=', '!='], ['==', '']), ' ', pick(['90', '1.1', '10,5'], ['7a'])]
+        if rng.random() < 0.4:
+            parts += [' resource id ', join(['_ResourceId', 'x', ' ', 'a.b', '-'], ['where', '5'], 3)]
+        if rng.random() < 0.6:
+            parts += [' where ']
+            for i in range(rng.randint(1, 3)):
+                parts += [pick([' and ', ', ', ' AND '], [' or ']) if i else '', pick(['ApiName', 'x'], ['id']), ' ',
+                          pick(['includes', 'excludes', 'Includes'], ['include']), ' ']
+                for j in range(rng.randint(1, 3)):
+                    parts += [pick([' or ', ', ', ' OR ', ' '], [' and ']) if j else '', pick(value_pieces, ['at'])]
+        if rng.random() < 0.4:
+            parts += [' at least ', pick(['1', '2.5'], ['1,5']), ' violations out of ', pick(['3'], ['x']),
+                      ' aggregated points']
+        parts += [pick(['', '\n', '\r\n'], [' ', ' junk'])]
+        expressions.append(''.join(parts))
+    return expressions
+
+
+def _load_antlr_parser():
+    """ Return a function parsing a condition with the ANTLR grammar, or None if the runtime can't load it. """
+    # pylint: disable=import-outside-toplevel
+    try:
+        import antlr4
+        from antlr4.error.ErrorListener import ErrorListener
+        from azext_scheduled_query.grammar.scheduled_query import (
+            ScheduleQueryConditionLexer, ScheduleQueryConditionParser, ScheduleQueryConditionValidator)
+        ScheduleQueryConditionParser(antlr4.CommonTokenStream(ScheduleQueryConditionLexer(antlr4.InputStream(''))))
+    except Exception:  # pylint: disable=broad-except
+        # the generated grammar can only be loaded by the 4.9 runtime
+        return None
+
+    class _ErrorCollector(ErrorListener):
+        def __init__(self):
+            super().__init__()
+            self.errors = []
+
+        def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):  # pylint: disable=invalid-name
+            self.errors.append(msg)
+
+    def parse(text):
+        """ Return the Condition, or None if the grammar reports errors or doesn't parse the whole text. """
+        errors = _ErrorCollector()
+        lexer = ScheduleQueryConditionLexer(antlr4.InputStream(text))
+        lexer.removeErrorListeners()
+        lexer.addErrorListener(errors)
+        stream = antlr4.CommonTokenStream(lexer)
+        parser = ScheduleQueryConditionParser(stream)
+        parser.removeErrorListeners()
+        parser.addErrorListener(errors)
+        tree = parser.expression()
+        try:
+            validator = ScheduleQueryConditionValidator()
+            antlr4.ParseTreeWalker().walk(validator, tree)
+            condition = validator.result()
+        except Exception:  # pylint: disable=broad-except
+            return None
+        # the expression rule doesn't end with EOF, ANTLR silently ignores some trailing tokens
+        if errors.errors or stream.LA(1) != antlr4.Token.EOF:
+            return None
+        return condition
+
+    return parse
+
+
+def _condition_fields(condition):
+    # as_dict() would convert the threshold, which the validator keeps as text
+    failing_periods = condition.failing_periods
+    return (condition.time_aggregation, condition.metric_measure_column, condition.query, condition.operator,
+            condition.threshold, condition.resource_id_column,
+            [(d.name, d.operator, d.values) for d in condition.dimensions],
+            failing_periods and (failing_periods.min_failing_periods_to_alert,
+                                 failing_periods.number_of_evaluation_periods))
+
+
+class ScheduledQueryConditionParserTest(unittest.TestCase):
+
+    def assertSameCondition(self, expected, text):
+        try:
+            actual = parse_condition(text)
+        except ValueError:
+            actual = None
+        if expected is None:
+            self.assertIsNone(actual, text)
+        else:
+            self.assertIsNotNone(actual, text)
+            self.assertEqual(_condition_fields(expected), _condition_fields(actual), text)
+
+    def test_tokenize(self):
+        self.assertEqual([('WORD', 'avg'), ('WHITESPACE', ' '), ('QUOTE', '"'), ('WORD', 'Perf'), ('QUOTE', '"')],
+                         tokenize('avg "Perf"'))
+        # longest match first, then the first rule of the grammar
+        self.assertEqual([('NUMBER', '90.5'), ('WORD', 'abc'), ('WHITESPACE', ' '), ('NUMBER', '1'), ('.', '.'),
+                          ('WORD', 'x'), ('WHITESPACE', ' \t'), ('_', '_'), ('WHITESPACE', ' '), ('WORD', '__')],
+                         tokenize('90.5abc 1.x \t_ __'))
+        self.assertEqual([('==', '=='), ('OPERATOR', '<='), ('OPERATOR', '!='), ('\\"', '\\"'), ('\\', '\\'),
+                          ('NEWLINE', '\r\n\n'), ('COLUMN', 'ID'), ('WHITESPACE', ' '), ('COMESFROM', 'From')],
+                         tokenize('==<=!=\\"\\\r\n\nID From'))
+        with self.assertRaises(ValueError):
+            tokenize('avg "Per+f" > 90')
+
+    def test_parse_condition(self):
+        condition = parse_condition('avg "% Processor Time" from "Perf | where ObjectName == \\"Processor\\"" > 70 '
+                                    'resource id resourceId where ApiName includes GetBlob or PutBlob and DpiName '
+                                    'excludes CCC at least 1.1 violations out of 10.1 aggregated points')
+        self.assertEqual('Average', condition.time_aggregation)
+        self.assertEqual('% Processor Time', condition.metric_measure_column)
+        self.assertEqual('Perf | where ObjectName == "Processor"', condition.query)
+        self.assertEqual('GreaterThan', condition.operator)
+        self.assertEqual('70', condition.threshold)
+        self.assertEqual('resourceId', condition.resource_id_column)
+        self.assertEqual([('ApiName', 'Include', ['GetBlob', 'PutBlob']), ('DpiName', 'Exclude', ['CCC'])],
+                         [(d.name, d.operator, d.values) for d in condition.dimensions])
+        self.assertEqual(1, condition.failing_periods.min_failing_periods_to_alert)
+        self.assertEqual(10, condition.failing_periods.number_of_evaluation_periods)
+
+        condition = parse_condition('total "x" <= 10,5 where A includes x, y or z and B excludes y\n')
+        self.assertEqual('10,5', condition.threshold)
+        self.assertEqual([('A', 'Include', ['x,', 'y', 'z']), ('B', 'Exclude', ['y'])],
+                         [(d.name, d.operator, d.values) for d in condition.dimensions])
+
+        condition = parse_condition('min a b from "Perf" != 0 resource id x junk')
+        self.assertEqual('a b', condition.metric_measure_column)
+        self.assertEqual('x junk', condition.resource_id_column)
+        self.assertIsNone(condition.failing_periods)
+
+    def test_parse_condition_error(self):
+        for text in CORPUS[CORPUS.index(''):]:
+            with self.assertRaises(ValueError, msg=text):
+                parse_condition(text)
+
+    def test_parse_condition_same_as_grammar(self):
+        antlr_parse = _load_antlr_parser()
+        if not antlr_parse:
+            self.skipTest('The ANTLR runtime can not load the generated grammar')
+        for text in CORPUS + _generate_corpus(2000):
+            self.assertSameCondition(antlr_parse(text), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
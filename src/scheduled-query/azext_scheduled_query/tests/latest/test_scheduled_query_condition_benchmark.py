@@ -0,0 +1,73 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import subprocess
+import sys
+import time
+import timeit
+import unittest
+
+from azext_scheduled_query._condition_parser import parse_condition
+from azext_scheduled_query.tests.latest.test_scheduled_query_condition import _load_antlr_parser
+
+CONDITIONS = [
+    'avg "Perf" > 90',
+    'count \'union Event, Syslog | where TimeGenerated > ago(1h)\' > 360 resource id _ResourceId',
+    'avg "% Processor Time" from "Perf | where ObjectName == \\"Processor\\" and C>=D && E<<F" > 70 resource id '
+    'resourceId where ApiName includes GetBlob or PutBlob and DpiName excludes CCC at least 1 violations out of '
+    '10 aggregated points',
+]
+
+COLD_START = '''
+from azext_scheduled_query.tests.latest.test_scheduled_query_condition_benchmark import CONDITIONS
+{}
+for condition in CONDITIONS:
+    parse(condition)
+'''
+
+
+def _cold_start(setup):
+    """ time a new process importing the parser and parsing the conditions, minus the time of an empty process """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+
+    def run(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], env=env, check=True)
+        return time.perf_counter() - start
+
+    baseline = min(run(COLD_START.format('parse = str')) for _ in range(3))
+    return min(run(COLD_START.format(setup)) for _ in range(3)) - baseline
+
+
+class ScheduledQueryConditionBenchmark(unittest.TestCase):
+    """ measures the time to parse a --condition, as paid by every scheduled-query create/update """
+
+    def test_benchmark_parse_condition(self):
+        number = 500
+        elapsed = timeit.timeit(lambda: [parse_condition(c) for c in CONDITIONS],
+                                number=number) / number / len(CONDITIONS)
+        message = 'hand-written parser: {:.3f}ms per condition'.format(elapsed * 1000)
+
+        antlr_parse = _load_antlr_parser()
+        if antlr_parse:
+            antlr_elapsed = timeit.timeit(lambda: [antlr_parse(c) for c in CONDITIONS],
+                                          number=number) / number / len(CONDITIONS)
+            message += ', ANTLR parser: {:.3f}ms per condition'.format(antlr_elapsed * 1000)
+            self.assertLess(elapsed, antlr_elapsed, message)
+        self.assertLess(elapsed, 0.005, message)
+
+    def test_benchmark_cold_start(self):
+        cold = _cold_start('from azext_scheduled_query._condition_parser import parse_condition as parse')
+
+        if _load_antlr_parser():
+            antlr_cold = _cold_start('from azext_scheduled_query.tests.latest.test_scheduled_query_condition import '
+                                     '_load_antlr_parser\nparse = _load_antlr_parser()')
+            self.assertLess(cold, antlr_cold, 'to import and parse the first conditions: hand-written parser '
+                            '{:.1f}ms, ANTLR parser {:.1f}ms'.format(cold * 1000, antlr_cold * 1000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,8 +5,10 @@
 
 # pylint: disable=too-few-public-methods, unused-argument, redefined-builtin
 import sys
+import codecs
 import requests
 import json
+from threading import BoundedSemaphore, Event, Lock, Thread
 from time import sleep
 from requests.auth import HTTPBasicAuth
 from knack.log import get_logger
@@ -21,6 +23,10 @@ from .vendored_sdks.appplatform.v2022_01_01_preview.models._app_platform_managem
 
 logger = get_logger(__name__)
 
+# The stages of a build run one after another, the logs of the next stages are requested while the current one is
+# streamed, so they're written as soon as it ends
+BUILD_LOG_MAX_STAGES = 3
+
 
 class BuildService:
     def __init__(self, cmd, client, resource_group, service):
@@ -123,8 +129,41 @@ class BuildService:
         stages = result.properties.build_stages
         if any(x is None for x in [pod, stages]):
             return
-        for stage in stages:
-            self._start_build_stage_log_with_retry(result, pod, stage.name)
+        stage_names = [stage.name for stage in stages]
+        stage_logs = BuildStageLogs(stage_names)
+        self._get_log_stream()
+        # the stages are streamed on daemon threads, which a retry waiting for its stage to start or a log being
+        # streamed don't keep alive once the command is interrupted
+        slots = BoundedSemaphore(BUILD_LOG_MAX_STAGES)
+        stop = Event()
+        errors = {}
+        threads = []
+        try:
+            for stage_name in stage_names:
+                slots.acquire()
+                thread = Thread(target=self._stream_build_stage_log,
+                                args=(result, pod, stage_name, stage_logs, slots, stop, errors))
+                thread.daemon = True
+                thread.start()
+                threads.append(thread)
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            raise
+        for stage_name in stage_names:
+            if stage_name in errors:
+                raise errors[stage_name]
+
+    def _stream_build_stage_log(self, result, pod, stage_name, stage_logs, slots, stop, errors):
+        try:
+            self._start_build_stage_log_with_retry(result, pod, stage_name, stage_logs, stop)
+        except Exception as e:  # pylint: disable=broad-except
+            errors[stage_name] = e
+        finally:
+            stage_logs.end(stage_name)
+            slots.release()
 
     def _try_print_build_logs(self, build_result_id):
         blob_url = self._try_get_build_log_url(build_result_id)
@@ -147,16 +186,17 @@ class BuildService:
         except Exception:
             logger.warning("Unfortunately we are not able to display offline build logs due to unknown errors.")
 
-    def _start_build_stage_log_with_retry(self, result, pod, stage_name):
-        while True:
+    def _start_build_stage_log_with_retry(self, result, pod, stage_name, stage_logs=None, stop=None):
+        while not (stop and stop.is_set()):
             try:
-                return self._start_build_stage_log(result, pod, stage_name)
+                self._start_build_stage_log(result, pod, stage_name, stage_logs)
+                return
             except InvalidArgumentValueError as e:
                 logger.debug('Failed to stream log out for stage {}: {}'.format(stage_name, str(e)))
                 sleep(5)
                 pass
 
-    def _start_build_stage_log(self, result, pod, stage_name):
+    def _start_build_stage_log(self, result, pod, stage_name, stage_logs=None):
         if result.properties.provisioning_state not in self.terminated_state:
             # refresh the build result
             result = self._get_build_result(result.id)
@@ -167,9 +207,9 @@ class BuildService:
         if not stage:
             logger.debug('Not found the stage {} in latest response'.format(stage_name))
             raise 'Not found the stage {} in latest response'.format(stage_name)
-        self._print_build_stage_log(pod, stage)
+        self._print_build_stage_log(pod, stage, stage_logs)
 
-    def _print_build_stage_log(self, pod, stage):
+    def _print_build_stage_log(self, pod, stage, stage_logs=None):
         if stage.status == 'NotStarted':
             logger.debug('Build stage {} not started yet.'.format(stage.name))
             raise InvalidArgumentValueError('Build stage {} not started yet.'.format(stage.name))
@@ -179,12 +219,16 @@ class BuildService:
             if response.status_code == 200:
                 logger.debug('start to stream log for stage {}'.format(stage.name))
                 self.progress_bar and self.progress_bar.end()
-                std_encoding = sys.stdout.encoding
-                for content in response.iter_content():
-                    if content:
-                        sys.stdout.write(content.decode(encoding='utf-8', errors='replace')
-                                         .encode(std_encoding, errors='replace')
+                stage_logs = stage_logs or BuildStageLogs([stage.name])
+                std_encoding = sys.stdout.encoding or 'utf-8'
+                # decode the content as it is received, a character may be split between two chunks
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+                for content in response.iter_content(chunk_size=None):
+                    text = decoder.decode(content)
+                    if text:
+                        stage_logs.write(stage.name, text.encode(std_encoding, errors='replace')
                                          .decode(std_encoding, errors='replace'))
+                stage_logs.write(stage.name, decoder.decode(b'', final=True))
                 logger.debug('End to stream log for stage {}'.format(stage.name))
             elif response.status_code == 400:
                 logger.debug('Failed to stream build log with response {}'.format(response.content))
@@ -200,3 +244,47 @@ class BuildService:
         if not self.log_stream:
             self.log_stream = LogStream(self.client, self.resource_group, self.service)
         return self.log_stream
+
+
+class BuildStageLogs:
+    '''
+    Writes the logs of the build stages to stdout in the order of the stages, while they may be received
+    concurrently. The logs of the first stage not ended are written as they are received, those of the next stages
+    are buffered until the stages before them end.
+    '''
+    def __init__(self, stage_names, output=None):
+        self.output = output or sys.stdout
+        self._stage_names = list(stage_names)
+        self._buffers = {name: [] for name in self._stage_names}
+        self._ended = set()
+        self._current = 0
+        self._lock = Lock()
+        self._write_lock = Lock()
+
+    def write(self, stage_name, text):
+        if not text:
+            return
+        with self._lock:
+            self._buffers[stage_name].append(text)
+        self._flush()
+
+    def end(self, stage_name):
+        with self._lock:
+            self._ended.add(stage_name)
+        self._flush()
+
+    def _flush(self):
+        # the content received while another thread writes is written along with its own
+        with self._write_lock:
+            with self._lock:
+                texts = []
+                while self._current < len(self._stage_names):
+                    name = self._stage_names[self._current]
+                    texts.extend(self._buffers[name])
+                    self._buffers[name].clear()
+                    if name not in self._ended:
+                        break
+                    self._current += 1
+            if texts:
+                self.output.write(''.join(texts))
+                self.output.flush()
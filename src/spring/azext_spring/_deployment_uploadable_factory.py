@@ -7,11 +7,37 @@
 import os
 from re import L
 import tempfile
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from knack.log import get_logger
+from azure.common import AzureException
 from azure.cli.core.azclierror import InvalidArgumentValueError
 from .azure_storage_file import FileService
+from .azure_storage_file._upload_chunking import _FileChunkUploader
 from ._utils import (get_azure_files_info, _pack_source_code)
 
+logger = get_logger(__name__)
+
+UPLOAD_MAX_CONNECTIONS = 8
+UPLOAD_MAX_ATTEMPTS = 3
+
+
+def get_upload_options(cmd):
+    '''
+    The upload options set with "az config set spring.upload_max_connections=<number>" and
+    "az config set spring.upload_range_size=<bytes>"
+    '''
+    if cmd is None:
+        return {}
+    config = cmd.cli_ctx.config
+    try:
+        return {'max_connections': config.getint('spring', 'upload_max_connections', fallback=UPLOAD_MAX_CONNECTIONS),
+                'range_size': config.getint('spring', 'upload_range_size', fallback=FileService.MAX_RANGE_SIZE)}
+    except ValueError as ex:
+        raise InvalidArgumentValueError('The spring.upload_max_connections and spring.upload_range_size configs '
+                                        'should be numbers.') from ex
+
 
 class Empty:
     def upload_and_build(self, **_):
@@ -22,13 +48,20 @@ class FileUpload:
     '''
     Upload a file in local file system to upload url
     '''
-    def __init__(self, upload_url):
+    def __init__(self, upload_url, max_connections=UPLOAD_MAX_CONNECTIONS, range_size=FileService.MAX_RANGE_SIZE):
+        if max_connections < 1:
+            raise InvalidArgumentValueError('The number of upload connections should be at least 1.')
+        if not 0 < range_size <= FileService.MAX_RANGE_SIZE:
+            raise InvalidArgumentValueError('The upload range size should be between 1 and {} bytes.'.format(
+                FileService.MAX_RANGE_SIZE))
         account_name, endpoint_suffix, share_name, relative_name, sas_token = get_azure_files_info(upload_url)
         self.account_name = account_name
         self.endpoint_suffix = endpoint_suffix
         self.share_name = share_name
         self.relative_name = relative_name
         self.sas_token = sas_token
+        self.max_connections = max_connections
+        self.range_size = range_size
 
     def upload_and_build(self, artifact_path, **_):
         if not artifact_path:
@@ -37,7 +70,42 @@ class FileUpload:
 
     def _upload(self, artifact_path):
         file_service = FileService(self.account_name, sas_token=self.sas_token, endpoint_suffix=self.endpoint_suffix)
-        file_service.create_file_from_path(self.share_name, None, self.relative_name, artifact_path)
+        self._upload_ranges(file_service, artifact_path)
+
+    def _upload_ranges(self, file_service, artifact_path):
+        '''
+        Upload the file by ranges of range_size bytes, max_connections at a time. The attempts after a failure only
+        upload the ranges which weren't committed.
+        '''
+        file_size = os.path.getsize(artifact_path)
+        committed = set()
+        lock = threading.Lock()
+
+        def committed_bytes():
+            with lock:
+                return sum(min(self.range_size, file_size - offset) for offset in committed)
+
+        file_service.create_file(self.share_name, None, self.relative_name, file_size)
+        with open(artifact_path, 'rb') as stream:
+            uploader = _FileChunkUploader(file_service, self.share_name, None, self.relative_name, file_size,
+                                          self.range_size, stream, True, None, False, None)
+
+            def upload_range(offset):
+                uploader.process_chunk(offset)
+                with lock:
+                    committed.add(offset)
+
+            for attempt in range(1, UPLOAD_MAX_ATTEMPTS + 1):
+                pending = [offset for offset in uploader.get_chunk_offsets() if offset not in committed]
+                try:
+                    with ThreadPoolExecutor(max_workers=min(self.max_connections, max(len(pending), 1))) as executor:
+                        list(executor.map(upload_range, pending))
+                    break
+                except AzureException as e:
+                    if attempt == UPLOAD_MAX_ATTEMPTS:
+                        raise
+                    logger.warning('Failed to upload %s, %d of %d bytes were uploaded, retrying: %s',
+                                   artifact_path, committed_bytes(), file_size, e)
 
 
 class FolderUpload(FileUpload):
@@ -56,9 +124,9 @@ class FolderUpload(FileUpload):
         return file_path
 
 
-def uploader_selector(source_path=None, artifact_path=None, upload_url=None, **_):
+def uploader_selector(cmd=None, source_path=None, artifact_path=None, upload_url=None, **_):
     if source_path:
-        return FolderUpload(upload_url)
+        return FolderUpload(upload_url, **get_upload_options(cmd))
     if artifact_path:
-        return FileUpload(upload_url)
+        return FileUpload(upload_url, **get_upload_options(cmd))
     return Empty()
@@ -327,6 +327,9 @@ helps['spring app log'] = """
 helps['spring app logs'] = """
     type: command
     short-summary: Show logs of an app instance, logs will be streamed when setting '-f/--follow'.
+    examples:
+    - name: Stream the logs of all the instances of an app.
+      text: az spring app logs -n MyApp -s MyService -g MyResourceGroup --all-instances -f
 """
 
 helps['spring app deployment'] = """
@@ -5,6 +5,7 @@
 
 # pylint: disable=wrong-import-order
 
+import codecs
 import time
 import colorama   # pylint: disable=import-error
 from io import BytesIO
@@ -20,6 +21,10 @@ logger = get_logger(__name__)
 
 DEFAULT_CHUNK_SIZE = 1024 * 4
 DEFAULT_LOG_TIMEOUT_IN_SEC = 60 * 30  # 30 minutes
+LOG_MAX_RANGE_SIZE = 1024 * 1024 * 4
+LOG_MAX_LINE_SIZE = 1024 * 1024
+LOG_POLL_MIN_SECONDS = 1
+LOG_POLL_MAX_SECONDS = 15
 
 
 def stream_logs(client,
@@ -75,16 +80,15 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
     if not no_format:
         colorama.init()
 
-    stream = BytesIO()
+    log = _LogBuffer(logger_level_func)
+    # reused for every range read from the blob
+    chunk = BytesIO()
     metadata = {}
     start = 0
-    end = byte_size - 1
     available = 0
-    sleep_time = 1
-    max_sleep_time = 15
-    num_fails = 0
-    num_fails_for_backoff = 3
+    sleep_time = LOG_POLL_MIN_SECONDS
     consecutive_sleep_in_sec = 0
+    grown = False
 
     blob_exists = False
 
@@ -116,49 +120,30 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
 
     while (_blob_is_not_complete(metadata) or start < available):
         while start < available:
-            # Success! Reset our polling backoff.
-            sleep_time = 1
-            num_fails = 0
             consecutive_sleep_in_sec = 0
 
             try:
-                old_byte_size = len(stream.getvalue())
+                # Read all the new content at once, rather than byte_size at a time
+                range_size = min(max(byte_size, available - start), LOG_MAX_RANGE_SIZE)
+                chunk.seek(0)
+                chunk.truncate()
                 blob_service.get_blob_to_stream(
                     container_name=container_name,
                     blob_name=blob_name,
                     start_range=start,
-                    end_range=end,
-                    stream=stream)
-
-                curr_bytes = stream.getvalue()
-                new_byte_size = len(curr_bytes)
-                amount_read = new_byte_size - old_byte_size
-                start += amount_read
-                end = start + byte_size - 1
-
-                # Only scan what's newly read. If nothing is read, default to 0.
-                min_scan_range = max(new_byte_size - amount_read - 1, 0)
-                for i in range(new_byte_size - 1, min_scan_range, -1):
-                    if curr_bytes[i - 1:i + 1] == b'\r\n':
-                        flush = curr_bytes[:i]  # won't logger.warning \n
-                        stream = BytesIO()
-                        stream.write(curr_bytes[i + 1:])
-                        logger_level_func(flush.decode('utf-8', errors='ignore'))
-                        break
-                    if curr_bytes[i:i + 1] == b'\n':
-                        flush = curr_bytes[:i + 1]  # won't logger.warning \n
-                        stream = BytesIO()
-                        stream.write(curr_bytes[i + 1:])
-                        logger_level_func(flush.decode('utf-8', errors='ignore'))
-                        break
+                    end_range=start + range_size - 1,
+                    stream=chunk)
+
+                with chunk.getbuffer() as content:
+                    log.append(content)
+                    start += len(content)
+                    grown = grown or len(content) > 0
 
             except AzureHttpError as ae:
                 if ae.status_code != 404:
                     raise CLIError(ae)
             except KeyboardInterrupt:
-                curr_bytes = stream.getvalue()
-                if curr_bytes:
-                    logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
+                log.flush()
                 return
 
         try:
@@ -170,8 +155,7 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
             if ae.status_code != 404:
                 raise CLIError(ae)
         except KeyboardInterrupt:
-            if curr_bytes:
-                logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
+            log.flush()
             return
         except Exception as err:
             raise CLIError(err)
@@ -179,32 +163,26 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
         if consecutive_sleep_in_sec > timeout_in_seconds:
             # Flush anything remaining in the buffer - this would be the case
             # if the file has expired and we weren't able to detect any \r\n
-            curr_bytes = stream.getvalue()
-            if curr_bytes:
-                logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
-
+            log.flush()
             return
 
         # If no new data available but not complete, sleep before trying to process additional data.
         if (_blob_is_not_complete(metadata) and start >= available):
-            num_fails += 1
-
-            if num_fails >= num_fails_for_backoff:
-                num_fails = 0
-                sleep_time = min(sleep_time * 2, max_sleep_time)
-
-            rnd = uniform(1, 2)  # 1.0 <= x < 2.0
-            total_sleep_time = sleep_time + rnd
+            # Poll sooner while the log grows, and back off while it doesn't
+            if grown:
+                sleep_time = max(sleep_time / 2, LOG_POLL_MIN_SECONDS)
+            else:
+                sleep_time = min(sleep_time * 2, LOG_POLL_MAX_SECONDS)
+            grown = False
+
+            total_sleep_time = sleep_time + uniform(0, sleep_time / 2)
             consecutive_sleep_in_sec += total_sleep_time
             time.sleep(total_sleep_time)
 
     # One final check to see if there's anything in the buffer to flush
     # E.g., metadata has been set and start == available, but the log file
     # didn't end in \r\n, so we were unable to flush out the final contents.
-    curr_bytes = stream.getvalue()
-
-    if curr_bytes:
-        logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
+    log.flush()
 
     build_status = _get_run_status(metadata).lower()
     logger_level_func("Log status was: {}".format(build_status))
@@ -218,6 +196,41 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
             raise CLIError("Run was canceled")
 
 
+class _LogBuffer:
+    '''
+    The content of the log read but not logged yet. The lines are logged as soon as they are complete, the content
+    read being only scanned once. The UTF-8 sequences split between two ranges are decoded with the next range.
+    '''
+    def __init__(self, logger_level_func):
+        self._logger_level_func = logger_level_func
+        self._pending = bytearray()
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+
+    def append(self, content):
+        scan_start = len(self._pending)
+        self._pending += content
+        line_end = self._pending.rfind(b'\n', scan_start)
+        if line_end >= 0:
+            # won't log the \n of \r\n
+            flush_end = line_end if line_end > 0 and self._pending[line_end - 1] == ord('\r') else line_end + 1
+            self._log(flush_end)
+            del self._pending[:line_end + 1]
+        elif len(self._pending) >= LOG_MAX_LINE_SIZE:
+            # don't keep an endless line in memory
+            self._log(len(self._pending))
+            self._pending.clear()
+
+    def flush(self):
+        self._log(len(self._pending), final=True)
+        self._pending.clear()
+
+    def _log(self, end, final=False):
+        with memoryview(self._pending) as pending, pending[:end] as content:
+            text = self._decoder.decode(content, final=final)
+        if text:
+            self._logger_level_func(text)
+
+
 def _blob_is_not_complete(metadata):
     if not metadata:
         return True
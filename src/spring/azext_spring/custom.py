@@ -36,7 +36,7 @@ from azure.core.exceptions import ResourceNotFoundError
 from ._utils import _get_rg_location
 from ._resource_quantity import validate_cpu, validate_memory
 from six.moves.urllib import parse
-from threading import Thread
+from threading import Thread, Lock
 import sys
 import json
 import base64
@@ -378,26 +378,33 @@ def app_get_build_log(cmd, client, resource_group, service, name, deployment=Non
 
 
 def app_tail_log(cmd, client, resource_group, service, name,
-                 deployment=None, instance=None, follow=False, lines=50, since=None, limit=2048, format_json=None):
-    if not instance:
+                 deployment=None, instance=None, follow=False, lines=50, since=None, limit=2048, format_json=None,
+                 all_instances=False, max_log_requests=5):
+    if instance:
+        instances = [instance]
+    else:
         if not deployment.properties.instances:
             raise CLIError("No instances found for deployment '{0}' in app '{1}'".format(
                 deployment.name, name))
-        instances = deployment.properties.instances
-        if len(instances) > 1:
+        instances = [x.name for x in deployment.properties.instances]
+        if max_log_requests < 1:
+            raise InvalidArgumentValueError('--max-log-requests must be positive')
+        if len(instances) > 1 and not all_instances:
             logger.warning("Multiple app instances found:")
             for temp_instance in instances:
-                logger.warning("{}".format(temp_instance.name))
-            logger.warning("Please use '-i/--instance' parameter to specify the instance name")
+                logger.warning("{}".format(temp_instance))
+            logger.warning("Please use '-i/--instance' parameter to specify the instance name, "
+                           "or '--all-instances' to show the logs of all of them")
             return None
-        instance = instances[0].name
+        if len(instances) > max_log_requests:
+            raise InvalidArgumentValueError("Deployment '{0}' has {1} instances, which is more than the {2} "
+                                            "concurrent logs allowed by '--max-log-requests'"
+                                            .format(deployment.name, len(instances), max_log_requests))
 
     log_stream = LogStream(client, resource_group, service)
     if not log_stream:
         raise CLIError("To use the log streaming feature, please enable the test endpoint by running 'az spring test-endpoint enable -n {0} -g {1}'".format(service, resource_group))
 
-    streaming_url = "https://{0}/api/logstream/apps/{1}/instances/{2}".format(
-        log_stream.base_url, name, instance)
     params = {}
     params["tailLines"] = lines
     params["limitBytes"] = limit
@@ -407,14 +414,23 @@ def app_tail_log(cmd, client, resource_group, service, name,
         params["follow"] = True
 
     exceptions = []
-    streaming_url += "?{}".format(parse.urlencode(params)) if params else ""
-    t = Thread(target=_get_app_log, args=(
-        streaming_url, "primary", log_stream.primary_key, format_json, exceptions))
-    t.daemon = True
-    t.start()
-
-    while t.is_alive():
-        sleep(5)  # so that ctrl+c can stop the command
+    output_lock = Lock()
+    threads = []
+    for instance_name in instances:
+        streaming_url = "https://{0}/api/logstream/apps/{1}/instances/{2}".format(
+            log_stream.base_url, name, instance_name)
+        streaming_url += "?{}".format(parse.urlencode(params)) if params else ""
+        # Label the lines with their instance only when the logs of several instances are interleaved
+        label = instance_name if len(instances) > 1 else None
+        t = Thread(target=_get_app_log, args=(
+            streaming_url, "primary", log_stream.primary_key, format_json, exceptions, label, output_lock))
+        t.daemon = True
+        t.start()
+        threads.append(t)
+
+    for t in threads:
+        while t.is_alive():
+            t.join(5)  # so that ctrl+c can stop the command
 
     if exceptions:
         raise exceptions[0]
@@ -975,123 +991,149 @@ def _get_redis_primary_key(cli_ctx, resource_id):
     return keys.primary_key
 
 
-# pylint: disable=bare-except, too-many-statements
-def _get_app_log(url, user_name, password, format_json, exceptions):
-    logger_seg_regex = re.compile(r'([^\.])[^\.]+\.')
-
-    def build_log_shortener(length):
-        if length <= 0:
-            raise InvalidArgumentValueError('Logger length in `logger{length}` should be positive')
-
-        def shortener(record):
-            '''
-            Try shorten the logger property to the specified length before feeding it to the formatter.
-            '''
-            logger_name = record.get('logger', None)
-            if logger_name is None:
-                return record
-
-            # first, try to shorten the package name to one letter, e.g.,
-            #     org.springframework.cloud.netflix.eureka.config.DiscoveryClientOptionalArgsConfiguration
-            # to: o.s.c.n.e.c.DiscoveryClientOptionalArgsConfiguration
-            while len(logger_name) > length:
-                logger_name, count = logger_seg_regex.subn(r'\1.', logger_name, 1)
-                if count < 1:
-                    break
-
-            # then, cut off the leading packages if necessary
-            logger_name = logger_name[-length:]
-            record['logger'] = logger_name
-            return record
+LOGGER_SEGMENT_REGEX = re.compile(r'([^\.])[^\.]+\.')
+LOGGER_FORMAT_REGEX = re.compile(r'\blogger\{(\d+)\}')
+
+
+def _build_log_shortener(length):
+    if length <= 0:
+        raise InvalidArgumentValueError('Logger length in `logger{length}` should be positive')
+
+    # The same loggers write most of the lines, so the shortened names are cached
+    shortened_names = {}
+
+    def shorten(logger_name):
+        # first, try to shorten the package name to one letter, e.g.,
+        #     org.springframework.cloud.netflix.eureka.config.DiscoveryClientOptionalArgsConfiguration
+        # to: o.s.c.n.e.c.DiscoveryClientOptionalArgsConfiguration
+        while len(logger_name) > length:
+            logger_name, count = LOGGER_SEGMENT_REGEX.subn(r'\1.', logger_name, 1)
+            if count < 1:
+                break
 
-        return shortener
+        # then, cut off the leading packages if necessary
+        return logger_name[-length:]
 
-    def build_formatter():
+    def shortener(record):
         '''
-        Build the log line formatter based on the format_json argument.
+        Try shorten the logger property to the specified length before feeding it to the formatter.
         '''
-        nonlocal format_json
+        logger_name = record.get('logger', None)
+        if logger_name is None:
+            return record
 
-        def identity(o):
-            return o
+        shortened_name = shortened_names.get(logger_name)
+        if shortened_name is None:
+            shortened_name = shortened_names[logger_name] = shorten(logger_name)
+        record['logger'] = shortened_name
+        return record
 
-        if format_json is None or len(format_json) == 0:
-            return identity
+    return shortener
 
-        logger_regex = re.compile(r'\blogger\{(\d+)\}')
-        match = logger_regex.search(format_json)
-        pre_processor = identity
-        if match:
-            length = int(match[1])
-            pre_processor = build_log_shortener(length)
-            format_json = logger_regex.sub('logger', format_json, 1)
 
-        first_exception = True
+# pylint: disable=bare-except
+def _build_log_formatter(format_json):
+    '''
+    Build the log line formatter based on the format_json argument.
+    '''
+    def identity(o):
+        return o
 
-        def format_line(line):
-            nonlocal first_exception
-            try:
-                log_record = json.loads(line)
-                # Add n=\n so that in Windows CMD it's easy to specify customized format with line ending
-                # e.g., "{timestamp} {message}{n}"
-                # (Windows CMD does not escape \n in string literal.)
-                return format_json.format_map(pre_processor(defaultdict(str, n="\n", **log_record)))
-            except:
-                if first_exception:
-                    # enable this format error logging only with --verbose
-                    logger.info("Failed to format log line '{}'".format(line), exc_info=sys.exc_info())
-                    first_exception = False
-                return line
-
-        return format_line
-
-    def iter_lines(response, limit=2 ** 20):
-        '''
-        Returns a line iterator from the response content. If no line ending was found and the buffered content size is
-        larger than the limit, the buffer will be yielded directly.
-        '''
-        buffer = []
-        total = 0
-        for content in response.iter_content(chunk_size=None):
-            if not content:
-                if len(buffer) > 0:
-                    yield b''.join(buffer)
-                break
+    if format_json is None or len(format_json) == 0:
+        return identity
+
+    match = LOGGER_FORMAT_REGEX.search(format_json)
+    pre_processor = identity
+    if match:
+        length = int(match[1])
+        pre_processor = _build_log_shortener(length)
+        format_json = LOGGER_FORMAT_REGEX.sub('logger', format_json, 1)
 
-            start = 0
-            while start < len(content):
-                line_end = content.find(b'\n', start)
-                should_print = False
-                if line_end < 0:
-                    next = (content if start == 0 else content[start:])
-                    buffer.append(next)
-                    total += len(next)
-                    start = len(content)
-                    should_print = total >= limit
-                else:
-                    buffer.append(content[start:line_end + 1])
-                    start = line_end + 1
-                    should_print = True
-
-                if should_print:
-                    yield b''.join(buffer)
-                    buffer.clear()
-                    total = 0
+    first_exception = True
 
+    def format_line(line):
+        nonlocal first_exception
+        try:
+            log_record = json.loads(line)
+            # Add n=\n so that in Windows CMD it's easy to specify customized format with line ending
+            # e.g., "{timestamp} {message}{n}"
+            # (Windows CMD does not escape \n in string literal.)
+            return format_json.format_map(pre_processor(defaultdict(str, n="\n", **log_record)))
+        except:
+            if first_exception:
+                # enable this format error logging only with --verbose
+                logger.info("Failed to format log line '{}'".format(line), exc_info=sys.exc_info())
+                first_exception = False
+            return line
+
+    return format_line
+
+
+def _iter_log_line_batches(response, limit=2 ** 20):
+    '''
+    Returns an iterator of the complete lines received so far from the response content, as a single bytes object per
+    chunk. If no line ending was found and the buffered content size is larger than the limit, the buffer will be
+    yielded directly.
+    '''
+    buffer = []
+    total = 0
+    for content in response.iter_content(chunk_size=None):
+        if not content:
+            break
+
+        line_end = content.rfind(b'\n')
+        if line_end < 0:
+            buffer.append(content)
+            total += len(content)
+            if total >= limit:
+                yield b''.join(buffer)
+                buffer.clear()
+                total = 0
+            continue
+
+        buffer.append(content[:line_end + 1])
+        yield b''.join(buffer)
+        buffer.clear()
+        total = len(content) - line_end - 1
+        if total:
+            buffer.append(content[line_end + 1:])
+
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _split_log_lines(text):
+    '''
+    Split the text into lines, keeping the line endings. Unlike str.splitlines, only '\n' ends a line.
+    '''
+    lines = text.split('\n')
+    last = lines.pop()
+    lines = [line + '\n' for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+
+def _get_app_log(url, user_name, password, format_json, exceptions, label=None, output_lock=None):
     with requests.get(url, stream=True, auth=HTTPBasicAuth(user_name, password)) as response:
         try:
             if response.status_code != 200:
                 raise CLIError("Failed to connect to the server with status code '{}' and reason '{}'".format(
                     response.status_code, response.reason))
             std_encoding = sys.stdout.encoding
+            prefix = '[{}] '.format(label) if label else ''
+            formatter = _build_log_formatter(format_json)
+            output_lock = output_lock or Lock()
 
-            formatter = build_formatter()
-
-            for line in iter_lines(response):
-                decoded = (line.decode(encoding='utf-8', errors='replace')
+            for lines in _iter_log_line_batches(response):
+                # decode and write all the lines of the batch at once
+                decoded = (lines.decode(encoding='utf-8', errors='replace')
                            .encode(std_encoding, errors='replace')
                            .decode(std_encoding, errors='replace'))
-                print(formatter(decoded), end='')
+                formatted = ''.join(prefix + formatter(line) for line in _split_log_lines(decoded))
+                with output_lock:
+                    sys.stdout.write(formatted)
+                    sys.stdout.flush()
 
         except CLIError as e:
             exceptions.append(e)
@@ -0,0 +1,145 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import io
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock
+
+from azure.cli.core.azclierror import InvalidArgumentValueError
+
+from ...custom import (app_tail_log, _get_app_log, _build_log_formatter, _iter_log_line_batches)
+try:
+    import unittest.mock as mock
+except ImportError:
+    from unittest import mock
+
+
+LOG_FORMAT = '{timestamp} {level:>5} {logger{20}:<20.20}: {message}\n'
+
+
+class _FakeLogHandler(BaseHTTPRequestHandler):
+    '''
+    Serves `lines` JSON log lines for /api/logstream/apps/<app>/instances/<instance>, split in odd sized chunks.
+    '''
+    lines = 50
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        instance = self.path.split('?')[0].rstrip('/').split('/')[-1]
+        if instance == 'missing':
+            self.send_response(404)
+            self.end_headers()
+            return
+        content = ''.join(json.dumps({
+            'timestamp': '2022-06-01T10:00:{:02d}'.format(i % 60),
+            'level': 'INFO',
+            'logger': 'org.springframework.boot.web.embedded.tomcat.TomcatWebServer',
+            'message': '{} line {}'.format(instance, i)
+        }) + '\n' for i in range(self.lines)).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        for start in range(0, len(content), 37):
+            self.wfile.write(content[start:start + 37])
+            self.wfile.flush()
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class TestAppLogs(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _FakeLogHandler)
+        cls.base_url = 'http://127.0.0.1:{}/api/logstream/apps/app/instances/'.format(cls.server.server_address[1])
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def _get_app_log(self, instances, format_json=None):
+        exceptions = []
+        output = io.TextIOWrapper(io.BytesIO(), encoding='utf-8', newline='')
+        lock = Lock()
+        with mock.patch('sys.stdout', output):
+            threads = [threading.Thread(target=_get_app_log, args=(
+                self.base_url + instance, 'primary', 'key', format_json, exceptions,
+                instance if len(instances) > 1 else None, lock)) for instance in instances]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        output.flush()
+        return output.buffer.getvalue().decode('utf-8'), exceptions
+
+    def test_get_app_log(self):
+        output, exceptions = self._get_app_log(['instance-1'])
+        self.assertFalse(exceptions)
+        lines = output.splitlines()
+        self.assertEqual(50, len(lines))
+        self.assertEqual('instance-1 line 49', json.loads(lines[-1])['message'])
+
+    def test_get_app_log_formatted(self):
+        output, _ = self._get_app_log(['instance-1'], LOG_FORMAT)
+        lines = output.splitlines()
+        self.assertEqual(50, len(lines))
+        self.assertEqual('2022-06-01T10:00:00  INFO .e.t.TomcatWebServer: instance-1 line 0', lines[0])
+
+    def test_get_app_log_of_multiple_instances(self):
+        instances = ['instance-{}'.format(i) for i in range(4)]
+        output, exceptions = self._get_app_log(instances, LOG_FORMAT)
+        self.assertFalse(exceptions)
+        lines = output.splitlines()
+        self.assertEqual(200, len(lines))
+        for instance in instances:
+            prefix = '[{}] '.format(instance)
+            messages = [line for line in lines if line.startswith(prefix)]
+            self.assertEqual(['{}2022-06-01T10:00:{:02d}  INFO .e.t.TomcatWebServer: {} line {}'.format(
+                prefix, i, instance, i) for i in range(50)], messages)
+
+    def test_get_app_log_failure(self):
+        _, exceptions = self._get_app_log(['missing'])
+        self.assertEqual(1, len(exceptions))
+
+    def test_iter_log_line_batches(self):
+        response = mock.MagicMock()
+        response.iter_content.return_value = [b'fir', b'st\nsec', b'ond\nthird\nfo', b'urth']
+        self.assertEqual([b'first\n', b'second\nthird\n', b'fourth'], list(_iter_log_line_batches(response)))
+
+        response.iter_content.return_value = [b'abc', b'def', b'g\n']
+        self.assertEqual([b'abcdef', b'g\n'], list(_iter_log_line_batches(response, limit=5)))
+
+    def test_build_log_formatter(self):
+        formatter = _build_log_formatter('{logger{10}} {message}{n}')
+        self.assertEqual('o.s.Logger hello\n', formatter('{"logger": "org.springframework.Logger", "message": "hello"}'))
+        self.assertEqual('not json\n', formatter('not json\n'))
+        self.assertEqual('as is\n', _build_log_formatter(None)('as is\n'))
+
+    @mock.patch('azext_spring.custom._get_app_log')
+    @mock.patch('azext_spring.custom.LogStream')
+    def test_app_tail_log_all_instances(self, log_stream, get_app_log):
+        log_stream.return_value.base_url = 'host'
+        log_stream.return_value.primary_key = 'key'
+        deployment = mock.MagicMock()
+        deployment.properties.instances = [mock.MagicMock(), mock.MagicMock()]
+        deployment.properties.instances[0].name = 'instance-0'
+        deployment.properties.instances[1].name = 'instance-1'
+
+        self.assertIsNone(app_tail_log(None, None, 'rg', 'service', 'app', deployment=deployment))
+        get_app_log.assert_not_called()
+
+        app_tail_log(None, None, 'rg', 'service', 'app', deployment=deployment, all_instances=True)
+        self.assertEqual(2, get_app_log.call_count)
+        labels = sorted(call[0][5] for call in get_app_log.call_args_list)
+        self.assertEqual(['instance-0', 'instance-1'], labels)
+        self.assertTrue(all(call[0][0].startswith('https://host/api/logstream/apps/app/instances/instance-')
+                            for call in get_app_log.call_args_list))
+
+        with self.assertRaises(InvalidArgumentValueError):
+            app_tail_log(None, None, 'rg', 'service', 'app', deployment=deployment, all_instances=True,
+                         max_log_requests=1)
@@ -0,0 +1,200 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import _thread
+import io
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from ..._buildservices_factory import BuildService, BuildStageLogs
+try:
+    import unittest.mock as mock
+except ImportError:
+    from unittest import mock
+
+
+def synthetic_build_log(stage, lines):
+    return ''.join('[INFO] {} Downloading from central: org/example/artifact-{}.jar ✓\n'.format(stage, i)
+                   for i in range(lines)).encode('utf-8')
+
+
+class _FakeBuildLogHandler(BaseHTTPRequestHandler):
+    '''
+    Serves the log of /api/logstream/buildpods/<pod>/stages/<stage> chunked, in chunks of chunk_size bytes, each
+    chunk after delay seconds. The chunks split the multi-byte characters of the log. Stages in not_started answer 400.
+    '''
+    protocol_version = 'HTTP/1.1'
+    logs = {}
+    chunk_size = 4096
+    delay = 0
+    not_started = set()
+    requests = []
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        stage = self.path.split('?')[0].rstrip('/').split('/')[-1]
+        _FakeBuildLogHandler.requests.append((stage, time.perf_counter()))
+        if stage in self.not_started:
+            self.send_response(400)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        content = self.logs[stage]
+        for start in range(0, len(content), self.chunk_size):
+            if self.delay:
+                time.sleep(self.delay)
+            chunk = content[start:start + self.chunk_size]
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.flush()
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+def build_result(stages, state='Building'):
+    result = mock.MagicMock()
+    result.id = 'result-id'
+    result.properties.provisioning_state = state
+    result.properties.build_pod_name = 'pod'
+    result.properties.build_stages = []
+    for name in stages:
+        stage = mock.MagicMock()
+        stage.name = name
+        stage.status = 'Running'
+        result.properties.build_stages.append(stage)
+    return result
+
+
+class BuildLogServer:
+    def __init__(self, test):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _FakeBuildLogHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        test.addCleanup(self.server.server_close)
+        test.addCleanup(self.server.shutdown)
+        _FakeBuildLogHandler.logs = {}
+        _FakeBuildLogHandler.requests = []
+        _FakeBuildLogHandler.chunk_size = 4096
+        _FakeBuildLogHandler.delay = 0
+        _FakeBuildLogHandler.not_started = set()
+
+        # the log stream endpoint is served over http locally
+        get = requests.get
+        patcher = mock.patch('azext_spring._buildservices_factory.requests.get',
+                             side_effect=lambda url, **kwargs: get(url.replace('https://', 'http://'), **kwargs))
+        patcher.start()
+        test.addCleanup(patcher.stop)
+
+    def build_service(self, stages):
+        service = BuildService(mock.MagicMock(), mock.MagicMock(), 'rg', 'service')
+        service.log_stream = mock.MagicMock()
+        service.log_stream.base_url = '127.0.0.1:{}'.format(self.server.server_address[1])
+        service.log_stream.primary_key = 'key'
+        service._get_build_result = mock.MagicMock(return_value=build_result(stages))  # pylint: disable=protected-access
+        return service
+
+
+def capture_stdout(fn, *args):
+    output = io.TextIOWrapper(io.BytesIO(), encoding='utf-8', newline='')
+    with mock.patch('sys.stdout', output):
+        fn(*args)
+    output.flush()
+    return output.buffer.getvalue()
+
+
+class TestBuildLogs(unittest.TestCase):
+    def test_print_build_stage_log(self):
+        server = BuildLogServer(self)
+        # chunks of 1000 bytes split the 3 bytes long ✓
+        _FakeBuildLogHandler.chunk_size = 1000
+        _FakeBuildLogHandler.logs = {'build': synthetic_build_log('build', 500)}
+        service = server.build_service(['build'])
+        stage = build_result(['build']).properties.build_stages[0]
+
+        output = capture_stdout(service._print_build_stage_log, 'pod', stage)  # pylint: disable=protected-access
+
+        self.assertEqual(_FakeBuildLogHandler.logs['build'], output)
+
+    def test_stream_build_logs_in_stage_order(self):
+        server = BuildLogServer(self)
+        stages = ['prepare', 'detect', 'restore', 'build', 'export']
+        _FakeBuildLogHandler.chunk_size = 512
+        _FakeBuildLogHandler.delay = 0.002
+        _FakeBuildLogHandler.logs = {stage: synthetic_build_log(stage, 100) for stage in stages}
+        service = server.build_service(stages)
+
+        output = capture_stdout(service._stream_build_logs, build_result(stages))  # pylint: disable=protected-access
+
+        self.assertEqual(b''.join(_FakeBuildLogHandler.logs[stage] for stage in stages), output)
+        # the logs of the next stages are requested while the first one is streamed
+        started = dict(_FakeBuildLogHandler.requests)
+        self.assertLess(started['restore'], started['prepare'] + 0.05)
+
+    def test_stream_build_logs_stage_not_started(self):
+        server = BuildLogServer(self)
+        stages = ['prepare', 'build']
+        _FakeBuildLogHandler.logs = {stage: synthetic_build_log(stage, 10) for stage in stages}
+        _FakeBuildLogHandler.not_started = {'build'}
+        service = server.build_service(stages)
+        # the build ends while its second stage is waited for, once the first one is streamed
+        def get_build_result(_):
+            streamed = 'prepare' in dict(_FakeBuildLogHandler.requests)
+            return build_result(stages, 'Succeeded' if streamed and sleep.called else 'Building')
+        service._get_build_result.side_effect = get_build_result  # pylint: disable=protected-access
+
+        with mock.patch('azext_spring._buildservices_factory.sleep') as sleep:
+            output = capture_stdout(service._stream_build_logs, build_result(stages))  # pylint: disable=protected-access
+
+        self.assertEqual(_FakeBuildLogHandler.logs['prepare'], output)
+        sleep.assert_called_with(5)
+        self.assertEqual(['prepare', 'build'], sorted(set(stage for stage, _ in _FakeBuildLogHandler.requests),
+                                                      reverse=True))
+
+    def test_stream_build_logs_interrupted(self):
+        server = BuildLogServer(self)
+        stages = ['prepare', 'build']
+        _FakeBuildLogHandler.logs = {stage: synthetic_build_log(stage, 10) for stage in stages}
+        _FakeBuildLogHandler.not_started = {'build'}
+        service = server.build_service(stages)
+        # the user presses ctrl+c while the second stage is waited for
+        threading.Timer(0.3, _thread.interrupt_main).start()
+
+        with mock.patch('azext_spring._buildservices_factory.sleep', side_effect=lambda _: time.sleep(0.01)):
+            start = time.perf_counter()
+            with self.assertRaises(KeyboardInterrupt):
+                capture_stdout(service._stream_build_logs, build_result(stages))  # pylint: disable=protected-access
+            self.assertLess(time.perf_counter() - start, 1.5)
+            # the stage isn't waited for anymore
+            time.sleep(0.1)
+            requests_count = len(_FakeBuildLogHandler.requests)
+            time.sleep(0.1)
+            self.assertEqual(requests_count, len(_FakeBuildLogHandler.requests))
+
+    def test_build_stage_logs(self):
+        output = io.StringIO()
+        logs = BuildStageLogs(['a', 'b', 'c'], output)
+
+        logs.write('b', 'b1 ')
+        logs.write('a', 'a1 ')
+        logs.write('c', 'c1 ')
+        self.assertEqual('a1 ', output.getvalue())
+        logs.end('b')
+        logs.write('a', 'a2 ')
+        self.assertEqual('a1 a2 ', output.getvalue())
+        # the buffered logs of the next stages are written once the stages before them end
+        logs.end('a')
+        self.assertEqual('a1 a2 b1 c1 ', output.getvalue())
+        logs.write('c', 'c2')
+        logs.end('c')
+        self.assertEqual('a1 a2 b1 c1 c2', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
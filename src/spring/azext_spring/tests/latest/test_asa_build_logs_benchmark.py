@@ -0,0 +1,49 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import sys
+import time
+import unittest
+
+import requests
+
+from .test_asa_build_logs import BuildLogServer, build_result, capture_stdout, synthetic_build_log, _FakeBuildLogHandler
+
+
+def legacy_print_build_stage_log(url):
+    ''' the loop of _print_build_stage_log before the content was streamed in chunks, one byte at a time '''
+    with requests.get(url, stream=True) as response:
+        std_encoding = sys.stdout.encoding
+        for content in response.iter_content():
+            if content:
+                sys.stdout.write(content.decode(encoding='utf-8', errors='replace')
+                                 .encode(std_encoding, errors='replace')
+                                 .decode(std_encoding, errors='replace'))
+
+
+class BuildLogsBenchmark(unittest.TestCase):
+    ''' streams a 5MB synthetic Maven build log from a local server, before and after '''
+
+    def test_benchmark_print_build_stage_log(self):
+        server = BuildLogServer(self)
+        _FakeBuildLogHandler.logs = {'build': synthetic_build_log('build', 70000)}
+        service = server.build_service(['build'])
+        stage = build_result(['build']).properties.build_stages[0]
+        url = 'http://127.0.0.1:{}/api/logstream/buildpods/pod/stages/build'.format(server.server.server_address[1])
+
+        start = time.perf_counter()
+        capture_stdout(legacy_print_build_stage_log, url)
+        before = time.perf_counter() - start
+        start = time.perf_counter()
+        output = capture_stdout(service._print_build_stage_log, 'pod', stage)  # pylint: disable=protected-access
+        after = time.perf_counter() - start
+
+        size = len(_FakeBuildLogHandler.logs['build'])
+        self.assertEqual(_FakeBuildLogHandler.logs['build'], output)
+        self.assertLess(after * 10, before, 'stream {:.1f}MB of build log: {:.2f}s before, {:.2f}s after'.format(
+            size / 2 ** 20, before, after))
+
+
+if __name__ == '__main__':
+    unittest.main()
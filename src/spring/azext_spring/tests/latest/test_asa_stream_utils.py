@@ -0,0 +1,126 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import unittest
+
+from knack.util import CLIError
+
+from ... import _stream_utils
+from ..._stream_utils import _stream_logs
+try:
+    import unittest.mock as mock
+except ImportError:
+    from unittest import mock
+
+
+class FakeAppendBlobService:
+    '''
+    Stands in for the AppendBlobService of the log blob. The blob grows by the next of the appends each time its
+    properties are read, and is complete with the given status once they're exhausted. A fake clock is advanced by
+    time.sleep.
+    '''
+    def __init__(self, test, appends, status='Succeeded', created_after=0):
+        self.appends = list(appends)
+        self.status = status
+        self.created_after = created_after
+        self.content = bytearray()
+        self.ranges = []
+        self.now = 0
+        self.sleeps = []
+        for target, fake in [('time.sleep', self.sleep), ('uniform', lambda a, b: a), ('colorama', mock.Mock())]:
+            patcher = mock.patch.object(_stream_utils, target, fake) if target != 'time.sleep' else \
+                mock.patch('azext_spring._stream_utils.time.sleep', fake)
+            patcher.start()
+            test.addCleanup(patcher.stop)
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def exists(self, container_name, blob_name):
+        if self.created_after:
+            self.created_after -= 1
+            return False
+        return True
+
+    def get_blob_properties(self, container_name, blob_name):
+        metadata = {}
+        if self.appends:
+            self.content += self.appends.pop(0)
+        else:
+            metadata['__complete_status'] = self.status
+        props = mock.Mock()
+        props.metadata = metadata
+        props.properties.content_length = len(self.content)
+        return props
+
+    def get_blob_to_stream(self, container_name, blob_name, start_range, end_range, stream):
+        self.ranges.append((start_range, end_range))
+        stream.write(self.content[start_range:end_range + 1])
+
+    def stream_logs(self, byte_size=4096, timeout_in_seconds=1800, raise_error_on_failure=True):
+        logged = []
+        _stream_logs(False, byte_size, timeout_in_seconds, self, 'logs', 'log.txt', raise_error_on_failure,
+                     logged.append)
+        return logged
+
+
+class TestStreamLogs(unittest.TestCase):
+    def test_stream_logs(self):
+        # the appends split lines, a \r\n and the 3 bytes of ✓ and 4 bytes of 🚀
+        content = 'Step 1/3 ✓\nStep 2/3 ✓\r\nStep 3/3 🚀 done\nno line ending'.encode('utf-8')
+        blob = FakeAppendBlobService(self, [content[:10], content[10:22], content[22:35], b'', content[35:]])
+
+        logged = blob.stream_logs(byte_size=4)
+
+        self.assertEqual(['Step 1/3 ✓\n', 'Step 2/3 ✓\r', 'Step 3/3 🚀 done\n', 'no line ending',
+                          'Log status was: succeeded'], logged)
+        # each new content is read once, in a single range
+        self.assertEqual([(0, 9), (10, 21), (22, 34), (35, len(content) - 1)], blob.ranges)
+
+    def test_stream_logs_long_line(self):
+        blob = FakeAppendBlobService(self, [b'x' * 3000] * 2 + ['é'.encode('utf-8') * 500])
+
+        with mock.patch('azext_spring._stream_utils.LOG_MAX_LINE_SIZE', 4000):
+            logged = blob.stream_logs()
+
+        # a line longer than LOG_MAX_LINE_SIZE is logged in parts, without cutting a character
+        self.assertEqual(['x' * 6000, 'é' * 500, 'Log status was: succeeded'], logged)
+
+        blob = FakeAppendBlobService(self, [b'x' * 3000])
+        with mock.patch('azext_spring._stream_utils.LOG_MAX_RANGE_SIZE', 1024):
+            logged = blob.stream_logs(byte_size=100)
+        self.assertEqual([(0, 1023), (1024, 2047), (2048, 2999)], blob.ranges)
+
+    def test_stream_logs_adaptive_polling(self):
+        # the blob is created after 2 polls, the log doesn't grow for 6 polls then grows every other poll
+        appends = [b''] * 6 + [b'line\n', b''] * 4
+        blob = FakeAppendBlobService(self, appends, created_after=2)
+
+        logged = blob.stream_logs()
+
+        self.assertEqual(['line\n'] * 4 + ['Log status was: succeeded'], logged)
+        # polls back off while the log doesn't grow and are sooner while it grows, between 1 and 15 seconds
+        self.assertEqual([2, 4, 8, 15, 15, 15, 15, 7.5, 3.75, 1.875, 1], blob.sleeps)
+
+    def test_stream_logs_status(self):
+        blob = FakeAppendBlobService(self, [b'error\n'], status='Failed')
+        with self.assertRaisesRegex(CLIError, 'Run failed'):
+            blob.stream_logs()
+
+        blob = FakeAppendBlobService(self, [b'error\n'], status='Failed')
+        self.assertEqual(['error\n', 'Log status was: failed'], blob.stream_logs(raise_error_on_failure=False))
+
+    def test_stream_logs_timeout(self):
+        blob = FakeAppendBlobService(self, [b'partial'] + [b''] * 100)
+
+        logged = blob.stream_logs(timeout_in_seconds=60)
+
+        # the partial line is logged once nothing was read for the timeout
+        self.assertEqual(['partial'], logged)
+        self.assertGreater(blob.now, 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import threading
+import time
+import unittest
+from io import BytesIO
+
+from ..._stream_utils import _blob_is_not_complete, DEFAULT_CHUNK_SIZE
+from .test_asa_stream_utils import FakeAppendBlobService
+
+
+def legacy_stream_logs(blob_service, byte_size, logger_level_func):
+    ''' the reads of _stream_logs before it tracked offsets, byte_size at a time copying the unlogged content '''
+    stream = BytesIO()
+    start, end, available, metadata = 0, byte_size - 1, 0, {}
+    while _blob_is_not_complete(metadata) or start < available:
+        while start < available:
+            old_byte_size = len(stream.getvalue())
+            blob_service.get_blob_to_stream(container_name='logs', blob_name='log.txt', start_range=start,
+                                            end_range=end, stream=stream)
+            curr_bytes = stream.getvalue()
+            new_byte_size = len(curr_bytes)
+            amount_read = new_byte_size - old_byte_size
+            start += amount_read
+            end = start + byte_size - 1
+            min_scan_range = max(new_byte_size - amount_read - 1, 0)
+            for i in range(new_byte_size - 1, min_scan_range, -1):
+                if curr_bytes[i - 1:i + 1] == b'\r\n':
+                    stream = BytesIO()
+                    stream.write(curr_bytes[i + 1:])
+                    logger_level_func(curr_bytes[:i].decode('utf-8', errors='ignore'))
+                    break
+                if curr_bytes[i:i + 1] == b'\n':
+                    stream = BytesIO()
+                    stream.write(curr_bytes[i + 1:])
+                    logger_level_func(curr_bytes[:i + 1].decode('utf-8', errors='ignore'))
+                    break
+        props = blob_service.get_blob_properties(container_name='logs', blob_name='log.txt')
+        metadata = props.metadata
+        available = props.properties.content_length
+    if stream.getvalue():
+        logger_level_func(stream.getvalue().decode('utf-8', errors='ignore'))
+
+
+class _SlowBlobService(FakeAppendBlobService):
+    ''' each range request takes 1ms, time.sleep being the fake clock '''
+    latency = threading.Event()
+
+    def get_blob_to_stream(self, container_name, blob_name, start_range, end_range, stream):
+        self.latency.wait(0.001)
+        super().get_blob_to_stream(container_name, blob_name, start_range, end_range, stream)
+
+
+class StreamLogsBenchmark(unittest.TestCase):
+    ''' tails an 8MB build log growing by 128KB a poll, with a 512KB progress output without line ending '''
+
+    def test_benchmark_stream_logs(self):
+        line = '[INFO] Downloaded from central: https://repo.maven.apache.org/org/example/lib ✓\n'.encode('utf-8')
+        appends = [line * (128 * 1024 // len(line))] * 60 + [b'.' * 128 * 1024] * 4 + [b'\n']
+        timings, requests, outputs = [], [], []
+        for stream in [lambda blob, logged: legacy_stream_logs(blob, DEFAULT_CHUNK_SIZE, logged.append),
+                       lambda blob, logged: logged.extend(blob.stream_logs()[:-1])]:
+            blob = _SlowBlobService(self, appends)
+            logged = []
+            start = time.perf_counter()
+            stream(blob, logged)
+            timings.append(time.perf_counter() - start)
+            requests.append(len(blob.ranges))
+            outputs.append(''.join(logged))
+
+        message = 'tail {:.1f}MB of log: {} range requests in {:.2f}s before, {} in {:.2f}s after'.format(
+            len(b''.join(appends)) / 2 ** 20, requests[0], timings[0], requests[1], timings[1])
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(len(appends), requests[1], message)
+        self.assertLess(timings[1] * 10, timings[0], message)
+
+
+if __name__ == '__main__':
+    unittest.main()
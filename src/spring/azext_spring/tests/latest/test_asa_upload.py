@@ -0,0 +1,151 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from azure.common import AzureException
+from azure.cli.core.azclierror import InvalidArgumentValueError
+
+from ..._deployment_uploadable_factory import FileUpload, FolderUpload, uploader_selector
+from ...azure_storage_file import FileService
+try:
+    import unittest.mock as mock
+except ImportError:
+    from unittest import mock
+
+
+UPLOAD_URL = 'https://account.file.core.windows.net/share/resources/app.jar?sv=2020-02-10&sig=signature'
+
+
+class FakeFileService(FileService):
+    '''
+    Stands in for the FileService of the upload url, keeping the file in memory. Each range takes latency seconds to
+    update, the ranges at the offsets in fail raise a connection error once.
+    '''
+    def __init__(self, latency=0, fail=()):  # pylint: disable=super-init-not-called
+        self.latency = latency
+        self.fail = set(fail)
+        self.content = None
+        self.created = 0
+        self.ranges = []
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def create_file(self, share_name, directory_name, file_name, content_length, *args, **kwargs):
+        assert (share_name, directory_name, file_name) == ('share', None, 'resources/app.jar')
+        self.content = bytearray(content_length)
+        self.created += 1
+
+    def update_range(self, share_name, directory_name, file_name, data, start_range, end_range,
+                     validate_content=False, timeout=None):
+        assert end_range - start_range + 1 == len(data) <= FileService.MAX_RANGE_SIZE
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        threading.Event().wait(self.latency)
+        with self.lock:
+            self.running -= 1
+            if start_range in self.fail:
+                self.fail.remove(start_range)
+                raise AzureException('Connection aborted.')
+            self.ranges.append(start_range)
+            self.content[start_range:end_range + 1] = data
+
+
+class TestArtifactUpload(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.artifact_path = os.path.join(self.folder, 'app.jar')
+        self.content = os.urandom(10 * 1000 + 123)
+        with open(self.artifact_path, 'wb') as f:
+            f.write(self.content)
+
+    def upload(self, file_service, uploader=None):
+        uploader = uploader or FileUpload(UPLOAD_URL, max_connections=4, range_size=1000)
+        with mock.patch('azext_spring._deployment_uploadable_factory.FileService', return_value=file_service):
+            uploader.upload_and_build(artifact_path=self.artifact_path)
+
+    def test_upload_ranges_in_parallel(self):
+        file_service = FakeFileService(latency=0.01)
+
+        self.upload(file_service)
+
+        self.assertEqual(self.content, file_service.content)
+        self.assertEqual(1, file_service.created)
+        self.assertEqual(list(range(0, len(self.content), 1000)), sorted(file_service.ranges))
+        self.assertEqual(4, file_service.max_running)
+
+    def test_upload_retries_failed_ranges(self):
+        file_service = FakeFileService(fail=[3000, 7000])
+
+        with self.assertLogs('cli.azext_spring._deployment_uploadable_factory', 'WARNING') as logs:
+            self.upload(file_service)
+
+        # only the ranges which failed are uploaded again
+        self.assertEqual(self.content, file_service.content)
+        self.assertEqual(len(range(0, len(self.content), 1000)), len(file_service.ranges))
+        self.assertIn('retrying: Connection aborted.', logs.output[0])
+        self.assertEqual(1, file_service.created)
+
+    def test_upload_failure(self):
+        file_service = FakeFileService(fail=[5000])
+        with mock.patch('azext_spring._deployment_uploadable_factory.UPLOAD_MAX_ATTEMPTS', 1):
+            with self.assertRaisesRegex(AzureException, 'Connection aborted.'):
+                self.upload(file_service)
+        self.assertNotIn(5000, file_service.ranges)
+
+    def test_upload_empty_file(self):
+        open(self.artifact_path, 'wb').close()
+        file_service = FakeFileService()
+
+        self.upload(file_service)
+
+        self.assertEqual(b'', file_service.content)
+        self.assertEqual([], file_service.ranges)
+
+    def test_upload_folder(self):
+        file_service = FakeFileService()
+        uploader = FolderUpload(UPLOAD_URL)
+        archive_path = os.path.join(self.folder, 'archive.tar.gz')
+        shutil.copy(self.artifact_path, archive_path)
+
+        with mock.patch.object(uploader, '_compress_folder', return_value=archive_path), \
+                mock.patch('azext_spring._deployment_uploadable_factory.FileService', return_value=file_service):
+            uploader.upload_and_build(source_path=self.folder)
+
+        self.assertEqual(self.content, file_service.content)
+
+    def test_upload_settings(self):
+        with self.assertRaisesRegex(InvalidArgumentValueError, 'at least 1'):
+            FileUpload(UPLOAD_URL, max_connections=0)
+        with self.assertRaisesRegex(InvalidArgumentValueError, 'between 1 and'):
+            FileUpload(UPLOAD_URL, range_size=FileService.MAX_RANGE_SIZE + 1)
+
+    def test_upload_settings_from_config(self):
+        cmd = mock.MagicMock()
+        config = {'upload_max_connections': 2, 'upload_range_size': 1000}
+        cmd.cli_ctx.config.getint.side_effect = lambda section, option, fallback: config.get(option, fallback)
+
+        uploader = uploader_selector(cmd=cmd, artifact_path=self.artifact_path, upload_url=UPLOAD_URL)
+        self.assertEqual((2, 1000), (uploader.max_connections, uploader.range_size))
+        uploader = uploader_selector(cmd=cmd, source_path=self.folder, upload_url=UPLOAD_URL)
+        self.assertEqual((2, 1000), (uploader.max_connections, uploader.range_size))
+
+        config = {}
+        uploader = uploader_selector(cmd=cmd, artifact_path=self.artifact_path, upload_url=UPLOAD_URL)
+        self.assertEqual((8, FileService.MAX_RANGE_SIZE), (uploader.max_connections, uploader.range_size))
+
+        config = {'upload_max_connections': 0}
+        with self.assertRaisesRegex(InvalidArgumentValueError, 'at least 1'):
+            uploader_selector(cmd=cmd, artifact_path=self.artifact_path, upload_url=UPLOAD_URL)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from azure.common import AzureException
+
+from ..._deployment_uploadable_factory import FileUpload
+from ...azure_storage_file import FileService
+from .test_asa_upload import FakeFileService, UPLOAD_URL
+try:
+    import unittest.mock as mock
+except ImportError:
+    from unittest import mock
+
+
+class ArtifactUploadBenchmark(unittest.TestCase):
+    ''' uploads a 64MB artifact, each range taking 50ms, with the connection dropped at 3/4 of the upload '''
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.artifact_path = os.path.join(self.folder, 'app.jar')
+        with open(self.artifact_path, 'wb') as f:
+            f.write(os.urandom(64 * 1024 * 1024))
+
+    def test_benchmark_upload(self):
+        drop_offset = 48 * 1024 * 1024
+
+        # before, create_file_from_path by ranges of MAX_RANGE_SIZE over 2 connections, starting over once dropped
+        file_service = FakeFileService(latency=0.05, fail=[drop_offset])
+        start = time.perf_counter()
+        for _ in range(2):
+            try:
+                file_service.create_file_from_path('share', None, 'resources/app.jar', self.artifact_path)
+                break
+            except AzureException:
+                pass
+        legacy_time, legacy_ranges = time.perf_counter() - start, len(file_service.ranges)
+
+        file_service = FakeFileService(latency=0.05, fail=[drop_offset])
+        uploader = FileUpload(UPLOAD_URL)
+        start = time.perf_counter()
+        with mock.patch('azext_spring._deployment_uploadable_factory.FileService', return_value=file_service):
+            uploader.upload_and_build(artifact_path=self.artifact_path)
+        elapsed, ranges = time.perf_counter() - start, len(file_service.ranges)
+
+        message = 'upload 64MB dropped once: {} ranges in {:.2f}s before, {} ranges in {:.2f}s after'.format(
+            legacy_ranges, legacy_time, ranges, elapsed)
+        with open(self.artifact_path, 'rb') as f:
+            self.assertEqual(f.read(), file_service.content)
+        self.assertEqual(64 * 1024 * 1024 // FileService.MAX_RANGE_SIZE, ranges, message)
+        self.assertLess(elapsed * 3, legacy_time, message)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import os
+import tempfile
+import time
+
+import oschmod
+
+from knack import log
+
+from . import rsa_parser
+from . import constants as const
+
+logger = log.get_logger(__name__)
+
+
+def get_cache_folder(cli_ctx):
+    return os.path.join(cli_ctx.config.config_dir, const.CERT_CACHE_FOLDER_NAME)
+
+
+def get_cache_key(tenant_id, user_name, key_id, scope):
+    # The key id is the hash of the public key, so a certificate is only reused for the same account and key pair
+    key_hash = hashlib.sha256()
+    for part in (tenant_id, user_name, key_id, scope):
+        key_hash.update((part or "").lower().encode('utf-8'))
+        key_hash.update(b'\0')
+    return key_hash.hexdigest()
+
+
+def get_certificate(cache_folder, cache_key, refresh_margin=const.CERT_CACHE_REFRESH_MARGIN_IN_SECONDS):
+    """
+    Return the contents of the cached certificate for cache_key, without the algorithm prefix. Return None
+    if there is no cached certificate, or if it isn't valid yet or expires within refresh_margin seconds.
+    """
+    cache_file = os.path.join(cache_folder, cache_key)
+    # pylint: disable=broad-except
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            certificate_text = f.read()
+        parser = rsa_parser.SSHCertificateParser()
+        parser.parse(certificate_text)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.debug("Ignoring unreadable cached certificate %s: %s", cache_file, str(e))
+        return None
+
+    now = time.time()
+    if parser.valid_after > now or (not parser.is_valid_forever() and parser.valid_before - refresh_margin <= now):
+        logger.debug("Cached certificate %s is expired or about to expire", cache_file)
+        return None
+
+    logger.debug("Reusing cached certificate %s", cache_file)
+    return certificate_text.split()[1]
+
+
+def save_certificate(cache_folder, cache_key, certificate):
+    # pylint: disable=broad-except
+    # The cache is an optimization, failing to write it must not fail the command.
+    try:
+        if not os.path.isdir(cache_folder):
+            os.makedirs(cache_folder, mode=0o700)
+        fd, temp_file = tempfile.mkstemp(dir=cache_folder, prefix=cache_key, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(f"ssh-rsa-cert-v01@openssh.com {certificate}")
+            oschmod.set_mode(temp_file, 0o600)
+            os.replace(temp_file, os.path.join(cache_folder, cache_key))
+        except Exception:
+            os.remove(temp_file)
+            raise
+    except Exception as e:
+        logger.debug("Couldn't cache certificate: %s", str(e))
@@ -18,3 +18,5 @@ RECOMMENDATION_SSH_CLIENT_NOT_FOUND = (Fore.YELLOW + "Ensure OpenSSH is installe
 RECOMMENDATION_RESOURCE_NOT_FOUND = (Fore.YELLOW + "Please ensure the active subscription is set properly "
                                      "and resource exists." + Style.RESET_ALL)
 RDP_TERMINATE_SSH_WAIT_TIME_IN_SECONDS = 30
+CERT_CACHE_FOLDER_NAME = "sshcertcache"
+CERT_CACHE_REFRESH_MARGIN_IN_SECONDS = 300
@@ -19,6 +19,7 @@ from azure.cli.core import telemetry
 from azure.core.exceptions import ResourceNotFoundError, HttpResponseError
 from azure.cli.core.style import Style, print_styled_text
 
+from . import cert_cache
 from . import ip_utils
 from . import rdp_utils
 from . import rsa_parser
@@ -169,8 +170,11 @@ def _do_ssh_op(cmd, op_info, op_call):
         op_info.public_key_file, op_info.private_key_file, delete_keys = \
             _check_or_create_public_private_files(op_info.public_key_file, op_info.private_key_file,
                                                   op_info.credentials_folder, op_info.ssh_client_folder)
+        # Connections can reuse a cached certificate, config files get a certificate with the full lifetime.
+        use_cache = not delete_keys and isinstance(op_info, ssh_info.SSHSession)
         op_info.cert_file, op_info.local_user = _get_and_write_certificate(cmd, op_info.public_key_file,
-                                                                           None, op_info.ssh_client_folder)
+                                                                           None, op_info.ssh_client_folder,
+                                                                           use_cache)
         if op_info.is_arc():
             # pylint: disable=broad-except
             try:
@@ -197,7 +201,7 @@ def _do_ssh_op(cmd, op_info, op_call):
     op_call(op_info, delete_keys, delete_cert)
 
 
-def _get_and_write_certificate(cmd, public_key_file, cert_file, ssh_client_folder):
+def _get_and_write_certificate(cmd, public_key_file, cert_file, ssh_client_folder, use_cache=False):
     cloudtoscope = {
         "azurecloud": "https://pas.windows.net/CheckMyAccess/Linux/.default",
         "azurechinacloud": "https://pas.chinacloudapi.cn/CheckMyAccess/Linux/.default",
@@ -214,19 +218,31 @@ def _get_and_write_certificate(cmd, public_key_file, cert_file, ssh_client_folde
     from azure.cli.core._profile import Profile
     profile = Profile(cli_ctx=cmd.cli_ctx)
 
-    t0 = time.time()
-    # We currently are using the presence of get_msal_token to detect if we are running on an older azure cli client
-    # TODO: Remove when adal has been deprecated for a while
-    if hasattr(profile, "get_msal_token"):
-        # we used to use the username from the token but now we throw it away
-        _, certificate = profile.get_msal_token(scopes, data)
-    else:
-        credential, _, _ = profile.get_login_credentials(subscription_id=profile.get_subscription()["id"])
-        certificatedata = credential.get_token(*scopes, data=data)
-        certificate = certificatedata.token
-
-    time_elapsed = time.time() - t0
-    telemetry.add_extension_event('ssh', {'Context.Default.AzureCLI.SSHGetCertificateTime': time_elapsed})
+    # Certificates are cached by account, key pair and scope, and are refreshed ahead of their expiration
+    certificate = None
+    if use_cache:
+        account = profile.get_subscription()
+        cache_folder = cert_cache.get_cache_folder(cmd.cli_ctx)
+        cache_key = cert_cache.get_cache_key(account["tenantId"], account["user"]["name"], data["key_id"], scope)
+        certificate = cert_cache.get_certificate(cache_folder, cache_key)
+
+    if not certificate:
+        t0 = time.time()
+        # We currently are using the presence of get_msal_token to detect if we are running on an older azure cli
+        # client
+        # TODO: Remove when adal has been deprecated for a while
+        if hasattr(profile, "get_msal_token"):
+            # we used to use the username from the token but now we throw it away
+            _, certificate = profile.get_msal_token(scopes, data)
+        else:
+            credential, _, _ = profile.get_login_credentials(subscription_id=profile.get_subscription()["id"])
+            certificatedata = credential.get_token(*scopes, data=data)
+            certificate = certificatedata.token
+
+        time_elapsed = time.time() - t0
+        telemetry.add_extension_event('ssh', {'Context.Default.AzureCLI.SSHGetCertificateTime': time_elapsed})
+        if use_cache:
+            cert_cache.save_certificate(cache_folder, cache_key, certificate)
 
     if not cert_file:
         cert_file = public_key_file + "-aadcert.pub"
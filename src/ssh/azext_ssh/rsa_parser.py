@@ -58,3 +58,85 @@ class RSAParser():
     def _get_struct_format(self):
         format_start = ">" if self._key_length_big_endian else "<"
         return format_start + "L"
+
+
+class SSHCertificateParser():
+    # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    # Number of public key fields encoded after the nonce for each certificate type (see OpenSSH PROTOCOL.certkeys)
+    PublicKeyFieldCount = {
+        'ssh-rsa-cert-v01@openssh.com': 2,
+        'ssh-dss-cert-v01@openssh.com': 4,
+        'ecdsa-sha2-nistp256-cert-v01@openssh.com': 2,
+        'ecdsa-sha2-nistp384-cert-v01@openssh.com': 2,
+        'ecdsa-sha2-nistp521-cert-v01@openssh.com': 2,
+        'ssh-ed25519-cert-v01@openssh.com': 1
+    }
+    # valid_before value of certificates that never expire
+    Forever = 0xFFFFFFFFFFFFFFFF
+
+    def __init__(self):
+        self.algorithm = ''
+        self.serial = 0
+        self.cert_type = 0
+        self.key_id = ''
+        self.principals = []
+        self.valid_after = 0
+        self.valid_before = 0
+
+    def parse(self, certificate_text):
+        text_parts = certificate_text.split()
+
+        if len(text_parts) < 2:
+            error_str = ("Incorrectly formatted certificate. "
+                         "Certificate must be format '<algorithm> <base64_certificate>'")
+            raise ValueError(error_str)
+
+        algorithm = text_parts[0]
+        if algorithm not in SSHCertificateParser.PublicKeyFieldCount:
+            raise ValueError(f"Certificate type is not supported ({algorithm})")
+
+        cert_bytes = base64.b64decode(text_parts[1])
+        offset = 0
+        try:
+            encoded_algorithm, offset = self._read_string(cert_bytes, offset)
+            if encoded_algorithm.decode("ascii") != algorithm:
+                raise ValueError(f"Encoded certificate type does not match ({encoded_algorithm.decode('ascii')})")
+
+            # nonce and public key
+            for _ in range(1 + SSHCertificateParser.PublicKeyFieldCount[algorithm]):
+                _, offset = self._read_string(cert_bytes, offset)
+
+            serial, cert_type = struct.unpack_from(">QL", cert_bytes, offset)
+            offset += 12
+            key_id, offset = self._read_string(cert_bytes, offset)
+            packed_principals, offset = self._read_string(cert_bytes, offset)
+            valid_after, valid_before = struct.unpack_from(">QQ", cert_bytes, offset)
+        except struct.error as e:
+            raise ValueError(f"Incorrectly encoded certificate. Error: {str(e)}") from e
+
+        principals = []
+        principal_offset = 0
+        while principal_offset < len(packed_principals):
+            principal, principal_offset = self._read_string(packed_principals, principal_offset)
+            principals.append(principal.decode("utf-8"))
+
+        self.algorithm = algorithm
+        self.serial = serial
+        self.cert_type = cert_type
+        self.key_id = key_id.decode("utf-8")
+        self.principals = principals
+        self.valid_after = valid_after
+        self.valid_before = valid_before
+
+    def is_valid_forever(self):
+        return self.valid_before == SSHCertificateParser.Forever
+
+    @staticmethod
+    def _read_string(data, offset):
+        if offset + 4 > len(data):
+            raise ValueError("Incorrectly encoded certificate. Certificate is truncated")
+        length = struct.unpack_from(">L", data, offset)[0]
+        offset += 4
+        if offset + length > len(data):
+            raise ValueError("Incorrectly encoded certificate. Certificate is truncated")
+        return data[offset:offset + length], offset + length
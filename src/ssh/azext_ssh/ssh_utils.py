@@ -18,6 +18,7 @@ from azure.cli.core.style import Style, print_styled_text
 
 from . import file_utils
 from . import connectivity_utils
+from . import rsa_parser
 from . import constants as const
 
 logger = log.get_logger(__name__)
@@ -118,23 +119,27 @@ def get_ssh_cert_info(cert_file, ssh_client_folder=None):
                                          const.RECOMMENDATION_SSH_CLIENT_NOT_FOUND)
 
 
-def _get_ssh_cert_validity(cert_file, ssh_client_folder=None):
-    if cert_file:
-        info = get_ssh_cert_info(cert_file, ssh_client_folder)
-        for line in info:
-            if "Valid:" in line:
-                return line.strip()
-    return None
+def parse_ssh_cert(cert_file):
+    # Certificates are parsed natively instead of running "ssh-keygen -L" for every connection
+    with open(cert_file, 'r', encoding='utf-8') as f:
+        certificate_text = f.read()
+    parser = rsa_parser.SSHCertificateParser()
+    try:
+        parser.parse(certificate_text)
+    except ValueError as e:
+        raise azclierror.FileOperationError(f"Could not parse certificate {cert_file}. Error: {str(e)}")
+    return parser
 
 
+# pylint: disable=unused-argument
 def get_certificate_start_and_end_times(cert_file, ssh_client_folder=None):
-    validity_str = _get_ssh_cert_validity(cert_file, ssh_client_folder)
     times = None
-    if validity_str and "Valid: from " in validity_str and " to " in validity_str:
-        times = validity_str.replace("Valid: from ", "").split(" to ")
-        t0 = datetime.datetime.strptime(times[0], '%Y-%m-%dT%X')
-        t1 = datetime.datetime.strptime(times[1], '%Y-%m-%dT%X')
-        times = (t0, t1)
+    if cert_file:
+        cert = parse_ssh_cert(cert_file)
+        if not cert.is_valid_forever():
+            t0 = datetime.datetime.fromtimestamp(cert.valid_after)
+            t1 = datetime.datetime.fromtimestamp(cert.valid_before)
+            times = (t0, t1)
     return times
 
 
@@ -146,20 +151,9 @@ def get_certificate_lifetime(cert_file, ssh_client_folder=None):
     return lifetime
 
 
+# pylint: disable=unused-argument
 def get_ssh_cert_principals(cert_file, ssh_client_folder=None):
-    info = get_ssh_cert_info(cert_file, ssh_client_folder)
-    principals = []
-    in_principal = False
-    for line in info:
-        if ":" in line:
-            in_principal = False
-        if "Principals:" in line:
-            in_principal = True
-            continue
-        if in_principal:
-            principals.append(line.strip())
-
-    return principals
+    return parse_ssh_cert(cert_file).principals
 
 
 def _print_error_messages_from_ssh_log(log_file, connection_status, delete_cert):
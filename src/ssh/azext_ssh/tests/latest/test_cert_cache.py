@@ -0,0 +1,72 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from azext_ssh import cert_cache
+from azext_ssh.tests.latest.test_rsa_parser import get_good_certificate
+
+# validity of the test certificate
+VALID_AFTER = 1654077600
+VALID_BEFORE = 1654081200
+
+
+class CertCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = os.path.join(tempfile.mkdtemp(), "sshcertcache")
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.cache_folder))
+
+    def test_get_cache_key(self):
+        key = cert_cache.get_cache_key("tenant", "user@contoso.com", "kid", "scope")
+        self.assertEqual(key, cert_cache.get_cache_key("TENANT", "User@Contoso.com", "kid", "scope"))
+        self.assertNotEqual(key, cert_cache.get_cache_key("tenant", "other@contoso.com", "kid", "scope"))
+        self.assertNotEqual(key, cert_cache.get_cache_key("tenant", "user@contoso.com", "kid2", "scope"))
+        self.assertNotEqual(key, cert_cache.get_cache_key("tenant", "user@contoso.com", "kid", "scope2"))
+        self.assertNotEqual(key, cert_cache.get_cache_key("tenantuser@contoso.com", "", "kid", "scope"))
+
+    def test_get_certificate_miss(self):
+        self.assertIsNone(cert_cache.get_certificate(self.cache_folder, "key"))
+
+    @mock.patch('time.time')
+    def test_save_and_get_certificate(self, mock_time):
+        cert_cache.save_certificate(self.cache_folder, "key", get_good_certificate())
+        self.assertEqual(["key"], os.listdir(self.cache_folder))
+
+        mock_time.return_value = VALID_AFTER + 60
+        self.assertEqual(get_good_certificate(), cert_cache.get_certificate(self.cache_folder, "key"))
+        self.assertIsNone(cert_cache.get_certificate(self.cache_folder, "other"))
+
+    @mock.patch('time.time')
+    def test_get_certificate_refreshed_ahead_of_expiration(self, mock_time):
+        cert_cache.save_certificate(self.cache_folder, "key", get_good_certificate())
+
+        mock_time.return_value = VALID_BEFORE - 301
+        self.assertIsNotNone(cert_cache.get_certificate(self.cache_folder, "key", refresh_margin=300))
+        mock_time.return_value = VALID_BEFORE - 300
+        self.assertIsNone(cert_cache.get_certificate(self.cache_folder, "key", refresh_margin=300))
+        mock_time.return_value = VALID_AFTER - 1
+        self.assertIsNone(cert_cache.get_certificate(self.cache_folder, "key"))
+
+    def test_get_certificate_corrupted(self):
+        os.makedirs(self.cache_folder)
+        with open(os.path.join(self.cache_folder, "key"), 'w', encoding='utf-8') as f:
+            f.write("ssh-rsa-cert-v01@openssh.com AAAA")
+        self.assertIsNone(cert_cache.get_certificate(self.cache_folder, "key"))
+
+    @mock.patch('os.replace')
+    def test_save_certificate_error(self, mock_replace):
+        mock_replace.side_effect = OSError("error")
+        cert_cache.save_certificate(self.cache_folder, "key", get_good_certificate())
+        self.assertEqual([], os.listdir(self.cache_folder))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -346,6 +346,9 @@ class SshCustomCommandTest(unittest.TestCase):
 
         self.assertRaises(azclierror.FileOperationError, custom._get_modulus_exponent, 'file')
     
+    @mock.patch('azext_ssh.cert_cache.save_certificate')
+    @mock.patch('azext_ssh.cert_cache.get_certificate')
+    @mock.patch('azext_ssh.cert_cache.get_cache_folder')
     @mock.patch('azext_ssh.ssh_utils.get_ssh_cert_principals')
     @mock.patch('os.path.join')
     @mock.patch('azext_ssh.custom._check_or_create_public_private_files')
@@ -354,7 +357,8 @@ class SshCustomCommandTest(unittest.TestCase):
     @mock.patch('azure.cli.core._profile.Profile')
     @mock.patch('azext_ssh.custom._write_cert_file')
     def test_do_ssh_op_aad_user_compute(self, mock_write_cert, mock_ssh_creds, mock_get_mod_exp, mock_ip,
-                                        mock_check_files, mock_join, mock_principal):
+                                        mock_check_files, mock_join, mock_principal, mock_cache_folder,
+                                        mock_get_cached_cert, mock_save_cert):
         cmd = mock.Mock()
         cmd.cli_ctx = mock.Mock()
         cmd.cli_ctx.cloud = mock.Mock()
@@ -372,7 +376,9 @@ class SshCustomCommandTest(unittest.TestCase):
         profile = mock_ssh_creds.return_value
         profile._adal_cache = True
         profile.get_msal_token.return_value = "username", "certificate"
+        profile.get_subscription.return_value = {"tenantId": "tenant", "user": {"name": "user@contoso.com"}}
         mock_join.return_value = "public-aadcert.pub"
+        mock_get_cached_cert.return_value = None
         
         custom._do_ssh_op(cmd, op_info, mock_op)
         
@@ -380,8 +386,75 @@ class SshCustomCommandTest(unittest.TestCase):
         mock_ip.assert_not_called()
         mock_get_mod_exp.assert_called_once_with("public")
         mock_write_cert.assert_called_once_with("certificate", "public-aadcert.pub")
+        mock_save_cert.assert_called_once_with(mock_cache_folder.return_value, mock.ANY, "certificate")
         mock_op.assert_called_once_with(op_info, False, True)
 
+    @mock.patch('azext_ssh.cert_cache.save_certificate')
+    @mock.patch('azext_ssh.cert_cache.get_certificate')
+    @mock.patch('azext_ssh.cert_cache.get_cache_folder')
+    @mock.patch('azext_ssh.ssh_utils.get_ssh_cert_principals')
+    @mock.patch('os.path.join')
+    @mock.patch('azext_ssh.custom._check_or_create_public_private_files')
+    @mock.patch('azext_ssh.custom._get_modulus_exponent')
+    @mock.patch('azure.cli.core._profile.Profile')
+    @mock.patch('azext_ssh.custom._write_cert_file')
+    def test_do_ssh_op_aad_user_cached_certificate(self, mock_write_cert, mock_ssh_creds, mock_get_mod_exp,
+                                                   mock_check_files, mock_join, mock_principal, mock_cache_folder,
+                                                   mock_get_cached_cert, mock_save_cert):
+        cmd = mock.Mock()
+        cmd.cli_ctx.cloud.name = "azurecloud"
+
+        op_info = ssh_info.SSHSession(None, None, "1.2.3.4", None, None, False, None, None, None, None, None, None, "Microsoft.Compute", None, None, False)
+        op_info.public_key_file = "publicfile"
+
+        mock_op = mock.Mock()
+        mock_check_files.return_value = "public", "private", False
+        mock_principal.return_value = ["username"]
+        mock_get_mod_exp.return_value = "modulus", "exponent"
+        mock_join.return_value = "public-aadcert.pub"
+        mock_get_cached_cert.return_value = "cachedcertificate"
+        mock_ssh_creds.return_value.get_subscription.return_value = {"tenantId": "tenant",
+                                                                     "user": {"name": "user@contoso.com"}}
+
+        custom._do_ssh_op(cmd, op_info, mock_op)
+
+        mock_ssh_creds.return_value.get_msal_token.assert_not_called()
+        mock_write_cert.assert_called_once_with("cachedcertificate", "public-aadcert.pub")
+        mock_save_cert.assert_not_called()
+        self.assertEqual(op_info.local_user, "username")
+        mock_op.assert_called_once_with(op_info, False, True)
+
+    @mock.patch('azext_ssh.cert_cache.save_certificate')
+    @mock.patch('azext_ssh.cert_cache.get_certificate')
+    @mock.patch('azext_ssh.cert_cache.get_cache_folder')
+    @mock.patch('azext_ssh.ssh_utils.get_ssh_cert_principals')
+    @mock.patch('azext_ssh.custom._get_modulus_exponent')
+    @mock.patch('azure.cli.core._profile.Profile')
+    @mock.patch('azext_ssh.custom._write_cert_file')
+    def test_get_and_write_certificate_switched_account(self, mock_write_cert, mock_ssh_creds, mock_get_mod_exp,
+                                                        mock_principal, mock_cache_folder, mock_get_cached_cert,
+                                                        mock_save_cert):
+        cmd = mock.Mock()
+        cmd.cli_ctx.cloud.name = "azurecloud"
+        cache = {}
+        mock_get_cached_cert.side_effect = lambda folder, key: cache.get(key)
+        mock_save_cert.side_effect = lambda folder, key, certificate: cache.__setitem__(key, certificate)
+        mock_principal.return_value = ["username"]
+        mock_get_mod_exp.return_value = "modulus", "exponent"
+        profile = mock_ssh_creds.return_value
+        profile.get_msal_token.return_value = "username", "certificate"
+
+        profile.get_subscription.return_value = {"tenantId": "tenant", "user": {"name": "user1@contoso.com"}}
+        custom._get_and_write_certificate(cmd, "public", "cert", None, use_cache=True)
+        custom._get_and_write_certificate(cmd, "public", "cert", None, use_cache=True)
+        self.assertEqual(1, profile.get_msal_token.call_count)
+
+        # another account in the same tenant, with the same key pair, doesn't get the certificate of the first one
+        profile.get_subscription.return_value = {"tenantId": "tenant", "user": {"name": "user2@contoso.com"}}
+        custom._get_and_write_certificate(cmd, "public", "cert", None, use_cache=True)
+        self.assertEqual(2, profile.get_msal_token.call_count)
+        self.assertEqual(2, len(cache))
+
     @mock.patch('azext_ssh.custom._check_or_create_public_private_files')
     @mock.patch('azext_ssh.ip_utils.get_ssh_ip')
     def test_do_ssh_op_local_user_compute(self, mock_ip, mock_check_files):
@@ -440,6 +513,9 @@ class SshCustomCommandTest(unittest.TestCase):
         mock_get_cert.assert_not_called()
         mock_check_keys.assert_not_called()
     
+    @mock.patch('azext_ssh.cert_cache.save_certificate')
+    @mock.patch('azext_ssh.cert_cache.get_certificate')
+    @mock.patch('azext_ssh.cert_cache.get_cache_folder')
     @mock.patch('azext_ssh.connectivity_utils.get_client_side_proxy')
     @mock.patch('azext_ssh.custom.connectivity_utils.get_relay_information')
     @mock.patch('azext_ssh.ssh_utils.get_ssh_cert_principals')
@@ -451,7 +527,8 @@ class SshCustomCommandTest(unittest.TestCase):
     @mock.patch('azext_ssh.ssh_utils.start_ssh_connection')
     @mock.patch('azext_ssh.ssh_utils.get_certificate_lifetime')
     def test_do_ssh_arc_op_aad_user(self, mock_cert_exp, mock_start_ssh, mock_write_cert, mock_ssh_creds, mock_get_mod_exp, mock_check_files, 
-                                    mock_join, mock_principal, mock_get_relay_info, mock_get_proxy):
+                                    mock_join, mock_principal, mock_get_relay_info, mock_get_proxy, mock_cache_folder,
+                                    mock_get_cached_cert, mock_save_cert):
 
         mock_get_proxy.return_value = '/path/to/proxy'
         mock_get_relay_info.return_value = 'relay'
@@ -465,7 +542,9 @@ class SshCustomCommandTest(unittest.TestCase):
         profile = mock_ssh_creds.return_value
         profile._adal_cache = True
         profile.get_msal_token.return_value = "username", "certificate"
+        profile.get_subscription.return_value = {"tenantId": "tenant", "user": {"name": "user@contoso.com"}}
         mock_join.return_value = "public-aadcert.pub"
+        mock_get_cached_cert.return_value = None
         from datetime import timedelta
         mock_cert_exp.return_value = timedelta(seconds=3600)
 
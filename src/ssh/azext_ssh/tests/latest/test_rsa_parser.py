@@ -3,6 +3,7 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import base64
 import unittest
 from unittest import mock
 
@@ -82,5 +83,66 @@ class RSAParserTest(unittest.TestCase):
         return "AQAB"
 
 
+class SSHCertificateParserTest(unittest.TestCase):
+    def test_certificate_parser_success(self):
+        parser = rsa_parser.SSHCertificateParser()
+
+        parser.parse('ssh-rsa-cert-v01@openssh.com ' + get_good_certificate() + ' comment\n')
+
+        self.assertEqual('ssh-rsa-cert-v01@openssh.com', parser.algorithm)
+        self.assertEqual(42, parser.serial)
+        self.assertEqual(1, parser.cert_type)
+        self.assertEqual('keyid', parser.key_id)
+        self.assertEqual(['user@contoso.com', 'other'], parser.principals)
+        self.assertEqual(1654077600, parser.valid_after)
+        self.assertEqual(1654081200, parser.valid_before)
+        self.assertFalse(parser.is_valid_forever())
+
+    def test_certificate_parser_too_few_fields(self):
+        parser = rsa_parser.SSHCertificateParser()
+
+        self.assertRaises(ValueError, parser.parse, 'ssh-rsa-cert-v01@openssh.com')
+
+    def test_certificate_parser_unsupported_algorithm(self):
+        parser = rsa_parser.SSHCertificateParser()
+
+        self.assertRaises(ValueError, parser.parse, 'ssh-rsa ' + get_good_certificate())
+
+    def test_certificate_parser_algorithm_mismatch(self):
+        parser = rsa_parser.SSHCertificateParser()
+
+        self.assertRaises(ValueError, parser.parse, 'ssh-ed25519-cert-v01@openssh.com ' + get_good_certificate())
+
+    def test_certificate_parser_truncated(self):
+        certificate = base64.b64decode(get_good_certificate())
+        parser = rsa_parser.SSHCertificateParser()
+
+        for length in [2, 40, 230, 270]:
+            truncated = base64.b64encode(certificate[:length]).decode('ascii')
+            self.assertRaises(ValueError, parser.parse, 'ssh-rsa-cert-v01@openssh.com ' + truncated)
+
+
+def get_good_certificate():
+    # ssh-keygen -s ca -I keyid -n user@contoso.com,other -V 20220601100000:20220601110000 -z 42 id_rsa.pub
+    return (
+            "AAAAHHNzaC1yc2EtY2VydC12MDFAb3BlbnNzaC5jb20AAAAg+511nWTxeVyw6Azy"
+            "agqVVmum4B1mOJ/kLE4vvFPSUWkAAAADAQABAAAAgQDhZ0DHpyPuP3bJbsC1KFs3"
+            "V0BIfbcOydeQajVCziKtymB4i09oBfeFD091PAk+T1shxFOGwc87pozoGjViEJcd"
+            "mRC1epMZtd2nDhveZ7mr4qOz0K+NyQhtvhyh5XdORYCsHhCVvPkZibWVk4/15tu2"
+            "gln3dmSSMbbaDpfyOUOmKwAAAAAAAAAqAAAAAQAAAAVrZXlpZAAAAB0AAAAQdXNl"
+            "ckBjb250b3NvLmNvbQAAAAVvdGhlcgAAAABilzigAAAAAGKXRrAAAAAAAAAAggAA"
+            "ABVwZXJtaXQtWDExLWZvcndhcmRpbmcAAAAAAAAAF3Blcm1pdC1hZ2VudC1mb3J3"
+            "YXJkaW5nAAAAAAAAABZwZXJtaXQtcG9ydC1mb3J3YXJkaW5nAAAAAAAAAApwZXJt"
+            "aXQtcHR5AAAAAAAAAA5wZXJtaXQtdXNlci1yYwAAAAAAAAAAAAAAlwAAAAdzc2gt"
+            "cnNhAAAAAwEAAQAAAIEAvpQtHSIv63uFF78q8joyyZ9V9VSQ0y95JnXhvGOzBB+G"
+            "WLnrNFK4CitwdN/RxxhVtwINvZiqJTajlM6x9UWy1TXkFmchepG8Z0dRXejhpLiC"
+            "DO27jCX87NhB8Iw++ACtK2NlzRmYa/ouOUN+hmY+bZPZ+73DivfuCafrFOPmHQkA"
+            "AACUAAAADHJzYS1zaGEyLTUxMgAAAICCs36xhThhoDzDwZKDqjHte/5Lr5gAe+C5"
+            "cBm4ZuwbATUTHoXLPJGuIeJZD9xU4JI7Ho3WfcBlNm/A96U0+4Z8p97PRbz8s2my"
+            "g2yHsWEML1y3zYaBgaF5PAs9xrHNpKD6nNv7Gcu6OLCCta05oHJ3Ybt6kJvCWNWD"
+            "+34pDowE8A=="
+    )
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -8,9 +8,13 @@ from unittest import mock
 import unittest
 import platform
 import os
+import shutil
+import tempfile
+import datetime
 
 from azext_ssh import ssh_utils
 from azext_ssh import ssh_info
+from azext_ssh.tests.latest.test_rsa_parser import get_good_certificate
 
 class SSHUtilsTests(unittest.TestCase):   
     @mock.patch.object(ssh_utils, '_start_cleanup')
@@ -234,3 +238,50 @@ class SSHUtilsTests(unittest.TestCase):
         mock_isfile.return_value = False
 
         self.assertRaises(azclierror.UnclassifiedUserFault, ssh_utils.get_ssh_client_path)
+
+
+class SSHCertificateInfoTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cert_file = os.path.join(self.temp_dir, "id_rsa.pub-aadcert.pub")
+        with open(self.cert_file, 'w', encoding='utf-8') as f:
+            f.write("ssh-rsa-cert-v01@openssh.com " + get_good_certificate())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    @mock.patch('subprocess.check_output')
+    def test_get_ssh_cert_principals(self, mock_check_output):
+        self.assertEqual(["user@contoso.com", "other"], ssh_utils.get_ssh_cert_principals(self.cert_file))
+        mock_check_output.assert_not_called()
+
+    def test_get_certificate_start_and_end_times(self):
+        t0, t1 = ssh_utils.get_certificate_start_and_end_times(self.cert_file)
+        self.assertEqual(datetime.datetime.fromtimestamp(1654077600), t0)
+        self.assertEqual(datetime.datetime.fromtimestamp(1654081200), t1)
+        self.assertEqual(datetime.timedelta(hours=1), ssh_utils.get_certificate_lifetime(self.cert_file))
+
+    def test_parse_ssh_cert_error(self):
+        with open(self.cert_file, 'w', encoding='utf-8') as f:
+            f.write("ssh-rsa-cert-v01@openssh.com AAAA")
+        self.assertRaises(azclierror.FileOperationError, ssh_utils.get_ssh_cert_principals, self.cert_file)
+
+    @unittest.skipUnless(shutil.which("ssh-keygen"), "ssh-keygen is not installed")
+    def test_cert_info_matches_ssh_keygen(self):
+        info = ssh_utils.get_ssh_cert_info(self.cert_file)
+        principals = []
+        in_principal = False
+        for line in info:
+            if ":" in line:
+                in_principal = False
+            if "Principals:" in line:
+                in_principal = True
+                continue
+            if in_principal:
+                principals.append(line.strip())
+            if "Valid:" in line:
+                times = line.strip().replace("Valid: from ", "").split(" to ")
+                validity = tuple(datetime.datetime.strptime(t, '%Y-%m-%dT%X') for t in times)
+
+        self.assertEqual(principals, ssh_utils.get_ssh_cert_principals(self.cert_file))
+        self.assertEqual(validity, ssh_utils.get_certificate_start_and_end_times(self.cert_file))
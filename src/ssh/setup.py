@@ -7,7 +7,7 @@
 
 from setuptools import setup, find_packages
 
-VERSION = "1.1.2"
+VERSION = "1.1.3"
 
 CLASSIFIERS = [
     'Development Status :: 4 - Beta',
@@ -13,6 +13,7 @@ from ._validators import (validate_metadata, get_permission_validator, get_permi
                           validate_storage_data_plane_list, as_user_validator, blob_tier_validator)
 
 from .profiles import CUSTOM_DATA_STORAGE_BLOB
+from .batch_util import DEFAULT_MAX_WORKERS
 
 
 def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statements, too-many-lines
@@ -122,6 +123,10 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         'an error will not be raised and the data will be appended to the existing blob. If set '
         'overwrite=True, then the existing append blob will be deleted, and a new one created. '
         'Defaults to False.')
+    max_workers_type = CLIArgumentType(
+        type=int, is_preview=True,
+        help='The number of files transferred in parallel. Each file can also use up to --max-connections '
+             'connections. Default to {}.'.format(DEFAULT_MAX_WORKERS))
 
     with self.argument_context('storage') as c:
         c.argument('container_name', container_name_type)
@@ -190,6 +195,14 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.argument('source_container')
         c.argument('source_share')
 
+    with self.argument_context('storage blob copy start-batch') as c:
+        from ._validators import validate_max_workers
+        c.argument('wait', action='store_true', is_preview=True,
+                   help='Wait for all the copies to complete, and fail if any of them does not succeed.')
+        c.argument('max_workers', max_workers_type, validator=validate_max_workers,
+                   help='The number of copies started, or polled with --wait, in parallel. Default to {}.'.format(
+                       DEFAULT_MAX_WORKERS))
+
     with self.argument_context('storage blob delete') as c:
         c.register_blob_arguments()
         c.register_precondition_options()
@@ -206,6 +219,9 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.argument('source', options_list=('--source', '-s'))
         c.argument('delete_snapshots', delete_snapshots_type)
         c.argument('lease_id', help='The active lease id for the blob.')
+        c.argument('max_workers', max_workers_type,
+                   help='The number of batch requests of up to 256 blobs sent in parallel. Default to {}.'.format(
+                       DEFAULT_MAX_WORKERS))
 
     with self.argument_context('storage blob download') as c:
         c.register_blob_arguments()
@@ -243,6 +259,7 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.argument('source', options_list=('--source', '-s'))
         c.extra('max_concurrency', options_list='--max-connections', type=int, default=2,
                 help='The number of parallel connections with which to download.')
+        c.argument('max_workers', max_workers_type)
         c.extra('no_progress', progress_type)
 
     with self.argument_context('storage blob exists') as c:
@@ -482,6 +499,7 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.argument('maxsize_condition', arg_group='Content Control')
         c.argument('validate_content', action='store_true', min_api='2016-05-31', arg_group='Content Control')
         c.argument('blob_type', options_list=('--type', '-t'), arg_type=get_enum_type(get_blob_types()))
+        c.argument('max_workers', max_workers_type)
         c.extra('no_progress', progress_type)
         c.extra('tier', tier_type, is_preview=True)
         c.extra('overwrite', overwrite_type, is_preview=True)
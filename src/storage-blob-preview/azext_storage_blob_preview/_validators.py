@@ -1095,6 +1095,12 @@ def glob_files_locally(folder_path, pattern):
                 yield (full_path, full_path[len_folder_path:])
 
 
+def validate_max_workers(namespace):
+    from azure.cli.core.azclierror import InvalidArgumentValueError
+    if namespace.max_workers is not None and namespace.max_workers < 1:
+        raise InvalidArgumentValueError("incorrect usage: '--max-workers' must be greater than or equal to 1")
+
+
 def process_blob_download_batch_parameters(cmd, namespace):
     """Process the parameters for storage blob download command"""
     from azure.cli.core.azclierror import InvalidArgumentValueError
@@ -1102,6 +1108,8 @@ def process_blob_download_batch_parameters(cmd, namespace):
     if not os.path.exists(namespace.destination) or not os.path.isdir(namespace.destination):
         raise InvalidArgumentValueError('incorrect usage: destination must be an existing directory')
 
+    validate_max_workers(namespace)
+
     # 2. try to extract account name and container name from source string
     _process_blob_batch_container_parameters(cmd, namespace)
 
@@ -1114,6 +1122,7 @@ def process_blob_upload_batch_parameters(cmd, namespace):
     # 1. quick check
     if not os.path.exists(namespace.source) or not os.path.isdir(namespace.source):
         raise ValueError('incorrect usage: source must be an existing directory')
+    validate_max_workers(namespace)
 
     # 2. try to extract account name and container name from destination string
     _process_blob_batch_container_parameters(cmd, namespace, source=False)
@@ -1147,6 +1156,7 @@ def process_blob_upload_batch_parameters(cmd, namespace):
 
 
 def process_blob_delete_batch_parameters(cmd, namespace):
+    validate_max_workers(namespace)
     _process_blob_batch_container_parameters(cmd, namespace)
 
 
@@ -0,0 +1,245 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import heapq
+import math
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+# The batch commands transfer one file at a time unless --max-workers is given.
+DEFAULT_MAX_WORKERS = 1
+
+# Files up to this size are grouped into jobs of several files, larger ones are a job of their own and are
+# transferred in chunks by the SDK with --max-connections.
+SMALL_FILE_SIZE = 4 * 1024 * 1024
+SMALL_FILES_PER_JOB = 32
+SMALL_JOBS_PER_WORKER = 4
+
+RETRIABLE_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+# The maximum number of sub-requests of a Blob Batch request. The SDK retry policy only sees the batch request as a
+# whole, so the sub-requests failing with a transient error are retried up to MAX_RETRIES times here.
+MAX_BATCH_SIZE = 256
+MAX_RETRIES = 3
+RETRY_BACKOFF = 1
+
+# The polling interval of a pending copy starts at COPY_POLL_INTERVAL seconds and doubles every time the copy didn't
+# progress, up to COPY_MAX_POLL_INTERVAL.
+COPY_POLL_INTERVAL = 1
+COPY_MAX_POLL_INTERVAL = 30
+
+# An item of a batch operation, with its size in bytes (None if unknown) and the arguments of the operation.
+BatchItem = namedtuple('BatchItem', ['name', 'size', 'args'])
+
+
+class BatchProgress:
+    """ Aggregates the progress of the concurrent transfers into a single progress bar over all the bytes. """
+
+    def __init__(self, hook, items):
+        self._hook = hook
+        self._lock = threading.Lock()
+        self._total_files = len(items)
+        self._total_bytes = sum(item.size or 0 for item in items)
+        self._completed_files = 0
+        self._completed_bytes = 0
+        self._current = {}
+
+    def update(self, name, current):
+        """ Report the number of bytes of an item transferred so far. """
+        with self._lock:
+            self._current[name] = current
+            self._report()
+
+    def complete(self, item):
+        with self._lock:
+            self._current.pop(item.name, None)
+            self._completed_files += 1
+            self._completed_bytes += item.size or 0
+            self._report()
+
+    def end(self):
+        with self._lock:
+            self._hook.end()
+
+    def _report(self):
+        message = '{}/{} files'.format(self._completed_files, self._total_files)
+        if self._total_bytes:
+            self._hook.add(message=message, value=min(self._completed_bytes + sum(self._current.values()),
+                                                      self._total_bytes), total_val=self._total_bytes)
+        else:
+            self._hook.add(message=message, value=self._completed_files, total_val=self._total_files)
+
+
+def get_response_progress_hook(progress, name, context_key):
+    """
+    Return a raw_response_hook reporting the progress of a single transfer to progress, the context_key being
+    'upload_stream_current' or 'download_stream_current'.
+    """
+    if not progress:
+        return None
+
+    def _hook(response):
+        if response.http_response.status_code not in [200, 201, 206]:
+            return
+        current = response.context.get(context_key)
+        if current is not None:
+            progress.update(name, current)
+    return _hook
+
+
+def _is_retriable(ex):
+    from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+    if isinstance(ex, (ServiceRequestError, ServiceResponseError)):
+        return True
+    return isinstance(ex, HttpResponseError) and ex.status_code in RETRIABLE_STATUS_CODES
+
+
+def _plan_jobs(items, max_workers):
+    """
+    Split the items into the jobs run by the workers, as lists of item indexes. The largest items start first so
+    that they don't end the batch alone, and small items are grouped to keep every worker busy with few jobs.
+    """
+    large = [i for i, item in enumerate(items) if item.size is None or item.size > SMALL_FILE_SIZE]
+    large.sort(key=lambda i: -(items[i].size or 0))
+    small = [i for i, item in enumerate(items) if item.size is not None and item.size <= SMALL_FILE_SIZE]
+
+    jobs = [[i] for i in large]
+    per_job = max(1, min(SMALL_FILES_PER_JOB, math.ceil(len(small) / (max_workers * SMALL_JOBS_PER_WORKER))))
+    jobs.extend(small[start:start + per_job] for start in range(0, len(small), per_job))
+    return jobs
+
+
+def run_batch(items, action, max_workers=None, progress=None):
+    """
+    Call action(item) for every BatchItem on a pool of max_workers threads, and return the results in the order of
+    the items. The transient errors are retried by the SDK retry policy, so an item failing stops the batch once the
+    running items end, and its error is raised.
+    """
+    max_workers = max_workers or DEFAULT_MAX_WORKERS
+    results = [None] * len(items)
+    stopped = threading.Event()
+
+    def _run_job(job):
+        for index in job:
+            if stopped.is_set():
+                return
+            try:
+                results[index] = action(items[index])
+            except BaseException:
+                stopped.set()
+                raise
+            if progress:
+                progress.complete(items[index])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_run_job, job) for job in _plan_jobs(items, max_workers)]
+        wait(futures, return_when=FIRST_EXCEPTION)
+        if stopped.is_set():
+            for future in futures:
+                future.cancel()
+    if progress:
+        progress.end()
+    for future in futures:
+        if not future.cancelled() and future.exception():
+            raise future.exception()
+    return results
+
+
+def delete_blobs_in_batches(container_client, blobs, max_workers=None, max_retries=MAX_RETRIES, **kwargs):
+    """
+    Delete the blobs with Blob Batch requests of up to MAX_BATCH_SIZE blobs each, max_workers requests at once. The
+    blobs are names, or dicts of the per-blob options of ContainerClient.delete_blobs. The blobs failing with a
+    transient error are retried in a new batch.
+
+    Return the names of the blobs deleted (including the ones already deleted), the names of the blobs skipped because
+    of a failed precondition, and a (name, status code, error code) tuple for each of the other failures.
+    """
+    def _get_blob_name(blob):
+        return blob['name'] if isinstance(blob, dict) else blob
+
+    def _delete_batch(item):
+        deleted, skipped, failed = [], [], []
+        pending = item.args
+        for attempt in range(max_retries + 1):
+            retried = []
+            # sub-responses come in the order of the blobs
+            parts = container_client.delete_blobs(*pending, raise_on_any_failure=False, **kwargs)
+            for blob, part in zip(pending, parts):
+                name = _get_blob_name(blob)
+                if 200 <= part.status_code < 300 or part.status_code == 404:
+                    deleted.append(name)
+                elif part.status_code in [304, 412]:
+                    skipped.append(name)
+                elif part.status_code in RETRIABLE_STATUS_CODES and attempt < max_retries:
+                    retried.append(blob)
+                else:
+                    failed.append((name, part.status_code, part.headers.get('x-ms-error-code')))
+            if not retried:
+                break
+            logger.warning('Retrying the deletion of %s blobs of %s', len(retried), item.name)
+            time.sleep(RETRY_BACKOFF * 2 ** attempt)
+            pending = retried
+        return deleted, skipped, failed
+
+    items = [BatchItem(name='batch {}'.format(start // MAX_BATCH_SIZE + 1), size=None,
+                       args=blobs[start:start + MAX_BATCH_SIZE]) for start in range(0, len(blobs), MAX_BATCH_SIZE)]
+    deleted, skipped, failed = [], [], []
+    for batch_deleted, batch_skipped, batch_failed in run_batch(items, _delete_batch, max_workers):
+        deleted.extend(batch_deleted)
+        skipped.extend(batch_skipped)
+        failed.extend(batch_failed)
+    return deleted, skipped, failed
+
+
+def wait_for_copies(blob_clients, max_workers=None, poll_interval=None, max_poll_interval=None):
+    """
+    Poll the copy status of the blobs until no copy is pending, with at most max_workers requests at once. Each blob
+    is polled again after its own interval, which doubles while its copy doesn't progress and is reset when it does.
+
+    Return a (blob client, copy properties) tuple for each copy which didn't succeed.
+    """
+    max_workers = max_workers or DEFAULT_MAX_WORKERS
+    poll_interval = poll_interval or COPY_POLL_INTERVAL
+    max_poll_interval = max_poll_interval or COPY_MAX_POLL_INTERVAL
+
+    # (time of the next poll, index of the blob, polling interval, last progress)
+    schedule = [(time.monotonic(), index, poll_interval, None) for index in range(len(blob_clients))]
+    heapq.heapify(schedule)
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while schedule:
+            delay = schedule[0][0] - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            now = time.monotonic()
+            due = []
+            while schedule and schedule[0][0] <= now:
+                due.append(heapq.heappop(schedule))
+            polls = [executor.submit(blob_clients[index].get_blob_properties) for _, index, _, _ in due]
+            for (_, index, interval, progress), poll in zip(due, polls):
+                try:
+                    copy = poll.result().copy
+                except Exception as ex:  # pylint: disable=broad-except
+                    if not _is_retriable(ex):
+                        raise
+                    logger.warning('Retrying to get the copy status of "%s" after error: %s',
+                                   blob_clients[index].url, ex)
+                    copy = None
+                if copy is None or copy.status == 'pending':
+                    if copy is not None and copy.progress != progress:
+                        interval, progress = poll_interval, copy.progress
+                    else:
+                        interval = min(interval * 2, max_poll_interval)
+                    heapq.heappush(schedule, (time.monotonic() + interval, index, interval, progress))
+                elif copy.status != 'success':
+                    failed.append((blob_clients[index], copy))
+            logger.info('%s of %s copies pending', len(schedule), len(blob_clients))
+    return failed
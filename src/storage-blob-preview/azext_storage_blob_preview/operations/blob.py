@@ -15,13 +15,18 @@ from knack.util import CLIError
 
 from ..util import (create_file_share_from_storage_client,
                     create_short_lived_share_sas,
-                    filter_none, collect_blobs, collect_blob_objects, collect_files,
+                    collect_blobs, collect_blob_objects, collect_files,
                     mkdir_p, guess_content_type, normalize_blob_file_path,
                     check_precondition_success)
+from ..batch_util import (BatchItem, BatchProgress, delete_blobs_in_batches, get_response_progress_hook,
+                          run_batch, wait_for_copies)
 from ..profiles import CUSTOM_DATA_STORAGE_BLOB
 
 logger = get_logger(__name__)
 
+# The size of the buffer of the file the query results are written to.
+QUERY_RESULT_BUFFER_SIZE = 1024 * 1024
+
 
 def delete_container(client, container_name, fail_not_exist=False, lease_id=None, if_modified_since=None,
                      if_unmodified_since=None, timeout=None, bypass_immutability_policy=False,
@@ -108,7 +113,7 @@ def set_blob_immutability_policy(cmd, client, expiry_time=None, policy_mode=None
 def storage_blob_copy_batch(cmd, client, source_client, container_name=None,
                             destination_path=None, source_container=None, source_share=None,
                             source_sas=None, pattern=None, dryrun=False, source_account_name=None,
-                            source_account_key=None):
+                            source_account_key=None, wait=False, max_workers=None):
     """Copy a group of blob or files to a blob container."""
     if dryrun:
         logger.warning('copy files or blobs to blob container')
@@ -130,21 +135,23 @@ def storage_blob_copy_batch(cmd, client, source_client, container_name=None,
         else:
             source_client = client
 
-        # pylint: disable=inconsistent-return-statements
-        def action_blob_copy(blob_name):
-            if dryrun:
+        source_blobs = collect_blobs(source_client, source_container, pattern)
+        if dryrun:
+            for blob_name in source_blobs:
                 logger.warning('  - copy blob %s', blob_name)
-            else:
-                return _copy_blob_to_blob_container(cmd, blob_service=client, source_blob_service=source_client,
-                                                    destination_container=container_name,
-                                                    destination_path=destination_path,
-                                                    source_container=source_container,
-                                                    source_blob_name=blob_name,
-                                                    source_sas=source_sas)
-
-        return list(filter_none(action_blob_copy(blob) for blob in collect_blobs(source_client,
-                                                                                 source_container,
-                                                                                 pattern)))
+            return []
+
+        def action_blob_copy(item):
+            return _copy_blob_to_blob_container(cmd, blob_service=client, source_blob_service=source_client,
+                                                destination_container=container_name,
+                                                destination_path=destination_path,
+                                                source_container=source_container,
+                                                source_blob_name=item.name,
+                                                source_sas=source_sas)
+
+        copies = run_batch([BatchItem(name=blob_name, size=0, args=None) for blob_name in source_blobs],
+                           action_blob_copy, max_workers)
+        return _wait_for_copy_batch(copies, max_workers) if wait else [blob_client.url for blob_client, _ in copies]
 
     if source_share:
         # copy blob from file share
@@ -158,35 +165,49 @@ def storage_blob_copy_batch(cmd, client, source_client, container_name=None,
             source_sas = create_short_lived_share_sas(cmd, source_client.account_name, source_client.account_key,
                                                       source_share)
 
-        # pylint: disable=inconsistent-return-statements
-        def action_file_copy(file_info):
-            dir_name, file_name = file_info
-            if dryrun:
+        source_files = list(collect_files(cmd, source_client, source_share, pattern))
+        if dryrun:
+            for dir_name, file_name in source_files:
                 logger.warning('  - copy file %s', os.path.join(dir_name, file_name))
-            else:
-                return _copy_file_to_blob_container(client, source_client, container_name, destination_path,
-                                                    source_share, source_sas, dir_name, file_name)
-
-        return list(filter_none(action_file_copy(file) for file in collect_files(cmd,
-                                                                                 source_client,
-                                                                                 source_share,
-                                                                                 pattern)))
+            return []
+
+        def action_file_copy(item):
+            dir_name, file_name = item.args
+            return _copy_file_to_blob_container(client, source_client, container_name, destination_path,
+                                                source_share, source_sas, dir_name, file_name)
+
+        copies = run_batch([BatchItem(name=os.path.join(*file_info), size=0, args=file_info)
+                            for file_info in source_files], action_file_copy, max_workers)
+        return _wait_for_copy_batch(copies, max_workers) if wait else [blob_client.url for blob_client, _ in copies]
     raise ValueError('Fail to find source. Neither blob container or file share is specified')
 
 
+def _wait_for_copy_batch(copies, max_workers):
+    """Wait for the copies still pending once started, and raise an error listing the copies which didn't succeed."""
+    pending = [blob_client for blob_client, copy_status in copies if copy_status == 'pending']
+    logger.warning('Waiting for %s of %s copies to complete', len(pending), len(copies))
+    failed = wait_for_copies(pending, max_workers)
+    if failed:
+        from azure.cli.core.azclierror import AzureResponseError
+        for blob_client, copy in failed:
+            logger.error('Copy to %s %s: %s', blob_client.url, copy.status, copy.status_description)
+        raise AzureResponseError('{} of {} copies did not succeed.'.format(len(failed), len(copies)))
+    return [blob_client.url for blob_client, _ in copies]
+
+
 # pylint: disable=unused-argument, too-many-locals
 def storage_blob_download_batch(client, source, destination, container_name, pattern=None, dryrun=False,
-                                progress_callback=None, socket_timeout=None, **kwargs):
-    source_blobs = collect_blobs(client, container_name, pattern)
+                                progress_callback=None, socket_timeout=None, max_workers=None, **kwargs):
+    source_blobs = list(collect_blob_objects(client, container_name, pattern))
     blobs_to_download = {}
-    for blob_name in source_blobs:
+    for blob_name, blob in source_blobs:
         # remove starting path seperator and normalize
         normalized_blob_name = normalize_blob_file_path(None, blob_name)
         if normalized_blob_name in blobs_to_download:
             raise CLIError('Multiple blobs with download path: `{}`. As a solution, use the `--pattern` parameter '
                            'to select for a subset of blobs to download OR utilize the `storage blob download` '
                            'command instead to download individual blobs.'.format(normalized_blob_name))
-        blobs_to_download[normalized_blob_name] = blob_name
+        blobs_to_download[normalized_blob_name] = (blob_name, getattr(blob, 'size', None))
 
     results = []
     if dryrun:
@@ -197,43 +218,41 @@ def storage_blob_download_batch(client, source, destination, container_name, pat
         logger.warning('  container %s', container_name)
         logger.warning('      total %d', len(source_blobs))
         logger.warning(' operations')
-        for b in source_blobs:
+        for b, _ in source_blobs:
             logger.warning('  - %s', b)
 
     else:
-        @check_precondition_success
-        def _download_blob(*args, **kwargs):
-            blob = download_blob(*args, **kwargs)
-            return blob.name
-
-        # Tell progress reporter to reuse the same hook
-        if progress_callback:
-            progress_callback.reuse = True
-
-        for index, blob_normed in enumerate(blobs_to_download):
-            from azure.cli.core.azclierror import FileOperationError
-            # add blob name and number to progress message
-            if progress_callback:
-                progress_callback.message = '{}/{}: "{}"'.format(
-                    index + 1, len(blobs_to_download), blobs_to_download[blob_normed])
-            blob_client = client.get_blob_client(container=container_name,
-                                                 blob=blobs_to_download[blob_normed])
+        from azure.cli.core.azclierror import FileOperationError
+        items = []
+        destination_folders = set()
+        for blob_normed, (blob_name, size) in blobs_to_download.items():
             destination_path = os.path.join(destination, os.path.normpath(blob_normed))
             destination_folder = os.path.dirname(destination_path)
             # Failed when there is same name for file and folder
             if os.path.isfile(destination_path) and os.path.exists(destination_folder):
-                raise FileOperationError("%s already exists in %s. Please rename existing file or choose another "
-                                         "destination folder. ")
+                raise FileOperationError("{} already exists in {}. Please rename existing file or choose another "
+                                         "destination folder. ".format(os.path.basename(destination_path),
+                                                                       destination_folder))
+            destination_folders.add(destination_folder)
+            items.append(BatchItem(name=blob_name, size=size, args=destination_path))
+        for destination_folder in destination_folders:
             if not os.path.exists(destination_folder):
                 mkdir_p(destination_folder)
-            include, result = _download_blob(client=blob_client, file_path=destination_path,
-                                             progress_callback=progress_callback, **kwargs)
-            if include:
-                results.append(result)
-
-        # end progress hook
-        if progress_callback:
-            progress_callback.hook.end()
+
+        progress = BatchProgress(progress_callback.hook, items) if progress_callback else None
+
+        @check_precondition_success
+        def _download_blob(item):
+            blob_client = client.get_blob_client(container=container_name, blob=item.name)
+            download_stream = blob_client.download_blob(
+                raw_response_hook=get_response_progress_hook(progress, item.name, 'download_stream_current'),
+                **kwargs)
+            with open(item.args, 'wb') as stream:
+                download_stream.readinto(stream)
+            return item.name
+
+        results = [result for include, result in run_batch(items, _download_blob, max_workers, progress)
+                   if include]
         num_failures = len(blobs_to_download) - len(results)
         if num_failures:
             logger.warning('%s of %s files not downloaded due to "Failed Precondition"',
@@ -247,7 +266,8 @@ def storage_blob_upload_batch(cmd, client, source, destination, pattern=None,  #
                               content_settings=None, metadata=None, validate_content=False,
                               maxsize_condition=None, max_connections=2, lease_id=None, progress_callback=None,
                               if_modified_since=None, if_unmodified_since=None, if_match=None,
-                              if_none_match=None, timeout=None, dryrun=False, socket_timeout=None, **kwargs):
+                              if_none_match=None, timeout=None, dryrun=False, socket_timeout=None, max_workers=None,
+                              **kwargs):
     def _create_return_result(blob_content_settings, upload_result=None):
         return {
             'Blob': client.url,
@@ -270,39 +290,27 @@ def storage_blob_upload_batch(cmd, client, source, destination, pattern=None,  #
             results.append(_create_return_result(blob_content_settings=guess_content_type(src, content_settings,
                                                                                           t_content_settings)))
     else:
+        items = [BatchItem(name=normalize_blob_file_path(destination_path, dst), size=os.path.getsize(src), args=src)
+                 for src, dst in source_files]
+        progress = BatchProgress(progress_callback.hook, items) if progress_callback else None
+
         @check_precondition_success
-        def _upload_blob(*args, **kwargs):
-            return upload_blob(*args, **kwargs)
-
-        # Tell progress reporter to reuse the same hook
-        if progress_callback:
-            progress_callback.reuse = True
-
-        for index, source_file in enumerate(source_files):
-            src, dst = source_file
-            # logger.warning('uploading %s', src)
-            guessed_content_settings = guess_content_type(src, content_settings, t_content_settings)
-
-            # add blob name and number to progress message
-            if progress_callback:
-                progress_callback.message = '{}/{}: "{}"'.format(
-                    index + 1, len(source_files), normalize_blob_file_path(destination_path, dst))
-            blob_client = client.get_blob_client(container=container_name,
-                                                 blob=normalize_blob_file_path(destination_path, dst))
-            include, result = _upload_blob(cmd, blob_client, file_path=src,
-                                           blob_type=blob_type, content_settings=guessed_content_settings,
-                                           metadata=metadata, validate_content=validate_content,
-                                           maxsize_condition=maxsize_condition, max_connections=max_connections,
-                                           lease_id=lease_id, progress_callback=progress_callback,
-                                           if_modified_since=if_modified_since,
-                                           if_unmodified_since=if_unmodified_since, if_match=if_match,
-                                           if_none_match=if_none_match, timeout=timeout, **kwargs)
-            if include:
-                results.append(_create_return_result(blob_content_settings=guessed_content_settings,
-                                                     upload_result=result))
-        # end progress hook
-        if progress_callback:
-            progress_callback.hook.end()
+        def _upload_blob(item):
+            guessed_content_settings = guess_content_type(item.args, content_settings, t_content_settings)
+            blob_client = client.get_blob_client(container=container_name, blob=item.name)
+            result = upload_blob(cmd, blob_client, file_path=item.args,
+                                 blob_type=blob_type, content_settings=guessed_content_settings,
+                                 metadata=metadata, validate_content=validate_content,
+                                 maxsize_condition=maxsize_condition, max_connections=max_connections,
+                                 lease_id=lease_id,
+                                 progress_callback=get_response_progress_hook(progress, item.name,
+                                                                              'upload_stream_current'),
+                                 if_modified_since=if_modified_since,
+                                 if_unmodified_since=if_unmodified_since, if_match=if_match,
+                                 if_none_match=if_none_match, timeout=timeout, **kwargs)
+            return _create_return_result(blob_content_settings=guessed_content_settings, upload_result=result)
+
+        results = [result for include, result in run_batch(items, _upload_blob, max_workers, progress) if include]
         num_failures = len(source_files) - len(results)
         if num_failures:
             logger.warning('%s of %s files not uploaded due to "Failed Precondition"', num_failures, len(source_files))
@@ -357,7 +365,7 @@ def _blob_precondition_check(source_blobs, if_modified_since=None, if_unmodified
 
 def storage_blob_delete_batch(client, source, container_name, pattern=None, lease_id=None,
                               delete_snapshots=None, if_modified_since=None, if_unmodified_since=None, if_match=None,
-                              if_none_match=None, timeout=None, dryrun=False, **kwargs):
+                              if_none_match=None, timeout=None, dryrun=False, max_workers=None, **kwargs):
     @check_precondition_success
     def _delete_blob(blob_name):
         blob_client = client.get_blob_client(container=container_name, blob=blob_name)
@@ -386,8 +394,27 @@ def storage_blob_delete_batch(client, source, container_name, pattern=None, leas
             logger.warning('  - %s', blob)
         return []
 
-    results = [result for include, result in (_delete_blob(blob[0]) for blob in source_blobs) if include]
-    num_failures = len(source_blobs) - len(results)
+    if if_match and if_none_match:
+        # a Blob Batch sub-request takes a single etag condition
+        results = [result for include, result in (_delete_blob(blob[0]) for blob in source_blobs) if include]
+        num_failures = len(source_blobs) - len(results)
+    else:
+        from azure.core import MatchConditions
+        blob_options = {'lease_id': lease_id}
+        if if_match:
+            blob_options.update(etag=if_match, match_condition=MatchConditions.IfNotModified)
+        if if_none_match:
+            blob_options.update(etag=if_none_match, match_condition=MatchConditions.IfModified)
+        _, skipped, failed = delete_blobs_in_batches(
+            client.get_container_client(container_name), [dict(blob_options, name=blob[0]) for blob in source_blobs],
+            max_workers=max_workers, delete_snapshots=delete_snapshots, if_modified_since=if_modified_since,
+            if_unmodified_since=if_unmodified_since, timeout=timeout)
+        if failed:
+            from azure.cli.core.azclierror import AzureResponseError
+            for blob_name, status_code, error_code in failed:
+                logger.error('Failed to delete "%s": %s %s', blob_name, status_code, error_code or '')
+            raise AzureResponseError('{} of {} blobs failed to be deleted.'.format(len(failed), len(source_blobs)))
+        num_failures = len(skipped)
     if num_failures:
         logger.warning('%s of %s blobs not deleted due to "Failed Precondition"', num_failures, len(source_blobs))
 
@@ -425,8 +452,8 @@ def _copy_blob_to_blob_container(cmd, blob_service, source_blob_service, destina
     destination_blob_name = normalize_blob_file_path(destination_path, source_blob_name)
     try:
         blob_client = blob_service.get_blob_client(container=destination_container, blob=destination_blob_name)
-        blob_client.start_copy_from_url(source_url=source_blob_url, incremental_copy=False)
-        return blob_client.url
+        copy = blob_client.start_copy_from_url(source_url=source_blob_url, incremental_copy=False)
+        return blob_client, copy['copy_status']
     except HttpResponseError as ex:
         error_template = 'Failed to copy blob {} to container {}. {}'
         raise CLIError(error_template.format(source_blob_name, destination_container, ex))
@@ -444,8 +471,8 @@ def _copy_file_to_blob_container(blob_service, source_file_service, destination_
 
     try:
         blob_client = blob_service.get_blob_client(container=destination_container, blob=destination_blob_name)
-        blob_client.start_copy_from_url(source_url=file_url, incremental_copy=False)
-        return blob_client.url
+        copy = blob_client.start_copy_from_url(source_url=file_url, incremental_copy=False)
+        return blob_client, copy['copy_status']
     except HttpResponseError as ex:
         error_template = 'Failed to copy file {} to container {}. {}'
         raise CLIError(error_template.format(source_file_name, destination_container, ex))
@@ -710,13 +737,20 @@ def renew_blob_lease(client, **kwargs):
 
 def query_blob(cmd, client, query_expression, input_config=None, output_config=None, result_file=None, **kwargs):
 
+    def _on_error(error):
+        if error.is_fatal:
+            from azure.cli.core.azclierror import AzureResponseError
+            raise AzureResponseError('Query failed at position {}: {} {}'.format(error.position, error.error,
+                                                                                 error.description))
+        logger.warning('Query error at position %s: %s %s', error.position, error.error, error.description)
+
     reader = client.query_blob(query_expression=query_expression, blob_format=input_config, output_format=output_config,
-                               **kwargs)
+                               on_error=_on_error, **kwargs)
 
+    # the records are written to the file as they arrive rather than all read in memory first
     if result_file is not None:
-        with open(result_file, 'wb') as stream:
+        with open(result_file, 'wb', buffering=QUERY_RESULT_BUFFER_SIZE) as stream:
             reader.readinto(stream)
-        stream.close()
         return None
 
     return reader.readall().decode("utf-8")
@@ -0,0 +1,47 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from azext_storage_blob_preview.tests.latest.test_storage_blob_batch_transfer import (
+    _FakeBlobService, upload_batch, download_batch, write_files)
+
+
+class StorageBlobBatchBenchmark(unittest.TestCase):
+    """ measures upload-batch and download-batch of many small files, with an in-memory service taking 5ms a request """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.source = os.path.join(self.folder, 'source')
+        write_files(self.source, {'dir{}/file{}'.format(i % 10, i): os.urandom(1024) for i in range(400)})
+
+    def _measure(self, max_workers):
+        service = _FakeBlobService(latency=0.005)
+        start = time.perf_counter()
+        upload_batch(service, self.source, max_workers=max_workers)
+        upload = time.perf_counter() - start
+
+        destination = tempfile.mkdtemp(dir=self.folder)
+        start = time.perf_counter()
+        download_batch(service, destination, max_workers=max_workers)
+        download = time.perf_counter() - start
+        return upload, download
+
+    def test_benchmark_batch_throughput(self):
+        sequential = self._measure(1)
+        concurrent = self._measure(8)
+        message = ', '.join('{} worker(s): upload {:.0f} files/s, download {:.0f} files/s'.format(
+            max_workers, 400 / upload, 400 / download)
+            for max_workers, (upload, download) in [(1, sequential), (8, concurrent)])
+        self.assertLess(sum(concurrent) * 3, sum(sequential), message)
+
+
+if __name__ == '__main__':
+    unittest.main()
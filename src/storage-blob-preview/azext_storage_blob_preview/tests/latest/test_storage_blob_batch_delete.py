@@ -0,0 +1,230 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import re
+import threading
+import time
+import unittest
+from unittest import mock
+
+from azure.core.pipeline.transport import HttpResponse, HttpTransport
+from azure.cli.core.azclierror import AzureResponseError
+
+from azext_storage_blob_preview.batch_util import MAX_BATCH_SIZE, delete_blobs_in_batches
+from azext_storage_blob_preview.operations.blob import storage_blob_delete_batch
+from azext_storage_blob_preview.vendored_sdks.azure_storage_blob.v2020_10_02 import ContainerClient
+
+_STATUS_REASONS = {202: 'Accepted', 404: 'The specified blob does not exist.', 412: 'Condition Not Met',
+                   403: 'Forbidden', 500: 'Internal Server Error', 503: 'Server Busy'}
+_ERROR_CODES = {404: 'BlobNotFound', 412: 'ConditionNotMet', 403: 'AuthorizationPermissionMismatch',
+                500: 'InternalError', 503: 'ServerBusy'}
+
+# A Blob Batch response as sent by the service, for a batch deleting "a", "b" and "c"
+_CANNED_RESPONSE = (
+    '--batchresponse_66925647-d0cb-4109-b6d3-28efe3e1e5ed\r\n'
+    'Content-Type: application/http\r\n'
+    'Content-ID: 0\r\n'
+    '\r\n'
+    'HTTP/1.1 202 Accepted\r\n'
+    'x-ms-delete-type-permanent: true\r\n'
+    'x-ms-request-id: 778fdc83-801e-0000-62ff-0334671e284f\r\n'
+    'x-ms-version: 2020-10-02\r\n'
+    '\r\n'
+    '--batchresponse_66925647-d0cb-4109-b6d3-28efe3e1e5ed\r\n'
+    'Content-Type: application/http\r\n'
+    'Content-ID: 1\r\n'
+    '\r\n'
+    'HTTP/1.1 412 The condition specified using HTTP conditional header(s) is not met.\r\n'
+    'x-ms-error-code: ConditionNotMet\r\n'
+    'x-ms-request-id: 778fdc83-801e-0000-62ff-0334671e2851\r\n'
+    'x-ms-version: 2020-10-02\r\n'
+    'Content-Length: 216\r\n'
+    'Content-Type: application/xml\r\n'
+    '\r\n'
+    '<?xml version="1.0" encoding="utf-8"?>\n'
+    '<Error><Code>ConditionNotMet</Code><Message>The condition specified using HTTP conditional header(s) is not '
+    'met.\nRequestId:778fdc83-801e-0000-62ff-0334671e2851\nTime:2026-10-18T07:00:00.0000000Z</Message></Error>\r\n'
+    '--batchresponse_66925647-d0cb-4109-b6d3-28efe3e1e5ed\r\n'
+    'Content-Type: application/http\r\n'
+    'Content-ID: 2\r\n'
+    '\r\n'
+    'HTTP/1.1 403 This request is not authorized to perform this operation using this permission.\r\n'
+    'x-ms-error-code: AuthorizationPermissionMismatch\r\n'
+    'x-ms-request-id: 778fdc83-801e-0000-62ff-0334671e2852\r\n'
+    'x-ms-version: 2020-10-02\r\n'
+    '\r\n'
+    '--batchresponse_66925647-d0cb-4109-b6d3-28efe3e1e5ed--\r\n')
+_CANNED_BOUNDARY = 'batchresponse_66925647-d0cb-4109-b6d3-28efe3e1e5ed'
+
+
+class _CannedResponse(HttpResponse):
+    def __init__(self, request, status_code, headers, body):
+        super().__init__(request, None)
+        self.status_code = status_code
+        self.headers = headers
+        self.reason = _STATUS_REASONS.get(status_code)
+        self.content_type = headers.get('Content-Type')
+        self._body = body
+
+    def body(self):
+        return self._body
+
+
+class _BlobBatchTransport(HttpTransport):
+    """
+    Stands in for the Blob Batch endpoint of a container: decodes the sub-requests of the multipart body and answers
+    them from blobs, failing the blobs named in errors with the given status codes.
+    """
+
+    def __init__(self, blobs=None, canned_response=None, latency=0.01):
+        self.blobs = set(blobs or [])
+        self.latency = latency
+        self.errors = {}
+        self.canned_response = canned_response
+        self.requests = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send(self, request, **kwargs):
+        body = request.body.decode()
+        sub_requests = re.findall(r'^DELETE /container/(\S+)\? HTTP/1.1\r\n(.*?)\r\n\r\n', body, re.M | re.S)
+        with self._lock:
+            self.requests.append(sub_requests)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.latency)
+            if self.canned_response:
+                return _CannedResponse(request, 202, {'Content-Type': 'multipart/mixed; boundary=' + _CANNED_BOUNDARY},
+                                       self.canned_response.encode())
+            parts = []
+            for index, (name, _) in enumerate(sub_requests):
+                status_code = self._delete(name)
+                headers = ['x-ms-version: 2020-10-02']
+                if status_code in _ERROR_CODES:
+                    headers.append('x-ms-error-code: ' + _ERROR_CODES[status_code])
+                parts.append('--batchresponse_1\r\nContent-Type: application/http\r\nContent-ID: {}\r\n\r\n'
+                             'HTTP/1.1 {} {}\r\n{}\r\n\r\n'.format(index, status_code, _STATUS_REASONS[status_code],
+                                                                 '\r\n'.join(headers)))
+            return _CannedResponse(request, 202, {'Content-Type': 'multipart/mixed; boundary=batchresponse_1'},
+                                   (''.join(parts) + '--batchresponse_1--\r\n').encode())
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def _delete(self, name):
+        with self._lock:
+            errors = self.errors.get(name)
+            if errors:
+                return errors.pop(0)
+            if name not in self.blobs:
+                return 404
+            self.blobs.remove(name)
+            return 202
+
+
+class _FakeBlobProperties:
+    def __init__(self, name):
+        self.name = name
+
+
+class _FakeContainerClient(ContainerClient):
+    def list_blobs(self, *args, **kwargs):
+        return [_FakeBlobProperties(name) for name in sorted(self._config.transport.blobs)]
+
+
+class _FakeBlobService:
+    def __init__(self, transport):
+        self._transport = transport
+
+    def get_container_client(self, container):
+        return _FakeContainerClient('https://account.blob.core.windows.net', container, transport=self._transport,
+                                    credential={'account_name': 'account', 'account_key': 'a2V5'})
+
+
+class StorageBlobBatchDeleteTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('azext_storage_blob_preview.batch_util.RETRY_BACKOFF', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_decode_canned_response(self):
+        transport = _BlobBatchTransport(canned_response=_CANNED_RESPONSE)
+        container_client = _FakeBlobService(transport).get_container_client('container')
+
+        deleted, skipped, failed = delete_blobs_in_batches(container_client, ['a', 'b', 'c'])
+
+        self.assertEqual((['a'], ['b'], [('c', 403, 'AuthorizationPermissionMismatch')]), (deleted, skipped, failed))
+
+    def test_encode_sub_requests(self):
+        from azure.core import MatchConditions
+        transport = _BlobBatchTransport(blobs=['a', 'dir/b c'])
+        container_client = _FakeBlobService(transport).get_container_client('container')
+
+        delete_blobs_in_batches(container_client, [
+            {'name': 'a', 'lease_id': 'lease'},
+            {'name': 'dir/b c', 'etag': '"etag"', 'match_condition': MatchConditions.IfNotModified}],
+            delete_snapshots='include')
+
+        (first, first_headers), (second, second_headers) = transport.requests[0]
+        self.assertEqual(('a', 'dir/b%20c'), (first, second))
+        self.assertIn('x-ms-lease-id: lease', first_headers)
+        self.assertIn('x-ms-delete-snapshots: include', first_headers)
+        self.assertIn('If-Match: "etag"', second_headers)
+        self.assertIn('Authorization: SharedKey account:', second_headers)
+
+    def test_delete_batch(self):
+        names = ['dir{}/blob{}'.format(i % 7, i) for i in range(1000)]
+        transport = _BlobBatchTransport(blobs=names, latency=0.2)
+        transport.errors = {'dir3/blob3': [503, 500], 'dir1/blob8': [412]}
+
+        storage_blob_delete_batch(_FakeBlobService(transport), 'container', 'container', pattern='dir*',
+                                  max_workers=4)
+
+        self.assertEqual({'dir1/blob8'}, transport.blobs)
+        # 4 batches of 256 blobs at most, and the batches retrying the blob failing with transient errors
+        self.assertEqual([1, 1, 232] + [MAX_BATCH_SIZE] * 3, sorted(len(r) for r in transport.requests))
+        self.assertEqual(4, transport.max_running)
+
+    def test_delete_batch_failures(self):
+        names = ['blob{}'.format(i) for i in range(300)]
+        transport = _BlobBatchTransport(blobs=names)
+        transport.errors = {'blob3': [403], 'blob270': [503] * 4}
+
+        with self.assertLogs('cli.azext_storage_blob_preview.operations.blob', 'ERROR') as logs, \
+                self.assertRaisesRegex(AzureResponseError, '2 of 300 blobs failed to be deleted'):
+            storage_blob_delete_batch(_FakeBlobService(transport), 'container', 'container', pattern='*')
+
+        self.assertEqual({'blob3', 'blob270'}, transport.blobs)
+        self.assertEqual(2, len(logs.output))
+        self.assertIn('"blob3": 403 AuthorizationPermissionMismatch', logs.output[0])
+        self.assertIn('"blob270": 503 ServerBusy', logs.output[1])
+
+    def test_delete_batch_dryrun(self):
+        transport = _BlobBatchTransport(blobs=['a', 'b'])
+
+        self.assertEqual([], storage_blob_delete_batch(_FakeBlobService(transport), 'container', 'container',
+                                                       pattern='*', dryrun=True))
+
+        self.assertEqual({'a', 'b'}, transport.blobs)
+        self.assertEqual([], transport.requests)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,224 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+
+from azext_storage_blob_preview.batch_util import BatchItem, BatchProgress, run_batch
+from azext_storage_blob_preview.operations.blob import storage_blob_download_batch, storage_blob_upload_batch
+from azext_storage_blob_preview.vendored_sdks.azure_storage_blob.v2020_10_02 import _models
+
+
+def _http_error(status_code):
+    error = HttpResponseError(message='error {}'.format(status_code))
+    error.status_code = status_code
+    return error
+
+
+class _FakeBlobProperties:
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+
+class _FakeDownloader:
+    def __init__(self, data):
+        self._data = data
+
+    def readinto(self, stream):
+        stream.write(self._data)
+        return len(self._data)
+
+
+class _FakeBlobClient:
+    def __init__(self, service, name):
+        self._service = service
+        self.name = name
+        self.url = 'https://account.blob.core.windows.net/container/{}'.format(name)
+
+    def upload_blob(self, data, length, **kwargs):
+        self._service.request(self.name)
+        self._service.blobs[self.name] = data.read(length)
+        return {'etag': '"{}"'.format(self.name), 'last_modified': None}
+
+    def download_blob(self, **kwargs):
+        self._service.request(self.name)
+        if self.name not in self._service.blobs:
+            raise ResourceNotFoundError('blob not found')
+        return _FakeDownloader(self._service.blobs[self.name])
+
+
+class _FakeContainerClient:
+    def __init__(self, service):
+        self._service = service
+
+    def list_blobs(self):
+        return [_FakeBlobProperties(name, len(data)) for name, data in sorted(self._service.blobs.items())]
+
+
+class _FakeBlobService:
+    """ An in-memory container, failing the requests of the blobs named in errors with the given status codes. """
+
+    url = 'https://account.blob.core.windows.net/'
+
+    def __init__(self, latency=0):
+        self.blobs = {}
+        self.errors = {}
+        self.latency = latency
+        self.requests = 0
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def request(self, name):
+        with self._lock:
+            self.requests += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            errors = self.errors.get(name)
+            status_code = errors.pop(0) if errors else None
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if status_code:
+                raise _http_error(status_code)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def get_blob_client(self, container, blob):
+        return _FakeBlobClient(self, blob)
+
+    def get_container_client(self, container):
+        return _FakeContainerClient(self)
+
+
+class _FakeCmd:
+    command_kwargs = {'resource_type': None}
+
+    @staticmethod
+    def get_models(model, **kwargs):
+        return getattr(_models, model.split('#')[1])
+
+    @staticmethod
+    def supported_api_version(**kwargs):
+        return True
+
+
+class _FakeProgressHook:
+    def __init__(self):
+        self.reports = []
+        self.ended = False
+
+    def add(self, message, value, total_val):
+        self.reports.append((message, value, total_val))
+
+    def end(self):
+        self.ended = True
+
+
+def upload_batch(service, source, **kwargs):
+    """ Upload all the files of source, like the validators of upload-batch would collect them. """
+    source_files = []
+    for root, _, files in os.walk(source):
+        for f in sorted(files):
+            path = os.path.join(root, f)
+            source_files.append((path, os.path.relpath(path, source).replace(os.sep, '/')))
+    return storage_blob_upload_batch(_FakeCmd(), service, source, 'container', source_files=source_files,
+                                     container_name='container', content_settings=_models.ContentSettings(),
+                                     **kwargs)
+
+
+def download_batch(service, destination, **kwargs):
+    return storage_blob_download_batch(service, 'container', destination, 'container', pattern='*', **kwargs)
+
+
+def write_files(folder, files):
+    for name, data in files.items():
+        path = os.path.join(folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+
+class StorageBlobBatchTransferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+
+    def test_upload_download_batch(self):
+        files = {'a.json': b'{}', 'dir/b.txt': b'b' * 1000, 'dir/sub/c': os.urandom(5 * 1024 * 1024)}
+        source = os.path.join(self.folder, 'source')
+        write_files(source, files)
+        service = _FakeBlobService()
+
+        results = upload_batch(service, source, max_workers=4)
+        self.assertEqual(files, service.blobs)
+        # the results keep the order of the files, whatever the order the uploads end in
+        self.assertEqual(['application/json', 'text/plain', None], [r['Type'] for r in results])
+        self.assertEqual(['"a.json"', '"dir/b.txt"', '"dir/sub/c"'], [r['eTag'] for r in results])
+
+        destination = os.path.join(self.folder, 'destination')
+        os.makedirs(destination)
+        hook = _FakeProgressHook()
+        results = download_batch(service, destination, max_workers=4, progress_callback=mock.Mock(hook=hook))
+        self.assertEqual(sorted(files), results)
+        for name, data in files.items():
+            with open(os.path.join(destination, name), 'rb') as f:
+                self.assertEqual(data, f.read())
+        total = sum(len(data) for data in files.values())
+        self.assertEqual(('3/3 files', total, total), hook.reports[-1])
+        self.assertTrue(hook.ended)
+
+    def test_batch_errors(self):
+        source = os.path.join(self.folder, 'source')
+        write_files(source, {'file{}'.format(i): b'data' for i in range(20)})
+
+        # the blobs failing a precondition are skipped
+        service = _FakeBlobService()
+        service.errors = {'file3': [412], 'file7': [304]}
+        results = upload_batch(service, source)
+        self.assertEqual(18, len(results))
+        self.assertNotIn('file3', service.blobs)
+
+        # any other error stops the batch, the transient ones being already retried by the SDK retry policy
+        for errors in [[403], [503, 503]]:
+            service = _FakeBlobService()
+            service.errors = {'file3': list(errors)}
+            with self.assertRaises(HttpResponseError):
+                upload_batch(service, source, max_workers=4)
+            self.assertLess(len(service.blobs), 20)
+            self.assertEqual(errors[1:], service.errors['file3'])
+
+    def test_run_batch_concurrency(self):
+        service = _FakeBlobService(latency=0.02)
+        items = [BatchItem(name='item{}'.format(i), size=1024 * i, args=i) for i in range(40)]
+        hook = _FakeProgressHook()
+
+        def action(item):
+            service.request(item.name)
+            return item.args
+
+        start = time.perf_counter()
+        results = run_batch(items, action, max_workers=8, progress=BatchProgress(hook, items))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(list(range(40)), results)
+        self.assertEqual(8, service.max_running)
+        self.assertLess(elapsed, 40 * 0.02)
+        self.assertEqual('40/40 files', hook.reports[-1][0])
+        self.assertEqual(len(items), len(hook.reports))
+
+
+if __name__ == '__main__':
+    unittest.main()
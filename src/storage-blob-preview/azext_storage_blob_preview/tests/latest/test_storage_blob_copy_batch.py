@@ -0,0 +1,150 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import unittest
+from collections import namedtuple
+from unittest import mock
+
+from azure.cli.core.azclierror import AzureResponseError
+
+from azext_storage_blob_preview.batch_util import wait_for_copies
+from azext_storage_blob_preview.operations.blob import storage_blob_copy_batch
+from azext_storage_blob_preview.vendored_sdks.azure_storage_blob.v2020_10_02 import _blob_client
+
+_CopyProperties = namedtuple('_CopyProperties', ['status', 'progress', 'status_description'])
+_BlobProperties = namedtuple('_BlobProperties', ['name', 'copy'])
+
+
+class _FakeCopyBlobClient:
+    """
+    A destination blob whose copy goes through the given (status, progress) states, one per poll, and stays in the
+    last one.
+    """
+
+    def __init__(self, service, name):
+        self._service = service
+        self.name = name
+        self.url = 'https://destination.blob.core.windows.net/container/{}'.format(name)
+        self.source_url = None
+        self.polls = 0
+
+    def start_copy_from_url(self, source_url, incremental_copy):
+        self.source_url = source_url
+        return {'copy_status': self._states[0][0]}
+
+    def get_blob_properties(self):
+        with self._service.lock:
+            self._service.running += 1
+            self._service.max_running = max(self._service.max_running, self._service.running)
+        try:
+            self.polls += 1
+            status, progress = self._states[min(self.polls, len(self._states) - 1)]
+            return _BlobProperties(self.name, _CopyProperties(status, progress, 'copy {}'.format(status)))
+        finally:
+            with self._service.lock:
+                self._service.running -= 1
+
+    @property
+    def _states(self):
+        return self._service.copies.get(self.name, [('pending', '0/10'), ('success', '10/10')])
+
+
+class _FakeBlobService:
+    account_name = 'account'
+    url = 'https://account.blob.core.windows.net/'
+
+    def __init__(self, blob_names, copies=None):
+        self.blob_names = blob_names
+        self.copies = copies or {}
+        self.blob_clients = {}
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def get_container_client(self, container):
+        return mock.Mock(list_blobs=lambda: [_BlobProperties(name, None) for name in self.blob_names])
+
+    def get_blob_client(self, container, blob):
+        with self.lock:
+            return self.blob_clients.setdefault(blob, _FakeCopyBlobClient(self, blob))
+
+
+class _FakeCmd:
+    @staticmethod
+    def get_models(model, **kwargs):
+        return getattr(_blob_client, model.split('#')[1])
+
+
+def copy_batch(service, **kwargs):
+    return storage_blob_copy_batch(_FakeCmd(), service, None, container_name='container', source_container='source',
+                                   source_sas='sig=sas', source_account_name='account', **kwargs)
+
+
+class StorageBlobCopyBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in [('COPY_POLL_INTERVAL', 0.01), ('COPY_MAX_POLL_INTERVAL', 0.08)]:
+            patcher = mock.patch('azext_storage_blob_preview.batch_util.' + name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_copy_batch(self):
+        names = ['dir/blob{}'.format(i) for i in range(50)]
+        service = _FakeBlobService(names)
+
+        results = copy_batch(service, destination_path='copied', max_workers=4)
+
+        self.assertEqual(['https://destination.blob.core.windows.net/container/copied/dir/blob{}'.format(i)
+                          for i in range(50)], results)
+        self.assertEqual('https://account.blob.core.windows.net/source/dir/blob7?sig=sas',
+                         service.blob_clients['copied/dir/blob7'].source_url)
+        # the copies aren't polled without --wait
+        self.assertEqual(0, sum(c.polls for c in service.blob_clients.values()))
+
+    def test_copy_batch_wait(self):
+        names = ['blob{}'.format(i) for i in range(40)]
+        service = _FakeBlobService(names, copies={
+            'blob1': [('success', '10/10')],
+            'blob2': [('pending', '0/10')] * 3 + [('pending', '5/10')] * 3 + [('success', '10/10')],
+            'blob3': [('pending', '0/10'), ('failed', '0/10')],
+            'blob4': [('pending', '0/10'), ('aborted', '2/10')]})
+
+        with self.assertLogs('cli.azext_storage_blob_preview.operations.blob', 'ERROR') as logs, \
+                self.assertRaisesRegex(AzureResponseError, '2 of 40 copies did not succeed'):
+            copy_batch(service, wait=True, max_workers=4)
+
+        self.assertEqual(['ERROR:cli.azext_storage_blob_preview.operations.blob:Copy to '
+                          'https://destination.blob.core.windows.net/container/blob3 failed: copy failed',
+                          'ERROR:cli.azext_storage_blob_preview.operations.blob:Copy to '
+                          'https://destination.blob.core.windows.net/container/blob4 aborted: copy aborted'],
+                         logs.output)
+        polls = {name: client.polls for name, client in service.blob_clients.items()}
+        # a copy completed when started isn't polled, the others are polled until they end
+        self.assertEqual((0, 6, 1, 1, 1), (polls['blob1'], polls['blob2'], polls['blob3'], polls['blob4'],
+                                           polls['blob5']))
+        self.assertLessEqual(service.max_running, 4)
+
+        service = _FakeBlobService(names)
+        self.assertEqual(40, len(copy_batch(service, wait=True)))
+
+    def test_wait_for_copies_backoff(self):
+        service = _FakeBlobService([], copies={
+            'stalled': [('pending', '0/10')] * 6 + [('success', '10/10')],
+            'progressing': [('pending', '{}/10'.format(i)) for i in range(6)] + [('success', '10/10')]})
+        stalled, progressing = service.get_blob_client('c', 'stalled'), service.get_blob_client('c', 'progressing')
+        sleeps = []
+
+        with mock.patch('azext_storage_blob_preview.batch_util.time.sleep', side_effect=sleeps.append), \
+                mock.patch('azext_storage_blob_preview.batch_util.time.monotonic', side_effect=lambda: sum(sleeps)):
+            self.assertEqual([], wait_for_copies([stalled, progressing], poll_interval=1, max_poll_interval=4))
+
+        # the interval of the stalled copy doubles up to the maximum, the other copy is polled every second
+        self.assertEqual((6, 6), (stalled.polls, progressing.polls))
+        self.assertEqual(1 + 2 + 4 + 4 + 4, sum(sleeps))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import time
+import tracemalloc
+import unittest
+
+from azext_storage_blob_preview.operations.blob import query_blob
+from azext_storage_blob_preview.tests.latest.test_storage_blob_query_stream import FakeQueryClient
+
+_RECORD = b'12345,contoso,2026-10-18T07:00:00Z,42.0\n' * 1600  # 64KB
+
+
+class _Results:
+    """ size bytes of query results, produced record by record """
+
+    def __init__(self, size):
+        self._count = size // len(_RECORD)
+
+    def __iter__(self):
+        return (_RECORD for _ in range(self._count))
+
+
+class StorageBlobQueryBenchmark(unittest.TestCase):
+    """ measures the peak memory of writing query results of growing sizes to --result-file """
+
+    def _measure(self, size):
+        client = FakeQueryClient(_Results(size))
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            query_blob(None, client, 'SELECT * from BlobStorage', result_file=os.devnull)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak, elapsed
+
+    def test_benchmark_query_memory(self):
+        sizes = [8, 64, 256]
+        measures = [self._measure(size * 1024 * 1024) for size in sizes]
+        peaks = [peak for peak, _ in measures]
+        message = ', '.join('{} MB to file: peak memory {:.2f} MB, {:.0f} MB/s'.format(
+            size, peak / 1024 / 1024, size / elapsed) for size, (peak, elapsed) in zip(sizes, measures))
+        # the memory doesn't grow with the size of the results
+        self.assertLess(max(peaks), 4 * 1024 * 1024, message)
+        self.assertLess(peaks[-1], peaks[0] * 2 + 512 * 1024, message)
+
+
+if __name__ == '__main__':
+    unittest.main()
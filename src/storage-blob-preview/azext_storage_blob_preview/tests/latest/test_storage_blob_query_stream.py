@@ -0,0 +1,100 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from azure.cli.core.azclierror import AzureResponseError
+
+from azext_storage_blob_preview.operations.blob import QUERY_RESULT_BUFFER_SIZE, query_blob
+from azext_storage_blob_preview.vendored_sdks.azure_storage_blob.v2020_10_02._models import BlobQueryError
+
+
+class FakeQueryReader:
+    """
+    Stands in for BlobQueryReader: results are data records, or BlobQueryError passed to the error callback, like
+    the records of the quick query response. The data records are produced as they are read.
+    """
+
+    def __init__(self, results, on_error=None):
+        self._results = results
+        self._errors = on_error
+
+    def readall(self):
+        stream = io.BytesIO()
+        self.readinto(stream)
+        return stream.getvalue()
+
+    def readinto(self, stream):
+        for result in self._results:
+            if isinstance(result, BlobQueryError):
+                self._errors(result)
+                continue
+            stream.write(result)
+
+
+class FakeQueryClient:
+    def __init__(self, results):
+        self._results = results
+
+    def query_blob(self, query_expression, on_error=None, **kwargs):
+        return FakeQueryReader(self._results, on_error)
+
+
+class StorageBlobQueryStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+
+    def test_query_blob_result(self):
+        # a multi-byte character split between two records
+        result = query_blob(None, FakeQueryClient([b'1,caf\xc3', b'\xa9\n', b'2,tea\n']), 'SELECT * from BlobStorage')
+
+        self.assertEqual('1,caf\u00e9\n2,tea\n', result)
+
+    def test_query_blob_result_file(self):
+        result_file = os.path.join(self.folder, 'result.csv')
+        records = [b'1,a\n' * (QUERY_RESULT_BUFFER_SIZE // 2), b'2,b\n']
+        written = []
+
+        def _results():
+            for record in records:
+                with open(result_file, 'rb') as f:
+                    written.append(len(f.read()))
+                yield record
+
+        self.assertIsNone(query_blob(None, FakeQueryClient(_results()), 'SELECT * from BlobStorage',
+                                     result_file=result_file))
+
+        with open(result_file, 'rb') as f:
+            self.assertEqual(b''.join(records), f.read())
+        # the records are written as they are read, not once they are all read
+        self.assertEqual([0, len(records[0])], written)
+
+    def test_query_blob_errors(self):
+        warning = BlobQueryError(error='InvalidColumnOrdinal', is_fatal=False, description='Column 3 is missing',
+                                 position=4)
+        fatal = BlobQueryError(error='ParseError', is_fatal=True, description='Unexpected token', position=8)
+
+        with self.assertLogs('cli.azext_storage_blob_preview.operations.blob', 'WARNING') as logs:
+            result = query_blob(None, FakeQueryClient([b'1,a\n', warning, b'2,b\n']), 'SELECT * from BlobStorage')
+        self.assertEqual('1,a\n2,b\n', result)
+        self.assertIn('Query error at position 4: InvalidColumnOrdinal Column 3 is missing', logs.output[0])
+
+        # the records before a fatal error are written to the result file before it is raised
+        result_file = os.path.join(self.folder, 'result.csv')
+        with self.assertRaisesRegex(AzureResponseError, 'position 8: ParseError Unexpected token'):
+            query_blob(None, FakeQueryClient([b'1,a\n', fatal, b'2,b\n']), 'SELECT * from BlobStorage',
+                       result_file=result_file)
+        with open(result_file, 'rb') as f:
+            self.assertEqual(b'1,a\n', f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
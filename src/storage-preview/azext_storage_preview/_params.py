@@ -672,6 +672,18 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.argument('source', options_list=('--source', '-s'), validator=process_file_upload_batch_parameters)
         c.argument('destination', options_list=('--destination', '-d'))
         c.argument('max_connections', arg_group='Upload Control', type=int)
+        c.argument('max_workers', arg_group='Upload Control', type=int,
+                   help='Maximum number of files uploaded concurrently. Default to 1, i.e. upload files one by one.')
+        c.argument('incremental', arg_group='Incremental Upload', action='store_true', is_preview=True,
+                   help='Only upload the files which are new or changed since the last incremental upload of the '
+                        'source to the destination, according to a local manifest of their size and modification '
+                        'time. Changes made to the file share in between are not detected.')
+        c.argument('manifest', arg_group='Incremental Upload', is_preview=True,
+                   help='The path of the manifest of the incremental uploads. Default to a manifest for the source '
+                        'and the destination in the Azure CLI configuration folder.')
+        c.argument('checksum', arg_group='Incremental Upload', action='store_true', is_preview=True,
+                   help='Also record the MD5 of the files, so that a file only touched since the last upload is '
+                        'not uploaded again.')
         c.argument('validate_content', action='store_true', min_api='2016-05-31')
         c.register_content_settings_argument(t_file_content_settings, update=False, arg_group='Content Settings',
                                              process_md5=True)
@@ -628,6 +628,9 @@ def process_file_upload_batch_parameters(cmd, namespace):
     namespace.source = os.path.realpath(namespace.source)
     namespace.share_name = namespace.destination
 
+    if (namespace.manifest or namespace.checksum) and not namespace.incremental:
+        raise ValueError('incorrect usage: --manifest and --checksum require --incremental')
+
 
 # pylint: disable=too-few-public-methods
 class PermissionScopeAddAction(argparse._AppendAction):
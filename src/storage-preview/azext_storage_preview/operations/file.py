@@ -5,6 +5,8 @@
 import os
 from knack.log import get_logger
 
+logger = get_logger(__name__)
+
 
 def storage_file_upload(client, local_file_path, content_settings=None,
                         metadata=None, validate_content=False, progress_callback=None, max_connections=2, timeout=None):
@@ -31,15 +33,21 @@ def storage_file_upload(client, local_file_path, content_settings=None,
 
 def storage_file_upload_batch(cmd, client, destination, source, destination_path=None, pattern=None, dryrun=False,
                               validate_content=False, content_settings=None, max_connections=1, metadata=None,
-                              progress_callback=None):
+                              progress_callback=None, max_workers=None, incremental=False, manifest=None,
+                              checksum=False):
     """ Upload local files to Azure Storage File Share in batch """
 
     from ..util import glob_files_locally, normalize_blob_file_path, guess_content_type
     from ..track2_util import make_file_url
 
     source_files = [c for c in glob_files_locally(source, pattern)]
-    logger = get_logger(__name__)
-    settings_class = cmd.get_models('_models#ContentSettings')
+
+    sync_manifest = None
+    if incremental:
+        from ..sync_manifest import load_changed_files
+        sync_manifest, source_files = load_changed_files(cmd, source, source_files,
+                                                         (client.account_name, destination, destination_path),
+                                                         manifest, checksum)
 
     if dryrun:
         logger.info('upload files to file share')
@@ -47,26 +55,75 @@ def storage_file_upload_batch(cmd, client, destination, source, destination_path
         logger.info('      share %s', destination)
         logger.info('      total %d', len(source_files))
         return [{'File': make_file_url(client, os.path.dirname(dst) or None, os.path.basename(dst)),
-                 'Type': guess_content_type(src, content_settings, settings_class).content_type} for src, dst in
-                source_files]
+                 'Type': guess_content_type(src, content_settings,
+                                            cmd.get_models('_models#ContentSettings')).content_type}
+                for src, dst in source_files]
 
-    # TODO: Performance improvement
-    # 1. Upload files in parallel
-    def _upload_action(src, dst):
-        dst = normalize_blob_file_path(destination_path, dst)
-        dir_name = os.path.dirname(dst)
-        file_name = os.path.basename(dst)
+    upload_list = [(src, normalize_blob_file_path(destination_path, dst)) for src, dst in source_files]
 
-        _make_directory_in_files_share(client, dir_name)
+    _make_directories_in_files_share(client, {os.path.dirname(dst) for _, dst in upload_list})
 
+    def _upload_action(src, dst):
         logger.warning('uploading %s', src)
 
         storage_file_upload(client.get_file_client(dst), src, content_settings, metadata, validate_content,
                             progress_callback, max_connections)
+        if sync_manifest:
+            sync_manifest.record(src)
+
+        return make_file_url(client, os.path.dirname(dst), os.path.basename(dst))
+
+    try:
+        return _run_batch_upload(_upload_action, upload_list, max_workers)
+    finally:
+        if sync_manifest:
+            sync_manifest.save()
+
 
-        return make_file_url(client, dir_name, file_name)
+def _run_batch_upload(upload_action, upload_list, max_workers=None):
+    """
+    Run upload_action for every (src, dst) pair of upload_list with at most max_workers uploads in flight.
+    Failed uploads are logged and skipped so a single bad file doesn't abort the batch, and a CLIError listing
+    them is raised once the batch ends. Otherwise the results are returned in the order of upload_list.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from knack.util import CLIError
+
+    max_workers = max(1, max_workers or 1)
+
+    results = []
+    failures = []
 
-    return list(_upload_action(src, dst) for src, dst in source_files)
+    def _collect(src, get_result):
+        try:
+            results.append(get_result())
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.error('Failed to upload %s: %s', src, ex)
+            failures.append(src)
+
+    if max_workers == 1:
+        for src, dst in upload_list:
+            _collect(src, lambda s=src, d=dst: upload_action(s, d))
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [(src, executor.submit(upload_action, src, dst)) for src, dst in upload_list]
+            for src, future in futures:
+                _collect(src, future.result)
+
+    if failures:
+        raise CLIError('Failed to upload {} of {} files: {}'.format(len(failures), len(upload_list),
+                                                                    ', '.join(failures)))
+    return results
+
+
+def _make_directories_in_files_share(share_client, directory_paths):
+    """
+    Create every directory of the destination tree once, parents first, before any file is uploaded so that
+    the workers never race each other on directory creation.
+    """
+    existing_dirs = set()
+    for dir_name in sorted(directory_paths):
+        _make_directory_in_files_share(share_client, dir_name, existing_dirs)
 
 
 def _make_directory_in_files_share(share_client, directory_path, existing_dirs=None):
@@ -89,7 +146,7 @@ def _make_directory_in_files_share(share_client, directory_path, existing_dirs=N
         p = os.path.dirname(p)
 
     for dir_name in reversed(parents):
-        if existing_dirs and (dir_name in existing_dirs):
+        if existing_dirs is not None and (dir_name in existing_dirs):
             continue
 
         try:
@@ -100,5 +157,5 @@ def _make_directory_in_files_share(share_client, directory_path, existing_dirs=N
             from knack.util import CLIError
             raise CLIError('Failed to create directory {}'.format(dir_name))
 
-        if existing_dirs:
-            existing_dirs.add(directory_path)
+        if existing_dirs is not None:
+            existing_dirs.add(dir_name)
@@ -0,0 +1,141 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_VERSION = 1
+MANIFEST_FOLDER_NAME = 'storage_sync_manifests'
+
+# An interrupted upload keeps the files recorded up to the last save.
+SAVE_INTERVAL = 5
+
+
+def get_default_manifest_path(cli_ctx, source, *destination):
+    """ Return the path of the manifest of the uploads of the source folder to the destination in the config dir. """
+    key = '\n'.join([os.path.realpath(source)] + [str(part or '') for part in destination])
+    return os.path.join(cli_ctx.config.config_dir, MANIFEST_FOLDER_NAME,
+                        hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+
+def load_changed_files(cmd, source, source_files, destination, manifest=None, checksum=False):
+    """
+    Load the manifest of the uploads of the source folder to the destination, by default the one in the config dir,
+    and return it with the (src, dst) pairs of source_files which are new or changed since they were last uploaded.
+    """
+    sync_manifest = SyncManifest.load(manifest or get_default_manifest_path(cmd.cli_ctx, source, *destination),
+                                      source, checksum=checksum)
+    changed = sync_manifest.filter_changed(source_files)
+    logger.warning('%d of %d files are new or changed since the last upload', len(changed), len(source_files))
+    return sync_manifest, changed
+
+
+def _file_md5(path, chunk_size=1024 * 1024):
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+class SyncManifest:
+    """
+    The size, modification time and optionally the MD5 of the files of a source folder when they were last uploaded.
+    Files are only recorded once uploaded, and the manifest is saved atomically, so an interrupted upload leaves the
+    manifest of its last save, without the files it didn't upload.
+    """
+
+    def __init__(self, path, source, checksum=False):
+        self.path = path
+        self.source = source
+        self.checksum = checksum
+        self._files = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        # when the first change not saved yet was recorded, None once saved
+        self._unsaved_since = None
+
+    @classmethod
+    def load(cls, path, source, checksum=False):
+        manifest = cls(path, source, checksum)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = json.load(f)
+            if content.get('version') == MANIFEST_VERSION and isinstance(content.get('files'), dict):
+                manifest._files = content['files']  # pylint: disable=protected-access
+            else:
+                logger.warning('Ignoring the manifest %s of an unknown version, all the files will be uploaded', path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as ex:
+            logger.warning('Ignoring the unreadable manifest %s, all the files will be uploaded: %s', path, ex)
+        return manifest
+
+    def _key(self, src):
+        return os.path.relpath(src, self.source).replace(os.sep, '/')
+
+    def filter_changed(self, source_files):
+        """ Return the (src, dst) pairs of source_files whose src is new or changed since it was recorded. """
+        changed = []
+        for src, dst in source_files:
+            key = self._key(src)
+            stat = os.stat(src)
+            entry = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+            recorded = self._files.get(key)
+            if recorded and recorded['size'] == entry['size'] and recorded['mtime'] == entry['mtime']:
+                continue
+            if self.checksum:
+                entry['md5'] = _file_md5(src)
+                if recorded and recorded['size'] == entry['size'] and recorded.get('md5') == entry['md5']:
+                    # only touched, nothing to upload
+                    self._files[key] = entry
+                    self._changed()
+                    continue
+            # the state before the upload is the one recorded, a change during the upload is seen next time
+            self._pending[key] = entry
+            changed.append((src, dst))
+        return changed
+
+    def record(self, src):
+        """ Record an uploaded file, saving the manifest once it has changes older than SAVE_INTERVAL seconds. """
+        with self._lock:
+            key = self._key(src)
+            self._files[key] = self._pending.pop(key)
+            self._changed()
+            if time.monotonic() - self._unsaved_since >= SAVE_INTERVAL:
+                self._save()
+
+    def _changed(self):
+        if self._unsaved_since is None:
+            self._unsaved_since = time.monotonic()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        if self._unsaved_since is None:
+            return
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        # written to a temporary file replacing the manifest, so the manifest is never partly written
+        fd, temp_path = tempfile.mkstemp(dir=folder or None, prefix='.manifest-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': MANIFEST_VERSION, 'source': self.source, 'files': self._files}, f)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self._unsaved_since = None
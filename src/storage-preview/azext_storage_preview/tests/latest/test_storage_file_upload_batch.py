@@ -0,0 +1,138 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from azure.core.exceptions import ResourceExistsError
+from knack.util import CLIError
+
+from ...operations.file import storage_file_upload_batch
+
+
+class _InMemoryFileShare(object):
+    """A tiny in-memory stand-in of the track2 ShareClient used by upload-batch."""
+
+    def __init__(self, fail_files=None):
+        self.account_name = 'account'
+        self.primary_endpoint = 'https://account.file.core.windows.net/share'
+        self.directories = set()
+        self.files = {}
+        self.create_directory_calls = []
+        self.fail_files = set(fail_files or [])
+        self._lock = threading.Lock()
+
+    def get_directory_client(self, directory_path):
+        return _InMemoryDirectory(self, directory_path)
+
+    def get_file_client(self, file_path):
+        return _InMemoryFile(self, file_path)
+
+
+class _InMemoryDirectory(object):
+    def __init__(self, share, path):
+        self.share = share
+        self.path = path
+
+    def create_directory(self):
+        with self.share._lock:  # pylint: disable=protected-access
+            self.share.create_directory_calls.append(self.path)
+            parent = os.path.dirname(self.path)
+            if parent and parent not in self.share.directories:
+                raise ValueError('parent directory {} does not exist'.format(parent))
+            if self.path in self.share.directories:
+                raise ResourceExistsError('directory exists')
+            self.share.directories.add(self.path)
+
+
+class _InMemoryFile(object):
+    def __init__(self, share, path):
+        self.share = share
+        self.path = path
+
+    def upload_file(self, data, length, **kwargs):  # pylint: disable=unused-argument
+        if self.path in self.share.fail_files:
+            raise IOError('connection reset')
+        content = data.read()
+        with self.share._lock:  # pylint: disable=protected-access
+            parent = os.path.dirname(self.path)
+            if parent and parent not in self.share.directories:
+                raise ValueError('directory {} does not exist'.format(parent))
+            self.share.files[self.path] = content
+        return {'length': length}
+
+
+class _MockCmd(object):
+    def get_models(self, *_):
+        return dict
+
+
+class StorageFileUploadBatchTests(unittest.TestCase):
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        for path in ['a.txt', 'apple/file_0', 'apple/file_1', 'apple/seed/file_0', 'butter/file_0']:
+            full_path = os.path.join(self.source, *path.split('/'))
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, 'w') as f:
+                f.write(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.source, ignore_errors=True)
+
+    def _upload(self, share, **kwargs):
+        return storage_file_upload_batch(_MockCmd(), share, 'share', self.source, **kwargs)
+
+    def test_upload_batch_sequential_and_parallel_results_match(self):
+        sequential_share = _InMemoryFileShare()
+        parallel_share = _InMemoryFileShare()
+
+        sequential = self._upload(sequential_share)
+        parallel = self._upload(parallel_share, max_workers=4)
+
+        self.assertEqual(sequential, parallel)
+        self.assertEqual(5, len(parallel))
+        self.assertEqual(sequential_share.files, parallel_share.files)
+        self.assertEqual(b'apple/seed/file_0', parallel_share.files['apple/seed/file_0'])
+        self.assertIn('https://account.file.core.windows.net/share/apple/seed/file_0', parallel)
+        self.assertIn('https://account.file.core.windows.net/share/a.txt', parallel)
+
+    def test_upload_batch_creates_each_directory_once(self):
+        share = _InMemoryFileShare()
+        self._upload(share, destination_path='root', max_workers=3)
+
+        self.assertEqual(len(share.create_directory_calls), len(set(share.create_directory_calls)))
+        self.assertEqual({'root', 'root/apple', 'root/apple/seed', 'root/butter'}, share.directories)
+        self.assertIn('root/apple/file_1', share.files)
+
+    def test_upload_batch_aggregates_failures(self):
+        share = _InMemoryFileShare(fail_files=['apple/file_1'])
+        with self.assertRaisesRegex(CLIError, 'Failed to upload 1 of 5 files: .*file_1$'):
+            self._upload(share, max_workers=2)
+
+        # the other files are uploaded anyway
+        self.assertEqual(4, len(share.files))
+        self.assertNotIn('apple/file_1', share.files)
+        self.assertIn('butter/file_0', share.files)
+
+    def test_upload_batch_dryrun_does_not_upload(self):
+        share = _InMemoryFileShare()
+        results = self._upload(share, dryrun=True, content_settings=_ContentSettings(), max_workers=4)
+
+        self.assertEqual(5, len(results))
+        self.assertFalse(share.files)
+        self.assertFalse(share.create_directory_calls)
+
+
+class _ContentSettings(object):
+    content_type = 'text/plain'
+    content_encoding = None
+
+
+if __name__ == '__main__':
+    unittest.main()
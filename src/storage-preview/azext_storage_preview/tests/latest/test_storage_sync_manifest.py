@@ -0,0 +1,128 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from knack.util import CLIError
+
+from ...operations.file import storage_file_upload_batch
+from ...sync_manifest import SyncManifest, get_default_manifest_path
+from .test_storage_file_upload_batch import _InMemoryFileShare, _MockCmd
+
+
+class StorageSyncManifestTests(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        self.source = os.path.join(self.folder, 'source')
+        self.manifest = os.path.join(self.folder, 'manifests', 'manifest.json')
+        for path in ['a.txt', 'apple/file_0', 'apple/seed/file_0', 'butter/file_0']:
+            self._write(path, path)
+
+    def _write(self, path, content):
+        full_path = os.path.join(self.source, *path.split('/'))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'w') as f:
+            f.write(content)
+        return full_path
+
+    def _upload(self, share, **kwargs):
+        kwargs.setdefault('manifest', self.manifest)
+        return storage_file_upload_batch(_MockCmd(), share, 'share', self.source, incremental=True, **kwargs)
+
+    def test_incremental_upload(self):
+        share = _InMemoryFileShare()
+        self.assertEqual(4, len(self._upload(share, max_workers=2)))
+        with open(self.manifest) as f:
+            self.assertEqual({'a.txt', 'apple/file_0', 'apple/seed/file_0', 'butter/file_0'},
+                             set(json.load(f)['files']))
+
+        # nothing changed, nothing is uploaded
+        share = _InMemoryFileShare()
+        self.assertEqual([], self._upload(share))
+        self.assertEqual({}, share.files)
+
+        # only the changed file and the new file are uploaded
+        changed = self._write('apple/file_0', 'changed')
+        self._write('apple/file_1', 'new')
+        share = _InMemoryFileShare()
+        self.assertEqual(['https://account.file.core.windows.net/share/apple/file_0',
+                          'https://account.file.core.windows.net/share/apple/file_1'],
+                         sorted(self._upload(share)))
+        self.assertEqual({'apple/file_0': b'changed', 'apple/file_1': b'new'}, share.files)
+
+        # a file only touched is uploaded again, unless its checksum is compared
+        os.utime(changed, ns=(1, 1))
+        self.assertEqual(1, len(self._upload(_InMemoryFileShare())))
+        os.utime(changed, ns=(2, 2))
+        # the first upload comparing the checksums records it
+        self.assertEqual(1, len(self._upload(_InMemoryFileShare(), checksum=True)))
+        os.utime(changed, ns=(3, 3))
+        self.assertEqual(0, len(self._upload(_InMemoryFileShare(), checksum=True)))
+        self.assertEqual(0, len(self._upload(_InMemoryFileShare())))
+
+        # a dry run lists the changed files only, without recording them
+        self._write('butter/file_0', 'changed')
+        results = self._upload(_InMemoryFileShare(), dryrun=True, content_settings=mock.Mock(content_type='text'))
+        self.assertEqual(1, len(results))
+        self.assertEqual(1, len(self._upload(_InMemoryFileShare())))
+
+    def test_interrupted_upload(self):
+        self._upload(_InMemoryFileShare())
+        for path in ['apple/file_0', 'apple/seed/file_0', 'butter/file_0']:
+            self._write(path, 'changed')
+
+        # a failed upload isn't recorded, so the file is uploaded next time
+        share = _InMemoryFileShare(fail_files=['apple/seed/file_0'])
+        with self.assertRaisesRegex(CLIError, 'Failed to upload 1 of 3 files'):
+            self._upload(share)
+        self.assertEqual(2, len(share.files))
+        share = _InMemoryFileShare()
+        self.assertEqual(['https://account.file.core.windows.net/share/apple/seed/file_0'], self._upload(share))
+
+        # a killed upload keeps the files recorded until its last save, and the manifest is never partly written
+        self._write('a.txt', 'changed')
+        self._write('butter/file_0', 'changed again')
+        with mock.patch('azext_storage_preview.sync_manifest.SAVE_INTERVAL', 0), \
+                mock.patch('azext_storage_preview.operations.file.storage_file_upload',
+                           side_effect=[None, KeyboardInterrupt()]), \
+                self.assertRaises(KeyboardInterrupt):
+            self._upload(_InMemoryFileShare())
+        self.assertEqual(1, len(self._upload(_InMemoryFileShare())))
+        self.assertEqual(['manifest.json'], os.listdir(os.path.dirname(self.manifest)))
+
+    def test_unreadable_manifest(self):
+        os.makedirs(os.path.dirname(self.manifest))
+        for content in ['{"files": {"a.txt": ', '{"version": 99, "files": {}}']:
+            with open(self.manifest, 'w') as f:
+                f.write(content)
+            self.assertEqual(4, len(self._upload(_InMemoryFileShare())))
+            self.assertEqual(0, len(self._upload(_InMemoryFileShare())))
+
+    def test_default_manifest_path(self):
+        cli_ctx = mock.Mock()
+        cli_ctx.config.config_dir = self.folder
+        path = get_default_manifest_path(cli_ctx, self.source, 'account', 'share', None)
+
+        self.assertEqual(os.path.join(self.folder, 'storage_sync_manifests'), os.path.dirname(path))
+        self.assertEqual(path, get_default_manifest_path(cli_ctx, self.source + os.sep, 'account', 'share', None))
+        self.assertNotEqual(path, get_default_manifest_path(cli_ctx, self.source, 'account', 'share', 'dir'))
+
+        manifest = SyncManifest.load(path, self.source)
+        src = os.path.join(self.source, 'a.txt')
+        self.assertEqual([(src, 'a.txt')], manifest.filter_changed([(src, 'a.txt')]))
+        manifest.record(src)
+        manifest.save()
+        self.assertEqual([], SyncManifest.load(path, self.source).filter_changed([(src, 'a.txt')]))
+
+
+if __name__ == '__main__':
+    unittest.main()
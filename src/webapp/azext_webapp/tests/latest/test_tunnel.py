@@ -0,0 +1,161 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import base64
+import hashlib
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+import unittest
+
+from websocket import ABNF
+
+from azext_webapp.tunnel import TunnelServer
+
+_WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+def _read_frame(rfile):
+    """ Read a websocket frame sent by a client, returning its opcode and unmasked payload. """
+    header = rfile.read(2)
+    if len(header) < 2:
+        return None, None
+    length = header[1] & 0x7f
+    if length == 126:
+        length = struct.unpack('!H', rfile.read(2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', rfile.read(8))[0]
+    mask_key = rfile.read(4)
+    return header[0] & 0x0f, ABNF.mask(mask_key, rfile.read(length))
+
+
+def _frame(opcode, payload):
+    return ABNF(1, 0, 0, 0, opcode, 0, payload).format()
+
+
+class EchoWebSocketServer(socketserver.ThreadingTCPServer):
+    """ A local websocket server echoing the data frames back, standing in for the tunnel endpoint. """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _EchoHandler)
+        self.url = 'ws://127.0.0.1:{}/AppServiceTunnel/Tunnel.ashx'.format(self.server_address[1])
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.max_connections = 0
+        self.headers = []
+
+
+class _EchoHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        self.rfile.readline()
+        headers = {}
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.lower()] = value.strip()
+        accept = base64.b64encode(hashlib.sha1((headers['sec-websocket-key'] + _WEBSOCKET_GUID).encode()).digest())
+        self.wfile.write('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                         'Sec-WebSocket-Accept: {}\r\n\r\n'.format(accept.decode()).encode())
+        with server.lock:
+            server.headers.append(headers)
+            server.connections += 1
+            server.max_connections = max(server.max_connections, server.connections)
+        try:
+            while True:
+                opcode, payload = _read_frame(self.rfile)
+                if opcode is None or opcode == ABNF.OPCODE_CLOSE:
+                    break
+                self.wfile.write(_frame(opcode, payload))
+        except OSError:
+            pass
+        finally:
+            with server.lock:
+                server.connections -= 1
+
+
+def echo_through_tunnel(port, data, chunk_size=32 * 1024):
+    """ Send data through the tunnel while reading the echo back, returning what was read. """
+    with socket.create_connection(('127.0.0.1', port)) as sock:
+        def send():
+            for start in range(0, len(data), chunk_size):
+                sock.sendall(data[start:start + chunk_size])
+
+        sending = threading.Thread(target=send)
+        sending.start()
+        received = bytearray()
+        while len(received) < len(data):
+            chunk = sock.recv(len(data) - len(received))
+            if not chunk:
+                break
+            received += chunk
+        sending.join()
+        return bytes(received)
+
+
+def start_tunnel(test):
+    """ Start a tunnel to a local echo websocket server, stopped once the test ends. """
+    echo_server = EchoWebSocketServer()
+    threading.Thread(target=echo_server.serve_forever, daemon=True).start()
+    test.addCleanup(echo_server.server_close)
+    test.addCleanup(echo_server.shutdown)
+    tunnel_server = TunnelServer('127.0.0.1', 0, 'myapp', 'user', 'password')
+    tunnel_server.remote_url = echo_server.url
+    tunnel_server.sock.listen(100)  # connections are accepted once the server thread runs
+    threading.Thread(target=tunnel_server.start_server, daemon=True).start()
+    test.addCleanup(tunnel_server.sock.close)
+    return tunnel_server, echo_server
+
+
+class TunnelServerTest(unittest.TestCase):
+
+    def test_tunnel_concurrent_connections(self):
+        tunnel_server, echo_server = start_tunnel(self)
+
+        # the connections stay open together, each one with its own websocket
+        sockets = [socket.create_connection(('127.0.0.1', tunnel_server.local_port)) for _ in range(5)]
+        for i, sock in enumerate(sockets):
+            sock.sendall('hello {}'.format(i).encode())
+            self.assertEqual('hello {}'.format(i).encode(), sock.recv(7))
+        self.assertEqual(5, echo_server.max_connections)
+
+        data = [os.urandom(256 * 1024 + i) for i in range(5)]
+        received = [None] * len(data)
+        threads = [threading.Thread(target=lambda i=i: received.__setitem__(
+            i, echo_through_tunnel(tunnel_server.local_port, data[i]))) for i in range(len(data))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(data, received)
+
+        for sock in sockets:
+            sock.close()
+        for _ in range(100):
+            if not echo_server.connections:
+                break
+            time.sleep(0.01)
+        self.assertEqual(0, echo_server.connections)
+        self.assertTrue(all(h['authorization'] == 'Basic dXNlcjpwYXNzd29yZA==' for h in echo_server.headers))
+
+    def test_tunnel_websocket_closed(self):
+        tunnel_server, _ = start_tunnel(self)
+        tunnel_server.remote_url = 'ws://127.0.0.1:1/AppServiceTunnel/Tunnel.ashx'
+
+        with socket.create_connection(('127.0.0.1', tunnel_server.local_port)) as sock:
+            sock.settimeout(5)
+            # the local connection is closed when the tunnel can't be opened
+            self.assertEqual(b'', sock.recv(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import threading
+import time
+import unittest
+
+from azext_webapp.tests.latest.test_tunnel import echo_through_tunnel, start_tunnel
+
+
+class TunnelServerBenchmark(unittest.TestCase):
+    """ measures the loopback throughput of the tunnel, with a local websocket server echoing the data back """
+
+    def _measure(self, connections, size):
+        tunnel_server, _ = start_tunnel(self)
+        data = os.urandom(size)
+        received = []
+        threads = [threading.Thread(target=lambda: received.append(echo_through_tunnel(tunnel_server.local_port, data)))
+                   for _ in range(connections)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        self.assertEqual(connections, len(received))
+        self.assertTrue(all(r == data for r in received))
+        return connections * size / elapsed / 1024 / 1024
+
+    def test_benchmark_tunnel_throughput(self):
+        for connections, size in [(1, 32 * 1024 * 1024), (8, 8 * 1024 * 1024)]:
+            throughput = self._measure(connections, size)
+            self.assertGreater(throughput, 5, '{} connection(s): {:.1f} MB/s each way'.format(connections, throughput))
+
+
+if __name__ == '__main__':
+    unittest.main()
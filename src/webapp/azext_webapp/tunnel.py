@@ -4,14 +4,10 @@
 # --------------------------------------------------------------------------------------------
 
 # pylint: disable=import-error,unused-import,import-outside-toplevel,super-with-arguments
-import sys
 import ssl
 import socket
-import time
-import traceback
 import logging as logs
 from contextlib import closing
-from datetime import datetime
 from threading import Thread
 
 import websocket
@@ -21,18 +17,16 @@ from knack.util import CLIError
 from knack.log import get_logger
 logger = get_logger(__name__)
 
+# Size of the reads from local connections, and so of the websocket frames sent to the tunnel.
+BUFFER_SIZE = 64 * 1024
+
 
 class TunnelWebSocket(WebSocket):
     def recv_frame(self):
         frame = super(TunnelWebSocket, self).recv_frame()
-        logger.info('Received frame: %s', frame)
+        logger.debug('Received frame, opcode: %s, length: %s', frame.opcode, len(frame.data))
         return frame
 
-    def recv(self):
-        data = super(TunnelWebSocket, self).recv()
-        logger.info('Received websocket data: %s', data)
-        return data
-
 
 # pylint: disable=no-member,too-many-instance-attributes,bare-except,no-self-use
 class TunnelServer(object):
@@ -44,8 +38,7 @@ class TunnelServer(object):
         self.remote_addr = remote_addr
         self.remote_user_name = remote_user_name
         self.remote_password = remote_password
-        self.client = None
-        self.ws = None
+        self.remote_url = 'wss://{}{}'.format(self.remote_addr, '.scm.azurewebsites.net/AppServiceTunnel/Tunnel.ashx')
         logger.info('Creating a socket on port: %s', self.local_port)
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         logger.info('Setting socket options')
@@ -105,59 +98,66 @@ class TunnelServer(object):
     def _listen(self):
         self.sock.listen(100)
         index = 0
-        basic_auth_string = self.create_basic_auth()
+        basic_auth_header = 'Authorization: Basic {}'.format(self.create_basic_auth())
+        cli_logger = get_logger()  # get CLI logger which has the level set through command lines
+        is_verbose = any(handler.level <= logs.INFO for handler in cli_logger.handlers)
+        if is_verbose:
+            logger.info('Websocket tracing enabled')
+            websocket.enableTrace(True)
+        else:
+            logger.warning('Websocket tracing disabled, use --verbose flag to enable')
+            websocket.enableTrace(False)
         while True:
-            self.client, _address = self.sock.accept()
-            self.client.settimeout(1800)
-            host = 'wss://{}{}'.format(self.remote_addr, '.scm.azurewebsites.net/AppServiceTunnel/Tunnel.ashx')
-            basic_auth_header = 'Authorization: Basic {}'.format(basic_auth_string)
-            cli_logger = get_logger()  # get CLI logger which has the level set through command lines
-            is_verbose = any(handler.level <= logs.INFO for handler in cli_logger.handlers)
-            if is_verbose:
-                logger.info('Websocket tracing enabled')
-                websocket.enableTrace(True)
-            else:
-                logger.warning('Websocket tracing disabled, use --verbose flag to enable')
-                websocket.enableTrace(False)
-            self.ws = create_connection(host,
-                                        sockopt=((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),),
-                                        class_=TunnelWebSocket,
-                                        header=[basic_auth_header],
-                                        sslopt={'cert_reqs': ssl.CERT_NONE},
-                                        enable_multithread=True)
-            logger.info('Websocket, connected status: %s', self.ws.connected)
+            try:
+                client, _address = self.sock.accept()
+            except OSError:
+                if self.sock.fileno() == -1:  # the server socket was closed
+                    return
+                raise
+            client.settimeout(1800)
             index = index + 1
             logger.info('Got debugger connection... index: %s', index)
-            debugger_thread = Thread(target=self._listen_to_client, args=(self.client, self.ws, index))
-            web_socket_thread = Thread(target=self._listen_to_web_socket, args=(self.client, self.ws, index))
-            debugger_thread.start()
-            web_socket_thread.start()
-            logger.info('Both debugger and websocket threads started...')
-            logger.warning('Successfully connected to local server..')
-            debugger_thread.join()
-            web_socket_thread.join()
-            logger.info('Both debugger and websocket threads stopped...')
-            logger.warning('Stopped local server..')
+            # each connection is tunneled through its own websocket, while the next connections are accepted
+            Thread(target=self._tunnel, args=(client, basic_auth_header, index), daemon=True).start()
+
+    def _tunnel(self, client, basic_auth_header, index):
+        try:
+            # the http_proxy and https_proxy environment variables are honoured
+            ws_socket = create_connection(self.remote_url,
+                                          sockopt=((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),),
+                                          class_=TunnelWebSocket,
+                                          header=[basic_auth_header],
+                                          sslopt={'cert_reqs': ssl.CERT_NONE},
+                                          enable_multithread=True)
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning('Failed to open the tunnel for connection %s: %s', index, ex)
+            client.close()
+            return
+        logger.info('Websocket, connected status: %s', ws_socket.connected)
+        web_socket_thread = Thread(target=self._listen_to_web_socket, args=(client, ws_socket, index), daemon=True)
+        web_socket_thread.start()
+        logger.info('Both debugger and websocket threads started...')
+        logger.warning('Successfully connected to local server.. index: %s', index)
+        self._listen_to_client(client, ws_socket, index)
+        web_socket_thread.join()
+        logger.info('Both debugger and websocket threads stopped...')
+        logger.warning('Stopped local server.. index: %s', index)
 
     def _listen_to_web_socket(self, client, ws_socket, index):
         while True:
             try:
-                logger.info('Waiting for websocket data, connection status: %s, index: %s', ws_socket.connected, index)
                 data = ws_socket.recv()
-                logger.info('Received websocket data: %s, index: %s', data, index)
                 if data:
-                    # Set the response to echo back the recieved data
-                    response = data
-                    logger.info('Sending to debugger, response: %s, index: %s', response, index)
-                    client.sendall(response)
-                    logger.info('Done sending to debugger, index: %s', index)
+                    logger.debug('Sending %s bytes to debugger, index: %s', len(data), index)
+                    client.sendall(data)
                 else:
                     logger.info('Client disconnected!, index: %s', index)
                     client.close()
                     ws_socket.close()
                     break
             except:
-                traceback.print_exc(file=sys.stdout)
+                # the other direction closes both sockets once it stops
+                logger.info('Websocket disconnected, index: %s', index, exc_info=True)
                 client.close()
                 ws_socket.close()
                 return False
@@ -165,22 +165,18 @@ class TunnelServer(object):
     def _listen_to_client(self, client, ws_socket, index):
         while True:
             try:
-                logger.info('Waiting for debugger data, index: %s', index)
-                buf = bytearray(4096)
-                nbytes = client.recv_into(buf, 4096)
-                logger.info('Received debugger data, nbytes: %s, index: %s', nbytes, index)
-                if nbytes > 0:
-                    responseData = buf[0:nbytes]
-                    logger.info('Sending to websocket, response data: %s, index: %s', responseData, index)
-                    ws_socket.send_binary(responseData)
-                    logger.info('Done sending to websocket, index: %s', index)
+                # the frames are masked from bytes much faster than from a bytearray or memoryview
+                data = client.recv(BUFFER_SIZE)
+                if data:
+                    logger.debug('Sending %s bytes to websocket, index: %s', len(data), index)
+                    ws_socket.send_binary(data)
                 else:
                     logger.warning('Client disconnected %s', index)
                     client.close()
                     ws_socket.close()
                     break
             except:
-                traceback.print_exc(file=sys.stdout)
+                logger.info('Debugger disconnected, index: %s', index, exc_info=True)
                 client.close()
                 ws_socket.close()
                 return False